@@ -0,0 +1,675 @@
+# 畫布 (ImageWidget) 的效能基準：offscreen 下以合成影像與標註量測繪製與各種互動, 結果寫成 JSON
+# 用法 (在專案根目錄):
+#   python scripts/bench_canvas.py [--quick] [--out bench.json] [--baseline 舊的.json] [--tolerance 0.25]
+#                                  [--images 1mp 12mp 50mp] [--sets boxes_1k poly_200x500 ...] [--backend qpainter|opengl]
+# 未設定 QT_QPA_PLATFORM 時自動用 offscreen (不需要螢幕); OpenGL 畫布需要 GL context, 請在有螢幕或
+# xvfb-run 下以 QT_QPA_PLATFORM=xcb 執行。
+# 每種影像尺寸量 load_image, 每種「影像 × 標註組合」量:
+#   paint_cold (標註剛改過, 含重建圖層 / 索引)、paint_warm、命中判斷、點選、框選、
+#   滾輪縮放 + 重繪、拖曳平移 + 重繪、undo / redo
+# 量測前先做兩項正確性檢查, 不符時 exit code 為 1:
+#   局部重繪 (只重畫 update(rect) 的範圍) 疊出來的畫面與整張重繪逐像素相同 (QPainter 畫布);
+#   拖曳移動後的標註仍畫得出來、點得到 (圖層裁切與命中索引沒有沿用移動前的位置)。
+# 給 --baseline 時逐項比較中位數, 慢了超過 tolerance (且差距大於 NOISE_FLOOR_MS) 視為退步, exit code 為 1。
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QT_VERSION_STR, QEvent, QPoint, QPointF, Qt
+from PyQt6.QtGui import QImage, QMouseEvent, QWheelEvent
+from PyQt6.QtWidgets import QApplication
+
+VIEW_W, VIEW_H = 1280, 800
+# 影像尺寸 (寬, 高)
+IMAGES = {
+    "1mp": (1280, 800),
+    "12mp": (4000, 3000),
+    "50mp": (8192, 6144),
+}
+# 標註組合: (bbox 數, polygon 數, 每個 polygon 的頂點數)
+ANNOTATION_SETS = {
+    "boxes_10": (10, 0, 0),
+    "boxes_1k": (1000, 0, 0),
+    "boxes_20k": (20000, 0, 0),
+    "poly_100x10": (0, 100, 10),
+    "poly_200x500": (0, 200, 500),
+    "poly_20x5k": (0, 20, 5000),
+    "mixed": (1000, 200, 100),
+}
+QUICK_IMAGES = ["1mp", "12mp"]
+QUICK_SETS = ["boxes_1k", "poly_200x500", "mixed"]
+# 每項量幾次 (取中位數); 很慢的項目 (load_image、paint_cold) 次數較少
+REPEAT = 15
+REPEAT_SLOW = 5
+# 與 baseline 比較時, 差距小於此值 (ms) 一律不算退步: 太快的項目只會量到雜訊
+NOISE_FLOOR_MS = 1.0
+UNDO_STEPS = 10
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ImageWidget 繪製與互動的效能基準")
+    parser.add_argument("--out", type=Path, default=None, help="結果 JSON 的輸出路徑")
+    parser.add_argument("--baseline", type=Path, default=None, help="要比較的舊結果 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="中位數允許變慢的比例 (預設: 0.25)")
+    parser.add_argument("--quick", action="store_true", help=f"只跑 {QUICK_IMAGES} × {QUICK_SETS}")
+    parser.add_argument("--images", nargs="+", choices=list(IMAGES), default=None, help="影像尺寸")
+    parser.add_argument("--sets", nargs="+", choices=list(ANNOTATION_SETS), default=None, help="標註組合")
+    parser.add_argument("--backend", choices=["qpainter", "opengl"], default="qpainter", help="畫布 (預設: qpainter)")
+    parser.add_argument("--seed", type=int, default=0, help="合成資料的隨機種子 (預設: 0)")
+    return parser.parse_args()
+
+
+# ------------------------------------------------------------------ 合成資料
+
+
+def make_image(path: Path, width: int, height: int, seed: int) -> None:
+    """漸層 + 雜訊 + 色塊的 JPEG (純色圖的解碼與縮放太快, 量不出真實成本)"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width]
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[..., 0] = (xx * 255 // width).astype(np.uint8)
+    img[..., 1] = (yy * 255 // height).astype(np.uint8)
+    img[..., 2] = rng.integers(0, 256, (height, width), dtype=np.uint8)
+    for _ in range(20):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        cv2.rectangle(img, (x, y), (x + width // 10, y + height // 10), tuple(int(c) for c in rng.integers(0, 256, 3)), -1)
+    cv2.imwrite(str(path), img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+
+def make_annotations(width: int, height: int, n_boxes: int, n_polys: int, n_vertices: int, seed: int):
+    from src.utils.model import Bbox, Polygon
+
+    rng = random.Random(seed)
+    # 框的大小隨影像尺寸縮放, 數量多時框小一點 (貼近實際的密集標註)
+    scale = min(width, height) / max(8.0, n_boxes ** 0.5 * 2)
+    bboxes = []
+    for i in range(n_boxes):
+        w = max(4, int(rng.uniform(0.3, 1.0) * scale))
+        h = max(4, int(rng.uniform(0.3, 1.0) * scale))
+        x = rng.randint(0, max(0, width - w))
+        y = rng.randint(0, max(0, height - h))
+        angle = rng.choice([0.0, 0.0, 0.0, rng.uniform(-60, 60)])
+        bboxes.append(Bbox(x, y, w, h, f"obj{i % 20}", round(rng.random(), 2), angle))
+    polygons = []
+    radius = min(width, height) / max(8.0, n_polys ** 0.5 * 3)
+    for i in range(n_polys):
+        cx = rng.uniform(radius, width - radius)
+        cy = rng.uniform(radius, height - radius)
+        # 不規則的星形輪廓: 頂點多時形狀仍然凹凸, 不會被簡化成少數幾點
+        points = []
+        for j in range(n_vertices):
+            a = 2 * np.pi * j / n_vertices
+            r = radius * (0.6 + 0.4 * abs(np.sin(a * 7 + i)))
+            points.append((cx + r * np.cos(a), cy + r * np.sin(a)))
+        polygons.append(Polygon(points, f"seg{i % 20}", round(rng.random(), 2)))
+    return bboxes, polygons
+
+
+# ------------------------------------------------------------------ 量測工具
+
+
+def measure(fn, repeat: int, setup=None) -> dict:
+    """執行 repeat 次 fn, 回傳毫秒的統計; setup 在每次之前執行且不計時"""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "min_ms": round(times[0], 3),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+        "n": len(times),
+    }
+
+
+def mouse(widget, kind: QEvent.Type, pos: QPoint, button=Qt.MouseButton.NoButton, buttons=None) -> None:
+    buttons = button if buttons is None else buttons
+    event = QMouseEvent(kind, QPointF(pos), QPointF(pos), button, buttons, Qt.KeyboardModifier.NoModifier)
+    handler = {
+        QEvent.Type.MouseButtonPress: widget.mousePressEvent,
+        QEvent.Type.MouseMove: widget.mouseMoveEvent,
+        QEvent.Type.MouseButtonRelease: widget.mouseReleaseEvent,
+    }[kind]
+    handler(event)
+
+
+def wheel(widget, pos: QPoint, delta: int) -> None:
+    event = QWheelEvent(
+        QPointF(pos),
+        QPointF(pos),
+        QPoint(0, 0),
+        QPoint(0, delta),
+        Qt.MouseButton.NoButton,
+        Qt.KeyboardModifier.NoModifier,
+        Qt.ScrollPhase.NoScrollPhase,
+        False,
+    )
+    widget.wheelEvent(event)
+
+
+def paint(widget) -> None:
+    """同步重繪一次 (OpenGL 畫布則重繪 GL 那一層)"""
+    target = widget._gl_canvas if widget._gl_canvas is not None else widget
+    target.repaint()
+
+
+# ------------------------------------------------------------------ 各項量測
+
+
+def bench_load(widget, image_path: Path) -> dict:
+    return measure(lambda: widget.load_image(str(image_path)), REPEAT_SLOW)
+
+
+def bench_scenario(app, widget, image_path: Path, set_name: str, seed: int) -> dict:
+    from src.image_widget import DrawingMode
+
+    widget.load_image(str(image_path))
+    width, height = widget.pixmap.width(), widget.pixmap.height()
+    n_boxes, n_polys, n_vertices = ANNOTATION_SETS[set_name]
+    bboxes, polygons = make_annotations(width, height, n_boxes, n_polys, n_vertices, seed)
+    widget.bboxes, widget.polygons = bboxes, polygons
+    widget.history.clear()
+    widget.set_drawing_mode(DrawingMode.SELECT)
+    widget.fitView()
+    widget.markAnnotationsChanged()
+    app.processEvents()
+    paint(widget)
+    rng = random.Random(seed)
+    results = {}
+
+    results["paint_cold"] = measure(lambda: paint(widget), REPEAT_SLOW, setup=widget.markAnnotationsChanged)
+    results["paint_warm"] = measure(lambda: paint(widget), REPEAT)
+
+    # 命中判斷: 在隨機位置按下再放開 (不重繪), 走的是點選時「找出游標下的標註」那一段;
+    # 索引第一次建立不計入
+    widget._hitIndex()
+    points = [QPoint(rng.randrange(VIEW_W), rng.randrange(VIEW_H)) for _ in range(200)]
+    it = iter(points * 100)
+
+    def press_release():
+        pos = next(it)
+        mouse(widget, QEvent.Type.MouseButtonPress, pos, Qt.MouseButton.LeftButton)
+        mouse(widget, QEvent.Type.MouseButtonRelease, pos, Qt.MouseButton.LeftButton, Qt.MouseButton.NoButton)
+
+    results["hit_test"] = measure(press_release, len(points))
+    widget._resetSelection()
+    widget.history.clear()
+
+    # 點選: 按下 + 放開在某個標註內部 (含選取後的重繪); polygon 點在中心, 避免抓到頂點變成拖曳頂點
+    targets = []
+    for b in bboxes[:50]:
+        targets.append(widget._scale_to_widget(QPoint(b.x + b.width // 2, b.y + b.height // 2)))
+    for p in polygons[:50]:
+        cx, cy = np.mean(p.points, axis=0)
+        targets.append(widget._scale_to_widget(QPoint(int(cx), int(cy))))
+    targets = targets or points[:10]
+    it_click = iter(targets * 100)
+
+    def click():
+        pos = next(it_click)
+        mouse(widget, QEvent.Type.MouseButtonPress, pos, Qt.MouseButton.LeftButton)
+        mouse(widget, QEvent.Type.MouseButtonRelease, pos, Qt.MouseButton.LeftButton, Qt.MouseButton.NoButton)
+        paint(widget)
+
+    results["click_select"] = measure(click, min(REPEAT, len(targets)))
+    widget.history.clear()
+
+    # 框選: 從左上拖到畫面中央附近, 每次移動都重繪, 放開時找出框內的標註
+    def rubber_band():
+        start = QPoint(5, 5)
+        widget.selection_rect_start = start
+        widget.current_mouse_pos = start
+        for k in range(1, 11):
+            pos = QPoint(5 + k * VIEW_W // 20, 5 + k * VIEW_H // 20)
+            mouse(widget, QEvent.Type.MouseMove, pos, Qt.MouseButton.NoButton, Qt.MouseButton.LeftButton)
+            paint(widget)
+        mouse(widget, QEvent.Type.MouseButtonRelease, pos, Qt.MouseButton.LeftButton, Qt.MouseButton.NoButton)
+        paint(widget)
+
+    results["rubber_band"] = measure(rubber_band, REPEAT_SLOW)
+    widget._resetSelection()
+
+    # 縮放: 滾輪放大 10 格再縮回, 每格重繪一次
+    center = QPoint(VIEW_W // 2, VIEW_H // 2)
+
+    def zoom_sequence():
+        for delta in [120] * 10 + [-120] * 10:
+            wheel(widget, center, delta)
+            paint(widget)
+
+    results["zoom_sequence"] = measure(zoom_sequence, REPEAT_SLOW, setup=widget.fitView)
+
+    # 平移: 放大 4 倍後以中鍵拖曳 20 步, 每步重繪
+    def zoom_in():
+        widget.fitView()
+        for _ in range(8):
+            wheel(widget, center, 120)
+        paint(widget)
+
+    def pan_sequence():
+        pos = QPoint(center)
+        mouse(widget, QEvent.Type.MouseButtonPress, pos, Qt.MouseButton.MiddleButton)
+        for k in range(20):
+            pos = QPoint(pos.x() + (15 if k < 10 else -15), pos.y() + (10 if k < 10 else -10))
+            mouse(widget, QEvent.Type.MouseMove, pos, Qt.MouseButton.NoButton, Qt.MouseButton.MiddleButton)
+            paint(widget)
+        mouse(widget, QEvent.Type.MouseButtonRelease, pos, Qt.MouseButton.MiddleButton, Qt.MouseButton.NoButton)
+
+    results["pan_sequence"] = measure(pan_sequence, REPEAT_SLOW, setup=zoom_in)
+    widget.fitView()
+
+    # undo / redo: 先做 UNDO_STEPS 次編輯 (與拖曳相同, 改動前 pushHistory), 再逐步還原 / 重做
+    def edit(k: int) -> None:
+        widget.pushHistory()
+        if widget.bboxes:
+            widget.bboxes[k % len(widget.bboxes)].x += 1
+        elif widget.polygons:
+            poly = widget.polygons[k % len(widget.polygons)]
+            # 與頂點拖曳相同, 換成新的 list (見 Polygon 的說明)
+            x, y = poly.points[0]
+            poly.points = [(x + 1, y)] + poly.points[1:]
+
+    def prepare_undo():
+        widget.history.clear()
+        for k in range(UNDO_STEPS):
+            edit(k)
+
+    def undo_all():
+        for _ in range(UNDO_STEPS):
+            widget.undo()
+
+    def redo_all():
+        for _ in range(UNDO_STEPS):
+            widget.redo()
+
+    results["push_history"] = measure(lambda: edit(0), REPEAT, setup=widget.history.clear)
+    per_step = {}
+    for name, fn, setup in (("undo", undo_all, prepare_undo), ("redo", redo_all, lambda: (prepare_undo(), undo_all()))):
+        stats = measure(fn, REPEAT_SLOW, setup=setup)
+        # 記錄每一步的時間, 與步數無關
+        per_step[name] = {k: (round(v / UNDO_STEPS, 3) if k.endswith("_ms") else v) for k, v in stats.items()}
+    results.update(per_step)
+    widget.history.clear()
+    return results
+
+
+# ------------------------------------------------------------------ 正確性檢查
+
+
+def check_partial_repaint(app, widget, image_path: Path) -> list[str]:
+    """各種互動的每一步都只重畫 update(rect) 記下的範圍並疊在前一幀上, 與整張重繪比對
+
+    漏掉的 dirty rect 會讓畫面留下舊的殘影或缺一角; 不帶參數的 update() 視為整張重繪。
+    OpenGL 畫布每次都整張重繪, 不做這項檢查。
+
+    Returns:
+        不一致的步驟說明; 空的表示通過
+    """
+    from PyQt6.QtCore import QRect
+    from PyQt6.QtGui import QPainter, QPixmap, QRegion
+
+    from src.image_widget import DrawingMode
+    from src.utils.model import Bbox, Polygon
+
+    widget.load_image(str(image_path))
+    width, height = widget.pixmap.width(), widget.pixmap.height()
+    u = min(width, height) // 20
+    widget.bboxes = [
+        Bbox(2 * u, 2 * u, 2 * u, 3 * u // 2, "box", 0.9),
+        Bbox(6 * u, 4 * u, 3 * u, 2 * u, "rotated", 0.5, 30),
+        Bbox(12 * u, 8 * u, u, u, "small", 0.3),
+    ]
+    widget.polygons = [
+        Polygon([(8 * u, 2 * u), (10 * u, 2.2 * u), (9.8 * u, 3.6 * u), (8.2 * u, 3.4 * u)], "poly", 0.8)
+    ]
+    widget.history.clear()
+    widget.set_drawing_mode(DrawingMode.SELECT)
+    widget.fitView()
+    widget.markAnnotationsChanged()
+    app.processEvents()
+
+    canvas = QPixmap(widget.size())
+    pending: list = []
+    failures = []
+
+    def render_full(target: QPixmap) -> None:
+        painter = QPainter(target)
+        widget.render(painter)
+        painter.end()
+
+    def record(*args):
+        pending.append(QRect(args[0]) if len(args) == 1 and isinstance(args[0], QRect) else None)
+        return real_update(*args)
+
+    def check(step: str) -> None:
+        if any(r is None for r in pending):
+            render_full(canvas)
+        for rect in pending:
+            if rect is not None:
+                painter = QPainter(canvas)
+                widget.render(painter, rect.topLeft(), QRegion(rect))
+                painter.end()
+        pending.clear()
+        ref = QPixmap(widget.size())
+        render_full(ref)
+        diff = (pixmap_array(canvas) != pixmap_array(ref)).any(axis=2)
+        if diff.any():
+            ys, xs = np.nonzero(diff)
+            failures.append(
+                f"{step}: {int(diff.sum())} px 與整張重繪不同 (x {xs.min()}~{xs.max()}, y {ys.min()}~{ys.max()})"
+            )
+            # 之後的步驟從正確的畫面接著比, 一個漏洞只報一次
+            render_full(canvas)
+
+    def to_widget(x: float, y: float) -> QPoint:
+        return widget._scale_to_widget(QPoint(int(x), int(y)))
+
+    def click(step: str, pos: QPoint) -> None:
+        mouse(widget, QEvent.Type.MouseButtonPress, pos, Qt.MouseButton.LeftButton)
+        check(f"{step} 按下")
+        mouse(widget, QEvent.Type.MouseButtonRelease, pos, Qt.MouseButton.LeftButton, Qt.MouseButton.NoButton)
+        check(f"{step} 放開")
+
+    def drag_checked(step: str, start: QPoint, end: QPoint, steps: int = 6) -> None:
+        mouse(widget, QEvent.Type.MouseButtonPress, start, Qt.MouseButton.LeftButton)
+        check(f"{step} 按下")
+        for k in range(1, steps + 1):
+            pos = start + (end - start) * (k / steps)
+            mouse(widget, QEvent.Type.MouseMove, pos, Qt.MouseButton.NoButton, Qt.MouseButton.LeftButton)
+            check(f"{step} 移動 {k}")
+        mouse(widget, QEvent.Type.MouseButtonRelease, end, Qt.MouseButton.LeftButton, Qt.MouseButton.NoButton)
+        check(f"{step} 放開")
+
+    render_full(canvas)
+    real_update = widget.update
+    widget.update = record
+    try:
+        for x, y in ((3 * u, 2.7 * u), (0, 0), (7.5 * u, 5 * u)):
+            mouse(widget, QEvent.Type.MouseMove, to_widget(x, y))
+            check("hover")
+        drag_checked("移動 bbox", to_widget(3 * u, 2.7 * u), to_widget(4 * u, 10 * u))
+        drag_checked("移動 polygon", to_widget(9 * u, 2.8 * u), to_widget(3 * u, 14 * u))
+        poly = widget.polygons[0]
+        cx, cy = np.mean(poly.points, axis=0)
+        click("點選 polygon", to_widget(cx, cy))
+        x0, y0 = poly.points[0]
+        drag_checked("拖頂點", to_widget(x0, y0), to_widget(x0 + 2 * u, y0 - u))
+        box = widget.bboxes[2]
+        click("點選 bbox", to_widget(box.x + box.width / 2, box.y + box.height / 2))
+        corner = (box.x + box.width, box.y + box.height)
+        drag_checked("resize", to_widget(*corner), to_widget(corner[0] + 3 * u, corner[1] + 2 * u))
+        drag_checked("框選", QPoint(5, 5), QPoint(VIEW_W // 2, VIEW_H * 3 // 4))
+        click("取消選取", QPoint(VIEW_W - 10, VIEW_H - 10))
+
+        # BBOX 兩點模式: 第一次按下就出現 0x0 的預覽, 按住拖曳不改預覽, 放開後移動才跟著游標
+        widget.set_drawing_mode(DrawingMode.BBOX)
+        check("切到 BBOX")
+        drag_checked("BBOX 第一點 (按住拖曳)", to_widget(14 * u, 2 * u), to_widget(16 * u, 4 * u))
+        for k in range(1, 4):
+            mouse(widget, QEvent.Type.MouseMove, to_widget(14 * u + k * u, 2 * u + k * u))
+            check(f"BBOX 預覽 {k}")
+        click("BBOX 第二點", to_widget(17 * u, 5 * u))
+
+        widget.set_drawing_mode(DrawingMode.POLYGON)
+        check("切到 POLYGON")
+        for k, (x, y) in enumerate(((2 * u, 9 * u), (4 * u, 9.2 * u), (3.6 * u, 11 * u))):
+            click(f"polygon 第 {k + 1} 點", to_widget(x, y))
+            mouse(widget, QEvent.Type.MouseMove, to_widget(x + u, y + u))
+            check(f"polygon 第 {k + 1} 點後移動")
+        widget.undo()
+        check("undo")
+    finally:
+        del widget.update
+        widget._cancelInProgressDrawing()
+        widget.set_drawing_mode(DrawingMode.SELECT)
+        widget.bboxes, widget.polygons = [], []
+        widget.history.clear()
+        widget.markAnnotationsChanged()
+    return failures
+
+
+def grab_array(widget) -> np.ndarray:
+    """畫面擷取成 (h, w, 3) 陣列 (OpenGL 畫布也由 QWidget.grab 一併擷取)"""
+    return pixmap_array(widget.grab())
+
+
+def pixmap_array(pixmap) -> np.ndarray:
+    """QPixmap 轉成 (h, w, 3) 的 RGB 陣列"""
+    img = pixmap.toImage().convertToFormat(QImage.Format.Format_RGB888)
+    arr = np.frombuffer(img.constBits().asstring(img.sizeInBytes()), np.uint8)
+    return arr.reshape(img.height(), img.bytesPerLine())[:, : img.width() * 3].reshape(img.height(), img.width(), 3).copy()
+
+
+def drag(widget, start: QPoint, end: QPoint, steps: int = 10) -> None:
+    """SELECT 模式下以左鍵從 start 拖到 end, 每步重繪"""
+    mouse(widget, QEvent.Type.MouseButtonPress, start, Qt.MouseButton.LeftButton)
+    for k in range(1, steps + 1):
+        pos = start + (end - start) * (k / steps)
+        mouse(widget, QEvent.Type.MouseMove, pos, Qt.MouseButton.NoButton, Qt.MouseButton.LeftButton)
+        paint(widget)
+    mouse(widget, QEvent.Type.MouseButtonRelease, end, Qt.MouseButton.LeftButton, Qt.MouseButton.NoButton)
+    paint(widget)
+
+
+def check_move(app, widget, image_path: Path) -> list[str]:
+    """拖曳移動一個 bbox、一個 polygon, 再拖 polygon 的一個頂點; 每次放開後放大到新位置檢查:
+    - 畫面與強制重建圖層 / 索引後的畫面相同 (沒有以舊位置裁切掉)
+    - 在新位置點得到 (命中索引已更新)
+
+    Returns:
+        不符合的項目說明; 空的表示通過
+    """
+    from src.image_widget import DrawingMode
+    from src.utils.model import Bbox, Polygon
+
+    widget.load_image(str(image_path))
+    width, height = widget.pixmap.width(), widget.pixmap.height()
+    bw, bh = width // 16, height // 16
+    bx, by = width // 10, height // 10
+    px, py = width * 4 // 10, height * 4 // 10
+    widget.bboxes = [Bbox(bx, by, bw, bh, "box", 1.0)]
+    widget.polygons = [Polygon([(px, py), (px + bw, py), (px + bw, py + bh), (px, py + bh)], "poly", 1.0)]
+    widget.history.clear()
+    widget.set_drawing_mode(DrawingMode.SELECT)
+    widget.fitView()
+    widget.markAnnotationsChanged()
+    app.processEvents()
+    paint(widget)
+    failures = []
+
+    def to_widget(x: float, y: float) -> QPoint:
+        return widget._scale_to_widget(QPoint(int(x), int(y)))
+
+    def verify(name: str, x: float, y: float) -> None:
+        """放大 4 倍到 (x, y) (原圖座標): 移動前的位置已在畫面外, 沿用舊索引裁切的話就不會畫"""
+        widget.fitView()
+        for _ in range(8):
+            wheel(widget, to_widget(x, y), 120)
+        paint(widget)
+        pos = to_widget(x, y)
+        # 先查命中再重建: 重建後就查不出索引有沒有過期
+        if name == "bbox":
+            hit = 0 in widget._bboxCandidates(pos)
+        else:
+            hit = 0 in widget._polygonCandidates(pos, 0) and widget._isPointInPolygon(pos, 0)
+        shown = grab_array(widget)
+        widget.markAnnotationsChanged()
+        paint(widget)
+        if not np.array_equal(shown, grab_array(widget)):
+            failures.append(f"{name}: 在新位置沒有畫出來 (與重建圖層後的畫面不同)")
+        if not hit:
+            failures.append(f"{name}: 在新位置點不到")
+        widget.fitView()
+        widget._resetSelection()
+        paint(widget)
+
+    # bbox 往右下拖到原本的位置之外
+    drag(widget, to_widget(bx + bw / 2, by + bh / 2), to_widget(width * 6 // 10, height * 7 // 10))
+    box = widget.bboxes[0]
+    if (box.x, box.y) == (bx, by):
+        return ["bbox: 拖曳沒有移動標註, 無法檢查"]
+    verify("bbox", box.x + box.width / 2, box.y + box.height / 2)
+
+    # polygon 往左下拖到原本的位置之外
+    drag(widget, to_widget(px + bw / 2, py + bh / 2), to_widget(bx + bw / 2, height * 6 // 10))
+    poly = widget.polygons[0]
+    if poly.points[0] == (px, py):
+        return failures + ["polygon: 拖曳沒有移動標註, 無法檢查"]
+    cx, cy = np.mean(poly.points, axis=0)
+    verify("polygon", cx, cy)
+
+    # 先點選 polygon, 再把第一個頂點往左上拖出一個角; 檢查點在新長出來、移動前不在 polygon 內的地方
+    mouse(widget, QEvent.Type.MouseButtonPress, to_widget(cx, cy), Qt.MouseButton.LeftButton)
+    mouse(widget, QEvent.Type.MouseButtonRelease, to_widget(cx, cy), Qt.MouseButton.LeftButton, Qt.MouseButton.NoButton)
+    x0, y0 = poly.points[0]
+    drag(widget, to_widget(x0, y0), to_widget(x0 - bw, y0 - bh))
+    if poly.points[0] == (x0, y0):
+        return failures + ["polygon 頂點: 拖曳沒有移動頂點, 無法檢查"]
+    verify("polygon 頂點", x0 - bw * 0.7, y0 - bh * 0.7)
+
+    widget.bboxes, widget.polygons = [], []
+    widget.history.clear()
+    widget.markAnnotationsChanged()
+    return failures
+
+
+# ------------------------------------------------------------------ 結果與比較
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent.parent,
+            capture_output=True,
+            text=True,
+            timeout=10,
+            check=False,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> int:
+    """逐項比較中位數, 印出差異; 回傳退步的項目數"""
+    base = baseline.get("results", {})
+    regressions = 0
+    print(f"\n與 baseline 比較 ({baseline.get('meta', {}).get('commit', '?')}), 容許變慢 {tolerance:.0%}:")
+    print(f"{'項目':<44} {'baseline':>10} {'目前':>10} {'比例':>8}")
+    for key, stats in results.items():
+        if key not in base:
+            continue
+        old = base[key]["median_ms"]
+        new = stats["median_ms"]
+        ratio = new / old if old > 0 else float("inf")
+        mark = ""
+        if new > old * (1 + tolerance) and new - old > NOISE_FLOOR_MS:
+            mark = "  ← 退步"
+            regressions += 1
+        elif new < old / (1 + tolerance) and old - new > NOISE_FLOOR_MS:
+            mark = "  (變快)"
+        print(f"{key:<44} {old:>10.2f} {new:>10.2f} {ratio:>7.2f}x{mark}")
+    missing = sorted(set(base) - set(results))
+    if missing:
+        print(f"baseline 有但這次沒跑的項目: {len(missing)} 項")
+    return regressions
+
+
+def main() -> int:
+    args = parse_args()
+    images = args.images or (QUICK_IMAGES if args.quick else list(IMAGES))
+    sets = args.sets or (QUICK_SETS if args.quick else list(ANNOTATION_SETS))
+    app = QApplication(sys.argv)
+
+    from src.config import cfg
+    from src.core import AppState
+    from src.image_widget import ImageWidget
+
+    cfg.enable_opengl_canvas = args.backend == "opengl"
+    widget = ImageWidget(AppState())
+    widget.resize(VIEW_W, VIEW_H)
+    widget.show()
+    app.processEvents()
+    backend = "opengl" if widget._gl_canvas is not None else "qpainter"
+    if backend != args.backend:
+        print(f"注意: 無法使用 {args.backend} 畫布, 改量 {backend}")
+
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = Path(tmp) / "check_move.jpg"
+        make_image(image_path, *IMAGES["1mp"], args.seed)
+        failures = []
+        if widget._gl_canvas is None:
+            failures += check_partial_repaint(app, widget, image_path)
+        failures += check_move(app, widget, image_path)
+        for failure in failures:
+            print(f"錯誤: {failure}")
+        if failures:
+            return 1
+        print("局部重繪與移動後的標註: 畫面與命中判斷皆正確")
+        for image_name in images:
+            w, h = IMAGES[image_name]
+            image_path = Path(tmp) / f"{image_name}.jpg"
+            make_image(image_path, w, h, args.seed)
+            key = f"{image_name}/load_image"
+            results[key] = bench_load(widget, image_path)
+            print(f"{key:<44} {results[key]['median_ms']:>10.2f} ms")
+            for set_name in sets:
+                scenario = bench_scenario(app, widget, image_path, set_name, args.seed)
+                for metric, stats in scenario.items():
+                    key = f"{image_name}/{set_name}/{metric}"
+                    results[key] = stats
+                    print(f"{key:<44} {stats['median_ms']:>10.2f} ms")
+            image_path.unlink()
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "backend": backend,
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "qpa": os.environ.get("QT_QPA_PLATFORM", ""),
+            "cpu_count": os.cpu_count(),
+            "view": [VIEW_W, VIEW_H],
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n結果已寫入: {args.out}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("meta", {}).get("backend") not in (None, backend):
+            print(f"注意: baseline 量的是 {baseline['meta']['backend']} 畫布")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{regressions} 項退步")
+            return 1
+        print("\n沒有退步")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+# cropped 裁切區計算 (src/utils/cropper.compute_crops) 的正確性檢查與效能比較
+# 用法 (在專案根目錄): python scripts/bench_cropper.py [--counts 100 1000 5000] [--trials 300]
+# 1. 隨機產生大量小案例 (框擠在一起、貼邊、旋轉框、polygon、各種 padding / fixed 尺寸),
+#    與改寫前「找第一對可合併、併完從頭再找」的算法比對輸出, 必須完全相同 (裁切區、順序、標註內容)。
+# 2. 各標註數量量一次 compute_crops; 舊算法是 O(n³), 只在 --max-reference 以內的數量跑。
+#    影像隨標註數等比放大 (密度固定), padding 模式在數量多時仍分成許多裁切區, 量的是逐區合併。
+# 有任何不一致時 exit code 為 1。
+import argparse
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils import cropper
+from src.utils.cropper import CROP_MODE_FIXED, CROP_MODE_PADDING, compute_crops
+from src.utils.model import Bbox, Polygon
+
+# 100 個標註時的影像尺寸; 標註更多時影像等比放大, 讓標註密度固定 (見 scene_size)
+IMG_W, IMG_H = 4000, 3000
+BASE_COUNT = 100
+# 量測的場景: (名稱, 群聚數相對標註數的比例, padding 模式的外擴 px)
+# dense: 很多小框擠在一起 (鳥群、人群、停車場), 大多併成少數幾張;
+# sparse: 小框散在整張圖, 外擴小、幾乎不合併, 舊算法每一輪都要掃過所有配對
+SCENES = [("dense", 1 / 8, 50), ("sparse", 1.0, 5)]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="compute_crops 的正確性檢查與效能比較")
+    parser.add_argument(
+        "--counts", type=int, nargs="+", default=[100, 1000, 5000], help="量測的標註數"
+    )
+    parser.add_argument("--trials", type=int, default=300, help="正確性檢查的隨機案例數 (每種模式)")
+    parser.add_argument(
+        "--max-reference", type=int, default=1000, help="舊算法只量到這個標註數 (預設: 1000)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def scene_size(n: int) -> tuple[int, int]:
+    """n 個標註的場景尺寸: 面積與 n 成正比
+
+    影像固定大小時, 標註一多 padding 模式就整張併成 1 個裁切區, 量到的只是一次大合併,
+    而不是逐區合併的成本; 密度固定時各數量的裁切區數也與 n 成正比。
+    """
+    scale = max(1.0, (n / BASE_COUNT) ** 0.5)
+    return int(IMG_W * scale), int(IMG_H * scale)
+
+
+def reference_compute_crops(img_w, img_h, bboxes, polygons, mode, padding_px, fixed_size):
+    """改寫前的 compute_crops: 每次找 index 最小的可合併配對, 併完從頭再找"""
+    polygons = [p for p in polygons if len(p.points) >= 3]
+    if not bboxes and not polygons:
+        return []
+    box_aabbs, poly_aabbs = cropper._annotation_aabbs(bboxes, polygons)
+    items = [(aabb, "bbox", b) for aabb, b in zip(box_aabbs, bboxes)]
+    items += [(aabb, "poly", p) for aabb, p in zip(poly_aabbs, polygons)]
+
+    def expand(aabb):
+        return cropper._expand(aabb, mode, padding_px, fixed_size, img_w, img_h)
+
+    def can_merge(c1, c2):
+        if mode == CROP_MODE_FIXED:
+            u = cropper._union(c1["member"], c2["member"])
+            return (u[2] - u[0]) <= fixed_size and (u[3] - u[1]) <= fixed_size
+        return cropper._rects_intersect(c1["region"], c2["region"])
+
+    clusters = [{"member": aabb, "region": expand(aabb)} for aabb, _, _ in items]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(clusters)):
+            for j in range(i + 1, len(clusters)):
+                if can_merge(clusters[i], clusters[j]):
+                    u = cropper._union(clusters[i]["member"], clusters[j]["member"])
+                    clusters[i]["member"] = u
+                    clusters[i]["region"] = expand(u)
+                    clusters.pop(j)
+                    merged = True
+                    break
+            if merged:
+                break
+
+    tasks = []
+    for c in clusters:
+        rx0, ry0, rx1, ry1 = c["region"]
+        task = cropper.CropTask(rx0, ry0, rx1, ry1)
+        for aabb, kind, ref in items:
+            if not cropper._rects_intersect(aabb, c["region"]):
+                continue
+            if kind == "bbox":
+                nb = cropper._translate_bbox(ref, rx0, ry0, rx1, ry1)
+                if nb is not None:
+                    task.bboxes.append(nb)
+            else:
+                npoly = cropper._translate_polygon(ref, rx0, ry0, rx1, ry1)
+                if npoly is not None:
+                    task.polygons.append(npoly)
+        if task.bboxes or task.polygons:
+            tasks.append(task)
+    return tasks
+
+
+def make_annotations(
+    rng: random.Random, n: int, img_w: int, img_h: int, max_size: int, ratio: float = 1 / 8
+):
+    """n 個標註: 約 3/4 是 bbox (部分旋轉、部分超出影像), 其餘是 polygon
+
+    標註集中在 n * ratio 個群聚附近; ratio 為 1 時近似均勻分布。
+    """
+    n_centers = max(1, int(n * ratio))
+    centers = [(rng.uniform(0, img_w), rng.uniform(0, img_h)) for _ in range(n_centers)]
+    bboxes, polygons = [], []
+    for _ in range(n):
+        cx, cy = rng.choice(centers)
+        x = int(cx + rng.gauss(0, max_size))
+        y = int(cy + rng.gauss(0, max_size))
+        w, h = rng.randint(0, max_size), rng.randint(0, max_size)
+        if rng.random() < 0.75:
+            angle = rng.choice([0, 0, 0, 90, rng.uniform(-60, 60)])
+            bboxes.append(Bbox(x, y, w, h, "obj", 1.0, angle))
+        else:
+            k = rng.randint(2, 8)
+            pts = [(x + rng.uniform(0, w), y + rng.uniform(0, h)) for _ in range(k)]
+            polygons.append(Polygon(pts, "obj", 1.0))
+    return bboxes, polygons
+
+
+def task_key(task: cropper.CropTask):
+    """比對用: 裁切區與所有標註的內容"""
+    return (
+        (task.x0, task.y0, task.x1, task.y1),
+        [(b.x, b.y, b.width, b.height, b.label, b.angle) for b in task.bboxes],
+        [(tuple(p.points), p.label) for p in task.polygons],
+    )
+
+
+def check(trials: int, seed: int) -> int:
+    """隨機案例與舊算法比對, 回傳不一致的案例數"""
+    rng = random.Random(seed)
+    failures = 0
+    for mode in (CROP_MODE_FIXED, CROP_MODE_PADDING):
+        for t in range(trials):
+            img_w, img_h = rng.choice([(64, 48), (640, 480), (1920, 1080)])
+            n = rng.randint(0, 60)
+            max_size = rng.choice([4, 40, 200, 900])
+            padding = rng.choice([0, 1, 10, 50, 300])
+            fixed = rng.choice([32, 64, 320, 640, 2000])
+            ratio = rng.choice([1 / 8, 1 / 2, 1.0])
+            bboxes, polygons = make_annotations(rng, n, img_w, img_h, max_size, ratio)
+            args = (img_w, img_h, bboxes, polygons, mode, padding, fixed)
+            got = [task_key(task) for task in compute_crops(*args)]
+            want = [task_key(task) for task in reference_compute_crops(*args)]
+            if got != want:
+                failures += 1
+                print(f"不一致: mode={mode} trial={t} n={n} padding={padding} fixed={fixed}")
+    return failures
+
+
+def timeit(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    args = parse_args()
+    failures = check(args.trials, args.seed)
+    print(f"正確性檢查: 每種模式 {args.trials} 個隨機案例, 不一致 {failures} 個")
+
+    print(
+        f"{'場景':>8} {'模式':>8} {'標註數':>8} {'舊算法 (ms)':>12} {'新算法 (ms)':>12} {'裁切數':>8}"
+    )
+    rng = random.Random(args.seed)
+    for n, (scene, ratio, padding) in itertools.product(args.counts, SCENES):
+        img_w, img_h = scene_size(n)
+        bboxes, polygons = make_annotations(rng, n, img_w, img_h, 60, ratio)
+        for mode in (CROP_MODE_FIXED, CROP_MODE_PADDING):
+            params = (img_w, img_h, bboxes, polygons, mode, padding, 640)
+            t_new = timeit(compute_crops, *params)
+            n_tasks = len(compute_crops(*params))
+            if n <= args.max_reference:
+                t_ref = f"{timeit(reference_compute_crops, *params) * 1000:>12.1f}"
+            else:
+                t_ref = f"{'-':>12}"
+            print(f"{scene:>8} {mode:>8} {n:>8} {t_ref} {t_new * 1000:>12.1f} {n_tasks:>8}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
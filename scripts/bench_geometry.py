@@ -0,0 +1,115 @@
+# 標註幾何的效能比較：逐點的 Python 算式 vs src/utils/geometry 的向量化版本
+# 用法 (在專案根目錄): python scripts/bench_geometry.py [每張圖的標註數 ...]
+# 每種數量各造一張「標註很多的圖」(bbox 一半旋轉, polygon 12~40 點), 量旋轉角點 + 外接框 + 夾邊 + 歸一化 + 面積。
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from src.utils import geometry
+
+IMG_W, IMG_H = 4000, 3000
+REPEAT = 20
+
+
+def make_annotations(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    boxes = []
+    polygons = []
+    for _ in range(n):
+        x0, y0 = rng.uniform(-50, IMG_W - 100), rng.uniform(-50, IMG_H - 100)
+        w, h = rng.uniform(10, 300), rng.uniform(10, 300)
+        angle = rng.choice([0.0, rng.uniform(-90, 90)])
+        boxes.append((x0, y0, x0 + w, y0 + h, angle))
+        cx, cy, r = rng.uniform(0, IMG_W), rng.uniform(0, IMG_H), rng.uniform(20, 200)
+        k = rng.randint(12, 40)
+        polygons.append(
+            [
+                (cx + r * math.cos(2 * math.pi * i / k), cy + r * math.sin(2 * math.pi * i / k))
+                for i in range(k)
+            ]
+        )
+    return boxes, polygons
+
+
+def python_version(boxes, polygons):
+    """改寫前各處逐點的算式"""
+    out = []
+    for xmin, ymin, xmax, ymax, angle in boxes:
+        cx, cy = (xmin + xmax) / 2, (ymin + ymax) / 2
+        hw, hh = (xmax - xmin) / 2, (ymax - ymin) / 2
+        rad = math.radians(angle)
+        corners = [
+            (cx + dx * math.cos(rad) - dy * math.sin(rad), cy + dx * math.sin(rad) + dy * math.cos(rad))
+            for dx, dy in ((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh))
+        ]
+        xs = [c[0] for c in corners]
+        ys = [c[1] for c in corners]
+        norm = [(min(max(x, 0), IMG_W) / IMG_W, min(max(y, 0), IMG_H) / IMG_H) for x, y in corners]
+        out.append(((min(xs), min(ys), max(xs), max(ys)), norm))
+    for pts in polygons:
+        clamped = [(min(max(x, 0.0), IMG_W), min(max(y, 0.0), IMG_H)) for x, y in pts]
+        xs = [p[0] for p in clamped]
+        ys = [p[1] for p in clamped]
+        acc = 0.0
+        for (x0, y0), (x1, y1) in zip(clamped, clamped[1:] + clamped[:1]):
+            acc += x0 * y1 - x1 * y0
+        norm = [(x / IMG_W, y / IMG_H) for x, y in clamped]
+        out.append(((min(xs), min(ys), max(xs), max(ys)), abs(acc) / 2, norm))
+    return out
+
+
+def numpy_version(boxes, polygons):
+    arr = geometry.boxes_array(boxes)
+    corners = geometry.rotated_corners(arr)
+    aabb = geometry.boxes_aabb(arr)
+    corners_norm = geometry.normalize_points(
+        geometry.clamp_points(corners.reshape(-1, 2), 0, 0, IMG_W, IMG_H), IMG_W, IMG_H
+    )
+    points, offsets = geometry.pack_polygons(polygons)
+    points = geometry.clamp_points(points, 0, 0, IMG_W, IMG_H)
+    poly_aabb = geometry.polygons_aabb(points, offsets)
+    area = geometry.polygons_area(points, offsets)
+    poly_norm = geometry.normalize_points(points, IMG_W, IMG_H)
+    return aabb, corners_norm, poly_aabb, area, poly_norm
+
+
+def timeit(fn, *args) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def check(boxes, polygons) -> None:
+    """兩種算法的數值要一致"""
+    ref = python_version(boxes, polygons)
+    aabb, _, poly_aabb, area, _ = numpy_version(boxes, polygons)
+    ref_box = np.array([r[0] for r in ref[: len(boxes)]])
+    ref_poly = np.array([r[0] for r in ref[len(boxes):]])
+    ref_area = np.array([r[1] for r in ref[len(boxes):]])
+    assert np.allclose(aabb, ref_box)
+    assert np.allclose(poly_aabb, ref_poly)
+    assert np.allclose(area, ref_area)
+
+
+def main() -> None:
+    counts = [int(a) for a in sys.argv[1:]] or [10, 100, 1000, 5000]
+    print(f"{'標註數':>8} {'python (ms)':>12} {'numpy (ms)':>12} {'加速':>8}")
+    for n in counts:
+        boxes, polygons = make_annotations(n)
+        check(boxes, polygons)
+        t_py = timeit(python_version, boxes, polygons)
+        t_np = timeit(numpy_version, boxes, polygons)
+        print(f"{n:>8} {t_py * 1000:>12.2f} {t_np * 1000:>12.2f} {t_py / t_np:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# OpenGL 畫布 (src/gl_canvas.py) 與 QPainter 畫布的畫面比對
+# 用法 (在專案根目錄): python scripts/check_gl_canvas.py [--out 比對圖.png] [--max-diff 0.05]
+# 沒有 GPU / 螢幕的機器以 Mesa 軟體繪製執行:
+#   xvfb-run -a env LIBGL_ALWAYS_SOFTWARE=1 python scripts/check_gl_canvas.py
+# 同一組合成的影像與標註 (bbox 一部分旋轉、polygon 5~30 點、多選與選取中的 polygon、mask)
+# 各以兩種畫布畫一次, 印出差異 pixel 的比例; 超過 --max-diff 時 exit code 為 1。
+# 兩者不會逐 pixel 相同: 影像縮小的濾波、線段端點與 label 的疊放順序略有差異 (見 docs/changelog.md)。
+import argparse
+import math
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cv2
+import numpy as np
+from PyQt6.QtGui import QImage
+from PyQt6.QtWidgets import QApplication
+
+IMG_W, IMG_H = 1600, 1200
+VIEW_W, VIEW_H = 800, 600
+# 同一個 pixel 任一通道差超過這個值才算不同 (吸收濾波與混色的取整差異)
+CHANNEL_TOLERANCE = 48
+# 容許的位移 (px): QPainter 畫布先把座標取整到 widget pixel, GL 用浮點, 線條可能差 1 px
+SHIFT_TOLERANCE = 1
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="比對 OpenGL 畫布與 QPainter 畫布的繪製結果")
+    parser.add_argument("--out", type=Path, default=None, help="左右並排的比對圖輸出路徑")
+    parser.add_argument("--max-diff", type=float, default=0.05, help="可接受的差異 pixel 比例 (預設: 0.05)")
+    parser.add_argument("--count", type=int, default=80, help="bbox 與 polygon 各幾個 (預設: 80)")
+    return parser.parse_args()
+
+
+def make_image(path: Path) -> None:
+    """平滑的漸層加幾個色塊: 縮小濾波的差異不會被雜訊放大成大片不同"""
+    yy, xx = np.mgrid[0:IMG_H, 0:IMG_W]
+    img = np.stack([xx * 255 // IMG_W, yy * 255 // IMG_H, np.full_like(xx, 96)], axis=2).astype(np.uint8)
+    for i in range(6):
+        cv2.rectangle(img, (i * 250 + 40, 300), (i * 250 + 200, 500), (40 * i, 200, 255 - 40 * i), -1)
+    cv2.imwrite(str(path), img)
+
+
+def make_widget(image_path: Path, count: int, use_gl: bool):
+    from src.config import cfg
+    from src.core import AppState
+    from src.image_widget import ImageWidget
+    from src.utils.mask_layer import MaskLayer
+    from src.utils.model import Bbox, Polygon
+
+    cfg.enable_opengl_canvas = use_gl
+    widget = ImageWidget(AppState())
+    widget.resize(VIEW_W, VIEW_H)
+    widget.load_image(str(image_path))
+    rng = random.Random(0)
+    widget.bboxes = [
+        Bbox(
+            rng.randint(0, IMG_W - 200),
+            rng.randint(0, IMG_H - 200),
+            rng.randint(20, 200),
+            rng.randint(20, 200),
+            f"obj{i}",
+            0.5,
+            rng.choice([0, 0, 30]),
+        )
+        for i in range(count)
+    ]
+    widget.polygons = []
+    for i in range(count):
+        cx, cy, r = rng.uniform(100, IMG_W - 100), rng.uniform(100, IMG_H - 100), rng.uniform(20, 90)
+        k = rng.randint(5, 30)
+        points = [(cx + r * math.cos(2 * math.pi * j / k), cy + r * math.sin(2 * math.pi * j / k)) for j in range(k)]
+        widget.polygons.append(Polygon(points, f"seg{i}", 0.9))
+    widget.selected_bbox_indices = {1, 2}
+    widget.selected_polygon_indices = {3}
+    widget.idx_focus_polygon = 4
+    widget.select_type = "polygon"
+    widget.mask = MaskLayer(IMG_W, IMG_H)
+    widget.mask.draw_line((100, 900), (1400, 1000), 40, erase=False)
+    widget.markAnnotationsChanged()
+    return widget
+
+
+def to_array(image: QImage) -> np.ndarray:
+    image = image.convertToFormat(QImage.Format.Format_RGB32)
+    buf = np.frombuffer(image.constBits().asarray(image.sizeInBytes()), np.uint8)
+    return buf.reshape(image.height(), image.bytesPerLine() // 4, 4)[:, : image.width(), :3].copy()
+
+
+def pixel_diff(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """a 的每個 pixel 在 b 的 SHIFT_TOLERANCE 鄰域內都找不到相近的顏色才算不同
+
+    Returns:
+        (H, W) bool
+    """
+    a = a.astype(np.int16)
+    b = b.astype(np.int16)
+    best = None
+    r = SHIFT_TOLERANCE
+    for dy in range(-r, r + 1):
+        for dx in range(-r, r + 1):
+            shifted = np.roll(np.roll(b, dy, axis=0), dx, axis=1)
+            d = np.abs(a - shifted).max(axis=2)
+            best = d if best is None else np.minimum(best, d)
+    return best > CHANNEL_TOLERANCE
+
+
+def main() -> int:
+    args = parse_args()
+    app = QApplication(sys.argv)
+
+    from src.gl_canvas import gl_available
+
+    if not gl_available():
+        print("錯誤: 建不了 OpenGL 2.1 context; 沒有螢幕時請以 xvfb-run 執行 (見檔頭)")
+        return 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = Path(tmp) / "scene.png"
+        make_image(image_path)
+        results = {}
+        for name, use_gl in (("qpainter", False), ("opengl", True)):
+            widget = make_widget(image_path, args.count, use_gl)
+            widget.show()
+            app.processEvents()
+            if use_gl and widget._gl_canvas is None:
+                print("錯誤: OpenGL 畫布初始化失敗, 已退回 QPainter (原因見上方 log)")
+                return 2
+            results[name] = to_array(widget.grab().toImage())
+            widget.close()
+
+    a, b = results["qpainter"], results["opengl"]
+    diff = pixel_diff(a, b)
+    ratio = float(diff.mean())
+    print(f"差異 pixel: {int(diff.sum())} / {diff.size} ({ratio:.2%}), 上限 {args.max_diff:.2%}")
+    if args.out:
+        marked = b.copy()
+        marked[diff] = (0, 0, 255)
+        cv2.imwrite(str(args.out), np.hstack([a, b, marked]))
+        print(f"比對圖 (QPainter | OpenGL | 差異標紅): {args.out}")
+    return 0 if ratio <= args.max_diff else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
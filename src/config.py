@@ -1,6 +1,6 @@
 # 系統設定載入：cfg/system.yaml 不存在時自動生成預設範本（含註解）；
 # 存在時依 schema migrate（補新欄位、移除過時欄位），保留使用者既有設定值與註解。
-# 更新日期: 2026-08-18
+# 更新日期: 2026-10-19
 from pathlib import Path
 
 from pydantic import BaseModel, ConfigDict
@@ -46,6 +46,12 @@ show_fps: false
 # 儲存圖片與標籤的資料夾（可用相對或絕對路徑）
 save_folder: ./output
 
+# 影片幀存檔的格式 (jpg / png) 與壓縮參數; 編碼與寫檔在背景進行, 不影響播放
+# jpg 品質 0~100 (越高越清楚、檔案越大); png 壓縮等級 0~9 (越高檔案越小、越慢, 畫質不變)
+frame_save_format: jpg
+frame_jpeg_quality: 95
+frame_png_compression: 3
+
 # 標註 undo / redo 的最大步數 (每張影像各自計算, 換檔即清空)
 undo_limit: 60
 
@@ -57,6 +63,21 @@ enable_obb: false
 
 # 是否啟用 SAM3 模型（需另外申請下載 sam3.pt）
 enable_sam3: false
+
+# 是否在儲存標註時同步更新輸出資料夾的標註 store (.annotations.sqlite)
+# 轉換 / 統計等整批讀取的功能可直接讀 store, 不必每次重新解析所有 XML
+enable_annotation_store: false
+
+# 是否以 OpenGL 繪製畫布 (影像 / mask 為貼圖、標註為 vertex buffer), 標註很多或影像很大時平移縮放較順
+# 建立不了 OpenGL context (例如遠端桌面或沒有 GL 驅動) 時自動改回一般繪製
+enable_opengl_canvas: false
+
+# 是否在狀態列顯示換圖 / 重繪耗時的 p50 / p95 (最近 100 次), 滑鼠停在上面可看最後一次各階段的耗時
+enable_perf_monitor: false
+
+# 逐筆記錄換圖、存檔、偵測耗時 (存檔 / 解碼 / 轉 QPixmap / 讀 XML / 偵測 / 第一次重繪) 的 CSV 路徑
+# 留空表示不記錄; 例如 ./logs/perf.csv
+perf_csv_path: ""
 """
 
 
@@ -72,10 +93,17 @@ class Config(BaseModel):
     auto_save_per_second: float = -1
     show_fps: bool = False
     save_folder: str = "./output"
+    frame_save_format: str = "jpg"
+    frame_jpeg_quality: int = 95
+    frame_png_compression: int = 3
     undo_limit: int = 60
     enable_mask_tools: bool = False
     enable_obb: bool = False
     enable_sam3: bool = False
+    enable_annotation_store: bool = False
+    enable_opengl_canvas: bool = False
+    enable_perf_monitor: bool = False
+    perf_csv_path: str = ""
 
 
 def load_config(file_path: str = "cfg/system.yaml") -> Config:
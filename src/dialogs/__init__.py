@@ -1,8 +1,11 @@
 # Dialog 模組：各種設定與功能對話框的集合
-# 更新日期: 2026-08-21
+# 更新日期: 2026-10-19
 from src.dialogs.categorize_media import CategorizeMediaDialog
 from src.dialogs.class_mapping import ClassMappingDialog
 from src.dialogs.convert_settings import ConvertSettingsDialog
+from src.dialogs.dataset_stats import DatasetStatsDialog
+from src.dialogs.dataset_validate import DatasetValidateDialog
+from src.dialogs.find_annotations import FindAnnotationsDialog
 from src.dialogs.label_mode import LabelModeDialog
 from src.dialogs.set_sam3_model import SetSam3ModelDialog
 from src.dialogs.set_yolo_model import SetYoloModelDialog
@@ -13,6 +16,9 @@ __all__ = [
     "CategorizeMediaDialog",
     "ClassMappingDialog",
     "ConvertSettingsDialog",
+    "DatasetStatsDialog",
+    "DatasetValidateDialog",
+    "FindAnnotationsDialog",
     "LabelModeDialog",
     "SetSam3ModelDialog",
     "SetYoloModelDialog",
@@ -0,0 +1,57 @@
+# 整個資料夾 cropped 批次裁切的背景 thread：解碼、裁切、編碼寫檔都離開 GUI 執行緒
+# 更新日期: 2026-10-19
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.utils.batch_crop import BatchCropReport, batch_crop
+from src.utils.logger import getUniqueLogger
+
+log = getUniqueLogger(__file__)
+
+
+class BatchCropThread(QThread):
+    """在背景執行 batch_crop; 裁切本身再分給 process pool
+
+    裁切參數在建立時就取好快照, 背景執行期間不讀 settings。
+    """
+
+    progress = pyqtSignal(int, int)  # current, total
+    finished_crop = pyqtSignal(bool, str, object)  # success, msg, BatchCropReport
+
+    def __init__(self, src_dir, out_dir, mode: str, padding_px: int, fixed_size: int):
+        """
+        Args:
+            src_dir: 來源資料夾 (圖片與 XML 放在一起)
+            out_dir: 輸出資料夾
+            mode: CROP_MODE_PADDING / CROP_MODE_FIXED
+            padding_px: padding 模式每邊外擴 pixel
+            fixed_size: fixed 模式最小邊長
+        """
+        super().__init__()
+        self.src_dir = src_dir
+        self.out_dir = out_dir
+        self.mode = mode
+        self.padding_px = padding_px
+        self.fixed_size = fixed_size
+        self._cancel = False
+
+    def cancel(self) -> None:
+        """請求取消 (已送出的那一批做完後生效; 已完成的部分記入 manifest, 下次接著做)"""
+        self._cancel = True
+
+    def run(self) -> None:
+        """執行批次裁切並回報結果"""
+        try:
+            report = batch_crop(
+                self.src_dir,
+                self.out_dir,
+                self.mode,
+                self.padding_px,
+                self.fixed_size,
+                progress_callback=self.progress.emit,
+                is_canceled=lambda: self._cancel,
+            )
+        except Exception as e:
+            log.e(f"批次裁切失敗 ({self.src_dir}): {e}")
+            self.finished_crop.emit(False, str(e), BatchCropReport())
+            return
+        self.finished_crop.emit(True, "", report)
@@ -1,9 +1,10 @@
 # VOC → YOLO 轉換設定對話框：含 class mapping、資料夾選擇、dataset split 比例
-# 更新日期: 2026-04-12
+# 更新日期: 2026-10-19
 from pathlib import Path
 
 from PyQt6.QtWidgets import (
     QButtonGroup,
+    QCheckBox,
     QComboBox,
     QDialog,
     QFileDialog,
@@ -23,6 +24,12 @@ from src.core import AppState
 from src.dialogs.class_mapping import ClassMappingDialog
 from src.utils.const import IMAGE_EXTS
 from src.utils.dynamic_settings import save_settings, settings
+from src.utils.materialize import (
+    METHOD_AUTO,
+    METHOD_COPY,
+    METHOD_MOVE,
+    METHOD_SYMLINK,
+)
 
 
 class ConvertSettingsDialog(QDialog):
@@ -125,20 +132,43 @@ class ConvertSettingsDialog(QDialog):
         img_group = QGroupBox("圖片處理方式")
         img_layout = QVBoxLayout()
 
-        self.radio_copy = QRadioButton("複製 (複製圖片到 images/，保留目前的圖片)")
-        self.radio_move = QRadioButton("搬移 (將目前的圖片移到 images/，減少硬碟使用空間)")
-        self.radio_copy.setChecked(True)
+        self.radio_auto = QRadioButton(
+            "自動 (同一顆硬碟用 hardlink，不佔空間；不行再試 reflink，最後才複製)"
+        )
+        self.radio_copy = QRadioButton("複製 (真的複製一份到 images/，與原圖完全獨立)")
+        self.radio_symlink = QRadioButton("Symlink (images/ 內放指向原圖的捷徑)")
+        self.radio_move = QRadioButton("搬移 (將目前的圖片移到 images/，原資料夾不再保留)")
+        self.radio_auto.setChecked(True)
 
         self.img_mode_group = QButtonGroup(self)
-        self.img_mode_group.addButton(self.radio_copy)
-        self.img_mode_group.addButton(self.radio_move)
-
-        img_layout.addWidget(self.radio_copy)
-        img_layout.addWidget(self.radio_move)
+        for radio, method in (
+            (self.radio_auto, METHOD_AUTO),
+            (self.radio_copy, METHOD_COPY),
+            (self.radio_symlink, METHOD_SYMLINK),
+            (self.radio_move, METHOD_MOVE),
+        ):
+            radio.setProperty("method", method)
+            self.img_mode_group.addButton(radio)
+            img_layout.addWidget(radio)
+        img_hint = QLabel(
+            "hardlink / symlink 與原圖共用同一份內容：之後若直接修改原圖，dataset 裡的也會跟著變"
+        )
+        img_hint.setStyleSheet("color: gray; font-size: 11px;")
+        img_hint.setWordWrap(True)
+        img_layout.addWidget(img_hint)
 
         img_group.setLayout(img_layout)
         main_layout.addWidget(img_group)
 
+        # --- 轉換前檢查 ---
+        self.preflight_check = QCheckBox("轉換前先檢查圖片與標註，有錯誤的移到隔離資料夾")
+        self.preflight_check.setToolTip(
+            "只讀圖檔頭, 檢查壞圖、XML <size> 與圖片不符、框超出圖片、零面積、沒有圖片的 XML;\n"
+            "有錯誤的圖片連同 XML 移到 _quarantine_<時間戳>/, 不會進 dataset。\n"
+            "報告寫在 validate_<時間戳>.json; 取消建置時隔離的檔案會放回原位"
+        )
+        main_layout.addWidget(self.preflight_check)
+
         # --- 按鈕 ---
         button_layout = QHBoxLayout()
         self.save_button = QPushButton("確定 (OK)")
@@ -230,6 +260,11 @@ class ConvertSettingsDialog(QDialog):
         return self.val_spin.value() / 100.0
 
     @property
-    def copy_images(self) -> bool:
-        """True = 複製圖片, False = 搬移圖片"""
-        return self.radio_copy.isChecked()
+    def preflight(self) -> bool:
+        """轉換前是否先檢查並隔離有錯誤的檔案"""
+        return self.preflight_check.isChecked()
+
+    @property
+    def materialize_method(self) -> str:
+        """圖片的擺放方式 (materialize.METHOD_*)"""
+        return self.img_mode_group.checkedButton().property("method")
@@ -0,0 +1,74 @@
+# VOC → YOLO dataset 建置的背景 thread：轉換、切分、擺放檔案、產生 yaml 全部離開 GUI 執行緒
+# 更新日期: 2026-10-19
+from datetime import datetime
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.utils.dataset_builder import BuildResult, build_yolo_dataset
+from src.utils.logger import getUniqueLogger
+
+log = getUniqueLogger(__file__)
+
+
+class DatasetBuildThread(QThread):
+    """在背景執行 build_yolo_dataset; 轉換本身再分給 process pool
+
+    參數 (mapping、輸出模式等) 在建立時就取好快照, 背景執行期間不讀 settings。
+    """
+
+    progress = pyqtSignal(str, int, int)  # stage, current, total
+    finished_build = pyqtSignal(bool, str, object)  # success, msg, BuildResult
+
+    def __init__(
+        self,
+        base: str,
+        output_mode: str,
+        categories: dict,
+        train_ratio: float,
+        method: str,
+        start_time: datetime,
+        preflight: bool = False,
+    ):
+        """
+        Args:
+            base: 含圖片與 VOC XML 的資料夾
+            output_mode: yolo_output_mode
+            categories: class mapping 的快照
+            train_ratio: train 所佔比例
+            method: 圖片的擺放方式 (materialize.METHOD_*)
+            start_time: 輸出檔名用的時間戳
+            preflight: 轉換前先檢查並隔離有錯誤的檔案
+        """
+        super().__init__()
+        self.base = base
+        self.output_mode = output_mode
+        self.categories = categories
+        self.train_ratio = train_ratio
+        self.method = method
+        self.start_time = start_time
+        self.preflight = preflight
+        self._cancel = False
+
+    def cancel(self) -> None:
+        """請求取消 (在下一個檢查點生效, 並復原已擺放的檔案)"""
+        self._cancel = True
+
+    def run(self) -> None:
+        """執行建置並回報結果"""
+        try:
+            result = build_yolo_dataset(
+                self.base,
+                self.output_mode,
+                self.categories,
+                self.train_ratio,
+                self.method,
+                progress_callback=self.progress.emit,
+                is_canceled=lambda: self._cancel,
+                start_time=self.start_time,
+                preflight=self.preflight,
+            )
+        except Exception as e:
+            log.e(f"dataset 建置失敗 ({self.base}): {e}")
+            self.finished_build.emit(False, str(e), BuildResult())
+            return
+        self.finished_build.emit(True, "", result)
@@ -0,0 +1,233 @@
+# Dataset Statistics 對話框：class 直方圖、框大小分布、每張圖物件數與 class mapping 檢查
+# 更新日期: 2026-10-19
+from pathlib import Path
+
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import (
+    QDialog,
+    QFileDialog,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QProgressBar,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QTabWidget,
+    QVBoxLayout,
+)
+
+from src.utils.annotation_store import AnnotationStore
+from src.utils.dataset_stats import DatasetStats, compute_stats
+from src.utils.dynamic_settings import settings
+from src.utils.logger import getUniqueLogger
+
+log = getUniqueLogger(__file__)
+
+# 未對應 class 的底色
+UNMAPPED_COLOR = QColor(255, 80, 80, 70)
+
+
+class _StatsThread(QThread):
+    """背景同步 store 並彙總統計 (sqlite 連線綁執行緒, 所以自己開一個 store)"""
+
+    progress = pyqtSignal(int, int)  # current, total
+    finished_stats = pyqtSignal(bool, str, object)  # success, msg, DatasetStats
+
+    def __init__(self, folder: str, categories: dict):
+        """
+        Args:
+            folder: 要統計的資料夾
+            categories: class mapping 的快照 (不在背景 thread 讀 settings)
+        """
+        super().__init__()
+        self.folder = folder
+        self.categories = categories
+
+    def run(self) -> None:
+        """同步 (只重新解析有變動的 XML) 後以 SQL 彙總"""
+        store = AnnotationStore(self.folder)
+        try:
+            store.sync(progress_callback=self.progress.emit)
+            stats = compute_stats(store, self.categories)
+        except Exception as e:
+            log.e(f"統計失敗 ({self.folder}): {e}")
+            self.finished_stats.emit(False, str(e), None)
+            return
+        finally:
+            store.close()
+        self.finished_stats.emit(True, "", stats)
+
+
+class DatasetStatsDialog(QDialog):
+    """顯示資料夾內 VOC 標註的統計; 第二次開同一個資料夾只會重算有變動的 XML"""
+
+    def __init__(self, parent=None, default_folder: str = ""):
+        super().__init__(parent)
+        self.setWindowTitle("Dataset Statistics")
+        self.resize(720, 520)
+        self._thread: _StatsThread | None = None
+
+        layout = QVBoxLayout(self)
+
+        folder_row = QHBoxLayout()
+        self.folder_edit = QLineEdit(default_folder)
+        self.folder_edit.setPlaceholderText("包含 VOC XML 的資料夾")
+        browse_btn = QPushButton("瀏覽...")
+        browse_btn.setFixedWidth(80)
+        browse_btn.clicked.connect(self._browse_folder)
+        self.refresh_btn = QPushButton("重新統計")
+        self.refresh_btn.clicked.connect(self._refresh)
+        folder_row.addWidget(self.folder_edit, 1)
+        folder_row.addWidget(browse_btn)
+        folder_row.addWidget(self.refresh_btn)
+        layout.addLayout(folder_row)
+
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+        self.mapping_label = QLabel()
+        self.mapping_label.setWordWrap(True)
+        self.mapping_label.setStyleSheet("color: #d04040; font-size: 11px;")
+        layout.addWidget(self.mapping_label)
+
+        self.tabs = QTabWidget()
+        self.class_table = self._make_table(
+            ["class", "class_id", "物件數", "圖片數", "small", "medium", "large",
+             "平均相對大小", "佔比"]
+        )
+        self.count_table = self._make_table(["物件數 / 圖", "圖片數", "分布"])
+        self.size_table = self._make_table(["相對大小 √(框/圖)", "物件數", "分布"])
+        self.tabs.addTab(self.class_table, "Classes")
+        self.tabs.addTab(self.count_table, "每張圖物件數")
+        self.tabs.addTab(self.size_table, "框大小")
+        layout.addWidget(self.tabs, 1)
+
+        hint = QLabel(
+            "small / medium / large 依原圖 pixel 面積分 (< 32² / < 96² / 其餘)。\n"
+            "統計結果快取在資料夾的 .annotations.sqlite, 再次統計只會重新解析有變動的 XML。"
+        )
+        hint.setStyleSheet("color: gray; font-size: 11px;")
+        hint.setWordWrap(True)
+        layout.addWidget(hint)
+
+        close_row = QHBoxLayout()
+        close_row.addStretch()
+        close_btn = QPushButton("關閉")
+        close_btn.clicked.connect(self.accept)
+        close_row.addWidget(close_btn)
+        layout.addLayout(close_row)
+
+        self._refresh()
+
+    @staticmethod
+    def _make_table(headers: list[str]) -> QTableWidget:
+        """唯讀、可排序的表格"""
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.ResizeToContents
+        )
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
+
+    def _browse_folder(self):
+        """選擇要統計的資料夾"""
+        folder = QFileDialog.getExistingDirectory(
+            self, "選擇資料夾", self.folder_edit.text()
+        )
+        if folder:
+            self.folder_edit.setText(folder)
+            self._refresh()
+
+    def _refresh(self):
+        """在背景重新統計"""
+        folder = self.folder_edit.text().strip()
+        if not folder or not Path(folder).is_dir():
+            self.summary_label.setText("資料夾不存在")
+            return
+        if self._thread is not None and self._thread.isRunning():
+            return
+        self.refresh_btn.setEnabled(False)
+        self.summary_label.setText("統計中…")
+        self.mapping_label.clear()
+        self._thread = _StatsThread(folder, dict(settings.class_names.categories))
+        self._thread.progress.connect(self._on_progress)
+        self._thread.finished_stats.connect(self._on_finished)
+        self._thread.start()
+
+    def _on_progress(self, current: int, total: int):
+        """只有變動的 XML 需要解析, 第二次開啟通常一閃而過"""
+        self.summary_label.setText(f"解析有變動的 XML… {current} / {total}")
+
+    def _on_finished(self, success: bool, msg: str, stats: DatasetStats):
+        """填入各個表格"""
+        self.refresh_btn.setEnabled(True)
+        if not success:
+            self.summary_label.setText(f"統計失敗：{msg}")
+            return
+        self.summary_label.setText(
+            f"{stats.n_files} 個 XML (其中 {stats.n_empty} 張沒有物件), "
+            f"{stats.n_objects} 個物件: polygon {stats.n_polygons}、"
+            f"旋轉框 {stats.n_rotated}"
+        )
+        notes = []
+        if stats.unmapped:
+            notes.append(
+                "未對應到 class mapping (VOC → YOLO 轉換時會被略過)：" + ", ".join(stats.unmapped)
+            )
+        if stats.unused:
+            notes.append("mapping 裡有、但資料夾沒有出現：" + ", ".join(stats.unused))
+        self.mapping_label.setText("\n".join(notes))
+
+        table = self.class_table
+        table.setSortingEnabled(False)
+        table.setRowCount(len(stats.classes))
+        total = max(1, stats.n_objects)
+        for row, cs in enumerate(stats.classes):
+            values = [
+                cs.label,
+                "未對應" if cs.class_id is None else cs.class_id,
+                cs.instances,
+                cs.images,
+                cs.small,
+                cs.medium,
+                cs.large,
+                round(cs.mean_rel_size, 3),
+                round(cs.instances * 100 / total, 1),
+            ]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem()
+                # 數字用 EditRole 存, 排序才會照數值而不是字串
+                item.setData(Qt.ItemDataRole.EditRole, value)
+                if cs.class_id is None:
+                    item.setBackground(UNMAPPED_COLOR)
+                table.setItem(row, col, item)
+        table.setSortingEnabled(True)
+
+        self._fill_hist(self.count_table, stats.count_hist)
+        self._fill_hist(self.size_table, stats.rel_size_hist)
+
+    @staticmethod
+    def _fill_hist(table: QTableWidget, hist: list[tuple[str, int]]):
+        """直方圖: 區間、數量, 再加一條以最大值為滿格的長條"""
+        table.setRowCount(len(hist))
+        peak = max((n for _, n in hist), default=0) or 1
+        for row, (name, n) in enumerate(hist):
+            table.setItem(row, 0, QTableWidgetItem(name))
+            table.setItem(row, 1, QTableWidgetItem(str(n)))
+            bar = QProgressBar()
+            bar.setRange(0, peak)
+            bar.setValue(n)
+            bar.setTextVisible(False)
+            table.setCellWidget(row, 2, bar)
+
+    def done(self, result: int):
+        """關閉前等背景統計結束, 避免 QThread 在執行中被銷毀"""
+        if self._thread is not None and self._thread.isRunning():
+            self._thread.wait()
+        super().done(result)
@@ -0,0 +1,241 @@
+# Validate Dataset 對話框：訓練前檢查壞圖、尺寸不符、座標超出範圍、孤兒檔與跨 split 重名
+# 更新日期: 2026-10-19
+from datetime import datetime
+from pathlib import Path
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import (
+    QCheckBox,
+    QDialog,
+    QFileDialog,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QProgressBar,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+)
+
+from src.utils.dataset_validator import (
+    ISSUE_NAMES,
+    SEVERITY_ERROR,
+    ValidationReport,
+    validate_dataset,
+)
+from src.utils.dynamic_settings import settings
+from src.utils.logger import getUniqueLogger
+
+log = getUniqueLogger(__file__)
+
+# 錯誤列的底色
+ERROR_COLOR = QColor(255, 80, 80, 70)
+# 表格最多列出的問題數; 完整清單在 JSON 報告裡
+MAX_ROWS = 5000
+
+
+class _ValidateThread(QThread):
+    """背景執行 validate_dataset (逐檔檢查再分給 process pool)"""
+
+    progress = pyqtSignal(int, int)  # current, total
+    finished_validate = pyqtSignal(bool, str, object)  # success, msg, ValidationReport
+
+    def __init__(self, folder: str, full_decode: bool, quarantine: bool, class_ids):
+        """
+        Args:
+            folder: 受檢資料夾
+            full_decode: 是否完整解碼每張圖
+            quarantine: 是否把有錯誤的檔案移到隔離資料夾
+            class_ids: class mapping 的 id 快照 (不在背景 thread 讀 settings); None 則不檢查
+        """
+        super().__init__()
+        self.folder = folder
+        self.full_decode = full_decode
+        self.quarantine = quarantine
+        self.class_ids = class_ids
+        self._cancel = False
+
+    def cancel(self) -> None:
+        """請求取消 (在下一批結束時生效)"""
+        self._cancel = True
+
+    def run(self) -> None:
+        try:
+            report = validate_dataset(
+                self.folder,
+                full_decode=self.full_decode,
+                class_ids=self.class_ids,
+                quarantine=self.quarantine,
+                progress_callback=self.progress.emit,
+                is_canceled=lambda: self._cancel,
+                start_time=datetime.now(),
+            )
+        except Exception as e:
+            log.e(f"dataset 檢查失敗 ({self.folder}): {e}")
+            self.finished_validate.emit(False, str(e), None)
+            return
+        self.finished_validate.emit(True, "", report)
+
+
+class DatasetValidateDialog(QDialog):
+    """檢查資料夾內的 dataset 並列出問題; 完整結果寫成資料夾內的 validate_<時間戳>.json"""
+
+    def __init__(self, parent=None, default_folder: str = ""):
+        super().__init__(parent)
+        self.setWindowTitle("Validate Dataset")
+        self.resize(820, 560)
+        self._thread: _ValidateThread | None = None
+
+        layout = QVBoxLayout(self)
+
+        folder_row = QHBoxLayout()
+        self.folder_edit = QLineEdit(default_folder)
+        self.folder_edit.setPlaceholderText("圖片 + VOC XML 的資料夾, 或含 images/ labels/ 的 YOLO dataset")
+        browse_btn = QPushButton("瀏覽...")
+        browse_btn.setFixedWidth(80)
+        browse_btn.clicked.connect(self._browse_folder)
+        folder_row.addWidget(self.folder_edit, 1)
+        folder_row.addWidget(browse_btn)
+        layout.addLayout(folder_row)
+
+        option_row = QHBoxLayout()
+        self.full_decode_check = QCheckBox("完整解碼每張圖 (較慢)")
+        self.full_decode_check.setToolTip(
+            "預設只讀圖檔頭 (尺寸、結尾標記), 抓得到大部分壞檔;\n"
+            "勾選後每張圖都用 OpenCV 解碼一次, 連資料段損毀與 EXIF 旋轉都能確認"
+        )
+        self.quarantine_check = QCheckBox("把有錯誤的檔案移到隔離資料夾")
+        self.quarantine_check.setToolTip(
+            "圖片連同同名的 XML / txt 整組移到資料夾內的 _quarantine_<時間戳>/,\n"
+            "保留原本的相對路徑; 修好後整個搬回即可"
+        )
+        option_row.addWidget(self.full_decode_check)
+        option_row.addWidget(self.quarantine_check)
+        option_row.addStretch()
+        self.run_btn = QPushButton("開始檢查")
+        self.run_btn.clicked.connect(self._start)
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self._cancel)
+        option_row.addWidget(self.run_btn)
+        option_row.addWidget(self.cancel_btn)
+        layout.addLayout(option_row)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["等級", "檔案", "問題", "說明"])
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.ResizeToContents
+        )
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table, 1)
+
+        hint = QLabel(
+            "錯誤: 訓練會中斷、或該張圖的標註會被 ultralytics 整份丟掉; 警告: 能訓練, 但多半不是刻意的。\n"
+            "txt 的 class id 以目前的 class mapping 為準。"
+        )
+        hint.setStyleSheet("color: gray; font-size: 11px;")
+        hint.setWordWrap(True)
+        layout.addWidget(hint)
+
+        close_row = QHBoxLayout()
+        close_row.addStretch()
+        close_btn = QPushButton("關閉")
+        close_btn.clicked.connect(self.accept)
+        close_row.addWidget(close_btn)
+        layout.addLayout(close_row)
+
+    def _browse_folder(self):
+        """選擇要檢查的資料夾"""
+        folder = QFileDialog.getExistingDirectory(self, "選擇資料夾", self.folder_edit.text())
+        if folder:
+            self.folder_edit.setText(folder)
+
+    def _start(self):
+        """在背景開始檢查"""
+        folder = self.folder_edit.text().strip()
+        if not folder or not Path(folder).is_dir():
+            self.summary_label.setText("資料夾不存在")
+            return
+        if self._thread is not None and self._thread.isRunning():
+            return
+        ids = {v for v in settings.class_names.categories.values() if isinstance(v, int)}
+        self._thread = _ValidateThread(
+            folder,
+            self.full_decode_check.isChecked(),
+            self.quarantine_check.isChecked(),
+            ids or None,
+        )
+        self._thread.progress.connect(self._on_progress)
+        self._thread.finished_validate.connect(self._on_finished)
+        self.run_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.summary_label.setText("檢查中…")
+        self.table.setRowCount(0)
+        self._thread.start()
+
+    def _cancel(self):
+        if self._thread is not None:
+            self._thread.cancel()
+            self.summary_label.setText("正在取消…")
+
+    def _on_progress(self, current: int, total: int):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(current)
+
+    def _on_finished(self, success: bool, msg: str, report: ValidationReport):
+        """列出問題, 錯誤排在前面"""
+        self.run_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        if not success:
+            self.summary_label.setText(f"檢查失敗：{msg}")
+            return
+        if report.canceled:
+            self.summary_label.setText("檢查已取消 (沒有寫出報告、也沒有隔離任何檔案)")
+            return
+        lines = [report.summary()]
+        if report.report_path:
+            lines.append(f"報告: {report.report_path}")
+        if report.quarantine_dir and report.quarantined:
+            lines.append(f"隔離資料夾: {report.quarantine_dir}")
+        self.summary_label.setText("\n".join(lines))
+
+        issues = sorted(report.issues, key=lambda i: i.severity != SEVERITY_ERROR)
+        shown = issues[:MAX_ROWS]
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(shown))
+        for row, issue in enumerate(shown):
+            values = [
+                "錯誤" if issue.severity == SEVERITY_ERROR else "警告",
+                issue.path,
+                ISSUE_NAMES.get(issue.code, issue.code),
+                issue.detail,
+            ]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if issue.severity == SEVERITY_ERROR:
+                    item.setBackground(ERROR_COLOR)
+                self.table.setItem(row, col, item)
+        self.table.setSortingEnabled(True)
+        if len(issues) > MAX_ROWS:
+            self.summary_label.setText(
+                self.summary_label.text() + f"\n表格只列前 {MAX_ROWS} 筆, 完整清單見報告"
+            )
+
+    def done(self, result: int):
+        """關閉前停下背景檢查, 避免 QThread 在執行中被銷毀"""
+        if self._thread is not None and self._thread.isRunning():
+            self._thread.cancel()
+            self._thread.wait()
+        super().done(result)
@@ -0,0 +1,167 @@
+# Find / Filter 對話框：依 class、confidence 或「沒有標註」過濾瀏覽目前資料夾的圖片
+# 更新日期: 2026-10-19
+from PyQt6.QtWidgets import (
+    QCheckBox,
+    QComboBox,
+    QDialog,
+    QDoubleSpinBox,
+    QFormLayout,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QVBoxLayout,
+)
+
+from src.dialogs.store_sync import StoreSyncThread
+from src.utils.annotation_store import get_store
+from src.utils.file_handler import file_h
+from src.utils.logger import getUniqueLogger
+
+log = getUniqueLogger(__file__)
+
+# label 下拉選單的「不限 class」項目
+_ANY_LABEL = None
+
+
+class FindAnnotationsDialog(QDialog):
+    """設定過濾條件; 確定後 file_h 進入過濾瀏覽, 翻頁只在符合的圖片之間跳
+
+    開啟時先在背景同步資料夾的標註 store (只重新解析有變動的 XML), 同步完才能查詢。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Find / Filter")
+        self.setMinimumWidth(420)
+        self.folder = file_h.folder_path
+
+        layout = QVBoxLayout(self)
+
+        self.status_label = QLabel("同步標註中…")
+        self.status_label.setStyleSheet("color: gray; font-size: 11px;")
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        form = QFormLayout()
+        self.label_combo = QComboBox()
+        self.label_combo.addItem("(任何 class)", _ANY_LABEL)
+        form.addRow("Class：", self.label_combo)
+
+        self.conf_check = QCheckBox("限定 confidence 範圍")
+        form.addRow(self.conf_check)
+        conf_row = QHBoxLayout()
+        self.conf_min_spin = QDoubleSpinBox()
+        self.conf_max_spin = QDoubleSpinBox()
+        for spin in (self.conf_min_spin, self.conf_max_spin):
+            spin.setRange(0.0, 1.0)
+            spin.setSingleStep(0.05)
+            spin.setDecimals(2)
+        self.conf_min_spin.setValue(0.0)
+        self.conf_max_spin.setValue(0.5)
+        conf_row.addWidget(self.conf_min_spin)
+        conf_row.addWidget(QLabel("~"))
+        conf_row.addWidget(self.conf_max_spin)
+        form.addRow("Confidence：", conf_row)
+
+        self.empty_check = QCheckBox("只看沒有標註的圖 (含沒有 XML 的圖)")
+        form.addRow(self.empty_check)
+
+        hint = QLabel(
+            "手動標註的 confidence 為 -1, 限定範圍時不會被選到。\n"
+            "過濾中 PageUp / PageDown / Home / End 只在符合的圖片之間跳。"
+        )
+        hint.setStyleSheet("color: gray; font-size: 11px;")
+        hint.setWordWrap(True)
+        form.addRow(hint)
+        layout.addLayout(form)
+
+        btn_layout = QHBoxLayout()
+        clear_btn = QPushButton("清除過濾")
+        clear_btn.clicked.connect(self._clear)
+        btn_layout.addWidget(clear_btn)
+        btn_layout.addStretch()
+        self.apply_btn = QPushButton("確定")
+        self.apply_btn.clicked.connect(self._apply)
+        self.apply_btn.setEnabled(False)
+        cancel_btn = QPushButton("取消")
+        cancel_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(self.apply_btn)
+        btn_layout.addWidget(cancel_btn)
+        layout.addLayout(btn_layout)
+
+        self.conf_check.toggled.connect(self._update_controls)
+        self.empty_check.toggled.connect(self._update_controls)
+        self._update_controls()
+
+        self._thread = StoreSyncThread(self.folder)
+        self._thread.progress.connect(self._on_progress)
+        self._thread.finished_sync.connect(self._on_synced)
+        self._thread.start()
+
+    def _update_controls(self):
+        """「沒有標註」與其他條件互斥; confidence 範圍需勾選才啟用"""
+        empty = self.empty_check.isChecked()
+        self.label_combo.setEnabled(not empty)
+        self.conf_check.setEnabled(not empty)
+        use_conf = self.conf_check.isChecked() and not empty
+        self.conf_min_spin.setEnabled(use_conf)
+        self.conf_max_spin.setEnabled(use_conf)
+
+    def _on_progress(self, current: int, total: int):
+        """同步進度 (只有變動的 XML 需要解析)"""
+        self.status_label.setText(f"同步標註中… {current} / {total}")
+
+    def _on_synced(self, success: bool, msg: str, report):
+        """同步完成: 填入 label 清單並開放查詢"""
+        if not success:
+            self.status_label.setText(f"同步失敗：{msg}")
+            return
+        try:
+            labels = get_store(self.folder).labels()
+        except Exception as e:
+            log.e(f"讀取 label 清單失敗: {e}")
+            self.status_label.setText("讀取標註失敗，請查看 log")
+            return
+        for label, count in labels:
+            self.label_combo.addItem(f"{label} ({count})", label)
+        self.status_label.setText(
+            f"{report.total} 個 XML (本次更新 {report.updated}、移除 {report.removed}"
+            f"、無法解析 {report.failed})"
+        )
+        self.apply_btn.setEnabled(True)
+
+    def _apply(self):
+        """查詢並套用到 file_h"""
+        try:
+            store = get_store(self.folder)
+            if self.empty_check.isChecked():
+                names = store.query_files()
+                count = file_h.set_filter(names, invert=True, desc="沒有標註")
+            else:
+                label = self.label_combo.currentData()
+                conf_min = conf_max = None
+                if self.conf_check.isChecked():
+                    conf_min = self.conf_min_spin.value()
+                    conf_max = self.conf_max_spin.value()
+                names = store.query_files(label, conf_min, conf_max)
+                desc = [label if label is not None else "任何 class"]
+                if conf_min is not None:
+                    desc.append(f"conf {conf_min:.2f}~{conf_max:.2f}")
+                count = file_h.set_filter(names, desc=", ".join(desc))
+        except Exception as e:
+            log.e(f"查詢標註失敗: {e}")
+            self.status_label.setText("查詢失敗，請查看 log")
+            return
+        log.i(f"filter [{file_h.filter_desc}]: {count} files")
+        self.accept()
+
+    def _clear(self):
+        """取消過濾並關閉"""
+        file_h.clear_filter()
+        self.accept()
+
+    def done(self, result: int):
+        """關閉前等背景同步結束, 避免 QThread 在執行中被銷毀"""
+        if self._thread.isRunning():
+            self._thread.wait()
+        super().done(result)
@@ -1,5 +1,5 @@
-# Label Mode 對話框：設定標註儲存模式 (整張圖 / Cropped 裁切) 與 cropped 裁切參數
-# 更新日期: 2026-07-14
+# Label Mode 對話框：設定標註儲存模式 (整張圖 / Cropped 裁切)、cropped 裁切參數與存檔時輸出的 YOLO txt
+# 更新日期: 2026-10-19
 from PyQt6.QtWidgets import (
     QComboBox,
     QDialog,
@@ -14,6 +14,7 @@ from PyQt6.QtWidgets import (
 
 from src.utils.cropper import CROP_MODE_FIXED, CROP_MODE_PADDING
 from src.utils.dynamic_settings import save_settings, settings
+from src.utils.yolo_format import MODE_BBOX, MODE_OBB, MODE_SEG
 
 # 兩種儲存模式的說明與使用情境
 FULL_MODE_DESC = (
@@ -92,6 +93,24 @@ class LabelModeDialog(QDialog):
 
         layout.addWidget(self.crop_group)
 
+        # === 存檔時輸出 YOLO txt ===
+        yolo_group = QGroupBox("存檔時輸出 YOLO txt")
+        yolo_form = QFormLayout(yolo_group)
+        self.yolo_combo = QComboBox()
+        self.yolo_combo.addItem("不輸出 (只存 VOC XML)", "")
+        self.yolo_combo.addItem("BBox (class_id cx cy w h)", MODE_BBOX)
+        self.yolo_combo.addItem("Segmentation (class_id x1 y1 ... xN yN)", MODE_SEG)
+        self.yolo_combo.addItem("OBB (class_id x1 y1 ... x4 y4)", MODE_OBB)
+        yolo_form.addRow("格式：", self.yolo_combo)
+        yolo_hint = QLabel(
+            "在 XML 旁一併寫出同名 .txt (依目前的 class mapping)。VOC to YOLO 選同一個格式時,\n"
+            "沒被改過的 txt 直接沿用、不再重新解析 XML; 可用 Train → Check YOLO Labels 檢查一致性。"
+        )
+        yolo_hint.setStyleSheet("color: gray; font-size: 11px;")
+        yolo_hint.setWordWrap(True)
+        yolo_form.addRow(yolo_hint)
+        layout.addWidget(yolo_group)
+
         # === 按鈕 ===
         btn_layout = QHBoxLayout()
         btn_layout.addStretch()
@@ -126,6 +145,10 @@ class LabelModeDialog(QDialog):
         self.padding_spin.setValue(settings.label.crop_padding_px or 50)
         self.fixed_spin.setValue(settings.label.crop_fixed_size or 640)
 
+        idx = self.yolo_combo.findData(settings.label.yolo_txt_mode or "")
+        if idx >= 0:
+            self.yolo_combo.setCurrentIndex(idx)
+
     def _on_mode_changed(self):
         """切換儲存模式時更新說明文字與 cropped 參數區的啟用狀態"""
         is_cropped = self.mode_combo.currentData() == "cropped"
@@ -146,5 +169,6 @@ class LabelModeDialog(QDialog):
         settings.label.crop_size_mode = self.size_mode_combo.currentData()
         settings.label.crop_padding_px = self.padding_spin.value()
         settings.label.crop_fixed_size = self.fixed_spin.value()
+        settings.label.yolo_txt_mode = self.yolo_combo.currentData()
         save_settings()
         self.accept()
@@ -0,0 +1,40 @@
+# 標註 store 的背景同步 thread：讓 Find / Statistics 這類對話框開啟時不凍結 UI
+# 更新日期: 2026-10-19
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.utils.annotation_store import AnnotationStore, SyncReport
+from src.utils.logger import getUniqueLogger
+
+log = getUniqueLogger(__file__)
+
+
+class StoreSyncThread(QThread):
+    """在背景執行 AnnotationStore.sync (解析本身再分給 process pool)
+
+    sqlite 連線綁在建立它的執行緒, 所以這裡自己開一個 store、同步完就關掉;
+    GUI 執行緒之後用 get_store() 讀到的就是同步後的內容 (WAL 下讀寫互不阻塞)。
+    """
+
+    progress = pyqtSignal(int, int)  # current, total
+    finished_sync = pyqtSignal(bool, str, object)  # success, msg, SyncReport
+
+    def __init__(self, folder: str):
+        """
+        Args:
+            folder: 要同步的資料夾
+        """
+        super().__init__()
+        self.folder = folder
+
+    def run(self) -> None:
+        """執行同步並回報結果"""
+        store = AnnotationStore(self.folder)
+        try:
+            report = store.sync(progress_callback=self.progress.emit)
+        except Exception as e:
+            log.e(f"背景同步 store 失敗 ({self.folder}): {e}")
+            self.finished_sync.emit(False, str(e), SyncReport())
+            return
+        finally:
+            store.close()
+        self.finished_sync.emit(True, "", report)
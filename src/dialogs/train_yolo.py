@@ -1,6 +1,6 @@
 # Train YOLO 對話框：選擇 dataset.yaml、設定訓練參數、執行 ultralytics 訓練並顯示進度與結果
 # 支援指定既有 .pt 來再訓練（fine-tune）或從中斷處續訓（resume）
-# 更新日期: 2026-07-13
+# 更新日期: 2026-10-19
 from __future__ import annotations
 
 import os
@@ -29,6 +29,7 @@ from PyQt6.QtWidgets import (
     QVBoxLayout,
 )
 
+from src.dialogs.dataset_validate import DatasetValidateDialog
 from src.dialogs.train_yolo_advanced import TrainYoloAdvancedDialog
 from src.utils.dynamic_settings import save_settings, settings
 from src.utils.logger import getUniqueLogger
@@ -300,8 +301,12 @@ class TrainYoloDialog(QDialog):
         yaml_browse = QPushButton("瀏覽...")
         yaml_browse.setFixedWidth(80)
         yaml_browse.clicked.connect(self._browse_yaml)
+        validate_btn = QPushButton("檢查 dataset...")
+        validate_btn.setToolTip("訓練前檢查 dataset.yaml 所在資料夾的圖片與 label (壞圖、座標超出 0~1 等)")
+        validate_btn.clicked.connect(self._open_validate)
         ds_row.addWidget(self.yaml_edit)
         ds_row.addWidget(yaml_browse)
+        ds_row.addWidget(validate_btn)
         ds_layout.addLayout(ds_row)
         ds_hint = QLabel(
             "dataset.yaml 內須定義 train/val 路徑、nc (類別數) 與 names"
@@ -590,6 +595,12 @@ class TrainYoloDialog(QDialog):
         if path:
             self.yaml_edit.setText(path)
 
+    def _open_validate(self) -> None:
+        """以 dataset.yaml 所在的資料夾開啟 Validate Dataset"""
+        yaml_path = self.yaml_edit.text().strip()
+        folder = str(Path(yaml_path).parent) if yaml_path else self._default_folder
+        DatasetValidateDialog(self, folder).exec()
+
     def _load_basic_from_settings(self) -> None:
         """從 settings.training 把基本參數值灌到 UI"""
         t = settings.training
@@ -1,126 +1,122 @@
-import os
-import random
-import shutil
-from glob import glob
-
-# --- 1. 請在這裡修改您的配置 ---
-
-# 原始數據集文件夾路徑
-SOURCE_DATA_DIR = os.path.expanduser("~/datasets/img/2024_liyu_lake_voc_coco")
-
-# 新的劃分後數據集存放路徑
-OUTPUT_DATA_DIR = os.path.expanduser("~/datasets/img/liyu_lake_split")
-
-# 數據集劃分比例 [訓練集, 驗證集, 測試集]
-# 確保三者相加等於 1
-SPLIT_RATIOS = [0.8, 0.1, 0.1]
-
-# 支持的圖片文件擴展名
-SUPPORTED_EXTENSIONS = [".jpg", ".jpeg", ".png", ".bmp"]
-
-# 設定隨機種子以確保每次劃分結果可重現
-random.seed(42)
-
-# --- 2. 腳本主要邏輯 (通常無需修改) ---
-
-
-def split_yolo_dataset():
-    """
-    將 YOLO 格式的數據集隨機劃分為訓練、驗證和測試集。
-    """
-    print("--- 開始處理數據集劃分 ---")
-
-    # 檢查源文件夾路徑是否存在
-    source_images_dir = os.path.join(SOURCE_DATA_DIR, "train", "images")
-    source_labels_dir = os.path.join(SOURCE_DATA_DIR, "train", "labels")
-
-    if not os.path.isdir(source_images_dir):
-        print(f"錯誤: 圖片文件夾不存在于 '{source_images_dir}'")
-        return
-    if not os.path.isdir(source_labels_dir):
-        print(f"錯誤: 標籤文件夾不存在于 '{source_labels_dir}'")
-        return
-
-    # 獲取所有圖片文件的路徑
-    image_files = []
-    for ext in SUPPORTED_EXTENSIONS:
-        image_files.extend(glob(os.path.join(source_images_dir, f"*{ext}")))
+# 把 YOLO 格式的 dataset 依比例切成 train / val / test (與 GUI 的 VOC to YOLO 共用 src/utils/dataset_split.py)
+# 更新日期: 2026-10-19
+#
+# 用法 (在專案根目錄):
+#   python src/for_training/split_dataset.py <來源資料夾> <輸出資料夾> [--ratios 0.8 0.1 0.1] [--seed 42]
+#                                           [--method auto|hardlink|reflink|copy|symlink|move]
+# 來源預設是 <來源>/train/images 與 <來源>/train/labels (可用 --images / --labels 指定其他子資料夾),
+# 輸出為 <輸出>/images/<split>/、<輸出>/labels/<split>/ 與 data.yaml。
+# 中斷後以相同參數重跑, 會沿用同一份分配、只補做還沒擺好的檔案。
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ruamel.yaml import YAML
+
+from src.utils.const import IMAGE_EXTS
+from src.utils.dataset_split import DEFAULT_SEED, split_dataset, write_dataset_yaml
+from src.utils.materialize import METHOD_AUTO, METHOD_NAMES
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="將 YOLO 格式的數據集依比例劃分為 train / val / test")
+    parser.add_argument("source", type=Path, help="原始數據集資料夾")
+    parser.add_argument("output", type=Path, help="劃分後的數據集存放資料夾")
+    parser.add_argument("--images", default="train/images", help="圖片相對於來源的子資料夾 (預設: train/images)")
+    parser.add_argument("--labels", default="train/labels", help="標籤相對於來源的子資料夾 (預設: train/labels)")
+    parser.add_argument(
+        "--ratios", type=float, nargs="+", default=[0.8, 0.1, 0.1],
+        help="train val [test] 的比例, 會正規化成總和 1 (預設: 0.8 0.1 0.1)",
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"隨機種子 (預設: {DEFAULT_SEED})")
+    parser.add_argument(
+        "--method", choices=list(METHOD_NAMES), default=METHOD_AUTO,
+        help="圖片的擺放方式; auto 會依序試 hardlink → reflink → 複製 (預設: auto)",
+    )
+    parser.add_argument(
+        "--yaml", type=Path, default=None,
+        help="讀取 names 的 yaml (預設: <來源>/data.yaml, 不存在則不產生 data.yaml)",
+    )
+    return parser.parse_args()
 
-    if not image_files:
-        print("錯誤: 在源文件夾中沒有找到任何圖片文件。")
-        return
 
-    print(f"總共找到 {len(image_files)} 張圖片。")
+def load_names(yaml_path: Path) -> dict[int, str]:
+    """從既有的 dataset yaml 讀出 {class_id: name}; names 可以是 dict 或 list"""
+    with open(yaml_path, encoding="utf-8") as f:
+        data = YAML(typ="safe").load(f) or {}
+    names = data.get("names") or {}
+    if isinstance(names, list):
+        return dict(enumerate(names))
+    return {int(k): v for k, v in names.items()}
 
-    # 隨機打亂文件列表
-    random.shuffle(image_files)
 
-    # 計算各個集合的數量
-    total_files = len(image_files)
-    train_count = int(total_files * SPLIT_RATIOS[0])
-    valid_count = int(total_files * SPLIT_RATIOS[1])
-    # 剩下的都給測試集
-    test_count = total_files - train_count - valid_count
+def main() -> int:
+    args = parse_args()
+    images_dir = args.source / args.images
+    labels_dir = args.source / args.labels
+    if not images_dir.is_dir():
+        print(f"錯誤: 圖片資料夾不存在: '{images_dir}'")
+        return 1
 
-    print(
-        f"數據集劃分數量: 訓練集={train_count}, 驗證集={valid_count}, 測試集={test_count}"
+    image_files = sorted(
+        f for f in images_dir.iterdir() if f.is_file() and f.suffix.lower() in IMAGE_EXTS
     )
-
-    # 分配文件路徑到不同集合
-    train_files = image_files[:train_count]
-    valid_files = image_files[train_count : train_count + valid_count]
-    test_files = image_files[train_count + valid_count :]
-
-    # 創建目標文件夾結構
-    sets = {"train": train_files, "valid": valid_files, "test": test_files}
-    for set_name in sets.keys():
-        os.makedirs(os.path.join(OUTPUT_DATA_DIR, set_name, "images"), exist_ok=True)
-        os.makedirs(os.path.join(OUTPUT_DATA_DIR, set_name, "labels"), exist_ok=True)
-
-    # 複製文件
-    for set_name, files in sets.items():
-        print(f"\n--- 正在複製 {set_name} 數據 ---")
-        total_files_in_set = len(files)
-        for i, image_path in enumerate(files):
-            # 1. 獲取文件名和擴展名
-            base_filename = os.path.basename(image_path)
-            name_part, _ = os.path.splitext(base_filename)
-            label_filename = f"{name_part}.txt"
-
-            # 2. 構造標籤文件的源路徑
-            label_path = os.path.join(source_labels_dir, label_filename)
-
-            # 3. 構造目標路徑
-            dest_image_path = os.path.join(
-                OUTPUT_DATA_DIR, set_name, "images", base_filename
-            )
-            dest_label_path = os.path.join(
-                OUTPUT_DATA_DIR, set_name, "labels", label_filename
-            )
-
-            # 4. 執行複製
-            shutil.copy2(image_path, dest_image_path)
-            if os.path.exists(label_path):
-                shutil.copy2(label_path, dest_label_path)
-            else:
-                print(
-                    f"警告: 圖片 '{base_filename}' 缺少對應的標籤文件 '{label_filename}'"
-                )
-
-            # 打印進度，使用 '\r' 讓光標回到行首，實現原地更新
-            print(f"  進度: {i + 1}/{total_files_in_set}", end="\r")
-
-        # 複製完成後打印一個換行符，避免下一行輸出覆蓋進度信息
-        print(f"\n  '{set_name}' 集合複製完成。")
-
-    print("\n--- 數據集劃分完成！---")
-    print(f"數據已保存至: '{os.path.abspath(OUTPUT_DATA_DIR)}'")
-
-    # copy data.yaml
-    yaml_path = os.path.join(SOURCE_DATA_DIR, "data.yaml")
-    shutil.copy2(yaml_path, OUTPUT_DATA_DIR)
-    print("data.yaml 已複製到數據集目錄。")
+    if not image_files:
+        print("錯誤: 在來源資料夾中沒有找到任何圖片。")
+        return 1
+    pairs = []
+    missing = 0
+    for image in image_files:
+        label = labels_dir / f"{image.stem}.txt"
+        if label.is_file():
+            pairs.append((image, label))
+        else:
+            # 沒有標籤的當作背景圖, 只擺圖片
+            pairs.append((image, None))
+            missing += 1
+    print(f"總共找到 {len(image_files)} 張圖片" + (f", 其中 {missing} 張沒有標籤" if missing else ""))
+
+    def on_progress(done: int, total: int) -> None:
+        print(f"  進度: {done}/{total}", end="\r")
+
+    try:
+        result = split_dataset(
+            pairs,
+            args.output,
+            ratios=args.ratios,
+            seed=args.seed,
+            method=args.method,
+            progress_callback=on_progress,
+        )
+    except ValueError as e:
+        print(f"錯誤: {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\n已中斷; 以相同參數重跑即可從中斷處繼續")
+        return 130
+    print()
+
+    print("劃分數量: " + ", ".join(f"{name}={count}" for name, count in result.counts.items()))
+    if result.kept:
+        print(f"沿用上次的分配: {result.kept} 張")
+    if result.skipped:
+        print(f"已擺好而略過: {result.skipped} 個檔案")
+    if result.removed:
+        print(f"換了 split 或來源已刪除, 從舊位置移除: {result.removed} 個檔案")
+    if result.placement:
+        print("圖片擺放: " + ", ".join(f"{METHOD_NAMES.get(m, m)} {n} 張" for m, n in result.placement.items()))
+
+    yaml_path = args.yaml or args.source / "data.yaml"
+    if yaml_path.is_file():
+        write_dataset_yaml(args.output / "data.yaml", args.output, load_names(yaml_path), result.counts)
+        print(f"data.yaml 已寫入 (names 取自 {yaml_path})")
+    else:
+        print(f"找不到 {yaml_path}, 未產生 data.yaml")
+    print(f"數據已保存至: '{args.output.resolve()}'")
+    return 0
 
 
 if __name__ == "__main__":
-    split_yolo_dataset()
+    sys.exit(main())
@@ -0,0 +1,639 @@
+# 畫布的 OpenGL 後端 (選用, cfg.enable_opengl_canvas)：覆蓋在 ImageWidget 上的 QOpenGLWidget
+# 更新日期: 2026-10-19
+#
+# 影像與 mask 各上傳一次成貼圖 (mask 之後只重傳筆刷 / 填滿改到的範圍); 不在編輯中的標註
+# (bbox 框線、polygon 的邊線 / 填色 / 頂點圓點) 以「原圖座標」整批放進一個 vertex buffer,
+# 平移縮放只換 ViewTransform.ndc_matrix 這個 uniform, 不重算任何頂點。
+# 文字 label、編輯中的標註、控制點與各種預覽仍由 ImageWidget 的 QPainter 程式碼畫在最上層
+# (_paintOverlay 等), 兩種畫布共用同一份互動與繪製邏輯, 這裡只負責「大量而不變」的部分。
+#
+# 只用 OpenGL 2.1 / GLSL 1.20 的功能 (point sprite、stencil), Mesa 的軟體繪製也能跑,
+# 沒有 GPU 的機器可以這樣檢查 (見 scripts/check_gl_canvas.py):
+#   xvfb-run -a env LIBGL_ALWAYS_SOFTWARE=1 python scripts/check_gl_canvas.py
+# 建不了 context、shader 編不過或影像超過貼圖上限時, ImageWidget 會改回 QPainter 繪製。
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from PyQt6 import sip
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QOffscreenSurface, QOpenGLContext, QPainter, QSurfaceFormat
+from PyQt6.QtOpenGL import (
+    QOpenGLBuffer,
+    QOpenGLPixelTransferOptions,
+    QOpenGLShader,
+    QOpenGLShaderProgram,
+    QOpenGLTexture,
+    QOpenGLVersionFunctionsFactory,
+    QOpenGLVersionProfile,
+)
+from PyQt6.QtOpenGLWidgets import QOpenGLWidget
+
+from src.utils import geometry
+from src.utils.const import POLYGON_VERTEX_RADIUS
+from src.utils.logger import getUniqueLogger
+from src.utils.model import ViewMode
+from src.utils.perf import perf
+
+log = getUniqueLogger(__file__)
+
+# OpenGL 常數 (PyQt6 不附, 不為了幾個數字引入 PyOpenGL)
+GL_POINTS = 0x0000
+GL_LINES = 0x0001
+GL_TRIANGLE_STRIP = 0x0005
+GL_TRIANGLE_FAN = 0x0006
+GL_ZERO = 0
+GL_SRC_ALPHA = 0x0302
+GL_ONE_MINUS_SRC_ALPHA = 0x0303
+GL_NOTEQUAL = 0x0205
+GL_ALWAYS = 0x0207
+GL_BLEND = 0x0BE2
+GL_STENCIL_TEST = 0x0B90
+GL_MAX_TEXTURE_SIZE = 0x0D33
+GL_FLOAT = 0x1406
+GL_KEEP = 0x1E00
+GL_INVERT = 0x150A
+GL_STENCIL_BUFFER_BIT = 0x0400
+GL_COLOR_BUFFER_BIT = 0x4000
+GL_VERTEX_PROGRAM_POINT_SIZE = 0x8642
+GL_POINT_SPRITE = 0x8861
+GL_TRUE = 1
+GL_FALSE = 0
+
+# vertex 格式: x, y (原圖座標), r, g, b, a (0~1); 貼圖用的 quad 則是 x, y, u, v
+VERTEX_FLOATS = 6
+VERTEX_STRIDE = VERTEX_FLOATS * 4
+TEX_VERTEX_STRIDE = 4 * 4
+
+_FLAT_VERTEX_SHADER = """
+#version 120
+attribute vec2 a_pos;
+attribute vec4 a_color;
+uniform mat4 u_matrix;
+uniform float u_point_size;
+varying vec4 v_color;
+void main() {
+    gl_Position = u_matrix * vec4(a_pos, 0.0, 1.0);
+    gl_PointSize = u_point_size;
+    v_color = a_color;
+}
+"""
+
+# u_ring 為 1 時畫頂點圓點: point sprite 內只留半徑 u_radius、粗 2 * u_half_width 的圓環
+# (同 QPainter.drawEllipse)。shader 原始碼只放 ASCII, 有些驅動不收其他字元
+_FLAT_FRAGMENT_SHADER = """
+#version 120
+uniform float u_ring;
+uniform float u_radius;
+uniform float u_half_width;
+uniform float u_point_size;
+varying vec4 v_color;
+void main() {
+    if (u_ring > 0.5) {
+        float d = length((gl_PointCoord - vec2(0.5)) * u_point_size);
+        if (abs(d - u_radius) > u_half_width) {
+            discard;
+        }
+    }
+    gl_FragColor = v_color;
+}
+"""
+
+_TEXTURE_VERTEX_SHADER = """
+#version 120
+attribute vec2 a_pos;
+attribute vec2 a_uv;
+uniform mat4 u_matrix;
+varying vec2 v_uv;
+void main() {
+    gl_Position = u_matrix * vec4(a_pos, 0.0, 1.0);
+    v_uv = a_uv;
+}
+"""
+
+# u_alpha_only 為 1 時畫 mask: 單通道的 alpha 貼圖, 與 QPainter 畫 Format_Alpha8 相同 (黑色 + alpha)
+_TEXTURE_FRAGMENT_SHADER = """
+#version 120
+uniform sampler2D u_texture;
+uniform float u_alpha_only;
+varying vec2 v_uv;
+void main() {
+    vec4 c = texture2D(u_texture, v_uv);
+    gl_FragColor = u_alpha_only > 0.5 ? vec4(0.0, 0.0, 0.0, c.a) : c;
+}
+"""
+
+
+def canvas_format() -> QSurfaceFormat:
+    """GL 畫布要的 surface 格式: 預設格式再加上填 polygon 用的 stencil buffer"""
+    fmt = QSurfaceFormat.defaultFormat()
+    fmt.setStencilBufferSize(8)
+    return fmt
+
+
+def gl_available() -> bool:
+    """目前的平台能不能建立桌面版 OpenGL 2.1 以上的 context
+
+    QOpenGLWidget 建 context 失敗時只會印警告、畫出空白, 所以建立畫布前先在
+    offscreen surface 上試一次, 不行就直接用 QPainter 畫布。
+    """
+    ctx = QOpenGLContext()
+    ctx.setFormat(canvas_format())
+    if not ctx.create() or ctx.isOpenGLES():
+        return False
+    surface = QOffscreenSurface()
+    surface.setFormat(ctx.format())
+    surface.create()
+    if not surface.isValid() or not ctx.makeCurrent(surface):
+        return False
+    fmt = ctx.format()
+    ok = (fmt.majorVersion(), fmt.minorVersion()) >= (2, 1)
+    ctx.doneCurrent()
+    return ok
+
+
+@dataclass
+class AnnotationBatch:
+    """整批標註的頂點與各段的繪製範圍 (index 都以 vertex 為單位)
+
+    vertices 依序放: bbox 框線 → polygon 邊線 → 頂點圓點 → polygon 本體 (stencil 用) →
+    polygon 外接框 (填色用)。線與圓點依 pen 寬度分段, 每段一次 draw call;
+    polygon 填色要逐個畫 (重疊處與 QPainter 一樣各自疊色), 但只畫畫面內的。
+    """
+
+    vertices: np.ndarray = field(default_factory=lambda: np.zeros((0, VERTEX_FLOATS), np.float32))
+    lines: list[tuple[int, int, float]] = field(default_factory=list)   # (first, count, pen 寬)
+    points: list[tuple[int, int, float]] = field(default_factory=list)  # (first, count, pen 寬)
+    polygon_ids: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    fans: np.ndarray = field(default_factory=lambda: np.zeros((0, 2), np.int64))  # (first, count)
+    quads: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))      # 外接框的 first
+
+
+def _pen_style(pens) -> tuple[np.ndarray, np.ndarray]:
+    """QPen 清單 → (N, 4) 顏色 (0~1) 與 (N,) 寬度; 寬 0 (cosmetic) 視為 1"""
+    colors = np.array([pen.color().getRgbF() for pen in pens], dtype=np.float32).reshape(-1, 4)
+    widths = np.array([pen.widthF() or 1.0 for pen in pens], dtype=np.float32)
+    return colors, widths
+
+
+def _vertices(xy: np.ndarray, rgba: np.ndarray) -> np.ndarray:
+    return np.hstack([xy.astype(np.float32), rgba.astype(np.float32)])
+
+
+def build_annotation_batch(
+    bboxes: list, bbox_pens: list, polygons: list, polygon_pens: list, polygon_fills: list
+) -> AnnotationBatch:
+    """把要畫的標註整理成一個 vertex 陣列 (原圖座標) 與各段的範圍
+
+    Args:
+        bboxes: 要畫的 Bbox
+        bbox_pens: 各 bbox 的 pen (顏色與線寬)
+        polygons: (polygon index, Polygon) 清單; 少於 3 點的不畫 (同 QPainter 畫布)
+        polygon_pens: 各 polygon 的 pen
+        polygon_fills: 各 polygon 的填色 (QColor)
+
+    Returns:
+        AnnotationBatch
+    """
+    batch = AnnotationBatch()
+    chunks: list[np.ndarray] = []
+    count = 0
+
+    def add(arr: np.ndarray) -> int:
+        nonlocal count
+        first = count
+        chunks.append(arr)
+        count += len(arr)
+        return first
+
+    def add_grouped(xy: np.ndarray, rgba: np.ndarray, widths: np.ndarray, out: list) -> None:
+        # 同寬度的放在一起, 每種寬度一次 draw call
+        for w in np.unique(widths):
+            sel = widths == w
+            first = add(_vertices(xy[sel], rgba[sel]))
+            out.append((first, int(sel.sum()), float(w)))
+
+    # bbox: 旋轉後的四個角連成四段線 (GL_LINES, 每段兩個頂點)
+    if bboxes:
+        corners = geometry.rotated_corners(geometry.bboxes_to_array(bboxes))     # (N, 4, 2)
+        segments = np.stack([corners, np.roll(corners, -1, axis=1)], axis=2)     # (N, 4, 2, 2)
+        colors, widths = _pen_style(bbox_pens)
+        add_grouped(
+            segments.reshape(-1, 2),
+            np.repeat(colors, 8, axis=0),
+            np.repeat(widths, 8),
+            batch.lines,
+        )
+
+    drawable = [
+        (i, p, pen, fill)
+        for (i, p), pen, fill in zip(polygons, polygon_pens, polygon_fills)
+        if len(p.points) >= 3
+    ]
+    if drawable:
+        points, offsets = geometry.pack_polygons(p.points for _, p, _, _ in drawable)
+        # 與 QPainter 畫布相同, 頂點先取整 (int() 往 0 取整) 再換算
+        points = np.trunc(points)
+        lengths = np.diff(offsets)
+        starts = offsets[:-1]
+        colors, widths = _pen_style([pen for _, _, pen, _ in drawable])
+        point_colors = np.repeat(colors, lengths, axis=0)
+        point_widths = np.repeat(widths, lengths)
+
+        # 邊線: 每個頂點連到下一個, 最後一點連回該 polygon 的第一點
+        nxt = np.arange(1, len(points) + 1)
+        nxt[offsets[1:] - 1] = starts
+        segments = np.stack([points, points[nxt]], axis=1)                       # (M, 2, 2)
+        add_grouped(
+            segments.reshape(-1, 2),
+            np.repeat(point_colors, 2, axis=0),
+            np.repeat(point_widths, 2),
+            batch.lines,
+        )
+        add_grouped(points, point_colors, point_widths, batch.points)
+
+        # stencil 用的 polygon 本體 (顏色不用, 填 0) 與填色用的外接框
+        fan_first = add(_vertices(points, np.zeros((len(points), 4))))
+        aabb = geometry.polygons_aabb(points, offsets)
+        quad_xy = np.stack(
+            [aabb[:, [0, 1]], aabb[:, [2, 1]], aabb[:, [0, 3]], aabb[:, [2, 3]]], axis=1
+        ).reshape(-1, 2)
+        fills = np.array([c.getRgbF() for _, _, _, c in drawable], dtype=np.float32)
+        quad_first = add(_vertices(quad_xy, np.repeat(fills, 4, axis=0)))
+
+        batch.polygon_ids = np.array([i for i, _, _, _ in drawable], dtype=np.int64)
+        batch.fans = np.stack([fan_first + starts, lengths], axis=1)
+        batch.quads = quad_first + np.arange(len(drawable), dtype=np.int64) * 4
+
+    if chunks:
+        batch.vertices = np.ascontiguousarray(np.vstack(chunks), dtype=np.float32)
+    return batch
+
+
+class GLCanvas(QOpenGLWidget):
+    """蓋在 ImageWidget 上、以 OpenGL 畫影像與標註的畫布
+
+    滑鼠事件直接穿透給底下的 ImageWidget; 所有狀態 (影像、標註、檢視變換) 都讀 owner 的,
+    這裡只保存 GPU 端的資源與「它們是依哪一份資料建的」key。
+    """
+
+    def __init__(self, owner):
+        """
+        Args:
+            owner: 擁有這個畫布的 ImageWidget
+        """
+        super().__init__(owner)
+        self._owner = owner
+        self.setFormat(canvas_format())
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self._f = None
+        self._failed = False
+        self._max_texture = 0
+        self._flat: QOpenGLShaderProgram | None = None
+        self._textured: QOpenGLShaderProgram | None = None
+        self._image_tex: QOpenGLTexture | None = None
+        self._image_quad: QOpenGLBuffer | None = None
+        self._image_key: tuple | None = None
+        self._mask_tex: QOpenGLTexture | None = None
+        self._mask_key: tuple | None = None
+        self._ann_buffer: QOpenGLBuffer | None = None
+        self._ann_batch: AnnotationBatch | None = None
+        self._ann_key: tuple | None = None
+        # polygon index -> 在 batch 裡的位置 (-1 表示不在 batch, 例如編輯中的)
+        self._ann_slot = np.zeros(0, np.int64)
+
+    # ----------------------------------------------------------------- 初始化 / 釋放
+
+    def initializeGL(self) -> None:
+        ctx = self.context()
+        profile = QOpenGLVersionProfile()
+        profile.setVersion(2, 1)
+        self._f = QOpenGLVersionFunctionsFactory.get(profile, ctx)
+        if self._f is None:
+            self._fail("取不到 OpenGL 2.1 的函式")
+            return
+        max_size = self._f.glGetIntegerv(GL_MAX_TEXTURE_SIZE)
+        self._max_texture = int(max_size[0] if isinstance(max_size, tuple) else max_size)
+        self._flat = self._buildProgram(_FLAT_VERTEX_SHADER, _FLAT_FRAGMENT_SHADER)
+        self._textured = self._buildProgram(_TEXTURE_VERTEX_SHADER, _TEXTURE_FRAGMENT_SHADER)
+        if self._flat is None or self._textured is None:
+            return
+        ctx.aboutToBeDestroyed.connect(self._releaseGL)
+        fmt = ctx.format()
+        log.i(
+            f"OpenGL 畫布: {fmt.majorVersion()}.{fmt.minorVersion()}, "
+            f"stencil {fmt.stencilBufferSize()} bit, 貼圖上限 {self._max_texture}"
+        )
+
+    def _buildProgram(self, vertex: str, fragment: str) -> QOpenGLShaderProgram | None:
+        program = QOpenGLShaderProgram(self)
+        if not (
+            program.addShaderFromSourceCode(QOpenGLShader.ShaderTypeBit.Vertex, vertex)
+            and program.addShaderFromSourceCode(QOpenGLShader.ShaderTypeBit.Fragment, fragment)
+            and program.link()
+        ):
+            self._fail(f"shader 編譯失敗: {program.log()}")
+            return None
+        return program
+
+    def _fail(self, reason: str) -> None:
+        """GL 畫布不能用: 交給 owner 移除畫布並改回 QPainter 繪製"""
+        self._failed = True
+        self._owner._dropGLCanvas(reason)
+
+    def _releaseGL(self) -> None:
+        """context 要被銷毀前釋放貼圖與 buffer (需要 context 是 current)"""
+        self.makeCurrent()
+        for tex in (self._image_tex, self._mask_tex):
+            if tex is not None:
+                tex.destroy()
+        for buf in (self._image_quad, self._ann_buffer):
+            if buf is not None:
+                buf.destroy()
+        self._image_tex = self._mask_tex = None
+        self._image_quad = self._ann_buffer = None
+        self._image_key = self._mask_key = self._ann_key = None
+        self.doneCurrent()
+
+    # ----------------------------------------------------------------- GPU 資源同步
+
+    def _syncImage(self, pixmap) -> bool:
+        """換圖 (或影片換幀) 時重新上傳影像貼圖; 超過貼圖上限回傳 False"""
+        key = (pixmap.cacheKey(), pixmap.width(), pixmap.height())
+        if self._image_key == key:
+            return True
+        if max(pixmap.width(), pixmap.height()) > self._max_texture:
+            self._fail(f"影像 {pixmap.width()}x{pixmap.height()} 超過 OpenGL 貼圖上限 {self._max_texture}")
+            return False
+        if self._image_tex is not None:
+            self._image_tex.destroy()
+        tex = QOpenGLTexture(pixmap.toImage(), QOpenGLTexture.MipMapGeneration.GenerateMipMaps)
+        # 縮小用 mipmap (近似 QPainter 畫布預縮的平滑縮圖), 放大用最近鄰 (看得到 pixel)
+        tex.setMinificationFilter(QOpenGLTexture.Filter.LinearMipMapLinear)
+        tex.setMagnificationFilter(QOpenGLTexture.Filter.Nearest)
+        tex.setWrapMode(QOpenGLTexture.WrapMode.ClampToEdge)
+        self._image_tex = tex
+
+        w, h = float(pixmap.width()), float(pixmap.height())
+        quad = np.array(
+            [[0, 0, 0, 0], [w, 0, 1, 0], [0, h, 0, 1], [w, h, 1, 1]], dtype=np.float32
+        )
+        self._image_quad = self._uploadBuffer(self._image_quad, quad)
+        self._image_key = key
+        return True
+
+    def _syncMask(self, mask) -> None:
+        """mask 貼圖: 換了 mask 整張上傳, 否則只重傳筆刷 / 填滿改到的範圍"""
+        options = QOpenGLPixelTransferOptions()
+        options.setAlignment(1)
+        key = (id(mask), mask.width, mask.height)
+        if self._mask_key != key or self._mask_tex is None:
+            if self._mask_tex is not None:
+                self._mask_tex.destroy()
+            tex = QOpenGLTexture(QOpenGLTexture.Target.Target2D)
+            tex.setFormat(QOpenGLTexture.TextureFormat.AlphaFormat)
+            tex.setSize(mask.width, mask.height)
+            # 與 QPainter 畫布的 mask 縮圖一樣用最近鄰
+            tex.setMinMagFilters(QOpenGLTexture.Filter.Nearest, QOpenGLTexture.Filter.Nearest)
+            tex.setWrapMode(QOpenGLTexture.WrapMode.ClampToEdge)
+            tex.allocateStorage(QOpenGLTexture.PixelFormat.Alpha, QOpenGLTexture.PixelType.UInt8)
+            tex.setData(
+                QOpenGLTexture.PixelFormat.Alpha,
+                QOpenGLTexture.PixelType.UInt8,
+                sip.voidptr(mask.data),
+                options,
+            )
+            mask.take_texture_pending()
+            self._mask_tex = tex
+            self._mask_key = key
+            return
+        rect = mask.take_texture_pending()
+        if rect is None:
+            return
+        x0, y0, x1, y1 = rect
+        region = np.ascontiguousarray(mask.data[y0:y1, x0:x1])
+        self._mask_tex.setData(
+            x0, y0, 0, x1 - x0, y1 - y0, 1,
+            QOpenGLTexture.PixelFormat.Alpha,
+            QOpenGLTexture.PixelType.UInt8,
+            sip.voidptr(region),
+            options,
+        )
+
+    def _syncAnnotations(self, live_bboxes: list[int], live_polygons: list[int]) -> None:
+        """標註或其顯示狀態變了才重建 vertex buffer; 平移縮放不會走到這裡"""
+        owner = self._owner
+        key = (
+            owner._ann_rev,
+            id(owner.bboxes),
+            id(owner.polygons),
+            len(owner.bboxes),
+            len(owner.polygons),
+            tuple(live_bboxes),
+            tuple(live_polygons),
+            frozenset(owner.selected_bbox_indices),
+            frozenset(owner.selected_polygon_indices),
+            owner.idx_focus_polygon,
+            owner.view_mode,
+        )
+        if self._ann_key == key:
+            return
+        bboxes: list = []
+        polygons: list = []
+        if owner.view_mode in (ViewMode.BBOX, ViewMode.ALL):
+            skip = set(live_bboxes)
+            bboxes = [(i, b) for i, b in enumerate(owner.bboxes) if i not in skip]
+        if owner.view_mode in (ViewMode.SEG, ViewMode.ALL):
+            # 選取中的 polygon 要畫可拖的大圓點, 與編輯中的一樣交給 QPainter 疊在上面
+            skip = set(live_polygons) | {owner.idx_focus_polygon}
+            polygons = [(i, p) for i, p in enumerate(owner.polygons) if i not in skip]
+        batch = build_annotation_batch(
+            [b for _, b in bboxes],
+            [owner._bboxPen(i, b) for i, b in bboxes],
+            polygons,
+            [owner._polygonPen(i, p) for i, p in polygons],
+            [owner._polygonFillColor(i) for i, _ in polygons],
+        )
+        self._ann_buffer = self._uploadBuffer(self._ann_buffer, batch.vertices)
+        self._ann_batch = batch
+        self._ann_slot = np.full(len(owner.polygons), -1, dtype=np.int64)
+        self._ann_slot[batch.polygon_ids] = np.arange(len(batch.polygon_ids))
+        self._ann_key = key
+
+    def _uploadBuffer(self, buf: QOpenGLBuffer | None, data: np.ndarray) -> QOpenGLBuffer:
+        if buf is None:
+            buf = QOpenGLBuffer(QOpenGLBuffer.Type.VertexBuffer)
+            buf.create()
+        buf.bind()
+        if data.nbytes:
+            buf.allocate(sip.voidptr(data), data.nbytes)
+        else:
+            buf.allocate(0)
+        buf.release()
+        return buf
+
+    # ----------------------------------------------------------------- 繪製
+
+    def paintGL(self) -> None:
+        # GL 指令是非同步送出的, 這裡量到的是 CPU 端準備與送出指令的時間
+        t0 = time.perf_counter()
+        self._paintGL()
+        perf.paint_done(time.perf_counter() - t0)
+
+    def _paintGL(self) -> None:
+        owner = self._owner
+        f = self._f
+        if self._failed or f is None:
+            return
+        bg = owner.palette().color(owner.backgroundRole())
+        f.glClearColor(bg.redF(), bg.greenF(), bg.blueF(), 1.0)
+        f.glClearStencil(0)
+        f.glClear(GL_COLOR_BUFFER_BIT | GL_STENCIL_BUFFER_BIT)
+        if not owner.pixmap:
+            return
+        owner._fitIfNeeded()
+        if not self._syncImage(owner.pixmap):
+            return
+
+        f.glEnable(GL_BLEND)
+        f.glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        matrix = owner.tf.ndc_matrix(self.size())
+        self._drawTexture(self._image_tex, matrix, alpha_only=False)
+        if owner.mask is not None and owner.mask.has_content:
+            self._syncMask(owner.mask)
+            self._drawTexture(self._mask_tex, matrix, alpha_only=True)
+
+        live_bboxes, live_polygons = owner._liveAnnotationIndices()
+        self._syncAnnotations(live_bboxes, live_polygons)
+        # polygon 填色與 label 依索引裁切; 編輯中的 (live) 標註不在 batch, 由 _paintOverlay 不經裁切
+        # 現畫; 移動 / 拖頂點放開時 owner 會 markAnnotationsChanged, 索引隨即以新位置重建
+        index = owner._hitIndex()
+        view = owner._visibleOriginalRect(index)
+        visible_polygons = [
+            i for i in index.polygons.query_rect(*view) if self._ann_slot[i] >= 0
+        ]
+        self._drawAnnotations(visible_polygons)
+        f.glDisable(GL_BLEND)
+
+        # 文字與編輯中的東西用 QPainter 疊上去 (QPainter 會自己設定它要的 GL 狀態)
+        painter = QPainter(self)
+        painter.setFont(owner.font())
+        self._drawLabels(painter, index, view, live_bboxes, live_polygons, visible_polygons)
+        owner._paintOverlay(painter, live_bboxes, live_polygons)
+        painter.end()
+
+    def _drawTexture(self, tex: QOpenGLTexture, matrix, alpha_only: bool) -> None:
+        program = self._textured
+        program.bind()
+        program.setUniformValue("u_matrix", matrix)
+        program.setUniformValue("u_texture", 0)
+        program.setUniformValue("u_alpha_only", 1.0 if alpha_only else 0.0)
+        tex.bind(0)
+        self._image_quad.bind()
+        pos = program.attributeLocation("a_pos")
+        uv = program.attributeLocation("a_uv")
+        program.enableAttributeArray(pos)
+        program.enableAttributeArray(uv)
+        program.setAttributeBuffer(pos, GL_FLOAT, 0, 2, TEX_VERTEX_STRIDE)
+        program.setAttributeBuffer(uv, GL_FLOAT, 8, 2, TEX_VERTEX_STRIDE)
+        self._f.glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+        program.disableAttributeArray(pos)
+        program.disableAttributeArray(uv)
+        self._image_quad.release()
+        tex.release(0)
+        program.release()
+
+    def _drawAnnotations(self, visible_polygons: list[int]) -> None:
+        batch = self._ann_batch
+        if batch is None or not len(batch.vertices):
+            return
+        f = self._f
+        owner = self._owner
+        dpr = self.devicePixelRatioF()
+        program = self._flat
+        program.bind()
+        self._ann_buffer.bind()
+        pos = program.attributeLocation("a_pos")
+        color = program.attributeLocation("a_color")
+        program.enableAttributeArray(pos)
+        program.enableAttributeArray(color)
+        program.setAttributeBuffer(pos, GL_FLOAT, 0, 2, VERTEX_STRIDE)
+        program.setAttributeBuffer(color, GL_FLOAT, 8, 4, VERTEX_STRIDE)
+        program.setUniformValue("u_ring", 0.0)
+        program.setUniformValue("u_point_size", 1.0)
+
+        # 1) polygon 填色: 先在 stencil 上以 odd-even 規則標出 polygon 內部 (同 QPainter 預設的
+        #    OddEvenFill), 再畫外接框、只留 stencil 有標記的部分; 畫的同時把 stencil 清回 0
+        if len(visible_polygons):
+            program.setUniformValue("u_matrix", owner.tf.ndc_matrix(self.size()))
+            f.glEnable(GL_STENCIL_TEST)
+            f.glStencilMask(1)
+            slots = self._ann_slot[visible_polygons]
+            for (fan_first, fan_count), quad_first in zip(
+                batch.fans[slots].tolist(), batch.quads[slots].tolist()
+            ):
+                f.glColorMask(GL_FALSE, GL_FALSE, GL_FALSE, GL_FALSE)
+                f.glStencilFunc(GL_ALWAYS, 0, 1)
+                f.glStencilOp(GL_KEEP, GL_KEEP, GL_INVERT)
+                f.glDrawArrays(GL_TRIANGLE_FAN, fan_first, fan_count)
+                f.glColorMask(GL_TRUE, GL_TRUE, GL_TRUE, GL_TRUE)
+                f.glStencilFunc(GL_NOTEQUAL, 0, 1)
+                f.glStencilOp(GL_ZERO, GL_ZERO, GL_ZERO)
+                f.glDrawArrays(GL_TRIANGLE_STRIP, quad_first, 4)
+            f.glDisable(GL_STENCIL_TEST)
+
+        # 2) 框線與邊線; 平移半個 px 讓線落在 pixel 中心, 與 QPainter 不開反鋸齒時的位置相同
+        program.setUniformValue("u_matrix", owner.tf.ndc_matrix(self.size(), shift=0.5))
+        for first, count, width in batch.lines:
+            f.glLineWidth(width * dpr)
+            f.glDrawArrays(GL_LINES, first, count)
+        f.glLineWidth(1.0)
+
+        # 3) 頂點圓點: 以 point sprite 畫圓環, 一種線寬一次 draw call
+        f.glEnable(GL_VERTEX_PROGRAM_POINT_SIZE)
+        f.glEnable(GL_POINT_SPRITE)
+        program.setUniformValue("u_ring", 1.0)
+        program.setUniformValue("u_radius", float(POLYGON_VERTEX_RADIUS * dpr))
+        for first, count, width in batch.points:
+            size = (POLYGON_VERTEX_RADIUS * 2 + width + 2) * dpr
+            program.setUniformValue("u_point_size", float(size))
+            program.setUniformValue("u_half_width", float(width * dpr / 2))
+            f.glDrawArrays(GL_POINTS, first, count)
+        f.glDisable(GL_POINT_SPRITE)
+        f.glDisable(GL_VERTEX_PROGRAM_POINT_SIZE)
+
+        program.disableAttributeArray(pos)
+        program.disableAttributeArray(color)
+        self._ann_buffer.release()
+        program.release()
+
+    def _drawLabels(
+        self,
+        painter: QPainter,
+        index,
+        view,
+        live_bboxes: list[int],
+        live_polygons: list[int],
+        visible_polygons: list[int],
+    ) -> None:
+        """畫面內、不在編輯中的標註的 label 與選取中的 polygon (QPainter, 與 QPainter 畫布同一份程式碼)"""
+        owner = self._owner
+        if owner.view_mode in (ViewMode.BBOX, ViewMode.ALL):
+            skip = set(live_bboxes)
+            for idx in index.bboxes.query_rect(*view):
+                if idx not in skip:
+                    bbox = owner.bboxes[idx]
+                    painter.setPen(owner._bboxPen(idx, bbox))
+                    owner._drawBboxLabel(painter, bbox)
+        if owner.view_mode in (ViewMode.SEG, ViewMode.ALL):
+            for idx in visible_polygons:
+                polygon = owner.polygons[idx]
+                painter.setPen(owner._polygonPen(idx, polygon))
+                owner._drawPolygonLabel(painter, polygon, polygon.points[0])
+            # 選取中的 polygon 不在 batch 裡 (見 _syncAnnotations), 連同可拖的大圓點整個現畫
+            focus = owner.idx_focus_polygon
+            if 0 <= focus < len(owner.polygons) and focus not in live_polygons:
+                owner._drawPolygon(painter, focus, owner.polygons[focus])
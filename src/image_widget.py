@@ -2,7 +2,9 @@
 # 標註的每次變更都會先在 self.history 記下變更前的快照, 供 undo / redo 還原
 # 影像的縮放與平移集中在 self.tf (ViewTransform); 原圖 <-> widget 的換算只走
 # _scale_to_original / _scale_to_widget, 不在別處自行乘 zoom 或加 offset
-# 更新日期: 2026-08-21
+# 不在編輯中的標註畫進快取圖層 (_annotationLayer), 拖曳時只現畫正在改的那幾個
+# cfg.enable_opengl_canvas 時改由覆蓋在上面的 GLCanvas (src/gl_canvas.py) 繪製, 互動邏輯不變
+# 更新日期: 2026-10-19
 import math
 import time
 import xml.etree.ElementTree as ET
@@ -31,9 +33,14 @@ from PyQt6.QtWidgets import (
 
 from src.config import cfg
 from src.core import AppState
+from src.utils import geometry
+from src.utils.annotation_set import AnnotationSet
 from src.utils.const import (
     CORNER_SIZE,
+    DIRTY_MARGIN,
     EDGE_HANDLE_MIN_SPAN,
+    LOD_CACHE_LEVELS,
+    LOD_MIN_POINTS,
     MIN_RESIZE_LENGTH,
     POLYGON_CLOSE_THRESHOLD,
     POLYGON_SELECT_PADDING,
@@ -49,7 +56,10 @@ from src.utils.global_param import g_param
 from src.utils.history import AnnotationHistory
 from src.utils.img_handler import inferencer
 from src.utils.logger import getUniqueLogger
+from src.utils.mask_layer import MaskLayer
 from src.utils.model import Bbox, ColorPen, FileType, ModelType, Polygon, ViewMode
+from src.utils.perf import perf
+from src.utils.spatial_index import AnnotationIndex
 from src.utils.view_transform import ViewTransform
 
 log = getUniqueLogger(__file__)
@@ -64,27 +74,6 @@ class DrawingMode(Enum):
     POLYGON = 5
 
 
-def qimage_to_cv_mat(qimage: QImage) -> np.ndarray:
-    """Converts a QImage to an OpenCV Mat."""
-    qimage = qimage.convertToFormat(QImage.Format.Format_ARGB32)
-    width = qimage.width()
-    height = qimage.height()
-
-    ptr = qimage.bits()
-    ptr.setsize(height * width * 4)
-    arr = np.array(ptr).reshape(height, width, 4)  # Copies the data
-    return arr
-
-
-def cv_mat_to_qimage(cv_mat: np.ndarray) -> QImage:
-    """Converts an OpenCV Mat to a QImage."""
-    height, width, channel = cv_mat.shape
-    bytes_per_line = 4 * width
-    return QImage(
-        cv_mat.data, width, height, bytes_per_line, QImage.Format.Format_ARGB32
-    )
-
-
 class ImageWidget(QWidget):
     # resize 控制點: 名稱 -> 在 bbox 局部座標中的位置比例 (-0.5 ~ +0.5)。
     # 這一份同時決定「畫在哪」「點得到哪」「拖了會動哪條邊界」, 三者不會走鐘。
@@ -116,6 +105,8 @@ class ImageWidget(QWidget):
 
     def __init__(self, app_state: AppState):
         super().__init__()
+        # OpenGL 畫布 (選用); None 表示用 QPainter 畫 (預設, 也是 GL 不能用時的退路)
+        self._gl_canvas = None
         self.setMouseTracking(True)  # 即使沒按住按鍵也能追蹤滑鼠移動
         self.setFocusPolicy(Qt.FocusPolicy.ClickFocus)
         self.app_state = app_state
@@ -140,7 +131,7 @@ class ImageWidget(QWidget):
 
         # Mask drawing properties
         self.drawing_mode = DrawingMode.SELECT
-        self.mask_pixmap: QPixmap | None = None
+        self.mask: MaskLayer | None = None
         self.brush_size = 20
         self.last_pos = None
 
@@ -181,6 +172,20 @@ class ImageWidget(QWidget):
         # 縮小檢視時的預縮 pixmap 快取, 平移就只是 blit
         self._scaled_cache: QPixmap | None = None
         self._scaled_cache_key: tuple | None = None
+        # 標註圖層快取: 不在編輯中的標註畫成一張 widget 大小的透明圖, 拖曳時只 blit;
+        # _ann_rev 在標註有變動時遞增 (見 markAnnotationsChanged), 是快取 key 的一部分
+        self._ann_rev = 0
+        self._ann_layer: QPixmap | None = None
+        self._ann_layer_key: tuple | None = None
+        # 命中判斷用的空間索引, 與標註圖層共用 _ann_rev 判斷是否過期
+        self._hit_index: AnnotationIndex | None = None
+        self._hit_index_key: tuple | None = None
+        # 縮小檢視時 polygon 的簡化版: zoom 級別 -> {polygon index: 頂點}, 標註一變就清空
+        self._lod_cache: dict[int, dict[int, list]] = {}
+        self._lod_cache_key: tuple | None = None
+
+        if cfg.enable_opengl_canvas:
+            self._gl_canvas = self._createGLCanvas()
 
         self.cv_img = None
         self.image_label.setSizePolicy(
@@ -333,29 +338,22 @@ class ImageWidget(QWidget):
         bbox.width = max(1, x2 - x1)
         bbox.height = max(1, y2 - y1)
 
-    def _clampPolygonToImage(self, polygon: Polygon) -> None:
-        """把 polygon 的所有頂點夾進影像範圍 (就地修改)
-
-        Args:
-            polygon: 要夾的 polygon (就地修改)
-        """
-        if not self.pixmap:
-            return
-        w, h = float(self.tf.img_w), float(self.tf.img_h)
-        polygon.points = [
-            (min(max(px, 0.0), w), min(max(py, 0.0), h)) for px, py in polygon.points
-        ]
-
-    def _clampAnnotationsToImage(self) -> None:
+    def _clampAnnotationsToImage(self) -> AnnotationSet:
         """把目前所有標註夾進影像範圍
 
         畫面上不該出現超出影像的框, 不論它是怎麼來的 —— 讀進來的 XML、偵測結果、
         還是手動畫的。旋轉過的框 (OBB) 例外, 理由見 _clampBboxToImage。
+        全部標註轉成陣列一次夾完, 只把真的超出範圍的那幾個寫回物件。
+
+        Returns:
+            AnnotationSet: 夾完之後的陣列 (與 self.bboxes / self.polygons 順序相同)
         """
-        for b in self.bboxes:
-            self._clampBboxToImage(b)
-        for p in self.polygons:
-            self._clampPolygonToImage(p)
+        ann = AnnotationSet.from_objects(self.bboxes, self.polygons)
+        if self.pixmap:
+            changed = ann.clamp(self.tf.img_w, self.tf.img_h)
+            ann.write_back(self.bboxes, self.polygons, *changed)
+        self.markAnnotationsChanged()
+        return ann
 
     def _min_zoom(self) -> float:
         """這張影像允許的最小 zoom
@@ -388,6 +386,8 @@ class ImageWidget(QWidget):
         再夾住 offset。
         """
         super().resizeEvent(event)
+        if self._gl_canvas is not None:
+            self._gl_canvas.setGeometry(self.rect())
         if not self.pixmap:
             return
         if self._needs_fit:
@@ -398,6 +398,38 @@ class ImageWidget(QWidget):
             self.tf.clamp_offset(self.size())
         self._notifyViewChanged()
 
+    def _createGLCanvas(self):
+        """建立覆蓋整個 widget 的 OpenGL 畫布; 平台建不了 OpenGL context 時回傳 None"""
+        try:
+            from src.gl_canvas import GLCanvas, gl_available
+        except ImportError as e:
+            log.w(f"無法載入 OpenGL 模組, 改用一般繪製: {e}")
+            return None
+        if not gl_available():
+            log.w("無法建立 OpenGL 2.1 context, 改用一般繪製")
+            return None
+        canvas = GLCanvas(self)
+        canvas.setGeometry(self.rect())
+        return canvas
+
+    def _dropGLCanvas(self, reason: str) -> None:
+        """GL 畫布不能用 (shader 編不過、影像超過貼圖上限等): 移除它並改回 QPainter 繪製"""
+        if self._gl_canvas is None:
+            return
+        log.w(f"OpenGL 畫布停用, 改用一般繪製: {reason}")
+        canvas, self._gl_canvas = self._gl_canvas, None
+        canvas.hide()
+        # 可能正在 canvas 自己的 paintGL 裡, 不能當場刪
+        canvas.deleteLater()
+        self.update()
+
+    def update(self, *args) -> None:
+        """排程重繪; 用 GL 畫布時交給它 (GL 每次重畫整個 framebuffer, 不分局部)"""
+        if self._gl_canvas is not None:
+            self._gl_canvas.update()
+        else:
+            super().update(*args)
+
     def _scaledPixmap(self) -> QPixmap:
         """縮小檢視時用的預縮 pixmap
 
@@ -414,6 +446,284 @@ class ImageWidget(QWidget):
             self._scaled_cache_key = key
         return self._scaled_cache
 
+    def markAnnotationsChanged(self) -> None:
+        """標註內容或顯示狀態 (顏色、label) 改了, 下次重繪時重建標註圖層與命中索引
+
+        pushHistory / undo / 換檔等入口已經會呼叫; 從外面直接改 bboxes / polygons
+        的內容而沒有經過 pushHistory 時, 要自己呼叫這個再 update()。
+        """
+        self._ann_rev += 1
+
+    def _liveAnnotationIndices(self) -> tuple[list[int], list[int]]:
+        """正在編輯中、每次重繪都要現畫的標註
+
+        拖曳移動中的那一組、resize / 旋轉中的 bbox、頂點拖曳中的 polygon;
+        其餘標註都從快取圖層 blit。
+
+        Returns:
+            (bbox index, polygon index), 皆已排序且在範圍內
+        """
+        bbox_idx: set[int] = set()
+        poly_idx: set[int] = set()
+        if self.moving:
+            bbox_idx.update(i for i, _ in self.move_orig_boxes)
+            poly_idx.update(i for i, _ in self.move_orig_polys)
+        if self.resizing or self.rotating:
+            bbox_idx.add(self.idx_focus_bbox)
+        if self.dragging_vertex_idx >= 0:
+            poly_idx.add(self.idx_focus_polygon)
+        return (
+            sorted(i for i in bbox_idx if 0 <= i < len(self.bboxes)),
+            sorted(i for i in poly_idx if 0 <= i < len(self.polygons)),
+        )
+
+    def _annotationLayer(self, live_bboxes: list[int], live_polygons: list[int]) -> QPixmap:
+        """不在編輯中的標註所畫成的透明圖層 (widget 大小)
+
+        標註、選取、檢視模式或 zoom / pan 沒變時直接沿用上一張; 拖曳一個頂點時
+        其他幾百個 polygon 不必每次滑鼠移動都重新換算座標、畫填色與文字。
+
+        Args:
+            live_bboxes: 編輯中的 bbox (不畫進圖層)
+            live_polygons: 編輯中的 polygon (不畫進圖層)
+
+        Returns:
+            QPixmap: 與 widget 同尺寸、已設定 devicePixelRatio 的圖層
+        """
+        dpr = self.devicePixelRatioF()
+        key = (
+            self._ann_rev,
+            id(self.bboxes),
+            id(self.polygons),
+            len(self.bboxes),
+            len(self.polygons),
+            tuple(live_bboxes),
+            tuple(live_polygons),
+            frozenset(self.selected_bbox_indices),
+            frozenset(self.selected_polygon_indices),
+            self.idx_focus_polygon,
+            self.drawing_mode,
+            self.view_mode,
+            (self.tf.zoom, self.tf.off_x, self.tf.off_y),
+            (self.width(), self.height(), dpr),
+        )
+        if self._ann_layer is not None and self._ann_layer_key == key:
+            return self._ann_layer
+
+        layer = QPixmap(max(1, int(self.width() * dpr)), max(1, int(self.height() * dpr)))
+        layer.setDevicePixelRatio(dpr)
+        layer.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(layer)
+        # QPixmap 上的 painter 預設用 QApplication 的字型, 要與直接畫在 widget 上一致
+        painter.setFont(self.font())
+        # 只畫落在畫面內的標註; 索引回傳的 index 已排序, 疊放順序與逐一畫時相同
+        index = self._hitIndex()
+        view = self._visibleOriginalRect(index)
+        if self.view_mode in (ViewMode.BBOX, ViewMode.ALL):
+            skip = set(live_bboxes)
+            for idx in index.bboxes.query_rect(*view):
+                if idx not in skip:
+                    self._drawBbox(painter, idx, self.bboxes[idx])
+        if self.view_mode in (ViewMode.SEG, ViewMode.ALL):
+            skip = set(live_polygons)
+            for idx in index.polygons.query_rect(*view):
+                if idx not in skip:
+                    polygon = self.polygons[idx]
+                    self._drawPolygon(painter, idx, polygon, self._lodPoints(idx, polygon))
+        painter.end()
+        self._ann_layer = layer
+        self._ann_layer_key = key
+        return layer
+
+    def _visibleOriginalRect(self, index: AnnotationIndex) -> tuple[float, float, float, float]:
+        """畫面可見範圍換到原圖座標, 外擴到畫面外仍可能露出一角的標註也算在內
+
+        label 畫在錨點的右上方, 錨點在畫面左邊或下面外側時文字仍可能露出來,
+        所以左邊多留最寬的 label、下面多留一行字高; 線寬與頂點圓點各邊都留 DIRTY_MARGIN。
+
+        Returns:
+            (x0, y0, x1, y1): 原圖座標
+        """
+        fm = self.fontMetrics()
+        label_w = max((fm.horizontalAdvance(t) for t in index.labels), default=0)
+        label_w += fm.horizontalAdvance(" (-0.00) [000°]")
+        o0 = self.tf.v2o(-(label_w + DIRTY_MARGIN), -DIRTY_MARGIN)
+        o1 = self.tf.v2o(self.width() + DIRTY_MARGIN, self.height() + fm.height() + DIRTY_MARGIN)
+        return o0.x(), o0.y(), o1.x(), o1.y()
+
+    def _lodPoints(self, idx: int, polygon: Polygon) -> list:
+        """畫 polygon 用的頂點: 頂點多的依目前 zoom 換成簡化版, 誤差約 1 個螢幕 px
+
+        SAM 產生的 polygon 常有上千個頂點, 縮小檢視時大多擠在同一個螢幕 pixel。
+        簡化只影響繪製; 選取中 (要拖頂點) 的 polygon 與命中判斷一律用原本的頂點。
+
+        Args:
+            idx: polygon 的 index
+            polygon: 目標 polygon
+
+        Returns:
+            list: (x, y) 頂點 (原圖座標)
+        """
+        if len(polygon.points) < LOD_MIN_POINTS or idx == self.idx_focus_polygon:
+            return polygon.points
+        key = (self._ann_rev, id(self.polygons), len(self.polygons))
+        if self._lod_cache_key != key:
+            self._lod_cache = {}
+            self._lod_cache_key = key
+        # 每半個 2 倍一級; 該級的縮放 2^(level/2) 不小於目前 zoom, 換到畫面的誤差就不超過 1 px
+        level = math.ceil(math.log2(self.tf.zoom) * 2)
+        cache = self._lod_cache.get(level)
+        if cache is None:
+            if len(self._lod_cache) >= LOD_CACHE_LEVELS:
+                self._lod_cache.pop(next(iter(self._lod_cache)))
+            cache = self._lod_cache[level] = {}
+        points = cache.get(idx)
+        if points is None:
+            tolerance = 2.0 ** (-level / 2)
+            points = geometry.simplify_closed(
+                np.asarray(polygon.points, dtype=np.float64), tolerance
+            ).tolist()
+            cache[idx] = points
+        return points
+
+    def _labelRect(self, anchor: QPoint, text: str) -> QRect:
+        """label 文字 (連同底色) 在 widget 上佔的範圍; anchor 是文字的基線起點"""
+        fm = self.fontMetrics()
+        # 底色在基線之上, 但 g、y 之類的字會往下超出 descent
+        return QRect(
+            anchor.x(),
+            anchor.y() - fm.height(),
+            fm.horizontalAdvance(text) + 1,
+            fm.height() + fm.descent() + 1,
+        )
+
+    def _infoTextRect(self, anchor: QPoint, text: str) -> QRect:
+        """尺寸資訊 (WxH=面積) 的範圍; 畫在 anchor 的右上, 與 paintEvent 的位置一致"""
+        fm = self.fontMetrics()
+        h = fm.height()
+        return QRect(anchor.x() + 5, anchor.y() - (h + 5), fm.horizontalAdvance(text) + 5, h + 1)
+
+    def _bboxDirtyRect(self, bbox: Bbox) -> QRect:
+        """bbox 重繪時會動到的 widget 範圍: 外框、label、控制點、旋轉握把與尺寸資訊"""
+        corners = self._getRotatedCorners(bbox)
+        if cfg.enable_obb:
+            h = self._getRotationHandlePos(bbox)
+            corners.append((h.x(), h.y()))
+        pts = [self._scale_to_widget_f(QPointF(x, y)) for x, y in corners]
+        xs = [p.x() for p in pts]
+        ys = [p.y() for p in pts]
+        rect = QRectF(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)).toAlignedRect()
+        rect = rect.adjusted(-DIRTY_MARGIN, -DIRTY_MARGIN, DIRTY_MARGIN, DIRTY_MARGIN)
+        text = f"{bbox.label} ({bbox.confidence:.2f})"
+        if bbox.angle != 0:
+            text += f" [{bbox.angle:.0f}°]"
+        rect = rect.united(self._labelRect(self._scale_to_widget(QPoint(bbox.x, bbox.y)), text))
+        info = f"{bbox.width}x{bbox.height}={bbox.width * bbox.height}"
+        corner = self._scale_to_widget(QPoint(bbox.x + bbox.width, bbox.y + bbox.height))
+        return rect.united(self._infoTextRect(corner, info))
+
+    def _polygonDirtyRect(self, polygon: Polygon) -> QRect:
+        """polygon 重繪時會動到的 widget 範圍: 外接框、頂點圓點與 label"""
+        if not polygon.points:
+            return QRect()
+        xs = [x for x, _ in polygon.points]
+        ys = [y for _, y in polygon.points]
+        tl = self._scale_to_widget_f(QPointF(min(xs), min(ys)))
+        br = self._scale_to_widget_f(QPointF(max(xs), max(ys)))
+        rect = QRectF(tl, br).toAlignedRect().adjusted(
+            -DIRTY_MARGIN, -DIRTY_MARGIN, DIRTY_MARGIN, DIRTY_MARGIN
+        )
+        text = f"{polygon.label}"
+        if polygon.confidence >= 0:
+            text += f" ({polygon.confidence:.2f})"
+        first = self._scale_to_widget(QPoint(int(polygon.points[0][0]), int(polygon.points[0][1])))
+        return rect.united(self._labelRect(first, text))
+
+    def _annotationsDirtyRect(self, bbox_indices, poly_indices) -> QRect:
+        """多個標註的 _bboxDirtyRect / _polygonDirtyRect 聯集"""
+        rect = QRect()
+        for i in bbox_indices:
+            if 0 <= i < len(self.bboxes):
+                rect = rect.united(self._bboxDirtyRect(self.bboxes[i]))
+        for i in poly_indices:
+            if 0 <= i < len(self.polygons):
+                rect = rect.united(self._polygonDirtyRect(self.polygons[i]))
+        return rect
+
+    def _selectionDirtyRect(self, pos: QPoint | None) -> QRect:
+        """框選矩形 (起點到 pos) 連同右下角尺寸資訊的範圍"""
+        if self.selection_rect_start is None or pos is None:
+            return QRect()
+        rect = QRect(self.selection_rect_start, pos).normalized()
+        # 尺寸字串的長度隨數字位數變, 取夠寬的樣本
+        info = self._infoTextRect(rect.bottomRight(), "00000x00000=0000000000")
+        return rect.adjusted(-2, -2, 2, 2).united(info)
+
+    def _bboxPreviewDirtyRect(self) -> QRect:
+        """BBOX 兩點模式預覽框連同尺寸資訊的範圍"""
+        if self.draw_start is None or self.draw_end is None:
+            return QRect()
+        rect = QRectF(
+            self._scale_to_widget_f(self.draw_start), self._scale_to_widget_f(self.draw_end)
+        ).normalized().toAlignedRect()
+        info = self._infoTextRect(rect.bottomRight(), "00000x00000=0000000000")
+        return rect.adjusted(-2, -2, 2, 2).united(info)
+
+    def _polygonDraftDirtyRect(self, mouse_pos: QPoint | None) -> QRect:
+        """進行中 polygon 的最後一段 (最後一點到游標的虛線) 與游標附近的範圍"""
+        if not self.current_polygon_points:
+            return QRect()
+        last = self._scale_to_widget(self.current_polygon_points[-1])
+        rect = QRect(last, last)
+        if mouse_pos is not None:
+            rect = QRect(last, mouse_pos).normalized()
+        return rect.adjusted(-DIRTY_MARGIN, -DIRTY_MARGIN, DIRTY_MARGIN, DIRTY_MARGIN)
+
+    def _resizeDirtyRect(self, mouse_pos: QPoint | None) -> QRect:
+        """resize / 旋轉中的 bbox 連同游標旁尺寸資訊的範圍"""
+        if self.selected_bbox is None:
+            return QRect()
+        rect = self._bboxDirtyRect(self.selected_bbox)
+        if mouse_pos is not None:
+            rect = rect.united(self._infoTextRect(mouse_pos, "00000x00000=0000000000"))
+        return rect
+
+    def _updateRect(self, rect: QRect) -> None:
+        """只重繪 rect 範圍 (空的就不重繪)"""
+        if not rect.isEmpty():
+            self.update(rect)
+
+    def _hitIndex(self) -> AnnotationIndex:
+        """目前標註的空間索引; 標註有變動 (_ann_rev) 或換了清單才重建
+
+        移動 / 頂點拖曳 / resize / 旋轉時會就地改座標, 只有開始時的 pushHistory
+        遞增 _ann_rev; 拖曳期間不做命中判斷, 各操作在 mouseReleaseEvent 放開時
+        都會再呼叫 markAnnotationsChanged, 下一次查詢就會以新位置重建。
+        """
+        key = (self._ann_rev, id(self.bboxes), len(self.bboxes), id(self.polygons), len(self.polygons))
+        if self._hit_index is None or self._hit_index_key != key:
+            self._hit_index = AnnotationIndex(self.bboxes, self.polygons)
+            self._hit_index_key = key
+        return self._hit_index
+
+    def _toWidgetArray(self, points: np.ndarray) -> np.ndarray:
+        """(N, 2) 原圖座標 → widget 座標並取整, 與逐點呼叫 _scale_to_widget 的結果相同"""
+        if not self.pixmap:
+            return points
+        return np.trunc(points * self.tf.zoom + (self.tf.off_x, self.tf.off_y))
+
+    def _bboxCandidates(self, pos: QPoint) -> list[int]:
+        """外接框涵蓋 pos (widget 座標) 的 bbox index, 由小到大; 精確判斷交給 _isInBboxArea"""
+        o = self._scale_to_original(pos)
+        return self._hitIndex().bboxes.query_point(o.x(), o.y())
+
+    def _polygonCandidates(self, pos: QPoint, radius: float) -> list[int]:
+        """外接框距 pos (widget 座標) 在 radius 螢幕 px 內的 polygon index, 由小到大"""
+        o = self._scale_to_original_f(pos)
+        # 頂點換到 widget 時會再取整一次, 多留 1 個螢幕 px
+        r = self.tf.v2o_len(radius + 1)
+        return self._hitIndex().polygons.query_rect(o.x() - r, o.y() - r, o.x() + r, o.y() + r)
+
     def _hitSelectedGroup(self, pos: QPoint) -> bool:
         """游標是否落在目前多選的任一個標註上
 
@@ -423,14 +733,15 @@ class ImageWidget(QWidget):
         Returns:
             bool: 是否命中
         """
-        for i in self.selected_bbox_indices:
-            if 0 <= i < len(self.bboxes) and self._isInBboxArea(pos, self.bboxes[i]):
-                return True
-        for i in self.selected_polygon_indices:
-            if 0 <= i < len(self.polygons) and self._isPointInPolygon(
-                pos, self.polygons[i]
-            ):
-                return True
+        # 全選後選取集合可能很大, 先用索引縮到游標附近再看是否在選取中
+        if self.selected_bbox_indices:
+            for i in self._bboxCandidates(pos):
+                if i in self.selected_bbox_indices and self._isInBboxArea(pos, self.bboxes[i]):
+                    return True
+        if self.selected_polygon_indices:
+            for i in self._polygonCandidates(pos, POLYGON_SELECT_PADDING):
+                if i in self.selected_polygon_indices and self._isPointInPolygon(pos, i):
+                    return True
         return False
 
     def _hitMovableTarget(self, pos: QPoint) -> bool:
@@ -449,7 +760,7 @@ class ImageWidget(QWidget):
         if self.select_type == "polygon" and 0 <= self.idx_focus_polygon < len(
             self.polygons
         ):
-            return self._isPointInPolygon(pos, self.polygons[self.idx_focus_polygon])
+            return self._isPointInPolygon(pos, self.idx_focus_polygon)
         return False
 
     def _beginMove(self, pos: QPoint, bbox_indices, poly_indices) -> None:
@@ -538,6 +849,9 @@ class ImageWidget(QWidget):
         if not self._move_pushed:
             self.pushHistory()
             self._move_pushed = True
+        moved_boxes = [i for i, _ in self.move_orig_boxes]
+        moved_polys = [i for i, _ in self.move_orig_polys]
+        dirty = self._annotationsDirtyRect(moved_boxes, moved_polys)
         for idx, (ox, oy) in self.move_orig_boxes:
             if 0 <= idx < len(self.bboxes):
                 self.bboxes[idx].x = int(round(ox + dx))
@@ -545,7 +859,8 @@ class ImageWidget(QWidget):
         for idx, pts in self.move_orig_polys:
             if 0 <= idx < len(self.polygons):
                 self.polygons[idx].points = [(px + dx, py + dy) for px, py in pts]
-        self.update()
+        # 只重繪移動前後的範圍, 其餘畫面 (影像與其他標註) 不動
+        self._updateRect(dirty.united(self._annotationsDirtyRect(moved_boxes, moved_polys)))
 
     def _beginRotate(self, pos: QPoint, bbox: Bbox) -> None:
         """開始拖曳旋轉握把
@@ -771,27 +1086,9 @@ class ImageWidget(QWidget):
         """獲取旋轉後的四個角點座標（原始座標）
         返回順序：top_left, top_right, bottom_right, bottom_left
         """
-        center_x = bbox.x + bbox.width / 2
-        center_y = bbox.y + bbox.height / 2
-
-        # 四個角點相對於中心的位置（未旋轉時）
-        corners = [
-            (-bbox.width / 2, -bbox.height / 2),  # top_left
-            (bbox.width / 2, -bbox.height / 2),  # top_right
-            (bbox.width / 2, bbox.height / 2),  # bottom_right
-            (-bbox.width / 2, bbox.height / 2),  # bottom_left
-        ]
-
-        angle_rad = math.radians(bbox.angle)
-        rotated_corners = []
-
-        for dx, dy in corners:
-            # 旋轉這個偏移量
-            rotated_x = dx * math.cos(angle_rad) - dy * math.sin(angle_rad)
-            rotated_y = dx * math.sin(angle_rad) + dy * math.cos(angle_rad)
-            rotated_corners.append((center_x + rotated_x, center_y + rotated_y))
-
-        return rotated_corners
+        return geometry.corners_one(
+            bbox.x, bbox.y, bbox.x + bbox.width, bbox.y + bbox.height, bbox.angle
+        )
 
     def _isOnRotationHandle(self, pos, bbox: Bbox) -> bool:
         """檢查滑鼠是否在旋轉控制點上"""
@@ -805,21 +1102,20 @@ class ImageWidget(QWidget):
 
         return distance <= ROTATION_HANDLE_RADIUS * 2
 
-    def _isNearPolygonVertex(self, pos: QPoint, polygon: Polygon) -> int:
-        """檢查滑鼠是否靠近polygon的某個頂點
+    def _isNearPolygonVertex(self, pos: QPoint, idx: int) -> int:
+        """檢查滑鼠是否靠近第 idx 個 polygon 的某個頂點
 
         Args:
             pos: widget座標
-            polygon: Polygon物件
+            idx: polygon 的 index (頂點取自 _hitIndex 的快取陣列)
 
         Returns:
             int: 頂點index，若無則回傳-1
         """
-        for i, (px, py) in enumerate(polygon.points):
-            widget_pt = self._scale_to_widget(QPoint(int(px), int(py)))
-            if self._distanceBetweenPoints(pos, widget_pt) < POLYGON_CLOSE_THRESHOLD:
-                return i
-        return -1
+        wpts = self._toWidgetArray(self._hitIndex().polygon_points[idx])
+        d = np.hypot(wpts[:, 0] - pos.x(), wpts[:, 1] - pos.y())
+        near = np.flatnonzero(d < POLYGON_CLOSE_THRESHOLD)
+        return int(near[0]) if len(near) else -1
 
     def _finalizeRectSelection(self):
         """框選結束，找出框內的bbox和polygon"""
@@ -829,9 +1125,17 @@ class ImageWidget(QWidget):
         self.selected_bbox_indices = set()
         self.selected_polygon_indices = set()
 
+        # 先用索引取出外接框落在框選範圍 (外擴取整誤差) 附近的候選, 再逐一精確判斷
+        index = self._hitIndex()
+        o0 = self._scale_to_original_f(sel_rect.topLeft())
+        o1 = self._scale_to_original_f(sel_rect.bottomRight())
+        margin = self.tf.v2o_len(2)
+        query = (o0.x() - margin, o0.y() - margin, o1.x() + margin, o1.y() + margin)
+
         # 檢查bbox是否與框選範圍相交（僅在view_mode可見時）
         if self.view_mode in (ViewMode.BBOX, ViewMode.ALL):
-            for i, bbox in enumerate(self.bboxes):
+            for i in index.bboxes.query_rect(*query):
+                bbox = self.bboxes[i]
                 bbox_rect = QRect(
                     self._scale_to_widget(QPoint(bbox.x, bbox.y)),
                     self._scale_to_widget(
@@ -843,12 +1147,16 @@ class ImageWidget(QWidget):
 
         # 檢查polygon頂點是否在框選範圍內（僅在view_mode可見時）
         if self.view_mode in (ViewMode.SEG, ViewMode.ALL):
-            for i, polygon in enumerate(self.polygons):
-                for px, py in polygon.points:
-                    wpt = self._scale_to_widget(QPoint(int(px), int(py)))
-                    if sel_rect.contains(wpt):
-                        self.selected_polygon_indices.add(i)
-                        break
+            for i in index.polygons.query_rect(*query):
+                wpts = self._toWidgetArray(index.polygon_points[i])
+                inside = (
+                    (wpts[:, 0] >= sel_rect.left())
+                    & (wpts[:, 0] <= sel_rect.right())
+                    & (wpts[:, 1] >= sel_rect.top())
+                    & (wpts[:, 1] <= sel_rect.bottom())
+                )
+                if inside.any():
+                    self.selected_polygon_indices.add(i)
 
         if self.selected_bbox_indices or self.selected_polygon_indices:
             self.select_type = "multi"
@@ -966,6 +1274,11 @@ class ImageWidget(QWidget):
         """Run inference using the active model (YOLO or SAM3)."""
         if inferencer.active_model_type == ModelType.NONE:
             return
+        # 單獨按 D (或影片逐幀偵測) 時自成一個事件; 換圖時的自動偵測併入換圖事件
+        with perf.event("inference"), perf.phase("inference"):
+            self._runInference()
+
+    def _runInference(self):
         if not file_h.current_image_path():
             return
         model_type = inferencer.active_model_type
@@ -1002,18 +1315,12 @@ class ImageWidget(QWidget):
                 self.polygons = polygons
 
         # 偵測結果偶爾會溢出影像邊界, 一併夾回來 —— 那些框會直接被存成 XML
-        self._clampAnnotationsToImage()
+        ann = self._clampAnnotationsToImage()
 
-        # 過濾掉太小的偵測結果
-        min_len = cfg.minimal_bbox_length
-        self.bboxes = [
-            b for b in self.bboxes
-            if b.width >= min_len and b.height >= min_len
-        ]
-        self.polygons = [
-            p for p in self.polygons
-            if self._polygon_bbox_size(p) >= min_len
-        ]
+        # 過濾掉太小的偵測結果 (以夾完的陣列一次算完)
+        boxes_ok, polygons_ok = ann.min_size_mask(cfg.minimal_bbox_length)
+        self.bboxes = [b for b, ok in zip(self.bboxes, boxes_ok.tolist()) if ok]
+        self.polygons = [p for p, ok in zip(self.polygons, polygons_ok.tolist()) if ok]
 
         if cfg.show_fps:
             self.list_fps.append(1 / (time.time() - t1))
@@ -1096,7 +1403,12 @@ class ImageWidget(QWidget):
             self.clearBboxes()
             self.update()
             return
+        # 單獨載入 (開資料夾等) 自成一個事件; 由 MainWindow.show_image 呼叫時併入換圖事件
+        with perf.event("load", wait_paint=True):
+            perf.set_file(file_path)
+            self._loadImage(file_path)
 
+    def _loadImage(self, file_path):
         # 判斷檔案是否為影片
         if file_path.lower().endswith(VIDEO_EXTS):
             # Google AI Gemini-2.0-pro 跟我都試過了, 沒有辦法把video widget的frame傳到畫布中編輯
@@ -1106,15 +1418,17 @@ class ImageWidget(QWidget):
             # 換片前先關掉舊的解碼器, 否則連續切換影片會一直累積沒釋放的 cap
             if self.cap:
                 self.cap.release()
-            self.cap = cv2.VideoCapture(file_path)
-            ret, self.cv_img = self.cap.read()
+            with perf.phase("decode"):
+                self.cap = cv2.VideoCapture(file_path)
+                ret, self.cv_img = self.cap.read()
             self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
             # log.info(f"Video FPS: {self.fps}")
             # on_video_loaded_callback 移到下方 cv_img 檢查之後才呼叫
         else:
             self.file_type = FileType.IMAGE
             # imread_unicode 支援中文路徑（cv2.imread 在 Windows 走 ANSI code page，中文會回 None）
-            self.cv_img = imread_unicode(file_path)
+            with perf.phase("decode"):
+                self.cv_img = imread_unicode(file_path)
 
             if self.on_image_loaded_callback:
                 self.on_image_loaded_callback()
@@ -1136,10 +1450,11 @@ class ImageWidget(QWidget):
 
         height, width, channel = self.cv_img.shape
         bytesPerLine = 3 * width
-        qImg = QImage(
-            self.cv_img.data, width, height, bytesPerLine, QImage.Format.Format_RGB888
-        ).rgbSwapped()
-        self.pixmap = QPixmap.fromImage(qImg)
+        with perf.phase("qt_convert"):
+            qImg = QImage(
+                self.cv_img.data, width, height, bytesPerLine, QImage.Format.Format_RGB888
+            ).rgbSwapped()
+            self.pixmap = QPixmap.fromImage(qImg)
         # 影像尺寸相同就保留 zoom/pan: 逐張比對同一個區域是這工具的主要用法,
         # 每換一張都跳回 fit 會讓人重新找一次位置。
         # 真正的 fit 延到 paintEvent: 這裡的 self.size() 可能還是 layout 前的
@@ -1151,13 +1466,14 @@ class ImageWidget(QWidget):
         self._notifyViewChanged()
         self.clearBboxes()
 
-        # Initialize the mask pixmap
-        self.mask_pixmap = QPixmap(self.pixmap.size())
-        self.mask_pixmap.fill(Qt.GlobalColor.transparent)
+        # Initialize the mask layer
+        self.mask = MaskLayer(self.pixmap.width(), self.pixmap.height())
 
         # 嘗試讀取 XML 檔案
         xml_path = getXmlPath(file_path)
-        if not self.loadBboxFromXml(xml_path):
+        with perf.phase("xml_parse"):
+            loaded = self.loadBboxFromXml(xml_path)
+        if not loaded:
             # 如果 bbox (來自xml) 不存在, 才嘗試使用 YOLO 偵測
             if self.app_state.auto_detect:
                 self.runInference()
@@ -1201,6 +1517,7 @@ class ImageWidget(QWidget):
         self.drawing = False
         self._resetSelection()
         self.history.clear()
+        self.markAnnotationsChanged()
 
     def pushHistory(self):
         """在改動標註「之前」記下目前狀態
@@ -1208,6 +1525,7 @@ class ImageWidget(QWidget):
         所有會改到 bboxes / polygons 的入口都要先呼叫這個, undo 才不會漏步。
         """
         self.history.push(self.bboxes, self.polygons)
+        self.markAnnotationsChanged()
 
     def dropHistoryIfUnchanged(self):
         """連續操作結束時, 若標註其實沒變就撤掉開始時記的快照
@@ -1226,6 +1544,7 @@ class ImageWidget(QWidget):
         self.bboxes, self.polygons = restored
         self.current_polygon_points = []
         self._resetSelection()
+        self.markAnnotationsChanged()
         # 還原本身也是一次變更, 必須讓切檔流程把它寫回 XML
         g_param.user_labeling = True
         self.update()
@@ -1254,276 +1573,90 @@ class ImageWidget(QWidget):
         self._applySnapshot(restored)
         return True
 
+    def _fitIfNeeded(self) -> None:
+        """第一次畫這張影像時才 fit: 到重繪時 widget 已經是最終尺寸"""
+        if self._needs_fit:
+            self.tf.fit(self.size())
+            self._needs_fit = False
+            self._notifyViewChanged()
+
     def paintEvent(self, event):
         super().paintEvent(event)
+        if self._gl_canvas is not None:
+            # 整個畫面由上面覆蓋的 GL 畫布負責
+            return
+        t0 = time.perf_counter()
+        self._paintCanvas(event)
+        perf.paint_done(time.perf_counter() - t0)
+
+    def _paintCanvas(self, event):
         painter = QPainter(self)
         if not self.pixmap:
             return
-        # 第一次畫這張影像時才 fit: 到這裡 widget 已經是最終尺寸
-        if self._needs_fit:
-            self.tf.fit(self.size())
-            self._needs_fit = False
-            self._notifyViewChanged()
+        self._fitIfNeeded()
 
         # 依 zoom/pan 繪製影像。縮小時 (一般檢視狀態) 用預縮好的 pixmap, 平移
-        # 只是 blit; 放大時只畫可見區域。兩者都不會重新解碼原圖
+        # 只是 blit; 放大時只畫可見區域。兩者都不會重新解碼原圖。
+        # 拖曳等互動只 update 局部範圍 (見 _updateRect), 這裡也只 blit event.rect() 那一塊
+        dirty = event.rect()
         img_rect = self.tf.image_rect()
         if self.tf.zoom < 1.0:
-            painter.drawPixmap(
-                int(img_rect.x()), int(img_rect.y()), self._scaledPixmap()
-            )
-            if self.mask_pixmap:
-                painter.drawPixmap(
-                    int(img_rect.x()),
-                    int(img_rect.y()),
-                    self.mask_pixmap.scaled(
-                        max(1, self.scaled_width),
-                        max(1, self.scaled_height),
-                        Qt.AspectRatioMode.KeepAspectRatio,
-                    ),
-                )
+            origin = QPoint(int(img_rect.x()), int(img_rect.y()))
+            scaled = self._scaledPixmap()
+            target = dirty.intersected(QRect(origin, scaled.size()))
+            if not target.isEmpty():
+                painter.drawPixmap(target, scaled, target.translated(-origin))
+            if self.mask is not None and self.mask.has_content:
+                # 縮圖依尺寸快取在 MaskLayer 裡, 筆刷 / 填滿後只補算改到的那一塊
+                mask = self.mask.scaled_image(self.scaled_width, self.scaled_height)
+                target = dirty.intersected(QRect(origin, mask.size()))
+                if not target.isEmpty():
+                    painter.drawImage(target, mask, target.translated(-origin))
         else:
             visible = QRectF(self.rect()).intersected(img_rect)
             if visible.isEmpty():
                 return
-            src = QRectF(
-                self.tf.v2o_len(visible.x() - img_rect.x()),
-                self.tf.v2o_len(visible.y() - img_rect.y()),
-                self.tf.v2o_len(visible.width()),
-                self.tf.v2o_len(visible.height()),
-            )
-            painter.drawPixmap(visible, self.pixmap, src)
-            if self.mask_pixmap:
-                painter.drawPixmap(visible, self.mask_pixmap, src)
-
-        # 繪製 Bounding Box (filtered by view mode)
-        _bboxes_to_draw = (
-            self.bboxes if self.view_mode in (ViewMode.BBOX, ViewMode.ALL) else []
-        )
-        for bbox_idx, bbox in enumerate(_bboxes_to_draw):
-            # 多選中的bbox用黃色顯示
-            if bbox_idx in self.selected_bbox_indices:
-                painter.setPen(ColorPen.YELLOW)
-            else:
-                painter.setPen(bbox.color_pen)
-
-            if bbox.angle != 0:
-                # 繪製旋轉的 bounding box
-                # 計算中心點（原始座標）
-                center_x = bbox.x + bbox.width / 2
-                center_y = bbox.y + bbox.height / 2
-
-                # 轉換到視窗座標
-                center_widget = self._scale_to_widget(
-                    QPoint(int(center_x), int(center_y))
-                )
-
-                # 計算縮放後的寬高
-                scaled_width = bbox.width * self.scaled_width / self.pixmap.width()
-                scaled_height = bbox.height * self.scaled_height / self.pixmap.height()
-
-                # 保存當前畫筆狀態
-                painter.save()
-                # 移動到中心點
-                painter.translate(center_widget.x(), center_widget.y())
-                # 順時針旋轉
-                painter.rotate(bbox.angle)
-                # 繪製矩形（以中心為原點）
-                painter.drawRect(
-                    int(-scaled_width / 2),
-                    int(-scaled_height / 2),
-                    int(scaled_width),
-                    int(scaled_height),
+            target = visible.intersected(QRectF(dirty))
+            if not target.isEmpty():
+                src = QRectF(
+                    self.tf.v2o_len(target.x() - img_rect.x()),
+                    self.tf.v2o_len(target.y() - img_rect.y()),
+                    self.tf.v2o_len(target.width()),
+                    self.tf.v2o_len(target.height()),
                 )
-                # 恢復畫筆狀態
-                painter.restore()
-
-                # 繪製文字（在未旋轉的位置）
-                text = f"{bbox.label} ({bbox.confidence:.2f})"
-                if bbox.angle != 0:
-                    text += f" [{bbox.angle:.0f}°]"
-                font_metrics = painter.fontMetrics()
-                text_width = font_metrics.horizontalAdvance(text)
-                text_height = font_metrics.height()
-
-                qpt_text = QPoint(bbox.x, bbox.y)
-                bg_rect = QRect(
-                    QPoint(
-                        self._scale_to_widget(qpt_text).x(),
-                        self._scale_to_widget(qpt_text).y() - int(text_height),
-                    ),
-                    QPoint(
-                        self._scale_to_widget(qpt_text).x() + int(text_width),
-                        self._scale_to_widget(qpt_text).y(),
-                    ),
-                )
-                painter.fillRect(bg_rect, QColor(0, 0, 0, 150))
-                painter.drawText(self._scale_to_widget(qpt_text), text)
-            else:
-                # 繪製一般的 bounding box
-                rect = QRect(
-                    self._scale_to_widget(QPoint(bbox.x, bbox.y)),
-                    self._scale_to_widget(
-                        QPoint(bbox.x + bbox.width, bbox.y + bbox.height)
-                    ),
-                )
-                painter.drawRect(rect)
-
-                # 計算文字大小
-                text = f"{bbox.label} ({bbox.confidence:.2f})"
-                font_metrics = painter.fontMetrics()
-                text_width = font_metrics.horizontalAdvance(text)
-                text_height = font_metrics.height()
-
-                # 繪製文字底色
-                qpt_text = QPoint(bbox.x, bbox.y)
-                bg_rect = QRect(
-                    QPoint(
-                        self._scale_to_widget(qpt_text).x(),
-                        self._scale_to_widget(qpt_text).y() - int(text_height),
-                    ),
-                    QPoint(
-                        self._scale_to_widget(qpt_text).x() + int(text_width),
-                        self._scale_to_widget(qpt_text).y(),
-                    ),
-                )
-                painter.fillRect(bg_rect, QColor(0, 0, 0, 150))  # 黑色半透明底色
-
-                # 繪製文字
-                painter.drawText(
-                    self._scale_to_widget(qpt_text),
-                    text,
-                )
-
-        # 繪製選中 bbox 的控制點。條件跟 mousePressEvent 的熱區判斷一致 (SELECT 模式
-        # 且 select_type == "bbox"), 否則會在拖不動的地方畫出控制點誤導人 ——
-        # 例如 BBOX 模式畫完一個框後, 那個框仍是 focus 但該模式並不處理 resize
-        if (
-            _bboxes_to_draw
-            and self.drawing_mode == DrawingMode.SELECT
-            and self.select_type == "bbox"
-            and 0 <= self.idx_focus_bbox < len(self.bboxes)
-        ):
-            focused_bbox = self.bboxes[self.idx_focus_bbox]
-
-            # OBB啟用時繪製旋轉控制點
-            if cfg.enable_obb:
-                center_x = focused_bbox.x + focused_bbox.width / 2
-                center_y = focused_bbox.y + focused_bbox.height / 2
-                center_widget = self._scale_to_widget(
-                    QPoint(int(center_x), int(center_y))
-                )
-
-                handle_pos_original = self._getRotationHandlePos(focused_bbox)
-                handle_pos_widget = self._scale_to_widget(handle_pos_original)
-
-                # 繪製虛線（從 bbox 上邊中點到旋轉控制點）
-                angle_rad = math.radians(focused_bbox.angle)
-                top_center_offset_x = 0
-                top_center_offset_y = -focused_bbox.height / 2
-                rotated_top_x = top_center_offset_x * math.cos(
-                    angle_rad
-                ) - top_center_offset_y * math.sin(angle_rad)
-                rotated_top_y = top_center_offset_x * math.sin(
-                    angle_rad
-                ) + top_center_offset_y * math.cos(angle_rad)
-                top_center_original = QPoint(
-                    int(center_x + rotated_top_x), int(center_y + rotated_top_y)
-                )
-                top_center_widget = self._scale_to_widget(top_center_original)
-
-                dashed_pen = QPen(QColor(255, 255, 0), 1, Qt.PenStyle.DashLine)
-                painter.setPen(dashed_pen)
-                painter.drawLine(top_center_widget, handle_pos_widget)
-
-                # 繪製旋轉控制點圓圈
-                painter.setPen(QPen(QColor(255, 255, 0), 2))
-                painter.setBrush(QColor(255, 255, 255, 200))
-                painter.drawEllipse(
-                    handle_pos_widget, ROTATION_HANDLE_RADIUS, ROTATION_HANDLE_RADIUS
-                )
-
-            # SELECT模式下繪製 resize 控制點 (四角 + 四邊)
-            if self.drawing_mode == DrawingMode.SELECT:
-                painter.setPen(QPen(QColor(255, 255, 0), 1))
-                painter.setBrush(QColor(255, 255, 255, 200))
-                # 與命中判斷共用同一份幾何, 畫得到的就點得到
-                for ox, oy in self._resizeHandlePoints(focused_bbox).values():
-                    wpt = self._scale_to_widget(QPoint(int(ox), int(oy)))
-                    painter.drawRect(
-                        wpt.x() - CORNER_SIZE,
-                        wpt.y() - CORNER_SIZE,
-                        CORNER_SIZE * 2,
-                        CORNER_SIZE * 2,
-                    )
-                painter.setBrush(Qt.BrushStyle.NoBrush)
-
-        # 繪製 Polygons (filtered by view mode)
-        _polygons_to_draw = (
-            self.polygons if self.view_mode in (ViewMode.SEG, ViewMode.ALL) else []
+                painter.drawPixmap(target, self.pixmap, src)
+                if self.mask is not None and self.mask.has_content:
+                    painter.drawImage(target, self.mask.image(), src)
+
+        # 標註: 不動的部分畫進快取圖層 (見 _annotationLayer), 編輯中的那幾個每次現畫
+        live_bboxes, live_polygons = self._liveAnnotationIndices()
+        layer = self._annotationLayer(live_bboxes, live_polygons)
+        dpr = layer.devicePixelRatio()
+        painter.drawPixmap(
+            QRectF(dirty),
+            layer,
+            QRectF(dirty.x() * dpr, dirty.y() * dpr, dirty.width() * dpr, dirty.height() * dpr),
         )
-        for poly_idx, polygon in enumerate(_polygons_to_draw):
-            # 多選中的polygon用黃色
-            if poly_idx in self.selected_polygon_indices:
-                painter.setPen(ColorPen.YELLOW)
-            else:
-                painter.setPen(polygon.color_pen)
-            # Semi-transparent fill
-            fill_color = QColor(0, 255, 0, 50)
-            if (
-                poly_idx == self.idx_focus_polygon
-                or poly_idx in self.selected_polygon_indices
-            ):
-                fill_color = QColor(255, 255, 0, 70)
+        self._paintOverlay(painter, live_bboxes, live_polygons)
 
-            if len(polygon.points) >= 3:
-                qpoly = QPolygonF()
-                for px, py in polygon.points:
-                    widget_pt = self._scale_to_widget(QPoint(int(px), int(py)))
-                    qpoly.append(QPointF(widget_pt.x(), widget_pt.y()))
+    def _paintOverlay(self, painter: QPainter, live_bboxes: list[int], live_polygons: list[int]) -> None:
+        """畫在標註圖層之上、每次重繪都現畫的部分
 
-                painter.setBrush(fill_color)
-                painter.drawPolygon(qpoly)
-                painter.setBrush(Qt.BrushStyle.NoBrush)
+        編輯中的標註、控制點、繪製中的 polygon / bbox 預覽、框選範圍與各種尺寸資訊。
+        QPainter 畫布與 GL 畫布 (src/gl_canvas.py) 共用。
 
-                # Draw vertex dots (SELECT模式下選取的polygon用大圓點)
-                if (
-                    poly_idx == self.idx_focus_polygon
-                    and self.drawing_mode == DrawingMode.SELECT
-                ):
-                    painter.setPen(QPen(QColor(255, 255, 0), 2))
-                    painter.setBrush(QColor(255, 255, 255, 200))
-                    for px, py in polygon.points:
-                        widget_pt = self._scale_to_widget(QPoint(int(px), int(py)))
-                        painter.drawEllipse(
-                            widget_pt,
-                            POLYGON_VERTEX_RADIUS * 2,
-                            POLYGON_VERTEX_RADIUS * 2,
-                        )
-                    painter.setBrush(Qt.BrushStyle.NoBrush)
-                else:
-                    for px, py in polygon.points:
-                        widget_pt = self._scale_to_widget(QPoint(int(px), int(py)))
-                        painter.drawEllipse(
-                            widget_pt, POLYGON_VERTEX_RADIUS, POLYGON_VERTEX_RADIUS
-                        )
-
-                # Draw label text
-                first_pt = self._scale_to_widget(
-                    QPoint(int(polygon.points[0][0]), int(polygon.points[0][1]))
-                )
-                text = f"{polygon.label}"
-                if polygon.confidence >= 0:
-                    text += f" ({polygon.confidence:.2f})"
-                font_metrics = painter.fontMetrics()
-                text_width = font_metrics.horizontalAdvance(text)
-                text_height = font_metrics.height()
-                bg_rect = QRect(
-                    QPoint(first_pt.x(), first_pt.y() - text_height),
-                    QPoint(first_pt.x() + text_width, first_pt.y()),
-                )
-                painter.fillRect(bg_rect, QColor(0, 0, 0, 150))
-                painter.drawText(first_pt, text)
+        Args:
+            painter: 目標 painter
+            live_bboxes: 編輯中的 bbox (見 _liveAnnotationIndices)
+            live_polygons: 編輯中的 polygon
+        """
+        if self.view_mode in (ViewMode.BBOX, ViewMode.ALL):
+            for idx in live_bboxes:
+                self._drawBbox(painter, idx, self.bboxes[idx])
+        if self.view_mode in (ViewMode.SEG, ViewMode.ALL):
+            for idx in live_polygons:
+                self._drawPolygon(painter, idx, self.polygons[idx])
+        self._drawFocusHandles(painter)
 
         # 繪製進行中的 Polygon
         if self.current_polygon_points and self.drawing_mode == DrawingMode.POLYGON:
@@ -1681,82 +1814,277 @@ class ImageWidget(QWidget):
             painter.setPen(QColor(220, 220, 220))
             painter.drawText(tx + 1, ty + th - fm.descent(), count_text)
 
-    def draw_on_mask(self, pos: QPoint):
-        if self.last_pos is None:
-            self.last_pos = pos
-            return
+    def _bboxPen(self, idx: int, bbox: Bbox) -> QPen:
+        """bbox 的框線 / label 顏色: 多選中的用黃色"""
+        return ColorPen.YELLOW if idx in self.selected_bbox_indices else bbox.color_pen
+
+    def _polygonPen(self, idx: int, polygon: Polygon) -> QPen:
+        """polygon 的邊線 / 頂點 / label 顏色: 多選中的用黃色"""
+        return ColorPen.YELLOW if idx in self.selected_polygon_indices else polygon.color_pen
 
-        painter = QPainter(self.mask_pixmap)
+    def _polygonFillColor(self, idx: int) -> QColor:
+        """polygon 的半透明填色: 選取中的用黃色"""
+        if idx == self.idx_focus_polygon or idx in self.selected_polygon_indices:
+            return QColor(255, 255, 0, 70)
+        return QColor(0, 255, 0, 50)
 
-        if self.drawing_mode == DrawingMode.MASK_DRAW:
-            pen = QPen(
-                QColor(0, 0, 0, 255),
-                self.brush_size,
-                Qt.PenStyle.SolidLine,
-                Qt.PenCapStyle.RoundCap,
-                Qt.PenJoinStyle.RoundJoin,
+    def _drawBbox(self, painter: QPainter, idx: int, bbox: Bbox) -> None:
+        """畫單一 bbox 與它的 label
+
+        Args:
+            painter: 目標 painter (widget 或快取圖層)
+            idx: bbox 在 self.bboxes 的 index (決定是否以多選色顯示)
+            bbox: 要畫的 bbox
+        """
+        painter.setPen(self._bboxPen(idx, bbox))
+
+        if bbox.angle != 0:
+            # 繪製旋轉的 bounding box
+            # 計算中心點（原始座標）
+            center_x = bbox.x + bbox.width / 2
+            center_y = bbox.y + bbox.height / 2
+
+            # 轉換到視窗座標
+            center_widget = self._scale_to_widget(
+                QPoint(int(center_x), int(center_y))
             )
-        elif self.drawing_mode == DrawingMode.MASK_ERASE:
-            pen = QPen(
-                Qt.GlobalColor.transparent,
-                self.brush_size,
-                Qt.PenStyle.SolidLine,
-                Qt.PenCapStyle.RoundCap,
-                Qt.PenJoinStyle.RoundJoin,
+
+            # 計算縮放後的寬高
+            scaled_width = bbox.width * self.scaled_width / self.pixmap.width()
+            scaled_height = bbox.height * self.scaled_height / self.pixmap.height()
+
+            # 保存當前畫筆狀態
+            painter.save()
+            # 移動到中心點
+            painter.translate(center_widget.x(), center_widget.y())
+            # 順時針旋轉
+            painter.rotate(bbox.angle)
+            # 繪製矩形（以中心為原點）
+            painter.drawRect(
+                int(-scaled_width / 2),
+                int(-scaled_height / 2),
+                int(scaled_width),
+                int(scaled_height),
             )
-            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Clear)
+            # 恢復畫筆狀態
+            painter.restore()
         else:
-            return
+            # 繪製一般的 bounding box
+            rect = QRect(
+                self._scale_to_widget(QPoint(bbox.x, bbox.y)),
+                self._scale_to_widget(
+                    QPoint(bbox.x + bbox.width, bbox.y + bbox.height)
+                ),
+            )
+            painter.drawRect(rect)
+        self._drawBboxLabel(painter, bbox)
+
+    def _drawBboxLabel(self, painter: QPainter, bbox: Bbox) -> None:
+        """在 bbox 左上角 (未旋轉的位置) 畫 label; 文字顏色沿用 painter 目前的 pen"""
+        text = f"{bbox.label} ({bbox.confidence:.2f})"
+        if bbox.angle != 0:
+            text += f" [{bbox.angle:.0f}°]"
+        font_metrics = painter.fontMetrics()
+        text_width = font_metrics.horizontalAdvance(text)
+        text_height = font_metrics.height()
+
+        # 繪製文字底色
+        anchor = self._scale_to_widget(QPoint(bbox.x, bbox.y))
+        bg_rect = QRect(
+            QPoint(anchor.x(), anchor.y() - int(text_height)),
+            QPoint(anchor.x() + int(text_width), anchor.y()),
+        )
+        painter.fillRect(bg_rect, QColor(0, 0, 0, 150))  # 黑色半透明底色
+        painter.drawText(anchor, text)
 
-        painter.setPen(pen)
-        painter.drawLine(self.last_pos, pos)
-        self.last_pos = pos
-        painter.end()
-        self.update()
+    def _drawPolygon(
+        self, painter: QPainter, idx: int, polygon: Polygon, points: list | None = None
+    ) -> None:
+        """畫單一 polygon 的填色、頂點與 label
 
-    def fill_mask(self, pos: QPoint):
-        if not self.mask_pixmap:
-            return
+        Args:
+            painter: 目標 painter (widget 或快取圖層)
+            idx: polygon 在 self.polygons 的 index (決定選取色與頂點大小)
+            polygon: 要畫的 polygon
+            points: 實際要畫的頂點 (例如 _lodPoints 的簡化版); None 則用 polygon.points
+        """
+        if points is None:
+            points = polygon.points
+        painter.setPen(self._polygonPen(idx, polygon))
+        fill_color = self._polygonFillColor(idx)
+
+        if len(points) >= 3:
+            qpoly = QPolygonF()
+            for px, py in points:
+                widget_pt = self._scale_to_widget(QPoint(int(px), int(py)))
+                qpoly.append(QPointF(widget_pt.x(), widget_pt.y()))
+
+            painter.setBrush(fill_color)
+            painter.drawPolygon(qpoly)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+
+            # Draw vertex dots (SELECT模式下選取的polygon用大圓點)
+            if (
+                idx == self.idx_focus_polygon
+                and self.drawing_mode == DrawingMode.SELECT
+            ):
+                painter.setPen(QPen(QColor(255, 255, 0), 2))
+                painter.setBrush(QColor(255, 255, 255, 200))
+                for px, py in points:
+                    widget_pt = self._scale_to_widget(QPoint(int(px), int(py)))
+                    painter.drawEllipse(
+                        widget_pt,
+                        POLYGON_VERTEX_RADIUS * 2,
+                        POLYGON_VERTEX_RADIUS * 2,
+                    )
+                painter.setBrush(Qt.BrushStyle.NoBrush)
+            else:
+                for px, py in points:
+                    widget_pt = self._scale_to_widget(QPoint(int(px), int(py)))
+                    painter.drawEllipse(
+                        widget_pt, POLYGON_VERTEX_RADIUS, POLYGON_VERTEX_RADIUS
+                    )
 
-        q_img = self.mask_pixmap.toImage()
-        # 確保是 ARGB 格式
-        if q_img.format() != QImage.Format.Format_ARGB32:
-            q_img = q_img.convertToFormat(QImage.Format.Format_ARGB32)
+            self._drawPolygonLabel(painter, polygon, points[0])
 
-        cv_img = qimage_to_cv_mat(q_img)  # 得到 BGRA 格式的 ndarray
+    def _drawPolygonLabel(self, painter: QPainter, polygon: Polygon, first_point) -> None:
+        """在 polygon 第一個頂點畫 label; 文字顏色沿用 painter 目前的 pen
 
-        bgr_img = cv_img[:, :, :3]
-        alpha = cv_img[:, :, 3]
+        Args:
+            painter: 目標 painter
+            polygon: 要畫 label 的 polygon
+            first_point: 第一個頂點 (原圖座標; 簡化版與原本的第一點相同)
+        """
+        first_pt = self._scale_to_widget(
+            QPoint(int(first_point[0]), int(first_point[1]))
+        )
+        text = f"{polygon.label}"
+        if polygon.confidence >= 0:
+            text += f" ({polygon.confidence:.2f})"
+        font_metrics = painter.fontMetrics()
+        text_width = font_metrics.horizontalAdvance(text)
+        text_height = font_metrics.height()
+        bg_rect = QRect(
+            QPoint(first_pt.x(), first_pt.y() - text_height),
+            QPoint(first_pt.x() + text_width, first_pt.y()),
+        )
+        painter.fillRect(bg_rect, QColor(0, 0, 0, 150))
+        painter.drawText(first_pt, text)
 
-        scaled_pos = self._scale_to_original(pos)
-        x, y = scaled_pos.x(), scaled_pos.y()
+    def _drawFocusHandles(self, painter: QPainter) -> None:
+        """畫選中 bbox 的旋轉握把與 resize 控制點
 
-        h, w = alpha.shape
-        if not (0 <= x < w and 0 <= y < h):
-            return
+        每次現畫而不進快取圖層: 拖曳中控制點要跟著框走, 而且只有一個框, 成本可忽略。
+        """
+        # 繪製選中 bbox 的控制點。條件跟 mousePressEvent 的熱區判斷一致 (SELECT 模式
+        # 且 select_type == "bbox"), 否則會在拖不動的地方畫出控制點誤導人 ——
+        # 例如 BBOX 模式畫完一個框後, 那個框仍是 focus 但該模式並不處理 resize
+        if (
+            self.view_mode in (ViewMode.BBOX, ViewMode.ALL)
+            and self.drawing_mode == DrawingMode.SELECT
+            and self.select_type == "bbox"
+            and 0 <= self.idx_focus_bbox < len(self.bboxes)
+        ):
+            focused_bbox = self.bboxes[self.idx_focus_bbox]
 
-        # floodFill 會原地修改影像，所以我們複製 alpha channel
-        alpha_to_fill = alpha.copy()
+            # OBB啟用時繪製旋轉控制點
+            if cfg.enable_obb:
+                center_x = focused_bbox.x + focused_bbox.width / 2
+                center_y = focused_bbox.y + focused_bbox.height / 2
+                center_widget = self._scale_to_widget(
+                    QPoint(int(center_x), int(center_y))
+                )
 
-        mask = np.zeros((h + 2, w + 2), np.uint8)
+                handle_pos_original = self._getRotationHandlePos(focused_bbox)
+                handle_pos_widget = self._scale_to_widget(handle_pos_original)
 
-        # 檢查點擊處的透明度
-        if alpha[y, x] == 0:
-            # 如果是透明的，填充為不透明 (255)
-            fill_value = 255
-        else:
-            # 如果是不透明的，填充為透明 (0)
-            fill_value = 0
+                # 繪製虛線（從 bbox 上邊中點到旋轉控制點）
+                angle_rad = math.radians(focused_bbox.angle)
+                top_center_offset_x = 0
+                top_center_offset_y = -focused_bbox.height / 2
+                rotated_top_x = top_center_offset_x * math.cos(
+                    angle_rad
+                ) - top_center_offset_y * math.sin(angle_rad)
+                rotated_top_y = top_center_offset_x * math.sin(
+                    angle_rad
+                ) + top_center_offset_y * math.cos(angle_rad)
+                top_center_original = QPoint(
+                    int(center_x + rotated_top_x), int(center_y + rotated_top_y)
+                )
+                top_center_widget = self._scale_to_widget(top_center_original)
 
-        # 在 alpha channel 上執行 flood fill
-        cv2.floodFill(alpha_to_fill, mask, (x, y), fill_value)
+                dashed_pen = QPen(QColor(255, 255, 0), 1, Qt.PenStyle.DashLine)
+                painter.setPen(dashed_pen)
+                painter.drawLine(top_center_widget, handle_pos_widget)
 
-        # 將原始 BGR 和修改後的 alpha channel 合併
-        new_cv_img = np.dstack((bgr_img, alpha_to_fill))
+                # 繪製旋轉控制點圓圈
+                painter.setPen(QPen(QColor(255, 255, 0), 2))
+                painter.setBrush(QColor(255, 255, 255, 200))
+                painter.drawEllipse(
+                    handle_pos_widget, ROTATION_HANDLE_RADIUS, ROTATION_HANDLE_RADIUS
+                )
 
-        result_q_img = cv_mat_to_qimage(new_cv_img)
-        self.mask_pixmap = QPixmap.fromImage(result_q_img)
-        self.update()
+            # SELECT模式下繪製 resize 控制點 (四角 + 四邊)
+            if self.drawing_mode == DrawingMode.SELECT:
+                painter.setPen(QPen(QColor(255, 255, 0), 1))
+                painter.setBrush(QColor(255, 255, 255, 200))
+                # 與命中判斷共用同一份幾何, 畫得到的就點得到
+                for ox, oy in self._resizeHandlePoints(focused_bbox).values():
+                    wpt = self._scale_to_widget(QPoint(int(ox), int(oy)))
+                    painter.drawRect(
+                        wpt.x() - CORNER_SIZE,
+                        wpt.y() - CORNER_SIZE,
+                        CORNER_SIZE * 2,
+                        CORNER_SIZE * 2,
+                    )
+                painter.setBrush(Qt.BrushStyle.NoBrush)
+
+    def draw_on_mask(self, pos: QPoint):
+        """從上一個點到 pos 畫 (或擦) 一段筆刷
+
+        Args:
+            pos: 原圖座標
+        """
+        if self.last_pos is None:
+            self.last_pos = pos
+            return
+        if self.mask is None or self.drawing_mode not in (
+            DrawingMode.MASK_DRAW,
+            DrawingMode.MASK_ERASE,
+        ):
+            return
+
+        rect = self.mask.draw_line(
+            (self.last_pos.x(), self.last_pos.y()),
+            (pos.x(), pos.y()),
+            self.brush_size,
+            erase=self.drawing_mode == DrawingMode.MASK_ERASE,
+        )
+        self.last_pos = pos
+        # 只重繪這一筆改到的範圍
+        self._updateRect(self._maskRectToWidget(rect))
+
+    def fill_mask(self, pos: QPoint):
+        """點在空白處就把相連的空白填滿, 點在 mask 上就把相連的 mask 清掉
+
+        Args:
+            pos: widget 座標
+        """
+        if self.mask is None:
+            return
+        scaled_pos = self._scale_to_original(pos)
+        rect = self.mask.flood_fill(scaled_pos.x(), scaled_pos.y())
+        if rect is not None:
+            self._updateRect(self._maskRectToWidget(rect))
+
+    def _maskRectToWidget(self, rect: tuple[int, int, int, int]) -> QRect:
+        """mask 改到的範圍 (原圖座標, 右下不含) 換成要重繪的 widget 範圍"""
+        x0, y0, x1, y1 = rect
+        return (
+            QRectF(self._scale_to_widget_f(QPointF(x0, y0)), self._scale_to_widget_f(QPointF(x1, y1)))
+            .toAlignedRect()
+            .adjusted(-1, -1, 1, 1)
+        )
 
     def mousePressEvent(self, event):
         if self.on_mouse_press_callback:
@@ -1782,8 +2110,8 @@ class ImageWidget(QWidget):
 
                 # 1. 檢查所有polygon的頂點（直接拖曳，不需先選取）
                 if can_select_polygon:
-                    for idx, poly in enumerate(self.polygons):
-                        vtx_idx = self._isNearPolygonVertex(pos, poly)
+                    for idx in self._polygonCandidates(pos, POLYGON_CLOSE_THRESHOLD):
+                        vtx_idx = self._isNearPolygonVertex(pos, idx)
                         if vtx_idx >= 0:
                             self.idx_focus_polygon = idx
                             self.idx_focus_bbox = -1
@@ -1822,8 +2150,8 @@ class ImageWidget(QWidget):
 
                 # 4. 嘗試選取bbox（點擊內部）, 選到後可直接拖著移動
                 if can_select_bbox:
-                    for idx, bbox in enumerate(self.bboxes):
-                        if self._isInBboxArea(pos, bbox):
+                    for idx in self._bboxCandidates(pos):
+                        if self._isInBboxArea(pos, self.bboxes[idx]):
                             self.idx_focus_bbox = idx
                             self.idx_focus_polygon = -1
                             self.select_type = "bbox"
@@ -1835,8 +2163,8 @@ class ImageWidget(QWidget):
 
                 # 5. 嘗試選取polygon（含邊緣padding範圍）, 同樣可直接拖著移動
                 if can_select_polygon:
-                    for idx, polygon in enumerate(self.polygons):
-                        if self._isPointInPolygon(pos, polygon):
+                    for idx in self._polygonCandidates(pos, POLYGON_SELECT_PADDING):
+                        if self._isPointInPolygon(pos, idx):
                             self.idx_focus_polygon = idx
                             self.idx_focus_bbox = -1
                             self.select_type = "polygon"
@@ -1926,6 +2254,8 @@ class ImageWidget(QWidget):
                     )
                     self.draw_end = QPointF(self.draw_start)
                     self.drawing = True
+                    # 起點處立即出現 0x0 的預覽框與尺寸資訊, 要把那一塊畫出來
+                    self._updateRect(self._bboxPreviewDirtyRect())
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key.Key_Escape:
@@ -1940,6 +2270,8 @@ class ImageWidget(QWidget):
         super().keyPressEvent(event)
 
     def mouseMoveEvent(self, event):
+        # 各種互動只重繪「改動前後」的範圍, 所以先留住上一個游標位置
+        prev_mouse_pos = self.current_mouse_pos
         self.current_mouse_pos = event.pos()
 
         # 平移中: 只動檢視, 完全不碰標註
@@ -1966,25 +2298,36 @@ class ImageWidget(QWidget):
         ):
             if self._distanceBetweenPoints(self.selection_rect_start, event.pos()) > 5:
                 self.dragging_selection = True
-            self.update()
+            self._updateRect(
+                self._selectionDirtyRect(prev_mouse_pos).united(
+                    self._selectionDirtyRect(event.pos())
+                )
+            )
             return
 
         # SELECT模式: polygon頂點拖曳
         if self.drawing_mode == DrawingMode.SELECT and self.dragging_vertex_idx >= 0:
             if 0 <= self.idx_focus_polygon < len(self.polygons):
+                polygon = self.polygons[self.idx_focus_polygon]
+                dirty = self._polygonDirtyRect(polygon)
                 orig_pos = self._clampToImage(
                     self._scale_to_original_f(event.pos())
                 )
-                self.polygons[self.idx_focus_polygon].points[
-                    self.dragging_vertex_idx
-                ] = (orig_pos.x(), orig_pos.y())
-                self.update()
+                # 換成新的 list 而非就地改: undo 歷史以 points 的 identity 判斷 polygon 有沒有改過
+                points = list(polygon.points)
+                points[self.dragging_vertex_idx] = (orig_pos.x(), orig_pos.y())
+                polygon.points = points
+                self._updateRect(dirty.united(self._polygonDirtyRect(polygon)))
                 return
 
         if self.drawing_mode == DrawingMode.POLYGON:
             # Rubber band update for polygon drawing
             if self.current_polygon_points:
-                self.update()
+                self._updateRect(
+                    self._polygonDraftDirtyRect(prev_mouse_pos).united(
+                        self._polygonDraftDirtyRect(event.pos())
+                    )
+                )
             return
         if self.drawing_mode in [DrawingMode.MASK_DRAW, DrawingMode.MASK_ERASE]:
             if self.drawing:
@@ -2024,16 +2367,23 @@ class ImageWidget(QWidget):
             if not cursor_changed and idle:
                 self.setCursor(Qt.CursorShape.ArrowCursor)
 
+        # 以下只重繪改動前後的範圍; 單純 hover 沒有任何東西要重畫
+        dirty = QRect()
         if self.drawing and self.drawing_mode == DrawingMode.BBOX:
             # BBOX兩點模式：只在滑鼠按鍵未按住時（第一點已釋放後移動）才顯示預覽
             if not (event.buttons() & Qt.MouseButton.LeftButton):
+                dirty = self._bboxPreviewDirtyRect()
                 self.draw_end = self._clampToImage(
                     self._scale_to_original_f(event.pos())
                 )
+                dirty = dirty.united(self._bboxPreviewDirtyRect())
         elif self.resizing:
+            dirty = self._resizeDirtyRect(prev_mouse_pos)
             self._applyResize(event.pos())
+            dirty = dirty.united(self._resizeDirtyRect(event.pos()))
 
         elif self.rotating:
+            dirty = self._resizeDirtyRect(prev_mouse_pos)
             # 計算當前滑鼠相對於 bbox 中心的角度
             pos_original = self._scale_to_original(event.pos())
             center_x = self.selected_bbox.x + self.selected_bbox.width / 2
@@ -2048,8 +2398,9 @@ class ImageWidget(QWidget):
 
             # 正規化角度到 0-360 範圍
             self.selected_bbox.angle = new_angle % 360
+            dirty = dirty.united(self._resizeDirtyRect(event.pos()))
 
-        self.update()
+        self._updateRect(dirty)
 
     def mouseReleaseEvent(self, event):
         # 平移結束 (中鍵或右鍵拖曳)
@@ -2069,6 +2420,9 @@ class ImageWidget(QWidget):
                     # 拖出去又拖回原位時不留下空的 undo 步驟
                     self.dropHistoryIfUnchanged()
                     g_param.user_labeling = True
+                    # 拖曳中就地改座標, 只有第一次移動時經 pushHistory 遞增過 _ann_rev;
+                    # 放開時再標記一次, 命中索引與圖層的裁切才會用移動後的位置
+                    self.markAnnotationsChanged()
                 self._move_pushed = False
                 self.update()
                 return
@@ -2088,6 +2442,8 @@ class ImageWidget(QWidget):
                 self.dragging_vertex_idx = -1
                 self.dropHistoryIfUnchanged()
                 g_param.user_labeling = True
+                # 理由同上面的移動: 拖曳中的頂點更新不會遞增 _ann_rev
+                self.markAnnotationsChanged()
                 self.update()
                 return
 
@@ -2158,38 +2514,29 @@ class ImageWidget(QWidget):
         for bbox in self.bboxes:
             bbox.color_pen = ColorPen.GREEN
         g_param.user_labeling = True
+        self.markAnnotationsChanged()
         self.update()
 
-    @staticmethod
-    def _polygon_bbox_size(polygon: Polygon) -> float:
-        """回傳 polygon bounding box 的較短邊長度（原始影像座標）"""
-        xs = [x for x, _ in polygon.points]
-        ys = [y for _, y in polygon.points]
-        return min(max(xs) - min(xs), max(ys) - min(ys))
-
     def _distanceBetweenPoints(self, p1: QPoint, p2: QPoint) -> float:
         dx = p1.x() - p2.x()
         dy = p1.y() - p2.y()
         return (dx * dx + dy * dy) ** 0.5
 
-    def _isPointInPolygon(self, pos: QPoint, polygon: Polygon) -> bool:
-        """檢查widget座標的點是否在polygon內部或邊緣附近（含padding範圍）
+    def _isPointInPolygon(self, pos: QPoint, idx: int) -> bool:
+        """檢查widget座標的點是否在第 idx 個 polygon 內部或邊緣附近（含padding範圍）
 
         Args:
             pos: widget座標
-            polygon: Polygon物件
+            idx: polygon 的 index (頂點取自 _hitIndex 的快取陣列)
 
         Returns:
             bool: 是否在polygon選取範圍內
         """
-        if len(polygon.points) < 3:
+        points = self._hitIndex().polygon_points[idx]
+        if len(points) < 3:
             return False
         # Convert polygon points to widget coords for comparison
-        poly_points = []
-        for px, py in polygon.points:
-            wpt = self._scale_to_widget(QPoint(int(px), int(py)))
-            poly_points.append((float(wpt.x()), float(wpt.y())))
-        np_poly = np.array(poly_points, dtype=np.float32)
+        np_poly = self._toWidgetArray(points).astype(np.float32)
         # measureDist=True 回傳有符號距離：正值=內部, 0=邊上, 負值=外部(距離邊緣的距離)
         dist = cv2.pointPolygonTest(np_poly, (float(pos.x()), float(pos.y())), True)
         return dist >= -POLYGON_SELECT_PADDING
@@ -1,6 +1,5 @@
 # 主視窗：工具列、選單、快捷鍵、儲存標註等主要UI邏輯
-# 更新日期: 2026-08-22
-import random
+# 更新日期: 2026-10-19
 import re
 import shutil
 import sys
@@ -8,7 +7,7 @@ from datetime import datetime
 from pathlib import Path
 
 import cv2
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QAction, QActionGroup, QImage, QKeySequence, QPixmap
 from PyQt6.QtWidgets import (
     QApplication,
@@ -31,32 +30,55 @@ from send2trash import send2trash
 
 from src.config import cfg
 from src.core import AppState
-from src.utils.const import IMAGE_EXTS
 from src.image_widget import DrawingMode, ImageWidget
 from src.dialogs import (
     CategorizeMediaDialog,
     ConvertSettingsDialog,
+    DatasetStatsDialog,
+    DatasetValidateDialog,
+    FindAnnotationsDialog,
     LabelModeDialog,
     SetSam3ModelDialog,
     SetYoloModelDialog,
     TrainYoloDialog,
 )
-from src.utils.cropper import CROP_MODE_FIXED, compute_crops
+from src.dialogs.batch_crop import BatchCropThread
+from src.dialogs.dataset_build import DatasetBuildThread
+from src.utils.annotation_store import get_store, store_exists
+from src.utils.batch_crop import BatchCropReport
+from src.utils.coco_export import export_coco
+from src.utils.cropper import CROP_MODE_FIXED, CROP_MODE_PADDING, compute_crops
+from src.utils.dataset_builder import (
+    STAGE_NAMES,
+    STAGE_VALIDATE,
+    BuildResult,
+    placement_summary,
+)
 from src.utils.dynamic_settings import save_settings, settings
 from src.utils.file_handler import file_h
+from src.utils.frame_writer import FrameJob, FrameResult, FrameWriter, encode_params, frame_ext
 from src.utils.img_handler import inferencer
 from src.utils.func import getMaskPath, getXmlPath, imwrite_unicode, is_same_path
 from src.utils.global_param import g_param
 from src.utils.logger import getUniqueLogger
-from src.utils.model import FileType, ModelType, PlayState, ShowImageCmd, ViewMode
+from src.utils.model import (
+    Bbox,
+    FileType,
+    ModelType,
+    PlayState,
+    Polygon,
+    ShowImageCmd,
+    ViewMode,
+)
+from src.utils.perf import perf
 
 log = getUniqueLogger(__file__)
 yaml = YAML()
 
-YOLO_LABELS_FOLDER = "labels"
-
-
 class MainWindow(QMainWindow):
+    # 影片幀在背景寫完後由 FrameWriter 的 thread 發出, 跨 thread 自動排進 GUI thread 處理
+    frame_saved = pyqtSignal(object)
+
     def __init__(self):
 
         super().__init__()
@@ -69,6 +91,9 @@ class MainWindow(QMainWindow):
         # Initialize state
         self.app_state = AppState()
         self._detect_after_load = False
+        # 背景建置 YOLO dataset 的 thread (同時只跑一個)
+        self._build_thread: DatasetBuildThread | None = None
+        self._crop_thread: BatchCropThread | None = None
 
         # 儲存
         self.save_action = QAction("Save", self)
@@ -141,6 +166,12 @@ class MainWindow(QMainWindow):
         self.statusbar.addPermanentWidget(self.frame_label)
         self.zoom_label = QLabel("")
         self.statusbar.addPermanentWidget(self.zoom_label)
+        # 換圖 / 重繪耗時 (system.yaml 的 enable_perf_monitor)
+        self.perf_label = None
+        if cfg.enable_perf_monitor:
+            self.perf_label = QLabel("")
+            self.statusbar.addPermanentWidget(self.perf_label)
+            perf.on_event = self._update_perf_label
 
         # 中央 Widget
         self.central_widget = QWidget()
@@ -164,6 +195,10 @@ class MainWindow(QMainWindow):
         self.timer.timeout.connect(self.update_frame)
         self.play_state = PlayState.STOP
 
+        # 影片幀存檔: 編碼與寫檔在背景 thread, 寫完再回 GUI thread 補 YOLO txt 與 store
+        self.frame_saved.connect(self._onFrameSaved)
+        self._frame_writer = FrameWriter(on_done=self.frame_saved.emit)
+
         self.play_pause_action = QAction("", self)
         self.play_pause_action.setIcon(
             self.style().standardIcon(QStyle.StandardPixmap.SP_MediaPlay)
@@ -338,7 +373,39 @@ class MainWindow(QMainWindow):
         )
         self.train_yolo_action.triggered.connect(self.train_yolo)
 
+        self.dataset_stats_action = QAction("Dataset Statistics", self)
+        self.dataset_stats_action.setToolTip(
+            "統計資料夾內 VOC 標註: class 直方圖、框大小分布、每張圖物件數,\n"
+            "並標出沒有對應到 class mapping 的 label (訓練前檢查用)"
+        )
+        self.dataset_stats_action.triggered.connect(self.show_dataset_stats)
+
+        self.check_yolo_txt_action = QAction("Check YOLO Labels", self)
+        self.check_yolo_txt_action.setToolTip(
+            "比對資料夾內每個 VOC .xml 與旁邊的 YOLO .txt 是否一致\n"
+            "(Label Mode 開啟「存檔時輸出 YOLO txt」時使用)"
+        )
+        self.check_yolo_txt_action.triggered.connect(self.check_yolo_txt)
+
+        self.validate_dataset_action = QAction("Validate Dataset", self)
+        self.validate_dataset_action.setToolTip(
+            "訓練前檢查: 壞圖、XML 尺寸與圖片不符、座標超出範圍、零面積、\n"
+            "孤兒 XML / txt / 圖片、train 與 val 重名; 結果寫成 JSON 報告, 可隔離有錯誤的檔案"
+        )
+        self.validate_dataset_action.triggered.connect(self.show_validate_dataset)
+
+        self.train_menu.addAction(self.dataset_stats_action)
+        self.train_menu.addAction(self.validate_dataset_action)
+        self.train_menu.addAction(self.check_yolo_txt_action)
+        self.export_coco_action = QAction("Export COCO JSON", self)
+        self.export_coco_action.setToolTip(
+            "把資料夾內的 VOC .xml 匯出成單一 COCO JSON (polygon → segmentation,\n"
+            "旋轉框 → 角點 segmentation + angle), category 編號沿用 class mapping"
+        )
+        self.export_coco_action.triggered.connect(self.export_coco_json)
+
         self.train_menu.addAction(self.convert_voc_yolo_action)
+        self.train_menu.addAction(self.export_coco_action)
         self.train_menu.addAction(self.train_yolo_action)
 
         self.open_file_by_index_action = QAction("Open File by Index", self)
@@ -347,8 +414,17 @@ class MainWindow(QMainWindow):
         )
         self.open_file_by_index_action.triggered.connect(self.open_file_by_index)
 
+        self.find_action = QAction("Find / Filter…", self)
+        self.find_action.setShortcut(QKeySequence("Ctrl+F"))
+        self.find_action.setToolTip(
+            "依 class、confidence 範圍或「沒有標註」過濾, 翻頁只在符合的圖片之間跳\n"
+            "(例如找下一張含 deer 的圖、所有還沒標的圖)"
+        )
+        self.find_action.triggered.connect(self.find_annotations)
+
         self.file_menu.addAction(self.open_folder_action)
         self.file_menu.addAction(self.open_file_by_index_action)
+        self.file_menu.addAction(self.find_action)
         self.file_menu.addSeparator()
         self.file_menu.addAction(self.save_action)
         # Auto Save 已移至 Ai 選單, 緊接 Auto Detect 之下
@@ -377,9 +453,17 @@ class MainWindow(QMainWindow):
         )
         self.label_mode_action.triggered.connect(self.open_label_mode)
 
+        self.batch_crop_action = QAction("Batch Crop Folder…", self)
+        self.batch_crop_action.setToolTip(
+            "把目前資料夾內每一組 圖片 + XML 依 Label Mode 的裁切參數裁成小圖 + XML,\n"
+            "寫到 save_folder (不必逐張打開再存); 中斷後再跑一次會從上次的進度繼續"
+        )
+        self.batch_crop_action.triggered.connect(self.batch_crop_folder)
+
         self.label_menu.addAction(self.edit_label_action)
         self.label_menu.addSeparator()
         self.label_menu.addAction(self.label_mode_action)
+        self.label_menu.addAction(self.batch_crop_action)
 
         # Model selection radio group
         self.model_action_group = QActionGroup(self)
@@ -712,6 +796,50 @@ class MainWindow(QMainWindow):
                 f"Image: {file_h.current_image_path()}"
             )
 
+    def find_annotations(self):
+        """開啟 Find / Filter 對話框; 套用後若目前的圖不符合條件, 跳到下一張符合的"""
+        if not file_h.folder_path:
+            QMessageBox.warning(self, "Warning", "No folder opened.")
+            return
+        if not FindAnnotationsDialog(self).exec():
+            return
+        if file_h.filter_indices is None:
+            self.statusbar.showMessage("已取消過濾")
+            return
+        if not file_h.filter_indices:
+            self.statusbar.showMessage(f"過濾 [{file_h.filter_desc}]：沒有符合的圖片")
+            return
+        if file_h.filter_position() is None:
+            # 往後找不到就從頭找, 讓「套用」一定落在符合的圖上
+            if not file_h.show_image(ShowImageCmd.NEXT):
+                file_h.show_image(ShowImageCmd.FIRST)
+            self.resetStates()
+            self.image_widget.load_image(file_h.current_image_path())
+            settings.file_system.file_index = file_h.current_index
+        self._show_nav_status(f"Image: {file_h.current_image_path()}")
+
+    def _update_perf_label(self, name: str, total_ms: float, phases_ms: dict[str, float]):
+        """狀態列的耗時指示: 換圖與重繪的 p50 / p95, tooltip 是最後一個事件各階段的耗時"""
+        parts = []
+        for key, title in (("navigate", "換圖"), ("paint", "重繪")):
+            stats = perf.stats(key)
+            if stats:
+                p50, p95, _ = stats
+                parts.append(f"{title} p50 {p50:.0f} / p95 {p95:.0f} ms")
+        self.perf_label.setText("  ".join(parts))
+        detail = ", ".join(f"{k} {v:.1f}" for k, v in phases_ms.items())
+        self.perf_label.setToolTip(f"最後一次 {name}: {total_ms:.1f} ms" + (f" ({detail})" if detail else ""))
+
+    def _show_nav_status(self, detail: str):
+        """狀態列顯示目前位置; 過濾中另外標出在過濾結果裡的序號"""
+        msg = f"[{file_h.current_index + 1} / {len(file_h.image_files)}] "
+        if file_h.filter_indices is not None:
+            pos = file_h.filter_position()
+            msg += (
+                f"(過濾 [{file_h.filter_desc}] {pos or '-'} / {len(file_h.filter_indices)}) "
+            )
+        self.statusbar.showMessage(msg + detail)
+
     def open_folder(self):
         """
         用pyqt瀏覽並選定資料夾。
@@ -748,17 +876,20 @@ class MainWindow(QMainWindow):
 
     def show_image(self, cmd: str):
         """show下一個影校或影片, 如有自動記錄則要先儲存之前的labels"""
-        if self.app_state.auto_save or g_param.user_labeling:
-            self.saveImgAndLabels()
-        self.resetStates()
-        if file_h.show_image(cmd):
-            self.image_widget.load_image(file_h.current_image_path())
-            self.statusbar.showMessage(
-                f"[{file_h.current_index + 1} / {len(file_h.image_files)}] "
-                f"Image: {file_h.current_image_path()}"
-            )
-            settings.file_system.file_index = file_h.current_index
-            save_settings()
+        # 換圖事件: 從按下到新圖第一次畫完 (存檔、解碼、讀 XML、偵測各自記一個階段)
+        with perf.event("navigate", wait_paint=True):
+            if self.app_state.auto_save or g_param.user_labeling:
+                with perf.phase("save"):
+                    self.saveImgAndLabels()
+            self.resetStates()
+            if file_h.show_image(cmd):
+                perf.set_file(file_h.current_image_path())
+                self.image_widget.load_image(file_h.current_image_path())
+                self._show_nav_status(f"Image: {file_h.current_image_path()}")
+                settings.file_system.file_index = file_h.current_index
+                save_settings()
+            elif file_h.filter_indices is not None:
+                self._show_nav_status("過濾結果已到盡頭")
 
     def update_frame(self):
         if self.play_state == PlayState.PLAY and self.image_widget.cap:
@@ -821,14 +952,17 @@ class MainWindow(QMainWindow):
         current_path = file_h.current_image_path()
         if not current_path:
             return
-        if settings.label.save_mode == "cropped":
-            self._saveCropped(current_path)
-            return
-        self._saveFullImage(current_path)
+        with perf.event("save"):
+            perf.set_file(current_path)
+            if settings.label.save_mode == "cropped":
+                self._saveCropped(current_path)
+            else:
+                self._saveFullImage(current_path)
 
     def _saveFullImage(self, current_path: str):
         """整張圖模式儲存：把原圖 (或影片當前幀) 放進 save_folder, 並寫出對應 VOC XML。
 
+        影片幀交給 _queueFrameSave 在背景編碼寫檔, 這裡不等它寫完。
         save_folder 若是絕對路徑, Path() 會忽略前面的 folder_path, 因此輸出資料夾
         可能正好就是目前開啟的資料夾 (例如直接開 output 回頭改標籤)。此時來源與目的
         是同一個檔案, 複製會失敗, 只需原地覆寫 XML。
@@ -843,32 +977,23 @@ class MainWindow(QMainWindow):
             log.e(f"建立輸出資料夾失敗 ({out_dir}): {e}")
             self.statusbar.showMessage("無法建立輸出資料夾，請查看 log")
             return
-        # Save BBox annotations (XML)
         if self.image_widget.file_type == FileType.VIDEO:
-            # 儲存影片當前幀
-            frame = self.image_widget.pixmap.toImage()  # 從 pixmap 取得
-            pure_name = Path(current_path).stem
-            frame_number = int(self.image_widget.cap.get(cv2.CAP_PROP_POS_FRAMES))
-            frame_filename = f"{pure_name}_frame{frame_number}.jpg"
-            save_path = (out_dir / frame_filename).as_posix()
-            if not frame.save(save_path):
-                log.e(f"寫入影片幀失敗: {save_path}")
-                self.statusbar.showMessage("影像儲存失敗，請查看 log")
-                return
+            self._queueFrameSave(current_path, out_dir)
+            return
+
+        # 搬移圖片; 來源與目的同檔時跳過複製 (shutil.copy 會拋 SameFileError),
+        # 後面照樣覆寫 XML, 等同原地更新標註
+        file_name = Path(current_path).name
+        save_path = (out_dir / file_name).as_posix()
+        if is_same_path(current_path, save_path):
+            log.i(f"來源與輸出為同一檔案, 僅更新標註: {save_path}")
         else:
-            # 搬移圖片; 來源與目的同檔時跳過複製 (shutil.copy 會拋 SameFileError),
-            # 後面照樣覆寫 XML, 等同原地更新標註
-            file_name = Path(current_path).name
-            save_path = (out_dir / file_name).as_posix()
-            if is_same_path(current_path, save_path):
-                log.i(f"來源與輸出為同一檔案, 僅更新標註: {save_path}")
-            else:
-                try:
-                    shutil.copy(current_path, save_path)
-                except Exception as e:
-                    log.e(f"複製圖片失敗 ({save_path}): {e}")
-                    self.statusbar.showMessage("圖片儲存失敗，請查看 log")
-                    return
+            try:
+                shutil.copy(current_path, save_path)
+            except Exception as e:
+                log.e(f"複製圖片失敗 ({save_path}): {e}")
+                self.statusbar.showMessage("圖片儲存失敗，請查看 log")
+                return
 
         # 儲存xml
         xml_path = getXmlPath(save_path)
@@ -882,10 +1007,69 @@ class MainWindow(QMainWindow):
             log.e(f"寫入標註失敗 ({xml_path}): {e}")
             self.statusbar.showMessage("標註儲存失敗，請查看 log")
             return
+        self._writeYoloTxt(
+            xml_path, bboxes, polygons, self.image_widget.cv_img.shape, Path(save_path).name
+        )
+        self._syncAnnotationStore([xml_path])
         g_param.user_labeling = False
         status_message = f"Annotations saved to {xml_path}"
         self.statusbar.showMessage(status_message)
 
+    def _queueFrameSave(self, current_path: str, out_dir: Path):
+        """影片當前幀送進背景寫檔: 直接用已解碼的 cv_img, 不從 pixmap 讀回再編碼
+
+        XML 字串在這裡就產生 (標註是送出當下的內容), 尺寸取自 cv_img, 因為圖還沒寫出。
+        圖寫成功後背景 thread 才寫 XML; YOLO txt 與 store 要等 XML 寫完, 在
+        _onFrameSaved 回到 GUI thread 處理。
+
+        Args:
+            current_path: 影片路徑
+            out_dir: 輸出資料夾 (已建立)
+        """
+        iw = self.image_widget
+        if iw.cv_img is None:
+            self.statusbar.showMessage("沒有可儲存的影片幀")
+            return
+        ext = frame_ext(cfg.frame_save_format)
+        frame_number = int(iw.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        save_path = (out_dir / f"{Path(current_path).stem}_frame{frame_number}{ext}").as_posix()
+        xml_path = getXmlPath(save_path)
+        # 快照標註: 寫完回來時畫面可能已換幀, 也可能被拖曳改過
+        bboxes = [Bbox.from_snapshot(b.snapshot()) for b in iw.bboxes]
+        polygons = [Polygon.from_snapshot(p.snapshot()) for p in iw.polygons]
+        height, width = iw.cv_img.shape[:2]
+        try:
+            xml_content = file_h.generate_voc_xml(
+                bboxes, save_path, polygons, size=(width, height)
+            )
+        except Exception as e:
+            log.e(f"產生標註失敗 ({xml_path}): {e}")
+            self.statusbar.showMessage("標註儲存失敗，請查看 log")
+            return
+        params = encode_params(ext, cfg.frame_jpeg_quality, cfg.frame_png_compression)
+        context = (bboxes, polygons, iw.cv_img.shape)
+        # cv_img 每幀都是 cap.read 新配置的陣列, 之後只會被換掉而不會就地修改, 不必複製
+        self._frame_writer.submit(
+            FrameJob(save_path, iw.cv_img, xml_path.as_posix(), xml_content, params, context)
+        )
+        g_param.user_labeling = False
+
+    def _onFrameSaved(self, result: FrameResult):
+        """影片幀寫完 (GUI thread): 補寫 YOLO txt、同步 store、顯示結果
+
+        Args:
+            result: FrameWriter 回報的結果
+        """
+        if not result.ok:
+            self.statusbar.showMessage("影片幀儲存失敗，請查看 log")
+            return
+        bboxes, polygons, shape = result.context
+        self._writeYoloTxt(
+            result.xml_path, bboxes, polygons, shape, Path(result.image_path).name
+        )
+        self._syncAnnotationStore([result.xml_path])
+        self.statusbar.showMessage(f"Annotations saved to {result.xml_path}")
+
     def _saveCropped(self, current_path: str):
         """Cropped 模式儲存：只裁切有框 (bbox/polygon) 的區域，各自存成小圖 + VOC XML。
 
@@ -937,6 +1121,7 @@ class MainWindow(QMainWindow):
             stem = f"{stem}_frame{frame_number}"
 
         saved = 0
+        written_xmls = []
         for idx, task in enumerate(tasks):
             crop = img[task.y0:task.y1, task.x0:task.x1]
             if crop.size == 0:
@@ -945,31 +1130,164 @@ class MainWindow(QMainWindow):
             if not imwrite_unicode(crop_path, crop):
                 log.e(f"寫入 cropped 圖片失敗: {crop_path}")
                 continue
-            # 先寫圖再產生 xml (generate_voc_xml 會讀圖取得尺寸)
+            # 先寫圖再產生 xml; 尺寸直接取自裁下的陣列, 不必把剛寫出的圖再讀一次
             xml_path = getXmlPath(crop_path.as_posix())
             try:
                 xml_content = file_h.generate_voc_xml(
-                    task.bboxes, crop_path.as_posix(), task.polygons
+                    task.bboxes, crop_path.as_posix(), task.polygons,
+                    size=(crop.shape[1], crop.shape[0]),
                 )
                 with open(xml_path, "w", encoding="utf-8") as f:
                     f.write(xml_content)
             except Exception as e:
                 log.e(f"寫入 cropped 標註失敗 ({xml_path}): {e}")
                 continue
+            self._writeYoloTxt(
+                xml_path, task.bboxes, task.polygons, crop.shape, crop_path.name
+            )
+            written_xmls.append(xml_path)
             saved += 1
 
+        self._syncAnnotationStore(written_xmls)
         g_param.user_labeling = False
         self.statusbar.showMessage(f"Cropped 已儲存 {saved} 張至 {out_dir}")
 
+    def batch_crop_folder(self):
+        """把目前資料夾內每一組 圖片 + XML 裁成 cropped 小圖 + XML (process pool, 可取消、可續做)
+
+        裁切參數與輸出位置與 Cropped 模式存檔相同 (settings.label、save_folder)。
+        批次裁切不輸出 YOLO txt: 之後 VOC to YOLO 轉換會由 XML 產生。
+        整批在背景 thread 執行, 結束後才回 GUI thread 同步 store 與顯示結果。
+        """
+        if self._crop_thread is not None and self._crop_thread.isRunning():
+            self.statusbar.showMessage("批次裁切進行中")
+            return
+        if not file_h.folder_path:
+            QMessageBox.warning(self, "Batch Crop", "請先開啟資料夾")
+            return
+        src_dir = Path(file_h.folder_path)
+        out_dir = Path(file_h.folder_path, cfg.save_folder)
+        if is_same_path(out_dir, src_dir):
+            QMessageBox.warning(
+                self,
+                "Batch Crop",
+                "輸出資料夾與目前資料夾相同，請調整 save_folder 或改開其他資料夾",
+            )
+            return
+        mode = settings.label.crop_size_mode or CROP_MODE_FIXED
+        padding = settings.label.crop_padding_px or 0
+        fixed = settings.label.crop_fixed_size or 640
+        params = f"每邊外擴 {padding} px" if mode == CROP_MODE_PADDING else f"至少 {fixed} px"
+        reply = QMessageBox.question(
+            self,
+            "Batch Crop",
+            f"將 {src_dir} 內有 XML 的圖片全部裁切 ({params})，\n輸出到 {out_dir}？",
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        progress = QProgressDialog("正在批次裁切 ...", "取消", 0, 100, self)
+        progress.setWindowTitle("Batch Crop")
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+
+        thread = BatchCropThread(src_dir, out_dir, mode, padding, fixed)
+
+        def on_progress(current: int, total: int):
+            progress.setMaximum(max(1, total))
+            progress.setValue(current)
+            progress.setLabelText(f"正在批次裁切 ... ({current}/{total})")
+
+        def on_canceled():
+            progress.setLabelText("正在取消 (等目前這批做完) ...")
+            thread.cancel()
+
+        def on_finished(success: bool, msg: str, report: BatchCropReport):
+            progress.close()
+            self._crop_thread = None
+            if not success:
+                QMessageBox.warning(self, "Batch Crop", f"批次裁切失敗：{msg}")
+                return
+            self._syncAnnotationStore(report.written_xmls)
+            if report.canceled:
+                self.statusbar.showMessage(
+                    f"批次裁切已取消 ({report.summary()})，再執行一次可繼續"
+                )
+                return
+            text = f"{report.summary()}\n輸出: {out_dir}"
+            if report.failed:
+                shown = "\n".join(f"  - {name}" for name in report.failed[:20])
+                more = f"\n  ... 共 {len(report.failed)} 張" if len(report.failed) > 20 else ""
+                text += f"\n\n⚠ 以下圖片無法裁切 (詳見 log):\n{shown}{more}"
+            QMessageBox.information(self, "Batch Crop", text)
+            self.statusbar.showMessage(f"批次裁切完成: {report.summary()}")
+
+        progress.canceled.connect(on_canceled)
+        thread.progress.connect(on_progress)
+        thread.finished_crop.connect(on_finished)
+        self._crop_thread = thread
+        thread.start()
+
+    def _writeYoloTxt(
+        self, xml_path, bboxes: list, polygons: list, img_shape: tuple, image_filename: str
+    ) -> None:
+        """settings.label.yolo_txt_mode 有設定時, 在 XML 旁一併寫出 YOLO txt
+
+        直接用記憶體裡的標註與 class mapping 計算, 算式與 VOC→YOLO 轉換共用
+        (src/utils/yolo_format.py); 轉換時就能沿用這份 txt 而不必重新解析 XML。
+        失敗只記 log: XML 已經寫好, 轉換時照樣可以從 XML 重算。
+
+        Args:
+            xml_path: 剛寫出的 XML 路徑
+            bboxes: 要輸出的 bbox
+            polygons: 要輸出的 polygon
+            img_shape: 影像的 shape (h, w, ...), 與 XML 的 <size> 相同
+            image_filename: 圖檔名
+        """
+        mode = settings.label.yolo_txt_mode
+        if not mode:
+            return
+        try:
+            file_h.write_yolo_txt(
+                xml_path, bboxes, polygons, img_shape[1], img_shape[0], mode, image_filename
+            )
+        except Exception as e:
+            log.e(f"寫入 YOLO txt 失敗 ({xml_path}): {e}")
+
+    def _syncAnnotationStore(self, xml_paths: list) -> None:
+        """存檔 / 刪檔後把 XML 的變動同步進所在資料夾的 store
+
+        cfg.enable_annotation_store 開啟時一律同步; 沒開但資料夾已有 store (用過 Find /
+        Filter) 也同步, 免得下次查詢前還要重新解析。store 只是快取, 同步失敗不影響
+        存檔結果, 記 log 即可; 下次整批 sync 會補回來。
+
+        Args:
+            xml_paths: 剛寫出 (或剛刪除) 的 XML 路徑 (皆位於同一個資料夾)
+        """
+        if not xml_paths:
+            return
+        folder = Path(xml_paths[0]).parent
+        if not cfg.enable_annotation_store and not store_exists(folder):
+            return
+        try:
+            store = get_store(folder)
+            for xml_path in xml_paths:
+                store.update_xml(xml_path)
+        except Exception as e:
+            log.e(f"同步標註 store 失敗: {e}")
+
     def saveMask(self):
         current_path = file_h.current_image_path()
         if not current_path:
             current_path = "./"
 
-        if self.image_widget.mask_pixmap:
-            mask_path = getMaskPath(current_path).as_posix()
-            self.image_widget.mask_pixmap.save(mask_path, "PNG")
-        self.statusbar.showMessage(f"Mask saved to {mask_path}")
+        if self.image_widget.mask is None:
+            return
+        mask_path = getMaskPath(current_path).as_posix()
+        if self.image_widget.mask.save(mask_path):
+            self.statusbar.showMessage(f"Mask saved to {mask_path}")
+        else:
+            self.statusbar.showMessage(f"Mask 存檔失敗: {mask_path}")
 
     def toggle_play_pause(self):
         if self.image_widget.file_type != FileType.VIDEO:
@@ -1199,6 +1517,9 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Delete", "刪除失敗，請查看 log")
             return
         log.i(f"已刪除 {[p.name for p in targets]} 於 {file_h.folder_path}")
+        if has_xml:
+            # update_xml 發現檔案不在會移除紀錄, 過濾 / 統計就不會再算到它
+            self._syncAnnotationStore([xml_path])
 
         # 標註已隨檔案消失, 必須清掉 user_labeling: 否則之後的換圖流程會觸發儲存,
         # 把畫面上這批舊的框寫進「下一張圖」的 XML
@@ -1296,126 +1617,93 @@ class MainWindow(QMainWindow):
         """
         if self.app_state.auto_save or g_param.user_labeling:
             self.saveImgAndLabels()
+        # 批次裁切進行中就取消並等它停下: 已完成的部分會寫進 manifest, 下次接著做
+        if self._crop_thread is not None and self._crop_thread.isRunning():
+            self._crop_thread.cancel()
+            self._crop_thread.wait()
+        # 等背景的影片幀寫完; 寫完的通知是排隊的 signal, 處理掉才會補上 YOLO txt 與 store
+        self._frame_writer.close()
+        QApplication.processEvents()
         save_settings()
 
     def convert_voc_to_yolo(self):
         """
         將 VOC XML 格式的標註檔案轉換為 YOLO TXT 標籤檔，
         並依 train/val 比例整理成 dataset 結構 + 產生 data.yaml
+        整個建置 (轉換 / 切分 / 擺放 / yaml) 在背景 thread 執行, 任何階段都可取消
         """
+        if self._build_thread is not None and self._build_thread.isRunning():
+            self.statusbar.showMessage("dataset 建置進行中")
+            return
         default_dir = str(Path(file_h.folder_path, cfg.save_folder)) if file_h.folder_path else ""
         dialog = ConvertSettingsDialog(self, self.app_state, default_dir)
         if not dialog.exec():
             return
 
-        base = Path(dialog.folder_path)
-        train_ratio = dialog.train_ratio
-        copy_images = dialog.copy_images
-        start_time = datetime.now()
-
-        # 1) 轉換 VOC XML → YOLO txt（先輸出到暫存 labels/ 下），顯示進度條
-        tmp_labels = base / YOLO_LABELS_FOLDER
-        tmp_labels.mkdir(parents=True, exist_ok=True)
-
         progress = QProgressDialog("正在轉換 VOC → YOLO ...", "取消", 0, 100, self)
         progress.setWindowTitle("轉換進度")
         progress.setMinimumDuration(0)
         progress.setValue(0)
 
-        canceled = False
-
-        def on_progress(current: int, total: int):
-            nonlocal canceled
-            if progress.wasCanceled():
-                canceled = True
-                return
-            progress.setMaximum(total)
-            progress.setValue(current)
-            progress.setLabelText(f"正在轉換 VOC → YOLO ... ({current}/{total})")
-            QApplication.processEvents()
-
-        not_matched = file_h.convertVocInFolder(
-            str(base), tmp_labels, self.app_state, progress_callback=on_progress
+        thread = DatasetBuildThread(
+            dialog.folder_path,
+            self.app_state.yolo_output_mode,
+            dict(settings.class_names.categories),
+            dialog.train_ratio,
+            dialog.materialize_method,
+            datetime.now(),
+            preflight=dialog.preflight,
         )
-        progress.close()
+        stages = [s for s in STAGE_NAMES if dialog.preflight or s != STAGE_VALIDATE]
 
-        if canceled:
-            self.statusbar.showMessage("轉換已取消")
-            return
+        def on_progress(stage: str, current: int, total: int):
+            progress.setMaximum(max(total, 1))
+            progress.setValue(current)
+            progress.setLabelText(
+                f"[{stages.index(stage) + 1}/{len(stages)}] {STAGE_NAMES[stage]} ... "
+                f"({current}/{total})"
+            )
 
-        # 寫入未對應的 class_name 記錄檔
-        not_match_path = None
-        if not_matched:
-            not_match_name = f"not_match_{start_time.strftime('%Y_%m%d_%H%M%S')}.txt"
-            not_match_path = base / not_match_name
-            with open(not_match_path, "w", encoding="utf-8") as f:
-                for image_filename, class_name in not_matched:
-                    f.write(f"{image_filename}\t{class_name}\n")
-            log.w(f"未對應的 class_name 已寫入: {not_match_path}")
-
-        # 2) 收集有對應 label 的圖片
-        image_files = sorted(
-            f for f in base.iterdir()
-            if f.is_file() and f.suffix.lower() in IMAGE_EXTS
-        )
-        paired = [
-            f for f in image_files
-            if (tmp_labels / f"{f.stem}.txt").exists()
-        ]
-        if not paired:
-            QMessageBox.warning(self, "Warning", "沒有找到成功轉換的圖片/標籤配對")
-            return
+        def on_canceled():
+            progress.setLabelText("正在取消並復原已擺放的檔案 ...")
+            thread.cancel()
 
-        random.shuffle(paired)
-        split_idx = max(1, int(len(paired) * train_ratio))
-        train_files = paired[:split_idx]
-        val_files = paired[split_idx:] if split_idx < len(paired) else []
+        def on_finished(success: bool, msg: str, result: BuildResult):
+            progress.close()
+            self._build_thread = None
+            if not success:
+                QMessageBox.critical(self, "Error", f"dataset 建置失敗：{msg}")
+                return
+            if result.canceled:
+                self.statusbar.showMessage(
+                    f"轉換已取消 ({STAGE_NAMES.get(result.canceled_stage, '')})"
+                )
+                return
+            if result.message:
+                QMessageBox.warning(self, "Warning", result.message)
+                return
+            validation = ""
+            if result.validation is not None:
+                validation = result.validation.summary()
+                if result.validation.report_path:
+                    validation += f" (報告: {result.validation.report_path.name})"
+            placement = placement_summary(result.placement)
+            if result.split_skipped:
+                # 切分沿用上次的分配時, 已經擺好的圖片與標籤不會重做
+                placement = "、".join(
+                    p for p in (placement, f"已擺好略過 {result.split_skipped} 個檔案") if p
+                )
+            self._show_convert_summary(
+                result.id_to_name, result.train_count, result.val_count,
+                result.yaml_name, result.convert.not_matched, result.not_match_path,
+                result.convert.summary(), placement, validation,
+            )
 
-        # 3) 建立目錄結構並移動檔案
-        for split_name, files in [("train", train_files), ("val", val_files)]:
-            if not files:
-                continue
-            img_dir = base / "images" / split_name
-            lbl_dir = base / "labels" / split_name
-            img_dir.mkdir(parents=True, exist_ok=True)
-            lbl_dir.mkdir(parents=True, exist_ok=True)
-            for img_path in files:
-                txt_path = tmp_labels / f"{img_path.stem}.txt"
-                if copy_images:
-                    shutil.copy2(str(img_path), str(img_dir / img_path.name))
-                else:
-                    shutil.move(str(img_path), str(img_dir / img_path.name))
-                shutil.move(str(txt_path), str(lbl_dir / txt_path.name))
-
-        # 清除暫存 labels/ (已搬空)
-        if tmp_labels.exists() and not any(tmp_labels.iterdir()):
-            tmp_labels.rmdir()
-
-        # 4) 產生 dataset yaml
-        categories = settings.class_names.categories  # {name: id}
-        # 反轉成 {id: name}，依 id 排序
-        id_to_name = dict(sorted(
-            ((v, k) for k, v in categories.items()),
-            key=lambda x: x[0],
-        ))
-
-        data_yaml = {"path": str(base.resolve())}
-        data_yaml["train"] = "images/train"
-        # ultralytics 要求 train/val 都必須存在；無 val split 時退回指向 train
-        data_yaml["val"] = "images/val" if val_files else "images/train"
-        data_yaml["nc"] = len(id_to_name)
-        data_yaml["names"] = id_to_name
-
-        yaml_name = f"dataset_{start_time.strftime('%Y_%m%d_%H%M%S')}.yaml"
-        yaml_path = base / yaml_name
-        with open(yaml_path, "w", encoding="utf-8") as f:
-            yaml.dump(data_yaml, f)
-
-        # 5) 顯示轉換結果摘要
-        self._show_convert_summary(
-            id_to_name, len(train_files), len(val_files),
-            yaml_name, not_matched, not_match_path,
-        )
+        progress.canceled.connect(on_canceled)
+        thread.progress.connect(on_progress)
+        thread.finished_build.connect(on_finished)
+        self._build_thread = thread
+        thread.start()
 
     def _show_convert_summary(
         self,
@@ -1425,11 +1713,20 @@ class MainWindow(QMainWindow):
         yaml_name: str,
         not_matched: list[tuple[str, str]],
         not_match_path: Path | None,
+        change_summary: str = "",
+        placement: str = "",
+        validation: str = "",
     ):
         """顯示 VOC → YOLO 轉換完成的摘要對話框"""
         # class_name 對應表
         lines = ["轉換完成\n"]
+        if validation:
+            lines.append(f"  檢查: {validation}")
+        if change_summary:
+            lines.append(f"  XML: {change_summary}")
         lines.append(f"  Train: {train_count} 張, Val: {val_count} 張")
+        if placement:
+            lines.append(f"  圖片擺放: {placement}")
         lines.append(f"  Dataset YAML: {yaml_name}")
         if val_count == 0:
             lines.append("  ⚠ 無 val split，dataset.yaml 的 val 已退回指向 train (僅供訓練啟動，建議下次設定 val 比例)")
@@ -1452,6 +1749,122 @@ class MainWindow(QMainWindow):
             f"yaml: {yaml_name}"
         )
 
+    def check_yolo_txt(self):
+        """檢查 save_folder 內 XML 與存檔時輸出的 YOLO txt 是否一致, 結果以對話框顯示"""
+        start_dir = str(Path(file_h.folder_path, cfg.save_folder)) if file_h.folder_path else ""
+        folder = QFileDialog.getExistingDirectory(self, "選擇要檢查的資料夾", start_dir)
+        if not folder:
+            return
+
+        progress = QProgressDialog("正在比對 XML / txt ...", None, 0, 100, self)
+        progress.setWindowTitle("Check YOLO Labels")
+        progress.setMinimumDuration(500)
+
+        def on_progress(current: int, total: int):
+            progress.setMaximum(total)
+            progress.setValue(current)
+            if current % 200 == 0:
+                QApplication.processEvents()
+
+        try:
+            checked, problems = file_h.check_yolo_txt(folder, progress_callback=on_progress)
+        except Exception as e:
+            log.e(f"檢查 YOLO txt 失敗 ({folder}): {e}")
+            QMessageBox.warning(self, "Check YOLO Labels", "檢查失敗，請查看 log")
+            return
+        finally:
+            progress.close()
+
+        if not problems:
+            QMessageBox.information(
+                self, "Check YOLO Labels", f"{checked} 組 XML / txt 全部一致"
+            )
+            return
+        # 對話框只列前幾筆, 完整清單寫進 log
+        for name, problem in problems:
+            log.w(f"{name}: {problem}")
+        shown = "\n".join(f"  • {name}: {problem}" for name, problem in problems[:20])
+        more = f"\n  … 其餘 {len(problems) - 20} 筆見 log" if len(problems) > 20 else ""
+        QMessageBox.warning(
+            self,
+            "Check YOLO Labels",
+            f"檢查 {checked} 個 XML, 發現 {len(problems)} 個問題:\n\n{shown}{more}",
+        )
+
+    def export_coco_json(self):
+        """把資料夾內的 VOC XML 匯出成 COCO JSON (process pool 解析、串流寫檔)"""
+        categories = settings.class_names.categories
+        if not categories:
+            QMessageBox.warning(
+                self, "Export COCO", "尚未設定 class mapping (Train → VOC to YOLO → 編輯 Mapping)"
+            )
+            return
+        start_dir = str(Path(file_h.folder_path, cfg.save_folder)) if file_h.folder_path else ""
+        folder = QFileDialog.getExistingDirectory(self, "選擇包含 VOC XML 的資料夾", start_dir)
+        if not folder:
+            return
+        default_out = str(Path(folder) / f"coco_{datetime.now().strftime('%Y_%m%d_%H%M%S')}.json")
+        out_path, _ = QFileDialog.getSaveFileName(
+            self, "COCO JSON 輸出位置", default_out, "JSON (*.json)"
+        )
+        if not out_path:
+            return
+
+        progress = QProgressDialog("正在匯出 COCO ...", "取消", 0, 100, self)
+        progress.setWindowTitle("Export COCO")
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+
+        def on_progress(current: int, total: int):
+            progress.setMaximum(max(1, total))
+            progress.setValue(current)
+            progress.setLabelText(f"正在匯出 COCO ... ({current}/{total})")
+            QApplication.processEvents()
+
+        try:
+            report = export_coco(
+                folder, out_path, categories,
+                progress_callback=on_progress, is_canceled=progress.wasCanceled,
+            )
+        except Exception as e:
+            log.e(f"COCO 匯出失敗: {e}")
+            QMessageBox.warning(self, "Export COCO", f"匯出失敗：{e}")
+            return
+        finally:
+            progress.close()
+
+        if report.canceled:
+            self.statusbar.showMessage("COCO 匯出已取消")
+            return
+        lines = [
+            f"images: {report.images}",
+            f"annotations: {report.annotations}",
+            f"輸出: {out_path}",
+        ]
+        if report.failed:
+            lines.append(f"\n⚠ {report.failed} 個 XML 無法解析 (詳見 log), 已略過")
+        if report.unmapped:
+            lines.append("\n⚠ 未對應到 class mapping 而略過的 label:")
+            lines.extend(f"  - {name}: {n}" for name, n in report.unmapped.most_common())
+        QMessageBox.information(self, "Export COCO", "\n".join(lines))
+        self.statusbar.showMessage(f"COCO 匯出完成: {out_path}")
+
+    def show_dataset_stats(self):
+        """開啟 Dataset Statistics; 預設統計 save_folder (與 VOC to YOLO 的預設一致)"""
+        default_dir = ""
+        if file_h.folder_path:
+            out_dir = Path(file_h.folder_path, cfg.save_folder)
+            default_dir = str(out_dir if out_dir.is_dir() else Path(file_h.folder_path))
+        DatasetStatsDialog(self, default_dir).exec()
+
+    def show_validate_dataset(self):
+        """開啟 Validate Dataset; 預設檢查 save_folder (與 VOC to YOLO 的預設一致)"""
+        default_dir = ""
+        if file_h.folder_path:
+            out_dir = Path(file_h.folder_path, cfg.save_folder)
+            default_dir = str(out_dir if out_dir.is_dir() else Path(file_h.folder_path))
+        DatasetValidateDialog(self, default_dir).exec()
+
     def categorize_media(self):
         """開啟 Categorize Media 對話框，依 YOLO 偵測結果分類媒體檔案"""
         default_folder = str(file_h.folder_path) if file_h.folder_path else ""
@@ -0,0 +1,137 @@
+# 一批標註的陣列表示：bbox 的 x / y / 寬 / 高 / 角度各存成陣列, polygon 的頂點首尾相接成一個
+# (M, 2) 陣列加 offsets (慣例同 src/utils/geometry.py)。夾邊、尺寸過濾等整批處理一次做完,
+# 再只把真的改到的那幾個寫回 Bbox / Polygon 物件。
+# 更新日期: 2026-10-19
+#
+# 畫布仍以 Bbox / Polygon 物件清單為主 (拖曳、選取都是逐個物件操作), 這裡是它們的「整批」視圖:
+# 先前夾邊與偵測結果的過濾都逐個物件、逐個頂點跑 Python 迴圈, SAM3 一次給上千個 polygon 時很慢。
+# 不碰 Qt, 可直接在 worker process 使用。
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+from src.utils import geometry
+from src.utils.model import Bbox, Polygon
+
+
+class AnnotationSet:
+    """bbox / polygon 清單的陣列快照
+
+    陣列的 dtype 沿用物件裡的值: 座標都是 int 就是 int64, 寫回物件時仍然是 int
+    (VOC XML 直接寫出 bbox 的值, 不能從 10 變成 10.0)。
+    """
+
+    def __init__(
+        self,
+        xywh: np.ndarray,
+        angle: np.ndarray,
+        points: np.ndarray,
+        offsets: np.ndarray,
+    ) -> None:
+        """
+        Args:
+            xywh: (N, 4) bbox 的 x, y, width, height
+            angle: (N,) bbox 的角度 (度)
+            points: (M, 2) 所有 polygon 的頂點
+            offsets: (P + 1,) 第 i 個 polygon 是 points[offsets[i]:offsets[i + 1]]
+        """
+        self.xywh = xywh
+        self.angle = angle
+        self.points = points
+        self.offsets = offsets
+
+    @classmethod
+    def from_objects(cls, bboxes: Sequence[Bbox], polygons: Sequence[Polygon]) -> AnnotationSet:
+        """由 Bbox / Polygon 物件建立 (複製一份, 之後改陣列不影響物件)"""
+        xywh = np.asarray([(b.x, b.y, b.width, b.height) for b in bboxes]).reshape(-1, 4)
+        angle = np.asarray([b.angle for b in bboxes]).reshape(-1)
+        points, offsets = geometry.pack_polygons(p.points for p in polygons)
+        return cls(xywh, angle, points, offsets)
+
+    @property
+    def n_boxes(self) -> int:
+        return len(self.xywh)
+
+    @property
+    def n_polygons(self) -> int:
+        return len(self.offsets) - 1
+
+    def polygon_points(self, i: int) -> np.ndarray:
+        """第 i 個 polygon 的頂點 (points 的 view, 不複製)"""
+        return self.points[self.offsets[i] : self.offsets[i + 1]]
+
+    def clamp(self, img_w: float, img_h: float) -> tuple[np.ndarray, np.ndarray]:
+        """把標註夾進影像範圍 (就地改陣列), 規則同 ImageWidget._clampBboxToImage
+
+        未旋轉的 bbox 裁掉溢出的部分 (寬高至少 1); 旋轉過的 bbox 不動;
+        polygon 的每個頂點各自夾進 [0, img_w] × [0, img_h]。
+
+        Returns:
+            (改到的 bbox index, 改到的 polygon index)
+        """
+        changed_boxes = np.zeros(0, dtype=np.intp)
+        if self.n_boxes:
+            axis = np.flatnonzero(self.angle == 0)
+            if len(axis):
+                x, y, w, h = self.xywh[axis].T
+                x1 = np.clip(x, 0, img_w)
+                y1 = np.clip(y, 0, img_h)
+                x2 = np.clip(x + w, 0, img_w)
+                y2 = np.clip(y + h, 0, img_h)
+                clamped = np.stack(
+                    [x1, y1, np.maximum(1, x2 - x1), np.maximum(1, y2 - y1)], axis=1
+                ).astype(self.xywh.dtype, copy=False)
+                diff = (clamped != self.xywh[axis]).any(axis=1)
+                changed_boxes = axis[diff]
+                self.xywh[changed_boxes] = clamped[diff]
+
+        changed_polygons = np.zeros(0, dtype=np.intp)
+        if len(self.points):
+            clamped = geometry.clamp_points(self.points, 0.0, 0.0, float(img_w), float(img_h))
+            moved = (clamped != self.points).any(axis=1)
+            if moved.any():
+                starts = self.offsets[:-1]
+                nonempty = np.flatnonzero(self.offsets[1:] > starts)
+                hit = np.logical_or.reduceat(moved, starts[nonempty])
+                changed_polygons = nonempty[hit]
+                self.points = clamped
+        return changed_boxes, changed_polygons
+
+    def min_size_mask(self, min_len: float) -> tuple[np.ndarray, np.ndarray]:
+        """寬高都不小於 min_len 的標註
+
+        bbox 看自身的寬高 (不管角度); polygon 看外接框較短的那一邊。
+
+        Returns:
+            (bbox 的 bool mask, polygon 的 bool mask)
+        """
+        boxes_ok = (self.xywh[:, 2] >= min_len) & (self.xywh[:, 3] >= min_len)
+        aabb = geometry.polygons_aabb(self.points, self.offsets)
+        # 空的 polygon 外接框是 NaN, 比較結果為 False, 一併濾掉
+        polygons_ok = np.minimum(aabb[:, 2] - aabb[:, 0], aabb[:, 3] - aabb[:, 1]) >= min_len
+        return boxes_ok, polygons_ok
+
+    def write_back(
+        self,
+        bboxes: Sequence[Bbox],
+        polygons: Sequence[Polygon],
+        box_indices: np.ndarray,
+        polygon_indices: np.ndarray,
+    ) -> None:
+        """把指定 index 的陣列內容寫回對應的物件
+
+        polygon 的 points 換成新的 list (不就地改, 見 Polygon 的說明)。
+
+        Args:
+            bboxes: 建立這份陣列時的 bbox 清單 (順序相同)
+            polygons: 建立這份陣列時的 polygon 清單
+            box_indices: 要寫回的 bbox index
+            polygon_indices: 要寫回的 polygon index
+        """
+        for i, (x, y, w, h) in zip(box_indices.tolist(), self.xywh[box_indices].tolist()):
+            b = bboxes[i]
+            b.x, b.y, b.width, b.height = x, y, w, h
+        for i in polygon_indices.tolist():
+            polygons[i].points = [tuple(p) for p in self.polygon_points(i).tolist()]
@@ -0,0 +1,422 @@
+# 每個資料夾一份的標註 sidecar store (SQLite), 鏡像該資料夾的 VOC XML
+# 更新日期: 2026-10-19
+#
+# * XML 永遠是唯一真值; store 只是快取, 整份刪掉隨時可由 XML 重建。
+# * 同步以 (mtime_ns, size) 判斷: 只重新解析有變動的 XML, 解析走 process pool。
+# * 儲存標註 (_saveFullImage / _saveCropped) 寫完 XML 後呼叫 update_xml(), 讓 store
+#   跟著更新, 下次整批讀取時就不必再 parse 一次。
+# * 整批讀取 (轉換 / 統計 / 匯出) 走 load_all(), 兩條 SQL 就讀完整個資料夾。
+# * 查詢 (依 class / confidence / 無標註找檔) 走 query_files(), 靠索引在毫秒內回應,
+#   給 Find / Filter 的過濾瀏覽用。
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from src.utils.logger import getUniqueLogger
+from src.utils.voc import KIND_BBOX, KIND_POLYGON, VocAnnotation, VocObject, parse_voc_xml
+
+log = getUniqueLogger(__file__)
+
+# 放在資料夾內的 store 檔名; 前綴 "." 讓它在檔案總管與 VOC→YOLO 的掃描裡都不顯眼
+STORE_FILENAME = ".annotations.sqlite"
+# schema 改動時遞增; 版本不符直接砍掉重建 (XML 是真值, 重建不會遺失資料)
+SCHEMA_VERSION = 3
+# 少於這個數量的變動檔就在本行程解析: 開 process pool 的固定成本比解析本身還貴
+PARALLEL_THRESHOLD = 64
+
+_KIND_CODE = {KIND_BBOX: 0, KIND_POLYGON: 1}
+_KIND_NAME = {v: k for k, v in _KIND_CODE.items()}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    image TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    n_objects INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS objects (
+    file TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    kind INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    xmin REAL NOT NULL,
+    ymin REAL NOT NULL,
+    xmax REAL NOT NULL,
+    ymax REAL NOT NULL,
+    angle REAL NOT NULL,
+    area REAL NOT NULL,
+    rel_area REAL NOT NULL,
+    points BLOB,
+    PRIMARY KEY (file, idx)
+);
+-- 查詢用的覆蓋索引: 帶上 file, 查詢只掃索引不回表
+CREATE INDEX IF NOT EXISTS idx_objects_label ON objects (label, confidence, file);
+CREATE INDEX IF NOT EXISTS idx_objects_conf ON objects (confidence, file);
+"""
+
+
+@dataclass
+class SyncReport:
+    """一次同步的結果統計"""
+
+    total: int = 0      # 資料夾內的 XML 數
+    updated: int = 0    # 新增或重新解析的檔案數
+    removed: int = 0    # XML 已不存在而移除的檔案數
+    failed: int = 0     # 解析失敗 (壞檔 / 缺 size) 的檔案數
+
+
+def _pack_points(points: list[tuple[float, float]]) -> bytes | None:
+    """polygon 頂點壓成 float32 的扁平 bytes; 比存文字小一半以上, 讀回也不必 parse"""
+    if not points:
+        return None
+    flat = array("f")
+    for x, y in points:
+        flat.append(x)
+        flat.append(y)
+    return flat.tobytes()
+
+
+def _unpack_points(blob: bytes | None) -> list[tuple[float, float]]:
+    """_pack_points 的反向"""
+    if not blob:
+        return []
+    flat = array("f")
+    flat.frombytes(blob)
+    return list(zip(flat[0::2], flat[1::2]))
+
+
+def _area(obj: VocObject) -> float:
+    """物件面積 (原圖 pixel²); polygon 用鞋帶公式, bbox 旋轉不改變面積"""
+    if obj.kind == KIND_POLYGON and len(obj.points) >= 3:
+        pts = obj.points
+        acc = 0.0
+        for (x0, y0), (x1, y1) in zip(pts, pts[1:] + pts[:1]):
+            acc += x0 * y1 - x1 * y0
+        return abs(acc) / 2
+    return max(0.0, obj.xmax - obj.xmin) * max(0.0, obj.ymax - obj.ymin)
+
+
+def _parse_job(xml_path: str) -> VocAnnotation | None:
+    """process pool 的 worker; 模組層級函式才能被 pickle"""
+    return parse_voc_xml(xml_path)
+
+
+class AnnotationStore:
+    """單一資料夾的標註 sidecar store
+
+    連線綁在建立它的執行緒 (sqlite3 的預設限制); 背景工作請在該執行緒自行建一個。
+    """
+
+    def __init__(self, folder) -> None:
+        """
+        Args:
+            folder: 含有 VOC XML 的資料夾
+        """
+        self.folder = Path(folder)
+        self.path = self.folder / STORE_FILENAME
+        self._conn: sqlite3.Connection | None = None
+
+    # --- 連線 / schema ---
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """延後到第一次使用才開檔, 沒啟用 store 的流程完全不會碰到磁碟"""
+        if self._conn is None:
+            self._conn = self._open()
+        return self._conn
+
+    def _open(self) -> sqlite3.Connection:
+        """開啟 (必要時重建) store"""
+        conn = sqlite3.connect(self.path)
+        # WAL: 讀寫可並行, 存檔時的單筆更新不必鎖住整個檔
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            if version:
+                log.i(f"store schema {version} -> {SCHEMA_VERSION}, 重建 {self.path}")
+            conn.executescript(
+                "DROP TABLE IF EXISTS objects; DROP TABLE IF EXISTS files;"
+            )
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            conn.commit()
+        return conn
+
+    def close(self) -> None:
+        """關閉連線"""
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception as e:
+                log.e(f"關閉 store 失敗 ({self.path}): {e}")
+            self._conn = None
+
+    # --- 寫入 ---
+
+    def _write(self, ann: VocAnnotation, mtime_ns: int, size: int) -> None:
+        """把一份解析結果寫進 store (不 commit, 由呼叫端整批提交)"""
+        c = self.conn
+        c.execute("DELETE FROM objects WHERE file = ?", (ann.xml_name,))
+        c.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                ann.xml_name, ann.filename, ann.width, ann.height,
+                mtime_ns, size, len(ann.objects),
+            ),
+        )
+        # rel_area = 面積 / 圖面積; 先算好存著, 統計時就不必再 join files
+        img_area = ann.width * ann.height
+        rows = []
+        for i, o in enumerate(ann.objects):
+            area = _area(o)
+            rows.append(
+                (
+                    ann.xml_name, i, _KIND_CODE[o.kind], o.label, o.confidence,
+                    o.xmin, o.ymin, o.xmax, o.ymax, o.angle,
+                    area, area / img_area if img_area > 0 else 0.0,
+                    _pack_points(o.points),
+                )
+            )
+        c.executemany(
+            "INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+
+    def _delete(self, names: Iterable[str]) -> int:
+        """移除指定 XML 的紀錄 (不 commit)"""
+        rows = [(n,) for n in names]
+        if not rows:
+            return 0
+        self.conn.executemany("DELETE FROM objects WHERE file = ?", rows)
+        self.conn.executemany("DELETE FROM files WHERE name = ?", rows)
+        return len(rows)
+
+    def update_xml(self, xml_path) -> bool:
+        """存檔後同步單一 XML (在本行程解析, 一份 XML 只要幾毫秒)
+
+        Args:
+            xml_path: 剛寫出的 XML 路徑, 必須位於這個 store 的資料夾
+
+        Returns:
+            bool: 是否更新成功
+        """
+        xml_path = Path(xml_path)
+        try:
+            st = xml_path.stat()
+        except OSError:
+            # 檔案已不在 (例如剛被刪掉) → 一併移除紀錄
+            try:
+                self._delete([xml_path.name])
+                self.conn.commit()
+            except Exception as e:
+                log.e(f"store 移除紀錄失敗 ({xml_path}): {e}")
+            return False
+        ann = parse_voc_xml(xml_path)
+        if ann is None:
+            return False
+        try:
+            self._write(ann, st.st_mtime_ns, st.st_size)
+            self.conn.commit()
+            return True
+        except Exception as e:
+            log.e(f"store 更新失敗 ({xml_path}): {e}")
+            return False
+
+    def sync(
+        self,
+        workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> SyncReport:
+        """讓 store 與資料夾內的 XML 一致: 只重新解析 mtime / size 有變的檔案
+
+        Args:
+            workers: process pool 大小; None 則用 CPU 數
+            progress_callback: (current, total) -> None, 以「需要解析的檔案數」為分母
+
+        Returns:
+            SyncReport: 同步結果
+        """
+        report = SyncReport()
+        on_disk: dict[str, tuple[int, int]] = {}
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith(".xml"):
+                    st = entry.stat()
+                    on_disk[entry.name] = (st.st_mtime_ns, st.st_size)
+        report.total = len(on_disk)
+
+        known = {
+            name: (mtime_ns, size)
+            for name, mtime_ns, size in self.conn.execute(
+                "SELECT name, mtime_ns, size FROM files"
+            )
+        }
+        report.removed = self._delete(n for n in known if n not in on_disk)
+        stale = [n for n, stamp in on_disk.items() if known.get(n) != stamp]
+        total = len(stale)
+        paths = [str(self.folder / n) for n in stale]
+
+        def _consume(results):
+            for i, (name, ann) in enumerate(zip(stale, results), start=1):
+                if ann is None:
+                    # 壞檔不留舊紀錄, 否則 store 會跟 XML 不一致
+                    self._delete([name])
+                    report.failed += 1
+                else:
+                    mtime_ns, size = on_disk[name]
+                    self._write(ann, mtime_ns, size)
+                    report.updated += 1
+                if progress_callback:
+                    progress_callback(i, total)
+
+        try:
+            if total >= PARALLEL_THRESHOLD and (workers is None or workers > 1):
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    # chunksize 攤掉 IPC 成本; 結果依輸入順序回來, 寫入順序因此固定
+                    chunk = max(1, min(256, total // ((workers or os.cpu_count() or 1) * 4)))
+                    _consume(pool.map(_parse_job, paths, chunksize=chunk))
+            else:
+                _consume(map(_parse_job, paths))
+            self.conn.commit()
+        except Exception as e:
+            log.e(f"store 同步失敗 ({self.folder}): {e}")
+            self.conn.rollback()
+            raise
+        log.i(
+            f"store sync {self.folder}: total={report.total} updated={report.updated} "
+            f"removed={report.removed} failed={report.failed}"
+        )
+        return report
+
+    # --- 讀取 ---
+
+    def load_all(self) -> dict[str, VocAnnotation]:
+        """整批讀出資料夾內所有標註 (呼叫前請先 sync)
+
+        Returns:
+            dict: XML 檔名 -> VocAnnotation, 依檔名排序
+        """
+        anns: dict[str, VocAnnotation] = {}
+        for name, image, width, height in self.conn.execute(
+            "SELECT name, image, width, height FROM files ORDER BY name"
+        ):
+            anns[name] = VocAnnotation(name, image, width, height)
+        for row in self.conn.execute(
+            "SELECT file, kind, label, confidence, xmin, ymin, xmax, ymax, angle, points"
+            " FROM objects ORDER BY file, idx"
+        ):
+            ann = anns.get(row[0])
+            if ann is None:
+                continue
+            kind = _KIND_NAME[row[1]]
+            box = row[4:8]
+            if kind == KIND_BBOX:
+                # 與 parse_voc_xml 一致: bbox 座標是整數, 讀回來不該變成 12.0
+                box = tuple(int(v) for v in box)
+            ann.objects.append(
+                VocObject(
+                    label=row[2],
+                    kind=kind,
+                    confidence=row[3],
+                    xmin=box[0],
+                    ymin=box[1],
+                    xmax=box[2],
+                    ymax=box[3],
+                    angle=row[8],
+                    points=_unpack_points(row[9]),
+                )
+            )
+        return anns
+
+    def labels(self) -> list[tuple[str, int]]:
+        """資料夾內出現過的 label 與其物件數
+
+        Returns:
+            list: [(label, count)], 依 label 排序
+        """
+        return list(
+            self.conn.execute(
+                "SELECT label, COUNT(*) FROM objects GROUP BY label ORDER BY label"
+            )
+        )
+
+    def query_files(
+        self,
+        label: Optional[str] = None,
+        conf_min: Optional[float] = None,
+        conf_max: Optional[float] = None,
+    ) -> set[str]:
+        """找出「至少有一個物件符合條件」的 XML 檔名
+
+        條件都不給時回傳所有有物件的檔案, 呼叫端取補集即為「沒有標註」的檔案。
+
+        Args:
+            label: 限定 class; None 為不限
+            conf_min: confidence 下限 (含); None 為不限
+            conf_max: confidence 上限 (含); None 為不限
+
+        Returns:
+            set: 符合的 XML 檔名
+        """
+        if label is None and conf_min is None and conf_max is None:
+            sql = "SELECT name FROM files WHERE n_objects > 0"
+            return {row[0] for row in self.conn.execute(sql)}
+        where = []
+        args: list = []
+        if label is not None:
+            where.append("label = ?")
+            args.append(label)
+        if conf_min is not None:
+            where.append("confidence >= ?")
+            args.append(conf_min)
+        if conf_max is not None:
+            where.append("confidence <= ?")
+            args.append(conf_max)
+        # 不用 DISTINCT: 交給 set 去重, 省掉 sqlite 的暫存 B-tree
+        sql = f"SELECT file FROM objects WHERE {' AND '.join(where)}"
+        return {row[0] for row in self.conn.execute(sql, args)}
+
+
+def store_exists(folder) -> bool:
+    """資料夾內是否已有 store 檔 (建過目錄或開過 store 就會有)"""
+    return (Path(folder) / STORE_FILENAME).is_file()
+
+
+# 每個資料夾共用一個 store (GUI 執行緒專用)
+_stores: dict[str, AnnotationStore] = {}
+
+
+def get_store(folder) -> AnnotationStore:
+    """取得 (必要時建立) 指定資料夾的 store; 以正規化後的路徑為 key
+
+    Args:
+        folder: 資料夾路徑
+
+    Returns:
+        AnnotationStore: 該資料夾的 store
+    """
+    key = os.path.normcase(str(Path(folder).resolve()))
+    store = _stores.get(key)
+    if store is None:
+        store = AnnotationStore(folder)
+        _stores[key] = store
+    return store
+
+
+if __name__ == "__main__":
+    # 手動重建: python -m src.utils.annotation_store <folder>
+    if len(sys.argv) < 2:
+        print("usage: python -m src.utils.annotation_store <folder>")
+        sys.exit(1)
+    print(AnnotationStore(sys.argv[1]).sync())
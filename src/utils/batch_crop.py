@@ -0,0 +1,363 @@
+# 整個資料夾的 cropped 批次匯出：逐一讀取 圖片 + VOC XML, 以 compute_crops 裁切並寫出小圖與 XML
+# 更新日期: 2026-10-19
+#
+# 與存檔時的 Cropped 模式 (MainWindow._saveCropped) 同一套規則與檔名 ({主檔名}_crop{N}.jpg),
+# 差別是不必逐張打開再存: 已經標好的資料夾可以一次產出 ROI dataset。
+# 每張圖只解碼一次; 裁切區先以檔頭讀到的尺寸計算 (不必解碼), 沒有可裁的標註就不解碼。
+# 裁切、編碼與寫檔都在 worker process 執行, 參數在建立 pool 時由 initializer 送進每個 worker 一次。
+# 不碰 Qt 介面、不讀 settings: 裁切參數由呼叫端給, 進度與取消由呼叫端驅動。
+#
+# 可續做: 輸出資料夾的 CROP_MANIFEST 記錄每張來源圖片與 XML 上次裁切時的 (mtime, size)、
+# 裁切參數與產出的檔名; 中途取消或當掉後再跑一次, 只處理還沒做完或有變動的圖片。
+from __future__ import annotations
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.utils.annotation_set import AnnotationSet
+from src.utils.const import IMAGE_EXTS
+from src.utils.cropper import CropTask, compute_crops
+from src.utils.dataset_validator import probe_image
+from src.utils.func import imread_unicode, imwrite_unicode
+from src.utils.logger import getUniqueLogger
+from src.utils.model import Bbox, Polygon
+from src.utils.parallel import chunked, default_workers, ordered_results
+from src.utils.voc import KIND_BBOX, build_voc_xml, parse_voc_xml
+
+log = getUniqueLogger(__file__)
+
+# 每批圖片數; 一張大圖解碼 + 編碼數十 ms, 一批約 1 秒內, 進度條與取消的反應都夠即時
+CHUNK_SIZE = 16
+# 少於這個數量就在本 process 處理, 開 pool 的成本 (每個 worker 重新 import) 划不來
+PARALLEL_THRESHOLD = 32
+# manifest 最多隔幾秒寫回一次 (中途當掉最多重做這段時間的圖片)
+MANIFEST_SAVE_INTERVAL = 2.0
+
+# 輸出資料夾內的續做紀錄
+CROP_MANIFEST = ".crop_manifest.json"
+CROP_MANIFEST_VERSION = 1
+
+# _CropResult.status
+STATUS_CROPPED = "cropped"
+STATUS_EMPTY = "empty"    # 沒有標註或沒有可裁的區域
+STATUS_FAILED = "failed"
+
+# worker 端的裁切參數, 由 _init_worker 設定
+_job_args: tuple[str, str, str, int, int] | None = None
+
+
+@dataclass
+class BatchCropReport:
+    """一次批次裁切的結果"""
+
+    total: int = 0          # 有 XML 的圖片數
+    cropped: int = 0        # 這次裁切的圖片數
+    crops: int = 0          # 這次寫出的小圖數
+    skipped: int = 0        # 上次已裁過且沒有變動, 沿用
+    empty: int = 0          # 沒有可裁的標註
+    failed: list[str] = field(default_factory=list)        # 讀不到或寫不出的圖檔名
+    written_xmls: list[str] = field(default_factory=list)  # 這次寫出的 XML 路徑
+    canceled: bool = False
+
+    def summary(self) -> str:
+        """一行的結果摘要"""
+        text = f"裁切 {self.cropped} 張圖、產出 {self.crops} 張小圖"
+        if self.skipped:
+            text += f"，沿用上次 {self.skipped} 張"
+        if self.empty:
+            text += f"，無標註 {self.empty} 張"
+        if self.failed:
+            text += f"，失敗 {len(self.failed)} 張"
+        return text
+
+
+@dataclass
+class _CropResult:
+    """worker 對一張圖片的處理結果"""
+
+    name: str
+    status: str
+    outputs: list[str] = field(default_factory=list)  # 寫出的小圖檔名 (XML 與其同名)
+    error: str = ""
+
+
+def find_crop_sources(folder) -> list[str]:
+    """資料夾內 (不含子資料夾) 有同名 XML 的圖片檔名, 依檔名排序 (與 FileHandler 的清單順序相同)"""
+    names = sorted(os.listdir(folder))
+    xmls = {Path(n).stem for n in names if n.lower().endswith(".xml")}
+    return [n for n in names if n.lower().endswith(IMAGE_EXTS) and Path(n).stem in xmls]
+
+
+def params_fingerprint(mode: str, padding_px: int, fixed_size: int) -> str:
+    """裁切參數的指紋; 與上次不同時所有圖片都要重裁"""
+    return f"{mode}:{padding_px}:{fixed_size}"
+
+
+def _source_key(folder: Path, name: str) -> list[int]:
+    """來源圖片與 XML 的 (mtime_ns, size); 任一個變了就要重裁"""
+    img = (folder / name).stat()
+    xml = (folder / f"{Path(name).stem}.xml").stat()
+    return [img.st_mtime_ns, img.st_size, xml.st_mtime_ns, xml.st_size]
+
+
+def load_crop_manifest(out_dir) -> dict | None:
+    """讀取輸出資料夾的 CROP_MANIFEST; 不存在、版本不符或壞掉時回傳 None"""
+    path = Path(out_dir) / CROP_MANIFEST
+    if not path.is_file():
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception as e:
+        log.e(f"讀取 {path} 失敗: {e}")
+        return None
+    if manifest.get("version") != CROP_MANIFEST_VERSION:
+        return None
+    manifest.setdefault("files", {})
+    return manifest
+
+
+def save_crop_manifest(out_dir, manifest: dict) -> None:
+    """寫回 CROP_MANIFEST (先寫暫存檔再取代, 中途當掉也不會留下半個 JSON)"""
+    path = Path(out_dir) / CROP_MANIFEST
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_annotations(xml_path) -> tuple[list[Bbox], list[Polygon]]:
+    """讀 XML 成 Bbox / Polygon, 取捨與 ImageWidget.loadBboxFromXml 相同 (角度取整數)"""
+    ann = parse_voc_xml(xml_path)
+    if ann is None:
+        return [], []
+    bboxes, polygons = [], []
+    for o in ann.objects:
+        if o.kind == KIND_BBOX:
+            width, height = o.xmax - o.xmin, o.ymax - o.ymin
+            bboxes.append(
+                Bbox(o.xmin, o.ymin, width, height, o.label, o.confidence, int(o.angle))
+            )
+        else:
+            polygons.append(Polygon(list(o.points), o.label, o.confidence))
+    return bboxes, polygons
+
+
+def _plan(
+    bboxes: list[Bbox], polygons: list[Polygon], img_w: int, img_h: int
+) -> list[CropTask]:
+    """先把標註夾進影像 (與畫面載入時相同), 再計算裁切任務"""
+    ann = AnnotationSet.from_objects(bboxes, polygons)
+    box_idx, poly_idx = ann.clamp(img_w, img_h)
+    ann.write_back(bboxes, polygons, box_idx, poly_idx)
+    _, _, mode, padding_px, fixed_size = _job_args
+    return compute_crops(img_w, img_h, bboxes, polygons, mode, padding_px, fixed_size)
+
+
+def _crop_one(name: str) -> _CropResult:
+    """worker: 裁切一張圖片並寫出小圖與 XML"""
+    src_folder, out_dir, _, _, _ = _job_args
+    img_path = Path(src_folder) / name
+    xml_path = img_path.with_suffix(".xml")
+    stem = img_path.stem
+
+    bboxes, polygons = load_annotations(xml_path)
+    if not bboxes and not polygons:
+        return _CropResult(name, STATUS_EMPTY)
+    try:
+        _, img_w, img_h, _ = probe_image(img_path)
+    except Exception:
+        # 檔頭讀不懂的格式交給解碼判斷
+        img_w = img_h = 0
+    tasks = _plan(bboxes, polygons, img_w, img_h) if img_w and img_h else None
+    if tasks is not None and not tasks:
+        return _CropResult(name, STATUS_EMPTY)
+
+    img = imread_unicode(img_path)
+    if img is None:
+        return _CropResult(name, STATUS_FAILED, error="無法解碼")
+    if tasks is None or img.shape[:2] != (img_h, img_w):
+        # EXIF 轉正後寬高對調等情況: 以解碼後的尺寸重新計算 (標註已夾過, 重讀一次原始值)
+        bboxes, polygons = load_annotations(xml_path)
+        tasks = _plan(bboxes, polygons, img.shape[1], img.shape[0])
+
+    outputs = []
+    for idx, task in enumerate(tasks):
+        crop = img[task.y0:task.y1, task.x0:task.x1]
+        if crop.size == 0:
+            continue
+        crop_name = f"{stem}_crop{idx}.jpg"
+        crop_path = Path(out_dir) / crop_name
+        if not imwrite_unicode(crop_path, crop):
+            return _CropResult(name, STATUS_FAILED, outputs, f"寫入失敗: {crop_name}")
+        # 圖寫完才寫 XML: 轉換與 store 同步都以 XML 為準, 不能指向還不存在的圖
+        xml_content = build_voc_xml(
+            task.bboxes, task.polygons, crop_name, Path(out_dir).name,
+            crop.shape[1], crop.shape[0],
+        )
+        with open(crop_path.with_suffix(".xml"), "w", encoding="utf-8") as f:
+            f.write(xml_content)
+        outputs.append(crop_name)
+    return _CropResult(name, STATUS_CROPPED if outputs else STATUS_EMPTY, outputs)
+
+
+def _init_worker(
+    src_folder: str, out_dir: str, mode: str, padding_px: int, fixed_size: int
+) -> None:
+    """pool initializer: 每個 worker 只收一次裁切參數"""
+    global _job_args
+    _job_args = (src_folder, out_dir, mode, padding_px, fixed_size)
+
+
+def _crop_chunk(names: list[str]) -> list[_CropResult]:
+    """worker: 裁切一批圖片 (模組層級函式才能被 pickle)"""
+    results = []
+    for name in names:
+        try:
+            results.append(_crop_one(name))
+        except Exception as e:
+            # 單檔失敗 (權限、磁碟滿、XML 壞掉) 不拖垮整批
+            log.e(f"裁切失敗 {name}: {e}")
+            results.append(_CropResult(name, STATUS_FAILED, error=str(e)))
+    return results
+
+
+def _remove_stale(out_dir: Path, names) -> None:
+    """刪掉上次產出、這次沒有再產出的小圖與 XML (標註變少時 _cropN 會變少)"""
+    for crop_name in names:
+        for path in (out_dir / crop_name, (out_dir / crop_name).with_suffix(".xml")):
+            try:
+                path.unlink(missing_ok=True)
+            except OSError as e:
+                log.w(f"刪除過期的裁切檔失敗 ({path}): {e}")
+
+
+def batch_crop(
+    src_folder,
+    out_dir,
+    mode: str,
+    padding_px: int,
+    fixed_size: int,
+    workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    is_canceled: Optional[Callable[[], bool]] = None,
+) -> BatchCropReport:
+    """把資料夾內每一組 圖片 + XML 裁成小圖 + XML, 寫到 out_dir
+
+    上次已裁過、來源與參數都沒變 (且產出的檔案都還在) 的圖片直接略過。
+    結果依檔名順序取回並逐張更新 manifest, 取消時已完成的部分照樣記錄, 下次從中斷處繼續。
+
+    Args:
+        src_folder: 來源資料夾 (圖片與 XML 放在一起)
+        out_dir: 輸出資料夾 (不可與來源相同)
+        mode: CROP_MODE_PADDING / CROP_MODE_FIXED
+        padding_px: padding 模式每邊外擴 pixel
+        fixed_size: fixed 模式最小邊長
+        workers: process pool 大小; None 則用 CPU 數, 1 則不開 pool
+        progress_callback: 每批完成後呼叫 (已處理數, 總數); 略過的圖片算在已處理內
+        is_canceled: 每批完成後檢查, 回傳 True 時取消尚未開始的批次並返回
+
+    Returns:
+        BatchCropReport
+    """
+    src_folder = Path(src_folder)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    report = BatchCropReport()
+
+    names = find_crop_sources(src_folder)
+    report.total = len(names)
+    fingerprint = params_fingerprint(mode, padding_px, fixed_size)
+    manifest = load_crop_manifest(out_dir)
+    if manifest is None or manifest.get("params") != fingerprint:
+        # 參數改了: 舊的紀錄全部作廢, 產出的檔名相同, 重裁時直接覆寫
+        old_files = manifest["files"] if manifest else {}
+        manifest = {"version": CROP_MANIFEST_VERSION, "params": fingerprint, "files": old_files}
+        for entry in old_files.values():
+            entry["key"] = None
+    files: dict = manifest["files"]
+
+    todo = []
+    keys = {}
+    for name in names:
+        try:
+            keys[name] = _source_key(src_folder, name)
+        except OSError as e:
+            log.e(f"讀取檔案資訊失敗 ({name}): {e}")
+            report.failed.append(name)
+            continue
+        entry = files.get(name)
+        if (
+            entry is not None
+            and entry.get("key") == keys[name]
+            and all(
+                (out_dir / n).is_file() and (out_dir / n).with_suffix(".xml").is_file()
+                for n in entry.get("outputs", [])
+            )
+        ):
+            report.skipped += 1
+        else:
+            todo.append(name)
+
+    done = report.total - len(todo)
+    if progress_callback:
+        progress_callback(done, report.total)
+
+    last_save = time.monotonic()
+
+    def _consume(chunk_results) -> bool:
+        nonlocal done, last_save
+        for chunk_result in chunk_results:
+            for r in chunk_result:
+                old = files.get(r.name, {}).get("outputs", [])
+                if r.status == STATUS_FAILED:
+                    log.e(f"裁切失敗 {r.name}: {r.error}")
+                    report.failed.append(r.name)
+                    # 寫出一半的檔案保留, 但不記 key: 下次一定重做
+                    files[r.name] = {"key": None, "outputs": sorted(set(old) | set(r.outputs))}
+                    continue
+                _remove_stale(out_dir, set(old) - set(r.outputs))
+                files[r.name] = {"key": keys[r.name], "outputs": r.outputs}
+                if r.status == STATUS_EMPTY:
+                    report.empty += 1
+                else:
+                    report.cropped += 1
+                    report.crops += len(r.outputs)
+                    report.written_xmls += [
+                        (out_dir / n).with_suffix(".xml").as_posix() for n in r.outputs
+                    ]
+            done += len(chunk_result)
+            if progress_callback:
+                progress_callback(done, report.total)
+            if time.monotonic() - last_save >= MANIFEST_SAVE_INTERVAL:
+                save_crop_manifest(out_dir, manifest)
+                last_save = time.monotonic()
+            if is_canceled and is_canceled():
+                return True
+        return False
+
+    chunks = chunked(todo, CHUNK_SIZE)
+    init_args = (str(src_folder), str(out_dir), mode, padding_px, fixed_size)
+    try:
+        if len(todo) < PARALLEL_THRESHOLD or default_workers(workers) <= 1:
+            _init_worker(*init_args)
+            report.canceled = _consume(_crop_chunk(chunk) for chunk in chunks)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=init_args
+            ) as pool:
+                report.canceled = _consume(
+                    ordered_results(pool, _crop_chunk, chunks, workers)
+                )
+                if report.canceled:
+                    # 在途的批次跑完即止 (最多一個視窗), 還沒開始的直接丟掉;
+                    # 跑完的批次沒有取回, 檔案已寫出但沒記錄, 下次會重裁覆寫
+                    pool.shutdown(wait=True, cancel_futures=True)
+    finally:
+        save_crop_manifest(out_dir, manifest)
+    return report
@@ -0,0 +1,223 @@
+# VOC XML 資料夾 → COCO JSON 的串流匯出：process pool 解析, 邊算邊寫, 記憶體用量與 dataset 大小無關
+# 更新日期: 2026-10-19
+#
+# COCO 要求 images 與 annotations 是兩個獨立陣列, 無法交錯寫。做法是 images 直接寫進輸出檔,
+# annotations 同時寫到同資料夾的暫存檔, images 寫完再把暫存檔整段接上去 (copyfileobj,
+# 固定大小的 buffer)。worker 的結果以有上限的視窗依序取回, 解析再快也不會在記憶體堆積。
+from __future__ import annotations
+
+import shutil
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+import orjson
+
+from src.utils import geometry
+from src.utils.logger import getUniqueLogger
+from src.utils.parallel import chunked, ordered_results
+from src.utils.voc import KIND_POLYGON, parse_voc_xml
+
+log = getUniqueLogger(__file__)
+
+# 每個 worker 任務處理的 XML 數; 太小 IPC 成本高, 太大進度條跳得粗
+CHUNK_SIZE = 256
+
+
+@dataclass
+class CocoExportReport:
+    """匯出結果統計"""
+
+    images: int = 0
+    annotations: int = 0
+    failed: int = 0                                     # 無法解析 / 缺 size 的 XML
+    unmapped: Counter = field(default_factory=Counter)  # label -> 略過的物件數
+    canceled: bool = False
+
+
+def _coco_job(xml_paths: list[str]) -> list[tuple | None]:
+    """worker: 解析一批 XML 並算好 COCO 需要的幾何 (模組層級函式才能被 pickle)
+
+    Returns:
+        list: 每個 XML 一筆 (filename, width, height, objects) 或 None (無法解析);
+              objects 為 [(label, bbox, area, segmentation, attributes)]
+    """
+    results = []
+    for xml_path in xml_paths:
+        ann = parse_voc_xml(xml_path)
+        if ann is None:
+            results.append(None)
+            continue
+        # 整張圖的 polygon 面積一次算完 (少於三點的為 0)
+        poly_objs = [o for o in ann.objects if o.kind == KIND_POLYGON]
+        areas = geometry.polygons_area(
+            *geometry.pack_polygons(o.points for o in poly_objs)
+        ).tolist()
+        poly_area = {id(o): a for o, a in zip(poly_objs, areas)}
+        objects = []
+        for o in ann.objects:
+            attributes = {}
+            if o.confidence >= 0:
+                attributes["confidence"] = o.confidence
+            if o.kind == KIND_POLYGON:
+                pts = o.points
+                segmentation = [[round(v, 2) for p in pts for v in p]]
+                bbox = [o.xmin, o.ymin, o.xmax - o.xmin, o.ymax - o.ymin]
+                area = poly_area[id(o)]
+            elif o.angle:
+                # OBB: bbox 取旋轉後角點的外接框, segmentation 放四個角點, 角度另記在 attributes
+                corners = geometry.corners_one(o.xmin, o.ymin, o.xmax, o.ymax, o.angle)
+                xs = [c[0] for c in corners]
+                ys = [c[1] for c in corners]
+                segmentation = [[round(v, 2) for c in corners for v in c]]
+                bbox = [min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)]
+                area = float((o.xmax - o.xmin) * (o.ymax - o.ymin))
+                attributes["angle"] = o.angle
+            else:
+                segmentation = []
+                bbox = [o.xmin, o.ymin, o.xmax - o.xmin, o.ymax - o.ymin]
+                area = float(bbox[2] * bbox[3])
+            bbox = [round(v, 2) for v in bbox]
+            objects.append((o.label, bbox, round(area, 2), segmentation, attributes))
+        results.append((ann.filename, ann.width, ann.height, objects))
+    return results
+
+
+def export_coco(
+    folder,
+    output_path,
+    categories: dict,
+    workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    is_canceled: Optional[Callable[[], bool]] = None,
+) -> CocoExportReport:
+    """把資料夾內的 VOC XML 匯出成單一 COCO JSON
+
+    category 沿用 class mapping (settings.class_names.categories) 的 id, 讓 COCO 與 YOLO
+    兩份匯出的類別編號一致; 多個 label 對到同一個 id 時, COCO 的 name 取第一個。
+    不在 mapping 裡的 label 略過並計入 report.unmapped。
+
+    Args:
+        folder: 含 VOC XML 的資料夾
+        output_path: 輸出的 JSON 路徑
+        categories: label -> class_id
+        workers: process pool 大小; None 則用 CPU 數
+        progress_callback: (已處理 XML 數, 總數) -> None
+        is_canceled: 回傳 True 時中止, 並刪除寫到一半的輸出
+
+    Returns:
+        CocoExportReport: 匯出結果
+    """
+    folder = Path(folder)
+    output_path = Path(output_path)
+    report = CocoExportReport()
+    xml_files = sorted(str(p) for p in folder.glob("*.xml"))
+    total = len(xml_files)
+    chunks = chunked(xml_files, CHUNK_SIZE)
+
+    id_to_name: dict[int, str] = {}
+    for label, cid in categories.items():
+        if isinstance(cid, int):
+            id_to_name.setdefault(cid, label)
+    label_to_id = {k: v for k, v in categories.items() if isinstance(v, int)}
+
+    tmp_ann_path = output_path.with_name(output_path.name + ".annotations.tmp")
+    info = {
+        "description": f"exported from {folder.name}",
+        "date_created": datetime.now().isoformat(timespec="seconds"),
+    }
+    done = 0
+    try:
+        with (
+            open(output_path, "wb") as out,
+            open(tmp_ann_path, "wb") as ann_out,
+            ProcessPoolExecutor(max_workers=workers) as pool,
+        ):
+            out.write(b'{"info":' + orjson.dumps(info) + b',"images":[')
+            first_img = first_ann = True
+            for results in ordered_results(pool, _coco_job, chunks, workers):
+                for result in results:
+                    if result is None:
+                        report.failed += 1
+                        continue
+                    filename, width, height, objects = result
+                    report.images += 1
+                    image_id = report.images
+                    out.write(
+                        (b"" if first_img else b",")
+                        + orjson.dumps(
+                            {
+                                "id": image_id,
+                                "file_name": filename,
+                                "width": width,
+                                "height": height,
+                            }
+                        )
+                    )
+                    first_img = False
+                    for label, bbox, area, segmentation, attributes in objects:
+                        cid = label_to_id.get(label)
+                        if cid is None:
+                            report.unmapped[label] += 1
+                            continue
+                        report.annotations += 1
+                        record = {
+                            "id": report.annotations,
+                            "image_id": image_id,
+                            "category_id": cid,
+                            "bbox": bbox,
+                            "area": area,
+                            "segmentation": segmentation,
+                            "iscrowd": 0,
+                        }
+                        if attributes:
+                            record["attributes"] = attributes
+                        ann_out.write((b"" if first_ann else b",") + orjson.dumps(record))
+                        first_ann = False
+                done += len(results)
+                if progress_callback:
+                    progress_callback(done, total)
+                if is_canceled and is_canceled():
+                    report.canceled = True
+                    # 還沒開始的任務直接取消, 不必等它們跑完
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    break
+
+            if not report.canceled:
+                ann_out.flush()
+                out.write(b'],"annotations":[')
+                with open(tmp_ann_path, "rb") as src:
+                    shutil.copyfileobj(src, out, 1024 * 1024)
+                cats = [{"id": cid, "name": name} for cid, name in sorted(id_to_name.items())]
+                out.write(b'],"categories":' + orjson.dumps(cats) + b"}")
+    except Exception as e:
+        log.e(f"COCO 匯出失敗 ({folder} → {output_path}): {e}")
+        output_path.unlink(missing_ok=True)
+        raise
+    finally:
+        tmp_ann_path.unlink(missing_ok=True)
+
+    if report.canceled:
+        output_path.unlink(missing_ok=True)
+        log.i(f"COCO 匯出已取消 ({done}/{total})")
+        return report
+    log.i(
+        f"COCO exported {report.images} images / {report.annotations} annotations "
+        f"→ {output_path} (failed={report.failed}, unmapped={dict(report.unmapped)})"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    # 命令列匯出: python -m src.utils.coco_export <folder> <output.json>
+    # class mapping 讀 cfg/settings.yaml, 與 GUI 一致
+    if len(sys.argv) < 3:
+        print("usage: python -m src.utils.coco_export <folder> <output.json>")
+        sys.exit(1)
+    from src.utils.dynamic_settings import settings
+
+    print(export_coco(sys.argv[1], sys.argv[2], settings.class_names.categories))
@@ -13,7 +13,13 @@ ROTATION_HANDLE_DISTANCE = 30  # 旋轉控制點距離 bbox 頂部的距離
 # Polygon 相關常數
 POLYGON_CLOSE_THRESHOLD = 10  # px distance to close polygon
 POLYGON_VERTEX_RADIUS = 4
+# 局部重繪時在標註外框之外多留的邊 (螢幕px): 要蓋得住控制點、旋轉握把、放大的頂點圓點與線寬
+DIRTY_MARGIN = max(CORNER_SIZE, ROTATION_HANDLE_RADIUS, POLYGON_VERTEX_RADIUS * 2, POLYGON_CLOSE_THRESHOLD) + 3
 POLYGON_SELECT_PADDING = 5  # px 距離polygon邊緣的選取範圍
+# 縮小檢視時 polygon 以簡化版繪製 (誤差約 1 個螢幕 px); 頂點少於此數的直接畫原本的點
+LOD_MIN_POINTS = 16
+# 簡化結果依 zoom 分級快取 (每半個 2 倍一級), 最多留幾級
+LOD_CACHE_LEVELS = 4
 
 IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff")
 VIDEO_EXTS = (".mp4", ".avi", ".mov", ".wmv", ".mkv", ".webm")
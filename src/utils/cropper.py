@@ -1,12 +1,15 @@
 # 依畫面標註 (bbox / polygon) 計算 cropped 裁切區域，供動態區/ROI 過濾後的 YOLO dataset 使用
-# 更新日期: 2026-07-14
+# 更新日期: 2026-10-19
 from __future__ import annotations
 
-import math
 from dataclasses import dataclass, field
 
+import numpy as np
+
+from src.utils import geometry
 from src.utils.logger import getUniqueLogger
 from src.utils.model import Bbox, Polygon
+from src.utils.spatial_index import GridIndex
 
 log = getUniqueLogger(__file__)
 
@@ -37,44 +40,30 @@ class CropTask:
         return self.y1 - self.y0
 
 
-def _bbox_aabb(bbox: Bbox) -> tuple[int, int, int, int]:
-    """取得 bbox 的軸對齊外接矩形；旋轉框則取旋轉後四角點的外接框
+def _annotation_aabbs(
+    bboxes: list[Bbox], polygons: list[Polygon]
+) -> tuple[list[tuple[int, int, int, int]], list[tuple[int, int, int, int]]]:
+    """一次算出所有標註的軸對齊外接矩形 (旋轉框取旋轉後四角點的外接框), 取整數 (往 0 截斷)
 
     Args:
-        bbox: 目標 bbox
+        bboxes: bbox 清單
+        polygons: polygon 清單 (需至少 3 點, 由呼叫端過濾)
 
     Returns:
-        (x0, y0, x1, y1) 軸對齊外接矩形
+        (bbox 的外接框, polygon 的外接框), 順序與輸入相同
     """
-    if bbox.angle % 360 == 0:
-        return (bbox.x, bbox.y, bbox.x + bbox.width, bbox.y + bbox.height)
-
-    cx = bbox.x + bbox.width / 2
-    cy = bbox.y + bbox.height / 2
-    rad = math.radians(bbox.angle)
-    corners = [
-        (-bbox.width / 2, -bbox.height / 2),
-        (bbox.width / 2, -bbox.height / 2),
-        (bbox.width / 2, bbox.height / 2),
-        (-bbox.width / 2, bbox.height / 2),
-    ]
-    xs = [cx + dx * math.cos(rad) - dy * math.sin(rad) for dx, dy in corners]
-    ys = [cy + dx * math.sin(rad) + dy * math.cos(rad) for dx, dy in corners]
-    return (int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys)))
-
-
-def _polygon_aabb(polygon: Polygon) -> tuple[int, int, int, int]:
-    """取得 polygon 的軸對齊外接矩形
+    box_aabb = geometry.boxes_aabb(geometry.bboxes_to_array(bboxes))
+    points, offsets = geometry.pack_polygons(p.points for p in polygons)
+    poly_aabb = geometry.polygons_aabb(points, offsets)
+    return _to_int_rects(box_aabb), _to_int_rects(poly_aabb)
 
-    Args:
-        polygon: 目標 polygon
 
-    Returns:
-        (x0, y0, x1, y1) 軸對齊外接矩形
+def _to_int_rects(arr: np.ndarray) -> list[tuple[int, int, int, int]]:
+    """(N, 4) 外接框陣列轉成整數 tuple 的 list
+
+    先四捨五入到 1e-6 再截斷: 90 度這類旋轉的角點理論上是整數, 三角函數誤差可能落在 66.9999999
     """
-    xs = [p[0] for p in polygon.points]
-    ys = [p[1] for p in polygon.points]
-    return (int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys)))
+    return [tuple(r) for r in np.round(arr, 6).astype(np.int64).tolist()]
 
 
 def _fit_region(
@@ -174,23 +163,130 @@ def _union(
     return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
 
 
-def _can_merge(c1: dict, c2: dict, mode: str, fixed_size: int) -> bool:
-    """判斷兩個 cluster 是否可合併成同一張 cropped
+def _fits_fixed(member: tuple[int, int, int, int], fixed_size: int) -> bool:
+    """fixed 模式: 成員聯集框塞得進單一 fixed_size 裁切區"""
+    return (member[2] - member[0]) <= fixed_size and (member[3] - member[1]) <= fixed_size
 
-    Args:
-        c1, c2: cluster，含 "member" (成員聯集框) 與 "region" (裁切區域)
-        mode: 尺寸模式
-        fixed_size: fixed 模式最小邊長
+
+def _cluster_fixed(
+    aabbs: list[tuple[int, int, int, int]], fixed_size: int
+) -> list[tuple[int, int, int, int]]:
+    """fixed 模式的貪婪合併: 依序讓每個還沒被併走的標註當 cluster, 往後吸收塞得進同一區的標註
+
+    等同「每次找 index 最小的可合併 (i, j)、把 j 併進 i、從頭再找」: 合併條件只看成員聯集框,
+    cluster 變大後只會更難與別人合併, 已經失敗的配對不會再成功, 因此不必從頭重找。
+    能被 i 吸收的標註一定落在以 i 的外接框為準、往外 fixed_size 的窗口內, 以格網索引只取窗口內的候選。
 
     Returns:
-        bool: 是否可合併
+        每個 cluster 的成員聯集框, 依 cluster 內最小的 index 排序
     """
-    if mode == CROP_MODE_FIXED:
-        # 成員聯集框需能塞進單一 fixed_size 裁切區才合併
-        u = _union(c1["member"], c2["member"])
-        return (u[2] - u[0]) <= fixed_size and (u[3] - u[1]) <= fixed_size
-    # padding 模式：兩裁切區相交即合併
-    return _rects_intersect(c1["region"], c2["region"])
+    grid = GridIndex(np.asarray(aabbs, dtype=np.float64), cell_size=float(fixed_size))
+    taken = bytearray(len(aabbs))
+    members = []
+    for i, member in enumerate(aabbs):
+        if taken[i]:
+            continue
+        taken[i] = 1
+        if _fits_fixed(member, fixed_size):
+            x0, y0, x1, y1 = member
+            window = (x1 - fixed_size, y1 - fixed_size, x0 + fixed_size, y0 + fixed_size)
+            for j in grid.query_rect(*window):
+                if j <= i or taken[j]:
+                    continue
+                u = _union(member, aabbs[j])
+                if _fits_fixed(u, fixed_size):
+                    member = u
+                    taken[j] = 1
+        members.append(member)
+    return members
+
+
+def _cluster_padding(
+    aabbs: list[tuple[int, int, int, int]], padding_px: int, img_w: int, img_h: int
+) -> list[tuple[int, int, int, int]]:
+    """padding 模式的合併: 裁切區相交的 cluster 合併, 直到沒有相交的為止
+
+    成員框變大時外擴後的裁切區只會變大 (_fit_region 只平移不縮小), 相交的兩個 cluster
+    不論先併哪一對最後都會在同一組, 結果與合併順序無關, 因此可以換個順序併:
+    1. 依序讓每個還沒被併走的標註當 cluster, 以格網索引反覆吸收裁切區與它相交的標註,
+       直到吸收不到為止 (標註密集時一個 cluster 就吞掉一大片, 查詢次數很少)
+    2. 只有變大過的 cluster 可能與其他 cluster 相交 (兩個單獨的標註在步驟 1 已經比過);
+       以 union-find 併完相交的配對, 下一輪只替裁切區又變大的 cluster 重查, 直到沒有合併
+
+    Returns:
+        每個 cluster 的成員聯集框, 依 cluster 內最小的 index 排序
+    """
+
+    def expand(member: tuple[int, int, int, int]) -> tuple[int, int, int, int]:
+        return _expand(member, CROP_MODE_PADDING, padding_px, 0, img_w, img_h)
+
+    def query(grid: GridIndex, arr: np.ndarray, region: tuple[int, int, int, int]) -> np.ndarray:
+        """裁切區與 region 相交的 index; 與 _rects_intersect 相同, 只貼邊不算"""
+        x0, y0, x1, y1 = region
+        cand = np.asarray(grid.query_rect(x0, y0, x1, y1), dtype=np.int64)
+        r = arr[cand]
+        return cand[(r[:, 0] < x1) & (r[:, 2] > x0) & (r[:, 1] < y1) & (r[:, 3] > y0)]
+
+    # 1. 各 cluster 以最小的 index 為代表
+    arr = np.asarray([expand(m) for m in aabbs], dtype=np.int64)
+    grid = GridIndex(arr)
+    taken = np.zeros(len(aabbs), dtype=bool)
+    members: dict[int, tuple[int, int, int, int]] = {}
+    dirty = set()
+    for i, member in enumerate(aabbs):
+        if taken[i]:
+            continue
+        taken[i] = True
+        region = tuple(arr[i].tolist())
+        while True:
+            hit = query(grid, arr, region)
+            hit = hit[~taken[hit]]
+            if not len(hit):
+                break
+            taken[hit] = True
+            for j in hit.tolist():
+                member = _union(member, aabbs[j])
+            region = expand(member)
+            dirty.add(i)
+        members[i] = member
+
+    # 2. 變大過的 cluster 與其他 cluster 相交就合併
+    parent = {r: r for r in members}
+
+    def find(k: int) -> int:
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    while dirty:
+        roots = list(members)
+        regions = [expand(members[r]) for r in roots]
+        arr = np.asarray(regions, dtype=np.int64)
+        grid = GridIndex(arr)
+        is_dirty = np.fromiter((r in dirty for r in roots), dtype=bool, count=len(roots))
+        for a in np.flatnonzero(is_dirty).tolist():
+            hit = query(grid, arr, regions[a])
+            # 兩個都要重查的配對只在 index 小的那邊處理一次
+            hit = hit[(hit > a) | ~is_dirty[hit]]
+            ra = find(roots[a])
+            for b in hit.tolist():
+                rb = find(roots[b])
+                if ra != rb:
+                    ra, rb = min(ra, rb), max(ra, rb)
+                    parent[rb] = ra
+
+        grouped: dict[int, tuple[int, int, int, int]] = {}
+        dirty = set()
+        for r in roots:
+            root = find(r)
+            if root in grouped:
+                grouped[root] = _union(grouped[root], members[r])
+                dirty.add(root)
+            else:
+                grouped[root] = members[r]
+        members = dict(sorted(grouped.items()))
+    return list(members.values())
 
 
 def _translate_bbox(
@@ -239,16 +335,11 @@ def _translate_polygon(
     Returns:
         平移後的 Polygon；點數不足則回傳 None
     """
-    w = rx1 - rx0
-    h = ry1 - ry0
-    pts = []
-    for px, py in polygon.points:
-        nx = min(max(px - rx0, 0), w)
-        ny = min(max(py - ry0, 0), h)
-        pts.append((float(nx), float(ny)))
-    if len(pts) < 3:
+    if len(polygon.points) < 3:
         return None
-    return Polygon(pts, polygon.label, polygon.confidence)
+    shifted = np.asarray(polygon.points, dtype=np.float64) - (rx0, ry0)
+    clamped = geometry.clamp_points(shifted, 0, 0, rx1 - rx0, ry1 - ry0)
+    return Polygon([tuple(p) for p in clamped.tolist()], polygon.label, polygon.confidence)
 
 
 def compute_crops(
@@ -277,47 +368,37 @@ def compute_crops(
         CropTask 清單；無標註時回傳空清單
     """
     # 1. 蒐集所有標註的軸對齊外接框
+    polygons = [p for p in polygons if len(p.points) >= 3]
+    if not bboxes and not polygons:
+        return []
+    box_aabbs, poly_aabbs = _annotation_aabbs(bboxes, polygons)
     items: list[tuple[tuple[int, int, int, int], str, object]] = []
-    for b in bboxes:
-        items.append((_bbox_aabb(b), "bbox", b))
-    for p in polygons:
-        if len(p.points) >= 3:
-            items.append((_polygon_aabb(p), "poly", p))
+    items += [(aabb, "bbox", b) for aabb, b in zip(box_aabbs, bboxes)]
+    items += [(aabb, "poly", p) for aabb, p in zip(poly_aabbs, polygons)]
     if not items:
         return []
 
     # 2. 每個標註各自成一個 cluster，再以「聯集框可被單一裁切區涵蓋」為條件貪婪合併
-    clusters: list[dict] = []
-    for aabb, _kind, _ref in items:
-        clusters.append({
-            "member": aabb,
-            "region": _expand(aabb, mode, padding_px, fixed_size, img_w, img_h),
-        })
-
-    merged = True
-    while merged:
-        merged = False
-        for i in range(len(clusters)):
-            for j in range(i + 1, len(clusters)):
-                if _can_merge(clusters[i], clusters[j], mode, fixed_size):
-                    u = _union(clusters[i]["member"], clusters[j]["member"])
-                    clusters[i]["member"] = u
-                    clusters[i]["region"] = _expand(
-                        u, mode, padding_px, fixed_size, img_w, img_h
-                    )
-                    clusters.pop(j)
-                    merged = True
-                    break
-            if merged:
-                break
+    aabbs = [aabb for aabb, _kind, _ref in items]
+    if mode == CROP_MODE_FIXED:
+        members = _cluster_fixed(aabbs, fixed_size)
+    else:
+        members = _cluster_padding(aabbs, padding_px, img_w, img_h)
+    regions = [_expand(m, mode, padding_px, fixed_size, img_w, img_h) for m in members]
 
     # 3. 每個 cluster 產生 CropTask，納入所有與該區域相交的標註 (平移+裁邊)
+    # 以格網索引只取區域附近的標註; 格子取裁切區的中位數大小, 一次查詢約落在 1~4 格
+    region_sizes = [max(r[2] - r[0], r[3] - r[1]) for r in regions]
+    item_grid = GridIndex(
+        np.asarray(aabbs, dtype=np.float64), cell_size=float(np.median(region_sizes))
+    )
     tasks: list[CropTask] = []
-    for c in clusters:
-        rx0, ry0, rx1, ry1 = c["region"]
+    for region in regions:
+        rx0, ry0, rx1, ry1 = region
         task = CropTask(rx0, ry0, rx1, ry1)
-        for aabb, kind, ref in items:
-            if not _rects_intersect(aabb, c["region"]):
+        for k in item_grid.query_rect(rx0, ry0, rx1, ry1):
+            aabb, kind, ref = items[k]
+            if not _rects_intersect(aabb, region):
                 continue
             if kind == "bbox":
                 nb = _translate_bbox(ref, rx0, ry0, rx1, ry1)
@@ -0,0 +1,228 @@
+# VOC → YOLO dataset 的完整建置：(檢查) → 轉換 → 切分 train/val → 擺放檔案 → dataset yaml
+# 更新日期: 2026-10-19
+#
+# 不碰 Qt: 進度以 (階段, 目前, 總數) 回報、取消以 is_canceled() 輪詢, 由呼叫端的 QThread 驅動。
+# 任何階段取消都會把這次擺放過的檔案復原 (link / 複製的刪掉、搬移的搬回去), 不會留下半套 dataset;
+# 檢查階段隔離的檔案也一併放回原位。
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.utils.const import IMAGE_EXTS
+from src.utils.dataset_split import DEFAULT_SEED, split_dataset, write_dataset_yaml
+from src.utils.dataset_validator import ValidationReport, undo_quarantine, validate_dataset
+from src.utils.file_handler import file_h
+from src.utils.logger import getUniqueLogger
+from src.utils.materialize import (
+    METHOD_AUTO,
+    METHOD_NAMES,
+    undo_placed,
+)
+from src.utils.yolo_convert import ConvertReport
+
+log = getUniqueLogger(__file__)
+
+# 轉換結果 (增量轉換的基準) 所在的子資料夾; train / val 也放在它底下
+YOLO_LABELS_FOLDER = "labels"
+YOLO_IMAGES_FOLDER = "images"
+
+# 建置階段 (STAGE_NAMES 的順序即執行順序; 檢查階段只在 preflight 時執行)
+STAGE_VALIDATE = "validate"
+STAGE_CONVERT = "convert"
+STAGE_SPLIT = "split"
+STAGE_MATERIALIZE = "materialize"
+STAGE_YAML = "yaml"
+STAGE_NAMES = {
+    STAGE_VALIDATE: "檢查圖片與標註",
+    STAGE_CONVERT: "轉換 VOC → YOLO",
+    STAGE_SPLIT: "切分 train / val",
+    STAGE_MATERIALIZE: "擺放圖片與標籤",
+    STAGE_YAML: "產生 dataset yaml",
+}
+
+
+class BuildCanceled(Exception):
+    """使用者取消建置 (內部用, 讓各階段統一走復原流程)"""
+
+
+@dataclass
+class BuildResult:
+    """dataset 建置的結果, 內容對應 _show_convert_summary 需要的欄位"""
+
+    convert: ConvertReport = field(default_factory=ConvertReport)
+    id_to_name: dict[int, str] = field(default_factory=dict)
+    train_count: int = 0
+    val_count: int = 0
+    yaml_name: str = ""
+    not_match_path: Optional[Path] = None
+    placement: Counter = field(default_factory=Counter)    # 圖片實際的擺放方式 -> 張數
+    split_skipped: int = 0                                 # 上次就擺好而略過的檔案數
+    validation: Optional[ValidationReport] = None          # preflight 的檢查結果
+    canceled: bool = False
+    canceled_stage: str = ""    # 在哪個階段取消
+    message: str = ""           # 無法完成時的原因 (例如沒有配對)
+
+
+def build_yolo_dataset(
+    base,
+    output_mode: str,
+    categories: dict,
+    train_ratio: float,
+    method: str = METHOD_AUTO,
+    progress_callback: Optional[Callable[[str, int, int], None]] = None,
+    is_canceled: Optional[Callable[[], bool]] = None,
+    start_time: Optional[datetime] = None,
+    preflight: bool = False,
+    seed: int = DEFAULT_SEED,
+) -> BuildResult:
+    """把資料夾內的 VOC XML 建成 ultralytics 可直接訓練的 YOLO dataset
+
+    Args:
+        base: 含圖片與 VOC XML 的資料夾
+        output_mode: MODE_BBOX / MODE_SEG / MODE_OBB
+        categories: class mapping 的快照 (label -> class_id)
+        train_ratio: train 所佔比例 (0~1)
+        method: 圖片的擺放方式 (materialize.METHOD_*); 預設自動挑 hardlink → reflink → 複製
+        progress_callback: (階段, 目前, 總數) -> None
+        is_canceled: 回傳 True 時在下一個檢查點中止, 並復原這次擺放的檔案
+        start_time: 輸出檔名用的時間戳; None 則用現在
+        preflight: 轉換前先檢查 (壞圖、尺寸不符、座標超出範圍、孤兒 XML),
+                   有錯誤的圖片連同 XML 移到隔離資料夾, 不進 dataset
+        seed: 切分 train / val 的隨機種子; seed 與比例不變時沿用上次的分配 (見 dataset_split)
+
+    Returns:
+        BuildResult: 建置結果; canceled 或 message 有值時表示沒有產出 dataset
+    """
+    base = Path(base)
+    start_time = start_time or datetime.now()
+    stamp = start_time.strftime("%Y_%m%d_%H%M%S")
+    result = BuildResult()
+    stage = STAGE_VALIDATE if preflight else STAGE_CONVERT
+
+    def report(current: int, total: int) -> None:
+        if progress_callback:
+            progress_callback(stage, current, total)
+
+    def check_canceled() -> None:
+        if is_canceled and is_canceled():
+            raise BuildCanceled()
+
+    # 擺放過的檔案 (op, src, dst), 取消時倒序復原
+    placed: list[tuple[str, Path, Path]] = []
+    try:
+        # 0) 檢查: 有錯誤的檔案先隔離, 之後的階段就看不到它們
+        if preflight:
+            result.validation = validate_dataset(
+                base,
+                include_splits=False,
+                quarantine=True,
+                progress_callback=report,
+                is_canceled=is_canceled,
+                start_time=start_time,
+            )
+            if result.validation.canceled:
+                raise BuildCanceled()
+            stage = STAGE_CONVERT
+
+        # 1) 轉換 VOC XML → YOLO txt (增量, 結果留在 labels/ 下)
+        labels_dir = base / YOLO_LABELS_FOLDER
+        labels_dir.mkdir(parents=True, exist_ok=True)
+        result.convert = file_h.convertVocInFolder(
+            str(base),
+            labels_dir,
+            progress_callback=report,
+            is_canceled=is_canceled,
+            mode=output_mode,
+            categories=categories,
+        )
+        if result.convert.canceled:
+            raise BuildCanceled()
+
+        # 寫入未對應的 class_name 記錄檔
+        not_matched = result.convert.not_matched
+        if not_matched:
+            result.not_match_path = base / f"not_match_{stamp}.txt"
+            with open(result.not_match_path, "w", encoding="utf-8") as f:
+                for image_filename, class_name in not_matched:
+                    f.write(f"{image_filename}\t{class_name}\n")
+            log.w(f"未對應的 class_name 已寫入: {result.not_match_path}")
+
+        # 2) 收集有對應 label 的圖片
+        stage = STAGE_SPLIT
+        check_canceled()
+        image_files = sorted(
+            f for f in base.iterdir() if f.is_file() and f.suffix.lower() in IMAGE_EXTS
+        )
+        report(0, len(image_files))
+        label_names = {p.name for p in labels_dir.glob("*.txt")}
+        paired = [f for f in image_files if f"{f.stem}.txt" in label_names]
+        report(len(image_files), len(image_files))
+        if not paired:
+            result.message = "沒有找到成功轉換的圖片/標籤配對"
+            return result
+
+        # 3) 依固定 seed 切分並擺放 (沿用上次的分配, 已經擺好的檔案略過)
+        stage = STAGE_MATERIALIZE
+        split = split_dataset(
+            [(f, labels_dir / f"{f.stem}.txt") for f in paired],
+            base,
+            ratios=(train_ratio, 1 - train_ratio),
+            seed=seed,
+            method=method,
+            placed=placed,
+            images_folder=YOLO_IMAGES_FOLDER,
+            labels_folder=YOLO_LABELS_FOLDER,
+            progress_callback=report,
+            is_canceled=is_canceled,
+        )
+        if split.canceled:
+            raise BuildCanceled()
+        result.placement = split.placement
+        result.split_skipped = split.skipped
+        result.train_count = split.counts["train"]
+        result.val_count = split.counts["val"]
+
+        # 4) 產生 dataset yaml (最後一步, 寫完就不再復原)
+        stage = STAGE_YAML
+        check_canceled()
+        # 反轉成 {id: name}，依 id 排序
+        result.id_to_name = dict(
+            sorted(((v, k) for k, v in categories.items()), key=lambda x: x[0])
+        )
+        result.yaml_name = f"dataset_{stamp}.yaml"
+        write_dataset_yaml(
+            base / result.yaml_name, base, result.id_to_name, split.counts, YOLO_IMAGES_FOLDER
+        )
+        report(1, 1)
+    except BuildCanceled:
+        result.canceled = True
+        result.canceled_stage = stage
+        undo_placed(placed)
+        if result.validation is not None:
+            undo_quarantine(result.validation)
+        if result.not_match_path is not None:
+            result.not_match_path.unlink(missing_ok=True)
+            result.not_match_path = None
+        log.i(f"dataset 建置已取消 (階段: {stage}, 復原 {len(placed)} 個檔案)")
+        return result
+    except Exception:
+        # 非預期的錯誤也不要留下半套 dataset; 錯誤本身交給呼叫端記錄與顯示
+        undo_placed(placed)
+        if result.validation is not None:
+            undo_quarantine(result.validation)
+        raise
+
+    log.i(
+        f"dataset built at {base}: train={result.train_count}, val={result.val_count}, "
+        f"yaml={result.yaml_name}, placement={dict(result.placement)}"
+    )
+    return result
+
+
+def placement_summary(placement: Counter) -> str:
+    """圖片擺放方式的摘要, 例如「hardlink 1200 張、複製 3 張」"""
+    return "、".join(f"{METHOD_NAMES.get(m, m)} {n} 張" for m, n in placement.most_common())
@@ -0,0 +1,323 @@
+# dataset 的 train / val / test 切分：固定 seed、thread pool 擺放檔案、中斷後從停下的地方續跑
+# 更新日期: 2026-10-19
+#
+# GUI 的 VOC to YOLO 建置與 src/for_training/split_dataset.py 共用這裡的實作。
+# 輸出結構與 ultralytics 的慣例相同: <output>/images/<split>/、<output>/labels/<split>/。
+# <output>/.split_manifest.json 記錄每張圖分到哪個 split 與當時的 seed / 比例:
+#   - 參數沒變: 沿用上次的分配, 已經擺好的檔案 (同一個 inode, 或大小與 mtime 相同) 直接略過,
+#     中斷後重跑只補做剩下的部分; 新增的圖片另外依比例分配, 原本的 val / test 不會被打散
+#   - 參數變了: 整批重新分配, 換了 split 的圖片先從舊位置刪掉, 不會同時出現在 train 與 val
+# 不碰 Qt, 進度以 (目前, 總數) 回報、取消以 is_canceled() 輪詢。
+from __future__ import annotations
+
+import json
+import os
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+from ruamel.yaml import YAML
+
+from src.utils.logger import getUniqueLogger
+from src.utils.materialize import METHOD_AUTO, METHOD_COPY, METHOD_MOVE, materialize_files
+
+log = getUniqueLogger(__file__)
+
+SPLIT_MANIFEST = ".split_manifest.json"
+SPLIT_MANIFEST_VERSION = 1
+# split 名稱, 與 ratios 的順序對應
+SPLIT_NAMES = ("train", "val", "test")
+DEFAULT_SEED = 42
+DEFAULT_IMAGES_FOLDER = "images"
+DEFAULT_LABELS_FOLDER = "labels"
+
+
+@dataclass
+class SplitResult:
+    """切分的結果"""
+
+    counts: dict[str, int] = field(default_factory=dict)   # split -> 圖片數
+    placement: Counter = field(default_factory=Counter)    # 圖片實際的擺放方式 -> 張數 (不含略過的)
+    skipped: int = 0        # 已經擺好而略過的檔案數 (圖片 + 標籤)
+    kept: int = 0           # 沿用上次分配的圖片數
+    removed: int = 0        # 換了 split 或來源已刪除, 從舊位置刪掉的檔案數
+    canceled: bool = False
+
+
+def normalize_ratios(ratios: Sequence[float]) -> tuple[float, ...]:
+    """檢查比例並正規化成總和 1; 長度必須是 2 (train, val) 或 3 (train, val, test)
+
+    Raises:
+        ValueError: 長度不對、有負值或 train 為 0
+    """
+    if len(ratios) not in (2, 3):
+        raise ValueError(f"比例要有 2 或 3 個值 (train, val[, test]): {list(ratios)}")
+    if any(r < 0 for r in ratios) or ratios[0] <= 0:
+        raise ValueError(f"比例不可為負, 且 train 必須大於 0: {list(ratios)}")
+    total = sum(ratios)
+    return tuple(r / total for r in ratios)
+
+
+def split_counts(n: int, ratios: Sequence[float]) -> list[int]:
+    """n 張圖依比例分到各 split 的張數
+
+    各 split 先取 int(n × 比例), train 至少 1 張, 除不盡的餘數給最後一個比例不為 0 的 split
+    (train / val 兩段時與先前 GUI 的切法相同)。
+    """
+    counts = [int(n * r) for r in ratios]
+    if n and not counts[0]:
+        counts[0] = 1
+    last = max(i for i, r in enumerate(ratios) if r > 0)
+    counts[last] += n - sum(counts)
+    return counts
+
+
+def assign_splits(names: Sequence[str], ratios: Sequence[float], seed: int) -> dict[str, str]:
+    """把檔名依比例隨機分到各 split
+
+    先排序再用獨立的 random.Random(seed) 洗牌, 結果只取決於檔名集合與 seed,
+    與掃描順序、全域的 random 狀態無關。
+
+    Returns:
+        檔名 -> split 名稱
+    """
+    order = sorted(names)
+    random.Random(seed).shuffle(order)
+    assignments: dict[str, str] = {}
+    start = 0
+    for split_name, count in zip(SPLIT_NAMES, split_counts(len(order), ratios)):
+        for name in order[start:start + count]:
+            assignments[name] = split_name
+        start += count
+    return assignments
+
+
+def load_split_manifest(output) -> dict:
+    """讀取上次的切分記錄; 不存在或格式不符時回傳空 dict"""
+    path = Path(output) / SPLIT_MANIFEST
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        log.w(f"切分記錄無法讀取, 整批重新分配: {path} ({e})")
+        return {}
+    if data.get("version") != SPLIT_MANIFEST_VERSION:
+        return {}
+    return data
+
+
+def save_split_manifest(output, manifest: dict) -> None:
+    """寫入切分記錄 (先寫暫存檔再取代, 中斷時不會留下寫一半的檔案)"""
+    path = Path(output) / SPLIT_MANIFEST
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _is_current(src: Path, dst: Path) -> bool:
+    """dst 是否已經是 src 擺好的結果 (續跑時略過)
+
+    hardlink / symlink 指向同一個 inode; 複製 (copy2) 與 reflink 會保留 mtime, 以大小 + mtime 判斷;
+    搬移過的 src 已不存在, dst 在就算完成。
+    """
+    try:
+        d = os.stat(dst)
+    except OSError:
+        return False
+    try:
+        s = os.stat(src)
+    except FileNotFoundError:
+        return True
+    if (s.st_dev, s.st_ino) == (d.st_dev, d.st_ino):
+        return True
+    return s.st_size == d.st_size and s.st_mtime_ns == d.st_mtime_ns
+
+
+def _remove_stale(paths: list[Path]) -> int:
+    """刪掉不該再留在 dataset 裡的檔案
+
+    Returns:
+        實際刪掉的檔案數
+    """
+    removed = 0
+    for path in paths:
+        try:
+            if os.path.lexists(path):
+                path.unlink()
+                removed += 1
+        except OSError as e:
+            log.w(f"無法刪除舊的切分結果 {path}: {e}")
+    return removed
+
+
+def split_dataset(
+    pairs: Sequence[tuple[Path, Optional[Path]]],
+    output,
+    ratios: Sequence[float] = (0.8, 0.2),
+    seed: int = DEFAULT_SEED,
+    method: str = METHOD_AUTO,
+    placed: Optional[list[tuple[str, Path, Path]]] = None,
+    images_folder: str = DEFAULT_IMAGES_FOLDER,
+    labels_folder: str = DEFAULT_LABELS_FOLDER,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    is_canceled: Optional[Callable[[], bool]] = None,
+) -> SplitResult:
+    """把 (圖片, 標籤) 依比例切到 <output>/images/<split>/ 與 <output>/labels/<split>/
+
+    圖片的擺放方式見 materialize.materialize_files; 標籤一律複製 (檔案小, 而且來源的 txt
+    可能之後被原地改寫, 不能共用 inode)。切分記錄在開始擺放前就寫好, 中途取消或被中斷,
+    下次以相同參數執行會沿用同一份分配、只補做還沒擺好的檔案。
+
+    Args:
+        pairs: (圖片, 標籤); 標籤為 None 的當作背景圖, 只擺圖片
+        output: 輸出資料夾
+        ratios: (train, val) 或 (train, val, test) 的比例, 會正規化成總和 1
+        seed: 洗牌用的隨機種子
+        method: 圖片的擺放方式 (materialize.METHOD_*)
+        placed: 這次新擺放的 (方式, src, dst) 會附加到這裡, 供呼叫端取消時復原
+        images_folder: 圖片的子資料夾名稱
+        labels_folder: 標籤的子資料夾名稱
+        progress_callback: (已完成的檔案數, 總數) -> None
+        is_canceled: 每批檔案完成後檢查; 回傳 True 時停止
+
+    Returns:
+        SplitResult
+
+    Raises:
+        ValueError: 比例不合法, 或圖片檔名重複
+    """
+    ratios = normalize_ratios(ratios)
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    placed = placed if placed is not None else []
+    result = SplitResult()
+
+    sources: dict[str, tuple[Path, Optional[Path]]] = {}
+    for image, label in pairs:
+        image = Path(image)
+        if image.name in sources:
+            raise ValueError(f"圖片檔名重複, 無法放進同一個 split 資料夾: {image.name}")
+        sources[image.name] = (image, Path(label) if label is not None else None)
+
+    def image_dst(name: str, split_name: str) -> Path:
+        return output / images_folder / split_name / name
+
+    def label_dst(name: str, split_name: str) -> Path:
+        return output / labels_folder / split_name / f"{Path(name).stem}.txt"
+
+    # 1) 分配: 參數相同時沿用上次的結果, 只替新圖片分配
+    old = load_split_manifest(output)
+    old_assign: dict[str, str] = old.get("assignments", {})
+    # 搬移過的 dataset 裡的檔案就是唯一的一份: 之後不論用哪種方式重跑都不自動刪除
+    was_moved = old.get("method") == METHOD_MOVE
+    same_params = bool(old) and old.get("seed") == seed and old.get("ratios") == list(ratios)
+    if same_params:
+        # 上次搬移到一半中斷時, 已搬走的圖片不在來源裡了, 仍照舊留在分配中
+        assignments = {
+            n: s
+            for n, s in old_assign.items()
+            if n in sources or (was_moved and image_dst(n, s).exists())
+        }
+        result.kept = len(assignments)
+        new_names = [n for n in sources if n not in assignments]
+        assignments.update(assign_splits(new_names, ratios, seed))
+    else:
+        assignments = assign_splits(list(sources), ratios, seed)
+
+    # 換了 split 或來源已不在的舊結果刪掉
+    if old_assign and not was_moved:
+        stale = []
+        for name, split_name in old_assign.items():
+            if assignments.get(name) != split_name:
+                stale.append(image_dst(name, split_name))
+                stale.append(label_dst(name, split_name))
+        result.removed = _remove_stale(stale)
+
+    save_split_manifest(
+        output,
+        {
+            "version": SPLIT_MANIFEST_VERSION,
+            "seed": seed,
+            "ratios": list(ratios),
+            "method": METHOD_MOVE if was_moved else method,
+            "assignments": assignments,
+        },
+    )
+
+    # 2) 列出還沒擺好的檔案
+    result.counts = {name: 0 for name in SPLIT_NAMES[: len(ratios)]}
+    image_jobs: list[tuple[Path, Path]] = []
+    label_jobs: list[tuple[Path, Path]] = []
+    for name in sorted(assignments):
+        split_name = assignments[name]
+        result.counts[split_name] += 1
+        if name not in sources:
+            continue
+        image, label = sources[name]
+        jobs = [(image, image_dst(name, split_name), image_jobs)]
+        if label is not None:
+            jobs.append((label, label_dst(name, split_name), label_jobs))
+        for src, dst, queue in jobs:
+            if _is_current(src, dst):
+                result.skipped += 1
+            else:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                queue.append((src, dst))
+    if result.skipped:
+        log.i(f"切分: {result.skipped} 個檔案已經擺好, 略過")
+
+    # 3) 擺放
+    total = len(image_jobs) + len(label_jobs)
+
+    def report(offset: int) -> Optional[Callable[[int, int], None]]:
+        # 圖片與標籤分兩趟擺放, 進度合併成同一個總數
+        if progress_callback is None:
+            return None
+        return lambda n, _: progress_callback(offset + n, total)
+
+    if progress_callback:
+        progress_callback(0, total)
+    result.placement, canceled = materialize_files(
+        image_jobs, method, placed, progress_callback=report(0), is_canceled=is_canceled
+    )
+    if canceled:
+        result.canceled = True
+        return result
+    _, canceled = materialize_files(
+        label_jobs, METHOD_COPY, placed, progress_callback=report(len(image_jobs)), is_canceled=is_canceled
+    )
+    result.canceled = canceled
+    return result
+
+
+def write_dataset_yaml(
+    path,
+    dataset_root,
+    names: dict[int, str],
+    counts: dict[str, int],
+    images_folder: str = DEFAULT_IMAGES_FOLDER,
+) -> None:
+    """寫出 ultralytics 的 dataset yaml
+
+    Args:
+        path: yaml 的輸出路徑
+        dataset_root: yaml 內 path 欄位指向的資料夾
+        names: {class_id: name}
+        counts: split_dataset 回傳的各 split 張數; 沒有圖片的 split 不寫入
+        images_folder: 圖片的子資料夾名稱
+    """
+    data_yaml = {"path": str(Path(dataset_root).resolve())}
+    data_yaml["train"] = f"{images_folder}/train"
+    # ultralytics 要求 train/val 都必須存在；無 val split 時退回指向 train
+    data_yaml["val"] = f"{images_folder}/val" if counts.get("val") else f"{images_folder}/train"
+    if counts.get("test"):
+        data_yaml["test"] = f"{images_folder}/test"
+    data_yaml["nc"] = len(names)
+    data_yaml["names"] = names
+    with open(path, "w", encoding="utf-8") as f:
+        YAML().dump(data_yaml, f)
@@ -0,0 +1,159 @@
+# Dataset 統計：class 直方圖、框大小分布、每張圖物件數; 以標註 store 為快取只重算有變動的 XML
+# 更新日期: 2026-10-19
+#
+# 逐檔的部分結果就是 store 裡那幾筆紀錄 (以 mtime / size 判斷是否過期, 變動的 XML 交給
+# process pool 重新解析), 彙總則全部交給 SQL 的 GROUP BY, 不必把整個 dataset 讀進 Python。
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+
+from src.utils.annotation_store import AnnotationStore
+
+# 框大小分級 (沿用 COCO 的 small / medium / large: 面積 < 32² / < 96² / 其餘, 原圖 pixel)
+SIZE_SMALL = 32 * 32
+SIZE_MEDIUM = 96 * 96
+# 相對大小 sqrt(框面積 / 圖面積) 的分箱上界; 看得出是否多數是遠處的小目標
+REL_SIZE_BINS = (0.02, 0.05, 0.1, 0.2, 0.4, 1.0)
+# 每張圖物件數的分箱上界 (含); 超過最後一個歸到 ">"
+COUNT_BINS = (0, 1, 2, 5, 10, 20, 50)
+
+
+@dataclass
+class ClassStat:
+    """單一 class 的統計"""
+
+    label: str
+    class_id: int | None    # settings.class_names.categories 的對應; None 表示未對應
+    instances: int = 0      # 物件數
+    images: int = 0         # 含此 class 的圖片數
+    small: int = 0
+    medium: int = 0
+    large: int = 0
+    mean_rel_size: float = 0.0  # 平均相對大小 sqrt(框面積 / 圖面積)
+
+
+@dataclass
+class DatasetStats:
+    """整個資料夾的統計結果"""
+
+    n_files: int = 0        # XML 數
+    n_empty: int = 0        # 沒有任何物件的 XML (背景圖)
+    n_objects: int = 0
+    n_polygons: int = 0
+    n_rotated: int = 0      # angle != 0 的 bbox (OBB)
+    classes: list[ClassStat] = field(default_factory=list)
+    # (上界描述, 檔案數)
+    count_hist: list[tuple[str, int]] = field(default_factory=list)
+    rel_size_hist: list[tuple[str, int]] = field(default_factory=list)
+    unmapped: list[str] = field(default_factory=list)       # 有出現但不在 categories 的 label
+    unused: list[str] = field(default_factory=list)         # 在 categories 但沒出現的 label
+
+
+def compute_stats(store: AnnotationStore, categories: dict) -> DatasetStats:
+    """由 (已同步的) store 彙總統計
+
+    Args:
+        store: 資料夾的標註 store, 呼叫前請先 sync()
+        categories: settings.class_names.categories (label -> class_id)
+
+    Returns:
+        DatasetStats: 統計結果
+    """
+    c = store.conn
+    _ensure_sqrt(c)
+    stats = DatasetStats()
+    stats.n_files, stats.n_empty = c.execute(
+        "SELECT COUNT(*), COALESCE(SUM(n_objects = 0), 0) FROM files"
+    ).fetchone()
+    stats.n_objects, stats.n_polygons, stats.n_rotated = c.execute(
+        "SELECT COUNT(*), COALESCE(SUM(kind = 1), 0),"
+        " COALESCE(SUM(kind = 0 AND angle != 0), 0) FROM objects"
+    ).fetchone()
+
+    # NOT INDEXED: 整張表循序掃一次再排序, 比沿著 label 索引逐列回表快好幾倍;
+    # rel_area 為 0 表示該檔寬高缺失, 不列入平均
+    rows = c.execute(
+        """
+        SELECT label,
+               COUNT(*),
+               COUNT(DISTINCT file),
+               SUM(area < ?),
+               SUM(area >= ? AND area < ?),
+               SUM(area >= ?),
+               AVG(CASE WHEN rel_area > 0 THEN sqrt(rel_area) END)
+        FROM objects NOT INDEXED
+        GROUP BY label
+        ORDER BY COUNT(*) DESC, label
+        """,
+        (SIZE_SMALL, SIZE_SMALL, SIZE_MEDIUM, SIZE_MEDIUM),
+    ).fetchall()
+    seen = set()
+    for label, n, n_img, small, medium, large, rel in rows:
+        class_id = categories.get(label)
+        stats.classes.append(
+            ClassStat(
+                label=label,
+                class_id=class_id if isinstance(class_id, int) else None,
+                instances=n,
+                images=n_img,
+                small=small or 0,
+                medium=medium or 0,
+                large=large or 0,
+                mean_rel_size=rel or 0.0,
+            )
+        )
+        seen.add(label)
+    stats.unmapped = [s.label for s in stats.classes if s.class_id is None]
+    stats.unused = [label for label in categories if label not in seen]
+
+    per_file = dict(
+        c.execute("SELECT n_objects, COUNT(*) FROM files GROUP BY n_objects").fetchall()
+    )
+    stats.count_hist = _bin_counts(per_file, COUNT_BINS)
+
+    # 分箱在 SQL 裡做, 比較的是平方 (面積比), 省得每一列都開根號;
+    # 超出最後一個上界的 (polygon 畫出圖外) 併入最後一箱
+    cases = " ".join(
+        f"WHEN rel_area <= {upper * upper!r} THEN {i}"
+        for i, upper in enumerate(REL_SIZE_BINS)
+    )
+    rel_hist = dict(
+        c.execute(
+            f"""
+            SELECT CASE {cases} ELSE {len(REL_SIZE_BINS) - 1} END AS bin, COUNT(*)
+            FROM objects NOT INDEXED
+            WHERE rel_area > 0
+            GROUP BY bin
+            """
+        ).fetchall()
+    )
+    lower = 0.0
+    for i, upper in enumerate(REL_SIZE_BINS):
+        stats.rel_size_hist.append((f"{lower:g} ~ {upper:g}", rel_hist.get(i, 0)))
+        lower = upper
+    return stats
+
+
+def _ensure_sqrt(conn) -> None:
+    """sqlite 的數學函式要編譯時開啟才有 (各平台的 Python 不一定), 沒有才自己註冊
+
+    內建版本是 C 實作, 能用就用; Python 版每列都要回呼一次, 50 萬列會慢上數秒。
+    """
+    try:
+        conn.execute("SELECT sqrt(4.0)").fetchone()
+    except Exception:
+        conn.create_function("sqrt", 1, math.sqrt, deterministic=True)
+
+
+def _bin_counts(per_value: dict[int, int], bins: tuple[int, ...]) -> list[tuple[str, int]]:
+    """把 {物件數: 檔案數} 依分箱上界累加成直方圖"""
+    result = []
+    lower = 0
+    for upper in bins:
+        n = sum(cnt for v, cnt in per_value.items() if lower <= v <= upper)
+        result.append((str(upper) if lower == upper else f"{lower} ~ {upper}", n))
+        lower = upper + 1
+    n = sum(cnt for v, cnt in per_value.items() if v >= lower)
+    result.append((f"≥ {lower}", n))
+    return result
@@ -0,0 +1,717 @@
+# dataset 訓練前檢查：壞圖、XML 尺寸不符、框超出範圍、零面積、孤兒檔、跨 split 重名
+# 更新日期: 2026-10-19
+#
+# 訓練跑了幾個小時才在某張壞掉的 JPEG 或超出 0~1 的 label 上出錯, 不如事先整批檢查一次。
+# 逐檔的檢查 (讀圖檔頭、解析 XML / txt) 丟進 process pool; 孤兒檔與跨 split 重名只看檔名,
+# 在主行程做。結果寫成 JSON 報告, 可選擇把有錯誤的檔案整組移到隔離資料夾。
+# 不碰 Qt、不讀 settings, 由呼叫端的 QThread 或命令列驅動。
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import struct
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.utils import geometry
+from src.utils.const import IMAGE_EXTS
+from src.utils.logger import getUniqueLogger
+from src.utils.parallel import chunked, default_workers, ordered_results
+from src.utils.voc import KIND_POLYGON, parse_voc_xml
+
+log = getUniqueLogger(__file__)
+
+# 每批樣本數; 只讀檔頭時一批不到 10 ms, 完整解碼時約 1 秒
+CHUNK_SIZE = 64
+# 少於這個數量就在本 process 檢查
+PARALLEL_THRESHOLD = 300
+
+REPORT_VERSION = 1
+# 隔離資料夾名稱的前綴, 放在受檢資料夾底下 (掃描時不會進去)
+QUARANTINE_PREFIX = "_quarantine_"
+
+# 與 dataset_builder 的輸出結構一致: images/<split>/ 對 labels/<split>/
+YOLO_IMAGES_FOLDER = "images"
+YOLO_LABELS_FOLDER = "labels"
+# 受檢資料夾本身 (圖片與 VOC XML 放在一起) 的 split 名稱
+SPLIT_SOURCE = "."
+
+SEVERITY_ERROR = "error"        # 訓練會中斷、或標註會被 ultralytics 整份丟掉
+SEVERITY_WARNING = "warning"    # 能訓練, 但多半不是刻意的
+
+ISSUE_IMAGE_UNREADABLE = "image_unreadable"
+ISSUE_IMAGE_CORRUPT = "image_corrupt"
+ISSUE_IMAGE_TRUNCATED = "image_truncated"
+ISSUE_XML_INVALID = "xml_invalid"
+ISSUE_SIZE_MISMATCH = "size_mismatch"
+ISSUE_OUT_OF_BOUNDS = "out_of_bounds"
+ISSUE_ZERO_AREA = "zero_area"
+ISSUE_LABEL_FORMAT = "label_format"
+ISSUE_UNKNOWN_CLASS = "unknown_class"
+ISSUE_DUPLICATE_LABEL = "duplicate_label"
+ISSUE_ORPHAN_XML = "orphan_xml"
+ISSUE_ORPHAN_LABEL = "orphan_label"
+ISSUE_ORPHAN_IMAGE = "orphan_image"
+ISSUE_DUPLICATE_NAME = "duplicate_name"
+ISSUE_CHECK_FAILED = "check_failed"
+ISSUE_NAMES = {
+    ISSUE_IMAGE_UNREADABLE: "圖檔無法辨識",
+    ISSUE_IMAGE_CORRUPT: "圖檔無法解碼",
+    ISSUE_IMAGE_TRUNCATED: "圖檔結尾不完整",
+    ISSUE_XML_INVALID: "XML 無法解析",
+    ISSUE_SIZE_MISMATCH: "XML 尺寸與圖片不符",
+    ISSUE_OUT_OF_BOUNDS: "座標超出範圍",
+    ISSUE_ZERO_AREA: "面積為 0",
+    ISSUE_LABEL_FORMAT: "txt 格式錯誤",
+    ISSUE_UNKNOWN_CLASS: "class id 不在 mapping",
+    ISSUE_DUPLICATE_LABEL: "重複的標註行",
+    ISSUE_ORPHAN_XML: "XML 沒有對應圖片",
+    ISSUE_ORPHAN_LABEL: "txt 沒有對應圖片",
+    ISSUE_ORPHAN_IMAGE: "圖片沒有標註",
+    ISSUE_DUPLICATE_NAME: "檔名重複",
+    ISSUE_CHECK_FAILED: "檢查失敗",
+}
+
+# worker 端的檢查參數, 由 _init_worker 設定
+_job_args: tuple[str, bool, frozenset | None] | None = None
+
+
+@dataclass(slots=True)
+class Sample:
+    """同一個 split 裡同名 (stem) 的一組檔案; 不存在的為 None"""
+
+    split: str
+    stem: str
+    image: Optional[str] = None
+    xml: Optional[str] = None
+    txt: Optional[str] = None
+    extra_images: list[str] = field(default_factory=list)  # 同 stem 的其他圖片 (a.jpg + a.png)
+
+    def files(self) -> list[str]:
+        """這組實際存在的檔案"""
+        return [p for p in (self.image, *self.extra_images, self.xml, self.txt) if p]
+
+
+@dataclass(slots=True)
+class Issue:
+    """單一問題; path 為相對於受檢資料夾的路徑 (/ 分隔)"""
+
+    path: str
+    code: str
+    severity: str
+    detail: str = ""
+
+
+@dataclass
+class ValidationReport:
+    """一次檢查的結果"""
+
+    folder: str = ""
+    full_decode: bool = False
+    samples: int = 0
+    images: int = 0
+    xml_files: int = 0
+    label_files: int = 0
+    issues: list[Issue] = field(default_factory=list)
+    quarantined: list[tuple[str, str]] = field(default_factory=list)  # (原路徑, 隔離後路徑)
+    quarantine_dir: Optional[Path] = None
+    report_path: Optional[Path] = None
+    canceled: bool = False
+
+    @property
+    def errors(self) -> int:
+        return sum(1 for i in self.issues if i.severity == SEVERITY_ERROR)
+
+    @property
+    def warnings(self) -> int:
+        return sum(1 for i in self.issues if i.severity == SEVERITY_WARNING)
+
+    def summary(self) -> str:
+        """一行摘要"""
+        text = (
+            f"{self.samples} 組檔案 (圖片 {self.images}、XML {self.xml_files}、"
+            f"txt {self.label_files}): 錯誤 {self.errors}、警告 {self.warnings}"
+        )
+        if self.quarantined:
+            text += f", 已隔離 {len(self.quarantined)} 個檔案"
+        return text
+
+    def to_dict(self) -> dict:
+        """JSON 報告的內容"""
+        return {
+            "version": REPORT_VERSION,
+            "folder": self.folder,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "full_decode": self.full_decode,
+            "summary": {
+                "samples": self.samples,
+                "images": self.images,
+                "xml": self.xml_files,
+                "labels": self.label_files,
+                "errors": self.errors,
+                "warnings": self.warnings,
+                "by_code": dict(Counter(i.code for i in self.issues).most_common()),
+            },
+            "issues": [
+                {"path": i.path, "code": i.code, "severity": i.severity, "detail": i.detail}
+                for i in self.issues
+            ],
+            "quarantine_dir": str(self.quarantine_dir) if self.quarantine_dir else None,
+            "quarantined": [{"from": s, "to": d} for s, d in self.quarantined],
+        }
+
+
+# --- 圖檔頭 ---
+
+
+def _jpeg_size(f) -> tuple[int, int]:
+    """沿著 marker 找 SOF (EXIF 等 APP 段直接跳過, 不必整段讀進來)"""
+    f.seek(2)
+    while True:
+        b = f.read(1)
+        while b and b != b"\xff":
+            b = f.read(1)
+        while b == b"\xff":
+            b = f.read(1)
+        if not b:
+            raise ValueError("找不到 SOF marker")
+        marker = b[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            continue  # 沒有長度欄位的 marker
+        if marker in (0xD9, 0xDA):
+            raise ValueError("SOF 之前就到了影像資料")
+        seg = f.read(2)
+        if len(seg) < 2:
+            raise ValueError("marker 長度不完整")
+        length = struct.unpack(">H", seg)[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            data = f.read(5)
+            if len(data) < 5:
+                raise ValueError("SOF 不完整")
+            height, width = struct.unpack(">xHH", data)
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _tiff_size(f, head: bytes) -> tuple[int, int]:
+    """讀第一個 IFD 的 ImageWidth (256) / ImageLength (257)"""
+    endian = "<" if head[:2] == b"II" else ">"
+    f.seek(struct.unpack(endian + "I", head[4:8])[0])
+    count = struct.unpack(endian + "H", f.read(2))[0]
+    dims = {}
+    for _ in range(count):
+        entry = f.read(12)
+        if len(entry) < 12:
+            break
+        tag, typ = struct.unpack(endian + "HH", entry[:4])
+        if tag in (256, 257):
+            fmt = "H" if typ == 3 else "I"
+            dims[tag] = struct.unpack(endian + fmt, entry[8:8 + struct.calcsize(fmt)])[0]
+    if 256 not in dims or 257 not in dims:
+        raise ValueError("TIFF 缺少寬高欄位")
+    return dims[256], dims[257]
+
+
+def probe_image(path) -> tuple[str, int, int, bool]:
+    """只讀檔頭取得圖片寬高, 不解碼像素; 格式以 magic bytes 判斷 (不看副檔名)
+
+    Args:
+        path: 圖檔路徑
+
+    Returns:
+        (格式, 寬, 高, 結尾是否完整): JPEG 檢查 EOI、PNG 檢查 IEND; 其他格式一律視為完整
+
+    Raises:
+        ValueError: 無法辨識的格式或檔頭損毀
+    """
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head[:3] == b"\xff\xd8\xff":
+            fmt = "jpeg"
+            width, height = _jpeg_size(f)
+            f.seek(-2, os.SEEK_END)
+            complete = f.read(2) == b"\xff\xd9"
+        elif head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+            fmt = "png"
+            width, height = struct.unpack(">II", head[16:24])
+            f.seek(-8, os.SEEK_END)
+            complete = f.read(4) == b"IEND"
+        elif head[:6] in (b"GIF87a", b"GIF89a"):
+            fmt = "gif"
+            width, height = struct.unpack("<HH", head[6:10])
+            complete = True
+        elif head[:2] == b"BM" and len(head) >= 26:
+            fmt = "bmp"
+            width, height = struct.unpack("<ii", head[18:26])
+            height = abs(height)  # 負值表示由上而下存放
+            complete = True
+        elif head[:4] in (b"II*\x00", b"MM\x00*"):
+            fmt = "tiff"
+            width, height = _tiff_size(f, head)
+            complete = True
+        else:
+            raise ValueError("無法辨識的圖檔格式")
+    if width <= 0 or height <= 0:
+        raise ValueError(f"檔頭的尺寸無效 ({width}x{height})")
+    return fmt, width, height, complete
+
+
+def _decode_size(path) -> Optional[tuple[int, int]]:
+    """完整解碼 (與 ImageWidget、ultralytics 相同走 OpenCV, 含 EXIF 轉正); 失敗回傳 None"""
+    # 只有完整解碼才需要 cv2, 只讀檔頭時不必讓每個 worker 都載入
+    from src.utils.func import imread_unicode
+
+    img = imread_unicode(path)
+    if img is None:
+        return None
+    return img.shape[1], img.shape[0]
+
+
+# --- 逐檔檢查 (worker) ---
+
+
+def _check_image(rel: str, path: str, full_decode: bool, issues: list[Issue]):
+    """檢查圖檔, 回傳 (寬, 高, 尺寸是否已套用 EXIF 轉正); 讀不到時回傳 None"""
+    try:
+        fmt, width, height, complete = probe_image(path)
+    except Exception as e:
+        issues.append(Issue(rel, ISSUE_IMAGE_UNREADABLE, SEVERITY_ERROR, str(e)))
+        return None
+    if not complete:
+        # PNG 少了 IEND 多半是寫到一半; JPEG 缺 EOI 時 ultralytics 會自行補上並改寫原檔
+        severity = SEVERITY_ERROR if fmt == "png" else SEVERITY_WARNING
+        issues.append(
+            Issue(rel, ISSUE_IMAGE_TRUNCATED, severity, f"{fmt} 檔案結尾缺少結束標記")
+        )
+    if not full_decode:
+        return width, height, False
+    try:
+        decoded = _decode_size(path)
+    except Exception as e:
+        decoded = None
+        log.e(f"解碼失敗 {path}: {e}")
+    if decoded is None:
+        issues.append(Issue(rel, ISSUE_IMAGE_CORRUPT, SEVERITY_ERROR, "OpenCV 無法解碼"))
+        return None
+    return decoded[0], decoded[1], True
+
+
+def _check_xml(rel: str, path: str, image_size, issues: list[Issue]) -> None:
+    """檢查 VOC XML: <size> 與圖片一致、框與 polygon 在圖內、沒有零面積"""
+    ann = parse_voc_xml(path)
+    if ann is None:
+        issues.append(Issue(rel, ISSUE_XML_INVALID, SEVERITY_ERROR, "無法解析或缺少 <size>"))
+        return
+    w, h = ann.width, ann.height
+    if w <= 0 or h <= 0:
+        issues.append(Issue(rel, ISSUE_XML_INVALID, SEVERITY_ERROR, f"<size> 無效 ({w}x{h})"))
+        return
+    if image_size is not None:
+        iw, ih, oriented = image_size
+        if (iw, ih) != (w, h):
+            if not oriented and (ih, iw) == (w, h):
+                # 檔頭是感光元件的原始方向; 畫面與訓練都會依 EXIF 轉正, 只看檔頭分不出來
+                issues.append(Issue(
+                    rel, ISSUE_SIZE_MISMATCH, SEVERITY_WARNING,
+                    f"XML {w}x{h}, 圖檔頭 {iw}x{ih} (寬高對調, 多半是 EXIF 旋轉; 勾選完整解碼可確認)",
+                ))
+            else:
+                issues.append(Issue(
+                    rel, ISSUE_SIZE_MISMATCH, SEVERITY_ERROR, f"XML {w}x{h}, 圖片 {iw}x{ih}"
+                ))
+
+    polygons = []
+    for k, o in enumerate(ann.objects, 1):
+        name = f"物件 {k} ({o.label})"
+        if o.kind == KIND_POLYGON:
+            if len(o.points) < 3:
+                issues.append(Issue(rel, ISSUE_ZERO_AREA, SEVERITY_ERROR, f"{name}: 少於 3 個點"))
+                continue
+            polygons.append((name, o.points))
+            if o.xmin < 0 or o.ymin < 0 or o.xmax > w or o.ymax > h:
+                issues.append(Issue(rel, ISSUE_OUT_OF_BOUNDS, SEVERITY_ERROR, f"{name}: 頂點超出圖片"))
+            continue
+        if o.xmax <= o.xmin or o.ymax <= o.ymin:
+            issues.append(Issue(rel, ISSUE_ZERO_AREA, SEVERITY_ERROR, f"{name}: 寬或高為 0"))
+            continue
+        if o.angle % 360:
+            # 旋轉框只有輸出 OBB 時會用到角點; bbox 模式輸出的是未旋轉的框, 所以只列警告
+            corners = geometry.corners_one(o.xmin, o.ymin, o.xmax, o.ymax, o.angle)
+            if any(x < -0.5 or y < -0.5 or x > w + 0.5 or y > h + 0.5 for x, y in corners):
+                issues.append(Issue(
+                    rel, ISSUE_OUT_OF_BOUNDS, SEVERITY_WARNING,
+                    f"{name}: 旋轉後的角點超出圖片 (輸出 OBB 時座標會超出 0~1)",
+                ))
+        elif o.xmin < 0 or o.ymin < 0 or o.xmax > w or o.ymax > h:
+            issues.append(Issue(rel, ISSUE_OUT_OF_BOUNDS, SEVERITY_ERROR, f"{name}: 框超出圖片"))
+    _check_polygon_areas(rel, polygons, issues)
+
+
+def _check_polygon_areas(rel: str, polygons: list[tuple[str, list]], issues: list[Issue]) -> None:
+    """整個檔案的 polygon 面積一次算完, 面積為 0 (所有點共線或重疊) 的列為錯誤"""
+    if not polygons:
+        return
+    areas = geometry.polygons_area(*geometry.pack_polygons(pts for _, pts in polygons))
+    for (name, _), area in zip(polygons, areas.tolist()):
+        if area <= 0:
+            issues.append(Issue(rel, ISSUE_ZERO_AREA, SEVERITY_ERROR, f"{name}: polygon 面積為 0"))
+
+
+def _check_txt(rel: str, path: str, class_ids: Optional[frozenset], issues: list[Issue]) -> None:
+    """檢查 YOLO txt: 欄位數、class id、座標在 0~1、沒有零面積與重複行
+
+    規則對齊 ultralytics 載入 label 時的檢查; 任何一行不合格, ultralytics 會把整份 label 丟掉。
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        issues.append(Issue(rel, ISSUE_LABEL_FORMAT, SEVERITY_ERROR, f"無法讀取: {e}"))
+        return
+    seen = set()
+    polygons = []
+    for n, line in enumerate(text.splitlines(), 1):
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            cid = int(parts[0])
+            values = [float(v) for v in parts[1:]]
+        except ValueError:
+            issues.append(Issue(rel, ISSUE_LABEL_FORMAT, SEVERITY_ERROR, f"第 {n} 行含非數字"))
+            continue
+        ncol = len(values)
+        if ncol != 4 and (ncol < 6 or ncol % 2):
+            issues.append(Issue(
+                rel, ISSUE_LABEL_FORMAT, SEVERITY_ERROR,
+                f"第 {n} 行有 {ncol} 個座標 (bbox 為 4 個, polygon / OBB 至少 3 點)",
+            ))
+            continue
+        if cid < 0 or (class_ids is not None and cid not in class_ids):
+            issues.append(Issue(rel, ISSUE_UNKNOWN_CLASS, SEVERITY_ERROR, f"第 {n} 行 class {cid}"))
+        if min(values) < 0 or max(values) > 1:
+            issues.append(Issue(rel, ISSUE_OUT_OF_BOUNDS, SEVERITY_ERROR, f"第 {n} 行座標不在 0~1"))
+        if ncol == 4:
+            if values[2] <= 0 or values[3] <= 0:
+                issues.append(Issue(rel, ISSUE_ZERO_AREA, SEVERITY_ERROR, f"第 {n} 行寬或高為 0"))
+        else:
+            polygons.append((f"第 {n} 行", list(zip(values[0::2], values[1::2]))))
+        key = tuple(parts)
+        if key in seen:
+            issues.append(Issue(
+                rel, ISSUE_DUPLICATE_LABEL, SEVERITY_WARNING, f"第 {n} 行與前面重複 (ultralytics 會刪掉)"
+            ))
+        seen.add(key)
+    _check_polygon_areas(rel, polygons, issues)
+
+
+def _relpath(path: str, root: str) -> str:
+    """相對於受檢資料夾、以 / 分隔的路徑 (報告在各平台長得一樣)"""
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def _check_sample(sample: Sample, root: str, full_decode: bool, class_ids) -> list[Issue]:
+    """檢查一組檔案的內容 (孤兒與重名另外在主行程判斷)"""
+    issues: list[Issue] = []
+    image_size = None
+    if sample.image:
+        image_size = _check_image(_relpath(sample.image, root), sample.image, full_decode, issues)
+    for extra in sample.extra_images:
+        _check_image(_relpath(extra, root), extra, full_decode, issues)
+    if sample.xml:
+        _check_xml(_relpath(sample.xml, root), sample.xml, image_size, issues)
+    if sample.txt:
+        _check_txt(_relpath(sample.txt, root), sample.txt, class_ids, issues)
+    return issues
+
+
+def _init_worker(root: str, full_decode: bool, class_ids: Optional[frozenset]) -> None:
+    """pool initializer: 每個 worker 只收一次檢查參數"""
+    global _job_args
+    _job_args = (root, full_decode, class_ids)
+
+
+def _check_chunk(samples: list[Sample]) -> list[list[Issue]]:
+    """worker: 檢查一批樣本 (模組層級函式才能被 pickle)
+
+    Returns:
+        list: 與 samples 同順序, 每組的問題清單
+    """
+    root, full_decode, class_ids = _job_args
+    results = []
+    for sample in samples:
+        try:
+            results.append(_check_sample(sample, root, full_decode, class_ids))
+        except Exception as e:
+            # 檢查本身出錯也要列在報告裡, 不能讓這組檔案看起來像是通過了
+            log.e(f"檢查失敗 {sample.files()}: {e}")
+            results.append([
+                Issue(_relpath(sample.files()[0], root), ISSUE_CHECK_FAILED, SEVERITY_ERROR, str(e))
+            ])
+    return results
+
+
+# --- 掃描與檔名層級的檢查 (主行程) ---
+
+
+def collect_samples(folder, include_splits: bool = True) -> list[Sample]:
+    """掃描資料夾, 把同一個 split 裡同名的圖片 / XML / txt 湊成一組
+
+    * 受檢資料夾本身 (split 為 ".")：圖片、VOC XML 與存檔時輸出的 YOLO txt 放在一起;
+      沒有同名圖片或 XML 的 txt (not_match_*.txt 之類) 不當成 label
+    * images/<split>/ 對 labels/<split>/ (VOC to YOLO 的輸出結構)
+
+    Args:
+        folder: 受檢資料夾
+        include_splits: 是否一併檢查 images/<split>/ 與 labels/<split>/
+
+    Returns:
+        list[Sample]: 依 split、檔名排序
+    """
+    base = Path(folder)
+    groups = [(SPLIT_SOURCE, base, base)]
+    img_root = base / YOLO_IMAGES_FOLDER
+    if include_splits and img_root.is_dir():
+        for d in sorted(p for p in img_root.iterdir() if p.is_dir()):
+            groups.append((d.name, d, base / YOLO_LABELS_FOLDER / d.name))
+
+    samples: list[Sample] = []
+    for split, img_dir, label_dir in groups:
+        by_stem: dict[str, Sample] = {}
+        for f in sorted(img_dir.iterdir()):
+            if not f.is_file() or f.suffix.lower() not in IMAGE_EXTS:
+                continue
+            sample = by_stem.setdefault(f.stem, Sample(split, f.stem))
+            if sample.image is None:
+                sample.image = str(f)
+            else:
+                sample.extra_images.append(str(f))
+        if split == SPLIT_SOURCE:
+            for f in sorted(base.glob("*.xml")):
+                by_stem.setdefault(f.stem, Sample(split, f.stem)).xml = str(f)
+        if label_dir.is_dir():
+            for f in sorted(label_dir.glob("*.txt")):
+                sample = by_stem.get(f.stem)
+                if sample is None:
+                    if split == SPLIT_SOURCE:
+                        continue
+                    sample = by_stem.setdefault(f.stem, Sample(split, f.stem))
+                sample.txt = str(f)
+        samples.extend(sorted(by_stem.values(), key=lambda s: s.stem))
+    return samples
+
+
+def _name_issues(samples: list[Sample], root: str) -> list[list[Issue]]:
+    """只看檔名就能判斷的問題: 孤兒檔、同名不同副檔名、跨 split 重名
+
+    Returns:
+        list: 與 samples 同順序, 每組的問題清單
+    """
+    results: list[list[Issue]] = [[] for _ in samples]
+    splits_of: dict[str, list[int]] = defaultdict(list)
+    for idx, s in enumerate(samples):
+        issues = results[idx]
+        for extra in s.extra_images:
+            issues.append(Issue(
+                _relpath(extra, root), ISSUE_DUPLICATE_NAME, SEVERITY_ERROR,
+                f"與 {Path(s.image).name} 同名, 標註只會配對到其中一張",
+            ))
+        if s.image is None:
+            if s.xml:
+                issues.append(Issue(_relpath(s.xml, root), ISSUE_ORPHAN_XML, SEVERITY_ERROR))
+            if s.txt:
+                issues.append(Issue(_relpath(s.txt, root), ISSUE_ORPHAN_LABEL, SEVERITY_ERROR))
+            continue
+        if s.xml is None and s.txt is None:
+            detail = "轉換時不會納入" if s.split == SPLIT_SOURCE else "訓練時視為背景圖"
+            issues.append(Issue(_relpath(s.image, root), ISSUE_ORPHAN_IMAGE, SEVERITY_WARNING, detail))
+        if s.split != SPLIT_SOURCE:
+            splits_of[s.stem].append(idx)
+
+    # 同一張圖同時出現在 train 與 val, 驗證分數會虛高
+    for indices in splits_of.values():
+        if len(indices) < 2:
+            continue
+        for idx in indices:
+            others = ", ".join(samples[j].split for j in indices if j != idx)
+            results[idx].append(Issue(
+                _relpath(samples[idx].image, root), ISSUE_DUPLICATE_NAME, SEVERITY_ERROR,
+                f"也出現在 {others}",
+            ))
+    return results
+
+
+def _run_checks(
+    samples: list[Sample],
+    root: str,
+    full_decode: bool,
+    class_ids: Optional[frozenset],
+    workers: Optional[int],
+    progress_callback: Optional[Callable[[int, int], None]],
+    is_canceled: Optional[Callable[[], bool]],
+) -> tuple[list[list[Issue]], bool]:
+    """逐組檢查內容; 數量夠多時以 process pool 平行處理, 結果依 samples 的順序取回"""
+    total = len(samples)
+    chunks = chunked(samples, CHUNK_SIZE)
+    results: list[list[Issue]] = []
+    init_args = (root, full_decode, class_ids)
+
+    def _consume(chunk_results) -> bool:
+        for chunk_result in chunk_results:
+            results.extend(chunk_result)
+            if progress_callback:
+                progress_callback(len(results), total)
+            if is_canceled and is_canceled():
+                return True
+        return False
+
+    if total < PARALLEL_THRESHOLD or default_workers(workers) <= 1:
+        _init_worker(*init_args)
+        return results, _consume(_check_chunk(chunk) for chunk in chunks)
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=init_args
+    ) as pool:
+        canceled = _consume(ordered_results(pool, _check_chunk, chunks, workers))
+        if canceled:
+            pool.shutdown(wait=True, cancel_futures=True)
+    return results, canceled
+
+
+def quarantine_samples(
+    samples: list[Sample], root: Path, quarantine_dir: Path
+) -> list[tuple[str, str]]:
+    """把樣本的所有檔案搬到隔離資料夾, 保留相對路徑 (之後要放回去只需整個搬回)
+
+    Returns:
+        list: 成功搬移的 (原相對路徑, 隔離後相對路徑)
+    """
+    moved = []
+    for sample in samples:
+        for src in sample.files():
+            rel = _relpath(src, str(root))
+            dst = quarantine_dir / rel
+            try:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(src, dst)
+                moved.append((rel, _relpath(str(dst), str(root))))
+            except Exception as e:
+                log.e(f"隔離失敗 {src} → {dst}: {e}")
+    return moved
+
+
+def undo_quarantine(report: ValidationReport) -> None:
+    """把隔離的檔案搬回原位並刪掉報告 (建置取消時用, 讓資料夾回到檢查前的樣子)"""
+    base = Path(report.folder)
+    for rel, qrel in reversed(report.quarantined):
+        try:
+            shutil.move(base / qrel, base / rel)
+        except Exception as e:
+            log.e(f"放回隔離檔案失敗 {qrel} → {rel}: {e}")
+    report.quarantined = []
+    if report.quarantine_dir is not None:
+        # 只刪空的子資料夾; 放回失敗的檔案留在原處
+        for d in sorted(report.quarantine_dir.rglob("*"), reverse=True):
+            if d.is_dir() and not any(d.iterdir()):
+                d.rmdir()
+        if report.quarantine_dir.is_dir() and not any(report.quarantine_dir.iterdir()):
+            report.quarantine_dir.rmdir()
+    if report.report_path is not None:
+        report.report_path.unlink(missing_ok=True)
+        report.report_path = None
+
+
+def validate_dataset(
+    folder,
+    full_decode: bool = False,
+    class_ids: Optional[set[int]] = None,
+    include_splits: bool = True,
+    quarantine: bool = False,
+    workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    is_canceled: Optional[Callable[[], bool]] = None,
+    start_time: Optional[datetime] = None,
+) -> ValidationReport:
+    """檢查資料夾內的 dataset, 寫出 JSON 報告, 並可把有錯誤的檔案隔離
+
+    Args:
+        folder: 受檢資料夾 (圖片 + VOC XML, 或含 images/ labels/ 的 YOLO dataset)
+        full_decode: 除了檔頭之外, 每張圖都完整解碼一次 (慢, 但抓得到資料段損毀的圖)
+        class_ids: txt 允許的 class id; None 則不檢查
+        include_splits: 是否一併檢查 images/<split>/ 與 labels/<split>/
+        quarantine: 有錯誤的樣本 (圖片連同 XML / txt) 移到 _quarantine_<時間戳>/
+        workers: process pool 大小; None 則用 CPU 數
+        progress_callback: (已檢查組數, 總數) -> None
+        is_canceled: 回傳 True 時停止; 取消時不寫報告也不隔離
+        start_time: 報告 / 隔離資料夾名稱用的時間戳; None 則用現在
+
+    Returns:
+        ValidationReport: 檢查結果; report_path 為寫出的報告
+    """
+    base = Path(folder)
+    root = str(base)
+    stamp = (start_time or datetime.now()).strftime("%Y_%m%d_%H%M%S")
+    report = ValidationReport(folder=root, full_decode=full_decode)
+    samples = collect_samples(base, include_splits)
+    report.samples = len(samples)
+    report.images = sum(1 + len(s.extra_images) for s in samples if s.image)
+    report.xml_files = sum(1 for s in samples if s.xml)
+    report.label_files = sum(1 for s in samples if s.txt)
+
+    content, canceled = _run_checks(
+        samples, root, full_decode,
+        frozenset(class_ids) if class_ids is not None else None,
+        workers, progress_callback, is_canceled,
+    )
+    if canceled:
+        report.canceled = True
+        log.i(f"dataset 檢查已取消 ({len(content)}/{len(samples)})")
+        return report
+
+    bad: list[Sample] = []
+    for sample, by_name, by_content in zip(samples, _name_issues(samples, root), content):
+        issues = by_name + by_content
+        report.issues.extend(issues)
+        if any(i.severity == SEVERITY_ERROR for i in issues):
+            bad.append(sample)
+
+    if quarantine and bad:
+        report.quarantine_dir = base / f"{QUARANTINE_PREFIX}{stamp}"
+        report.quarantined = quarantine_samples(bad, base, report.quarantine_dir)
+
+    report.report_path = base / f"validate_{stamp}.json"
+    try:
+        with open(report.report_path, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        log.e(f"寫入檢查報告失敗 ({report.report_path}): {e}")
+        report.report_path = None
+    log.i(f"dataset 檢查 {root}: {report.summary()}")
+    return report
+
+
+if __name__ == "__main__":
+    # 命令列檢查: python -m src.utils.dataset_validator <folder> [--full] [--quarantine]
+    # txt 的 class id 以 cfg/settings.yaml 的 class mapping 為準, 與 GUI 一致
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print("usage: python -m src.utils.dataset_validator <folder> [--full] [--quarantine]")
+        sys.exit(1)
+    from src.utils.dynamic_settings import settings
+
+    ids = {v for v in settings.class_names.categories.values() if isinstance(v, int)}
+    result = validate_dataset(
+        args[0],
+        full_decode="--full" in sys.argv,
+        class_ids=ids or None,
+        quarantine="--quarantine" in sys.argv,
+    )
+    print(result.summary())
+    print(f"report: {result.report_path}")
+    sys.exit(1 if result.errors else 0)
@@ -1,5 +1,5 @@
 # 動態設定管理：載入/儲存 settings.yaml，自動同步 schema 變更（補新欄位、移除過時欄位）
-# 更新日期: 2026-08-20
+# 更新日期: 2026-10-19
 from pathlib import Path
 from typing import Optional
 
@@ -59,6 +59,9 @@ class LabelSettings(BaseModel):
     crop_padding_px: Optional[int] = 50
     # fixed 模式：裁切區的最小邊長 (對齊 yolo 輸入維度, 如 640)
     crop_fixed_size: Optional[int] = 640
+    # 存檔時在 XML 旁一併輸出 YOLO txt 的格式："" = 不輸出; "bbox" / "seg" / "obb"
+    # 轉換時 mapping 與模式相同、且 txt 不比 XML 舊, 就直接沿用而不重新解析 XML
+    yolo_txt_mode: Optional[str] = ""
 
 
 class TrainingSettings(BaseModel):
@@ -1,33 +1,58 @@
 # 檔案讀寫、清單維護、VOC XML 產生與 VOC→YOLO 格式轉換
-# 更新日期: 2026-08-06
-import math
+# 更新日期: 2026-10-19
+import bisect
+import json
 import os
-import xml.etree.ElementTree as ET
+import shutil
 from pathlib import Path
 from typing import Optional
 
 import cv2
 
 from src.core import AppState
-from src.utils.const import ALL_EXTS
+from src.utils.const import ALL_EXTS, IMAGE_EXTS
 from src.utils.dynamic_settings import settings
 from src.utils.func import imread_unicode
 from src.utils.logger import getUniqueLogger
 from src.utils.model import Bbox, Polygon, ShowImageCmd
+from src.utils.voc import KIND_BBOX, KIND_POLYGON, VocObject, build_voc_xml, parse_voc_xml
+from src.utils.yolo_convert import (
+    CONVERT_MANIFEST_VERSION,
+    ConvertReport,
+    convert_xml_files,
+    convert_xml_to_txt,
+    file_digest,
+    load_convert_manifest,
+    save_convert_manifest,
+)
+from src.utils.yolo_format import (
+    MODE_BBOX,
+    MODE_SEG,
+    lines_match,
+    mapping_fingerprint,
+    objects_to_lines,
+)
 
 log = getUniqueLogger(__file__)
 
+# 存檔時直接輸出 YOLO txt 的紀錄 (所在資料夾一份): 用哪個 mapping / 模式、從何時起算
+YOLO_TXT_MANIFEST = ".yolo_txt.json"
+
 
 class FileHandler:
     def __init__(self):
         self.folder_path = None
         self.image_files = []
         self.current_index = 0
+        # 過濾瀏覽: 符合條件的 image_files 索引 (遞增); None 表示沒有過濾
+        self.filter_indices: Optional[list[int]] = None
+        self.filter_desc = ""
 
     def load_folder(self, folder_path):
         self.folder_path = folder_path
         self.image_files = []
         self.current_index = 0
+        self.clear_filter()
         for file in os.listdir(folder_path):
             if file.lower().endswith(ALL_EXTS):
                 self.image_files.append(file)
@@ -38,6 +63,67 @@ class FileHandler:
             return None
         return os.path.join(self.folder_path, self.image_files[self.current_index])
 
+    def set_filter(self, xml_names: set[str], invert: bool = False, desc: str = "") -> int:
+        """依標註查詢結果建立過濾瀏覽, 之後 next / prev / first / last 只在符合的檔案間跳
+
+        image_files 本身不變 (索引、進度條與 settings 裡記的 file_index 都照舊),
+        只多一份符合條件的索引清單。影片的標註存在 save_folder 的抽幀上, 不列入過濾。
+
+        Args:
+            xml_names: 符合條件的 XML 檔名 (AnnotationStore.query_files 的結果)
+            invert: True 則取補集, 用於「沒有標註」(含根本沒有 XML 的圖)
+            desc: 顯示在狀態列的條件說明
+
+        Returns:
+            int: 符合的檔案數
+        """
+        self.filter_indices = [
+            i
+            for i, name in enumerate(self.image_files)
+            if name.lower().endswith(IMAGE_EXTS)
+            and ((f"{os.path.splitext(name)[0]}.xml" in xml_names) != invert)
+        ]
+        self.filter_desc = desc
+        return len(self.filter_indices)
+
+    def clear_filter(self):
+        """取消過濾瀏覽"""
+        self.filter_indices = None
+        self.filter_desc = ""
+
+    def _show_filtered(self, cmd: str) -> bool:
+        """過濾瀏覽下的 show_image; 目前檔案不必符合條件, 從它的位置往前 / 往後找"""
+        hits = self.filter_indices
+        if not hits:
+            return False
+        target = None
+        if cmd == ShowImageCmd.NEXT:
+            pos = bisect.bisect_right(hits, self.current_index)
+            if pos < len(hits):
+                target = hits[pos]
+        elif cmd == ShowImageCmd.PREV:
+            pos = bisect.bisect_left(hits, self.current_index)
+            if pos > 0:
+                target = hits[pos - 1]
+        elif cmd == ShowImageCmd.FIRST:
+            target = hits[0]
+        elif cmd == ShowImageCmd.LAST:
+            target = hits[-1]
+        if target is None or target == self.current_index:
+            return False
+        self.current_index = target
+        return True
+
+    def filter_position(self) -> Optional[int]:
+        """目前檔案在過濾結果中的序號 (從 1 起算); 不在結果內或沒有過濾時回傳 None"""
+        hits = self.filter_indices
+        if hits is None:
+            return None
+        pos = bisect.bisect_left(hits, self.current_index)
+        if pos < len(hits) and hits[pos] == self.current_index:
+            return pos + 1
+        return None
+
     def show_image(self, cmd: str):
         """
         show [next, prev, first, last] image
@@ -47,6 +133,8 @@ class FileHandler:
         Returns:
             True if file is changed
         """
+        if self.filter_indices is not None and cmd != ShowImageCmd.SAME_INDEX:
+            return self._show_filtered(cmd)
         if cmd == ShowImageCmd.NEXT:
             if self.current_index < len(self.image_files) - 1:
                 self.current_index += 1
@@ -89,14 +177,31 @@ class FileHandler:
         except IndexError as e:
             log.e(f"移除清單項目失敗 (index={self.current_index}): {e}")
             return bool(self.image_files)
+        if self.filter_indices is not None:
+            # 過濾索引跟著位移: 移除被刪的那一個, 之後的索引都減一
+            removed = self.current_index
+            self.filter_indices = [
+                i if i < removed else i - 1 for i in self.filter_indices if i != removed
+            ]
         # 索引修正沿用 SAME_INDEX 那一套: 停在原位以顯示下一張, 超出範圍才退回最後一張
         return self.show_image(ShowImageCmd.SAME_INDEX)
 
     def generate_voc_xml(
-        self, bboxes: list[Bbox], image_path, polygons: list[Polygon] = None
+        self,
+        bboxes: list[Bbox],
+        image_path,
+        polygons: list[Polygon] = None,
+        size: Optional[tuple[int, int]] = None,
     ):
         """
         基於現有的bbox與polygon產生符合voc格式的xml檔案
+
+        Args:
+            bboxes: bbox 清單
+            image_path: 圖檔路徑 (寫進 <folder> / <filename>)
+            polygons: polygon 清單
+            size: 圖片的 (寬, 高); 呼叫端手上已有影像時直接給, 省得把剛寫出的圖再讀一次。
+                  None 則讀圖取得 (圖檔必須已經寫出)
         """
         if polygons is None:
             polygons = []
@@ -104,43 +209,13 @@ class FileHandler:
         image_filename = os.path.basename(image_path)
         folder_name = os.path.basename(os.path.dirname(image_path))
 
-        xml_str = "<annotation>\n"
-        xml_str += f"    <folder>{folder_name}</folder>\n"
-        xml_str += f"    <filename>{image_filename}</filename>\n"
-
-        # 讀取圖片大小（imread_unicode 支援中文路徑）
-        img = imread_unicode(image_path)
-        height, width, depth = img.shape
-
-        xml_str += f"    <size>\n        <width>{width}</width>\n        <height>{height}</height>\n    </size>\n"
-
-        for bbox in bboxes:
-            xml_str += "    <object>\n"
-            xml_str += f"        <name>{bbox.label}</name>\n"
-            xml_str += "        <bndbox>\n"
-            xml_str += f"            <xmin>{bbox.x}</xmin>\n"
-            xml_str += f"            <ymin>{bbox.y}</ymin>\n"
-            xml_str += f"            <xmax>{bbox.x + bbox.width}</xmax>\n"
-            xml_str += f"            <ymax>{bbox.y + bbox.height}</ymax>\n"
-            xml_str += f"            <confidence>{bbox.confidence}</confidence>\n"
-            xml_str += f"            <angle>{int(bbox.angle)}</angle>\n"
-            xml_str += "        </bndbox>\n"
-            xml_str += "    </object>\n"
-
-        for polygon in polygons:
-            xml_str += "    <object>\n"
-            xml_str += f"        <name>{polygon.label}</name>\n"
-            xml_str += "        <polygon>\n"
-            xml_str += f"            <confidence>{polygon.confidence}</confidence>\n"
-            for px, py in polygon.points:
-                xml_str += (
-                    f"            <point><x>{px:.1f}</x><y>{py:.1f}</y></point>\n"
-                )
-            xml_str += "        </polygon>\n"
-            xml_str += "    </object>\n"
-
-        xml_str += "</annotation>\n"
-        return xml_str
+        if size is None:
+            # 讀取圖片大小（imread_unicode 支援中文路徑）
+            img = imread_unicode(image_path)
+            height, width = img.shape[:2]
+        else:
+            width, height = size
+        return build_voc_xml(bboxes, polygons, image_filename, folder_name, width, height)
 
     def convertVocInFolder(
         self,
@@ -148,33 +223,177 @@ class FileHandler:
         output_folder: Optional[Path] = None,
         app_state: AppState = None,
         progress_callback: Optional[callable] = None,
-    ) -> list[tuple[str, str]]:
+        is_canceled: Optional[callable] = None,
+        workers: Optional[int] = None,
+        mode: Optional[str] = None,
+        categories: Optional[dict] = None,
+    ) -> ConvertReport:
         """
         將指定資料夾下的所有 VOC XML 檔案轉換為 YOLO 格式
+        增量轉換: 輸出資料夾的 CONVERT_MANIFEST 記錄上次轉換的 XML 狀態, 只轉新增與有變動的
+        XML (mtime 變了但內容雜湊相同的視為未變動), XML 已刪除的連帶刪除 txt;
+        mapping 或輸出模式改變時整批重轉。需要轉的 XML 以 process pool 分批平行處理,
+        not_matched 依 XML 檔名順序合併, 與 worker 數無關
         Args:
-            progress_callback: 回呼函式 (current, total) -> None，用於更新進度條
+            progress_callback: 回呼函式 (current, total) -> None，用於更新進度條 (每批呼叫一次)
+            is_canceled: 回傳 True 時停止轉換 (已開始的批次跑完即止; 已完成的部分會記進 manifest)
+            workers: process pool 大小; None 則用 CPU 數
+            mode: 輸出模式; None 則依 app_state
+            categories: class mapping 的快照; None 則讀 settings (背景 thread 呼叫時請由呼叫端傳入)
         Returns:
-            not_matched: 未對應到的 (圖檔名, class_name) 列表
+            ConvertReport: 新增 / 變動 / 刪除 / 未變動的統計與 not_matched (取消時只含已完成的部分)
         """
         if output_folder is None:
             output_folder = folder_path  # 預設輸出到同一個資料夾
-
-        output_mode = app_state.yolo_output_mode if app_state else "bbox"
-        xml_files = list(Path(folder_path).glob("*.xml"))
+        output_folder = Path(output_folder)
+
+        if mode is not None:
+            output_mode = mode
+        else:
+            output_mode = app_state.yolo_output_mode if app_state else MODE_BBOX
+        if categories is None:
+            categories = settings.class_names.categories
+        categories = dict(categories)
+        fingerprint = mapping_fingerprint(categories)
+        xml_files = sorted(Path(folder_path).glob("*.xml"))
         total = len(xml_files)
-        not_matched: list[tuple[str, str]] = []
+        report = ConvertReport(total=total)
+        # 每個 XML 的 not_matched, 依 xml_files 順序; 最後再攤平, 順序才固定
+        per_file: list[Optional[list]] = [None] * total
+
+        manifest = load_convert_manifest(output_folder)
+        old_entries = manifest["files"] if manifest else {}
+        if (
+            manifest is None
+            or manifest.get("fingerprint") != fingerprint
+            or manifest.get("mode") != output_mode
+        ):
+            report.full = True
+            reusable_entries = {}
+        else:
+            reusable_entries = old_entries
+        existing_txt = {
+            e.name for e in os.scandir(output_folder) if e.name.endswith(".txt")
+        }
+        entries: dict[str, dict] = {}
+
+        # 存檔時已輸出且仍然有效的 txt 直接複製, 不必重新解析 XML
+        txt_manifest = self._load_txt_manifest(folder_path)
+        todo: list[int] = []
+        stats: dict[int, os.stat_result] = {}
 
         for i, xml_file in enumerate(xml_files):
-            if output_mode == "seg":
-                unmatched = self.convert_voc_xml_to_yolo_seg_txt(xml_file, output_folder, app_state)
-            else:
-                unmatched = self.convert_voc_xml_to_yolo_txt(xml_file, output_folder, app_state)
-            not_matched.extend(unmatched)
-            if progress_callback:
-                progress_callback(i + 1, total)
+            st = xml_file.stat()
+            entry = reusable_entries.get(xml_file.name)
+            if entry is not None and f"{xml_file.stem}.txt" in existing_txt:
+                same = entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size
+                if not same and entry["size"] == st.st_size and entry.get("sha1"):
+                    # 存檔但內容沒變 (例如只是重新儲存): 比對雜湊, 順便更新 mtime
+                    same = file_digest(xml_file) == entry["sha1"]
+                if same:
+                    entries[xml_file.name] = {**entry, "mtime_ns": st.st_mtime_ns}
+                    per_file[i] = entry.get("unmatched", [])
+                    report.unchanged += 1
+                    continue
+            (report.changed if xml_file.name in old_entries else report.added).append(
+                xml_file.name
+            )
+
+            txt_path = self._reusable_txt(xml_file, txt_manifest, fingerprint, output_mode)
+            if txt_path is None:
+                todo.append(i)
+                stats[i] = st
+                continue
+            dst = output_folder / txt_path.name
+            if not dst.exists() or not os.path.samefile(txt_path, dst):
+                shutil.copyfile(txt_path, dst)
+            per_file[i] = txt_manifest["unmatched"].get(xml_file.name, [])
+            entries[xml_file.name] = self._convert_entry(st, file_digest(xml_file), per_file[i])
+            report.reused += 1
+
+        # XML 已刪除: 連帶刪除上次輸出的 txt
+        current = {x.name for x in xml_files}
+        for name in sorted(set(old_entries) - current):
+            txt_name = f"{Path(name).stem}.txt"
+            if txt_name in existing_txt:
+                (output_folder / txt_name).unlink(missing_ok=True)
+            report.removed.append(name)
+
+        done = total - len(todo)
+        if progress_callback and done:
+            progress_callback(done, total)
+
+        if todo and not (is_canceled and is_canceled()):
+            results, report.canceled = convert_xml_files(
+                [xml_files[i] for i in todo],
+                output_folder,
+                output_mode,
+                categories,
+                workers=workers,
+                progress_callback=(
+                    (lambda n, _: progress_callback(done + n, total))
+                    if progress_callback
+                    else None
+                ),
+                is_canceled=is_canceled,
+            )
+            for i, (not_matched, digest) in zip(todo, results):
+                per_file[i] = not_matched
+                if digest:
+                    entries[xml_files[i].name] = self._convert_entry(
+                        stats[i], digest, not_matched
+                    )
+        elif todo:
+            report.canceled = True
+
+        if report.canceled:
+            # 沒轉到的保留舊紀錄: 它們的 mtime 已不同, 下次會再比對雜湊而被判定為變動
+            for i in todo:
+                name = xml_files[i].name
+                if name not in entries and name in reusable_entries:
+                    entries[name] = reusable_entries[name]
 
-        log.i(f"converted {total} xml files (mode={output_mode})")
-        return not_matched
+        try:
+            save_convert_manifest(
+                output_folder,
+                {
+                    "version": CONVERT_MANIFEST_VERSION,
+                    "fingerprint": fingerprint,
+                    "mode": output_mode,
+                    "files": entries,
+                },
+            )
+        except Exception as e:
+            log.e(f"寫入轉換紀錄失敗 ({output_folder}): {e}")
+
+        report.not_matched = [
+            (image, label) for result in per_file if result for image, label in result
+        ]
+        log.i(
+            f"{'conversion canceled' if report.canceled else 'converted'} "
+            f"{total} xml files (mode={output_mode}): {report.summary()}"
+        )
+        return report
+
+    @staticmethod
+    def _convert_entry(st: os.stat_result, digest: str, not_matched: list) -> dict:
+        """CONVERT_MANIFEST 裡一個 XML 的紀錄"""
+        return {
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "sha1": digest,
+            "unmatched": [[image, label] for image, label in not_matched],
+        }
+
+    def _convert_one(
+        self, xml_path, output_folder, mode: str, categories: dict
+    ) -> list[tuple[str, str]]:
+        """轉換單個 VOC XML 為 YOLO txt (bbox / seg / obb 共用)
+
+        Returns:
+            not_matched: 未對應到的 (圖檔名, class_name) 列表
+        """
+        return convert_xml_to_txt(xml_path, output_folder, mode, categories)
 
     def convert_voc_xml_to_yolo_txt(
         self, xml_path, output_folder, app_state=None
@@ -185,107 +404,12 @@ class FileHandler:
         Returns:
             not_matched: 未對應到的 (圖檔名, class_name) 列表
         """
-        not_matched: list[tuple[str, str]] = []
-
-        # root = ET.parse(Path(xml_path).as_posix())
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
-        size_element = root.find("size")
-        if size_element is None:
-            log.w(f"Warning: No size element found in {xml_path}, skipping")
-            return not_matched
-        img_width = int(size_element.find("width").text)
-        img_height = int(size_element.find("height").text)
-        yolo_lines = []
-
-        # 取得對應的圖檔名
-        filename_element = root.find("filename")
-        image_filename = filename_element.text if filename_element is not None else Path(xml_path).stem
-
-        for object_element in root.findall("object"):
-            label_name = object_element.find("name").text
-            if label_name not in settings.class_names.categories:
-                log.w(f"Warning: Label '{label_name}' not in categories")
-                not_matched.append((image_filename, label_name))
-                continue  # Skip to the next object if label is not in categories
-
-            category_id = settings.class_names.categories.get(label_name)
-            if category_id is None or not isinstance(category_id, int):
-                log.w(
-                    f"Warning: Category ID not found for label '{label_name}', skipping"
-                )
-                not_matched.append((image_filename, label_name))
-                continue
-
-            bndbox_element = object_element.find("bndbox")
-            if bndbox_element is None:
-                log.w(f"Warning: No bndbox element for '{label_name}' in {xml_path}, skipping")
-                continue
-            xmin = int(bndbox_element.find("xmin").text)
-            ymin = int(bndbox_element.find("ymin").text)
-            xmax = int(bndbox_element.find("xmax").text)
-            ymax = int(bndbox_element.find("ymax").text)
-
-            # 讀取角度（如果存在）
-            angle_element = bndbox_element.find("angle")
-            angle = float(angle_element.text) if angle_element is not None else 0.0
-
-            # 判斷是否使用 OBB 格式
-            output_mode = app_state.yolo_output_mode if app_state else "bbox"
-            if output_mode == "obb" and angle != 0:
-                # OBB 格式：輸出四個角點的歸一化座標
-                # 計算 bbox 的中心點和寬高
-                bbox_width = xmax - xmin
-                bbox_height = ymax - ymin
-                center_x = (xmin + xmax) / 2
-                center_y = (ymin + ymax) / 2
-
-                # 計算四個角點（未旋轉時）相對於中心的位置
-                corners = [
-                    (-bbox_width / 2, -bbox_height / 2),  # top_left
-                    (bbox_width / 2, -bbox_height / 2),  # top_right
-                    (bbox_width / 2, bbox_height / 2),  # bottom_right
-                    (-bbox_width / 2, bbox_height / 2),  # bottom_left
-                ]
-
-                # 旋轉角點
-                angle_rad = math.radians(angle)
-                rotated_corners = []
-                for dx, dy in corners:
-                    # 旋轉
-                    rotated_x = dx * math.cos(angle_rad) - dy * math.sin(angle_rad)
-                    rotated_y = dx * math.sin(angle_rad) + dy * math.cos(angle_rad)
-                    # 加上中心點偏移
-                    abs_x = center_x + rotated_x
-                    abs_y = center_y + rotated_y
-                    # 歸一化
-                    norm_x = abs_x / img_width
-                    norm_y = abs_y / img_height
-                    rotated_corners.append((norm_x, norm_y))
-
-                # 格式：class_id x1 y1 x2 y2 x3 y3 x4 y4
-                yolo_line = f"{category_id}"
-                for x, y in rotated_corners:
-                    yolo_line += f" {x:.6f} {y:.6f}"
-                yolo_lines.append(yolo_line)
-            else:
-                # 標準 YOLO 格式：中心點 + 寬高
-                x_center = (xmin + xmax) / 2 / img_width
-                y_center = (ymin + ymax) / 2 / img_height
-                w = (xmax - xmin) / img_width
-                h = (ymax - ymin) / img_height
-
-                yolo_line = (
-                    f"{category_id} {x_center:.6f} {y_center:.6f} {w:.6f} {h:.6f}"
-                )
-                yolo_lines.append(yolo_line)
-
-        # Save YOLO txt file
-        output_file = output_folder / Path(xml_path).with_suffix(".txt").name
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write("\n".join(yolo_lines))
-
-        return not_matched
+        output_mode = app_state.yolo_output_mode if app_state else MODE_BBOX
+        if output_mode == MODE_SEG:
+            output_mode = MODE_BBOX
+        return self._convert_one(
+            xml_path, output_folder, output_mode, settings.class_names.categories
+        )
 
     def convert_voc_xml_to_yolo_seg_txt(
         self, xml_path, output_folder, app_state=None
@@ -294,82 +418,208 @@ class FileHandler:
         轉換單個 VOC XML 檔案到 YOLO Segmentation 格式
         格式: class_id x1 y1 x2 y2 ... xN yN (normalized 0-1)
         """
-        not_matched: list[tuple[str, str]] = []
-
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
-        size_element = root.find("size")
-        if size_element is None:
-            log.w(f"Warning: No size element found in {xml_path}, skipping")
-            return not_matched
-        img_width = int(size_element.find("width").text)
-        img_height = int(size_element.find("height").text)
-        yolo_lines = []
-
-        # 取得對應的圖檔名
-        filename_element = root.find("filename")
-        image_filename = filename_element.text if filename_element is not None else Path(xml_path).stem
-
-        for object_element in root.findall("object"):
-            label_name = object_element.find("name").text
-            if label_name not in settings.class_names.categories:
-                log.w(f"Warning: Label '{label_name}' not in categories")
-                not_matched.append((image_filename, label_name))
-                continue
+        return self._convert_one(
+            xml_path, output_folder, MODE_SEG, settings.class_names.categories
+        )
 
-            category_id = settings.class_names.categories.get(label_name)
-            if category_id is None or not isinstance(category_id, int):
-                log.w(
-                    f"Warning: Category ID not found for label '{label_name}', skipping"
-                )
-                not_matched.append((image_filename, label_name))
-                continue
+    # --- 存檔時直接輸出 YOLO txt ---
 
-            polygon_element = object_element.find("polygon")
-            if polygon_element is not None:
-                # Use polygon points
-                points = []
-                for pt in polygon_element.findall("point"):
-                    px = float(pt.find("x").text)
-                    py = float(pt.find("y").text)
-                    points.append((px / img_width, py / img_height))
-
-                if points:
-                    yolo_line = f"{category_id}"
-                    for nx, ny in points:
-                        yolo_line += f" {nx:.6f} {ny:.6f}"
-                    yolo_lines.append(yolo_line)
-            else:
-                # Fallback: use bndbox as a 4-point polygon
-                bndbox_element = object_element.find("bndbox")
-                if bndbox_element is None:
-                    continue
-                xmin = int(bndbox_element.find("xmin").text)
-                ymin = int(bndbox_element.find("ymin").text)
-                xmax = int(bndbox_element.find("xmax").text)
-                ymax = int(bndbox_element.find("ymax").text)
-
-                # Normalize
-                nx1 = xmin / img_width
-                ny1 = ymin / img_height
-                nx2 = xmax / img_width
-                ny2 = ymax / img_height
-
-                yolo_line = (
-                    f"{category_id}"
-                    f" {nx1:.6f} {ny1:.6f}"
-                    f" {nx2:.6f} {ny1:.6f}"
-                    f" {nx2:.6f} {ny2:.6f}"
-                    f" {nx1:.6f} {ny2:.6f}"
+    @staticmethod
+    def _objects_as_saved(bboxes: list[Bbox], polygons: list[Polygon]) -> list[VocObject]:
+        """把畫面上的標註轉成「寫進 XML 再讀回來」的樣子
+
+        generate_voc_xml 會把 bbox 座標與角度寫成整數、polygon 頂點取到小數一位;
+        這裡照同樣的規則取捨, 存檔時算出的 txt 才會與事後由 XML 轉出的一字不差。
+        """
+        objects = []
+        for b in bboxes:
+            objects.append(
+                VocObject(
+                    label=b.label,
+                    kind=KIND_BBOX,
+                    xmin=int(float(b.x)),
+                    ymin=int(float(b.y)),
+                    xmax=int(float(b.x + b.width)),
+                    ymax=int(float(b.y + b.height)),
+                    angle=float(int(b.angle)),
                 )
-                yolo_lines.append(yolo_line)
+            )
+        for poly in polygons:
+            points = [(float(f"{px:.1f}"), float(f"{py:.1f}")) for px, py in poly.points]
+            if points:
+                objects.append(VocObject(label=poly.label, kind=KIND_POLYGON, points=points))
+        return objects
+
+    def write_yolo_txt(
+        self,
+        xml_path,
+        bboxes: list[Bbox],
+        polygons: list[Polygon],
+        img_w: int,
+        img_h: int,
+        mode: str,
+        image_filename: str = "",
+    ) -> list[tuple[str, str]]:
+        """存檔時在 XML 旁邊直接寫出 YOLO txt, 之後轉換可直接沿用而不必重新解析 XML
 
-        # Save YOLO seg txt file
-        output_file = output_folder / Path(xml_path).with_suffix(".txt").name
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write("\n".join(yolo_lines))
+        資料夾的 YOLO_TXT_MANIFEST 記錄這批 txt 是用哪個 mapping / 模式算的; 兩者有變就
+        重設起算時間, 之前寫的 txt 一律視為過期。請在 XML 寫完之後呼叫 (以 mtime 判斷新舊)。
+
+        Args:
+            xml_path: 剛寫出的 XML 路徑
+            bboxes: 畫面上的 bbox
+            polygons: 畫面上的 polygon
+            img_w: 影像寬 (XML 的 <size>)
+            img_h: 影像高
+            mode: MODE_BBOX / MODE_SEG / MODE_OBB
+            image_filename: 圖檔名 (XML 的 <filename>); 空字串則用 XML 的主檔名
 
+        Returns:
+            not_matched: 未對應到的 (圖檔名, class_name) 列表
+        """
+        xml_path = Path(xml_path)
+        categories = settings.class_names.categories
+        image_filename = image_filename or xml_path.stem
+        lines, not_matched = objects_to_lines(
+            self._objects_as_saved(bboxes, polygons),
+            img_w, img_h, categories, mode, image_filename, str(xml_path),
+        )
+        txt_path = xml_path.with_suffix(".txt")
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+        folder = xml_path.parent
+        fingerprint = mapping_fingerprint(categories)
+        manifest = self._load_txt_manifest(folder)
+        dirty = False
+        if (
+            manifest is None
+            or manifest.get("fingerprint") != fingerprint
+            or manifest.get("mode") != mode
+        ):
+            # 起算時間取這個 txt 自己的 mtime: 檔案系統時間戳的時鐘比 time_ns() 粗,
+            # 用 time_ns() 可能比剛寫的檔案還「晚」, 反而把它判成過期
+            manifest = {
+                "version": 1,
+                "fingerprint": fingerprint,
+                "mode": mode,
+                "since_ns": txt_path.stat().st_mtime_ns,
+                "unmatched": {},
+            }
+            dirty = True
+        # 沿用 txt 時還是要回報未對應的 label, 所以把它們記下來 (通常很少, 檔案不會大)
+        unmatched = manifest["unmatched"]
+        if not_matched:
+            entry = [[image, label] for image, label in not_matched]
+            if unmatched.get(xml_path.name) != entry:
+                unmatched[xml_path.name] = entry
+                dirty = True
+        elif unmatched.pop(xml_path.name, None) is not None:
+            dirty = True
+        if dirty:
+            self._save_txt_manifest(folder, manifest)
         return not_matched
 
+    @staticmethod
+    def _load_txt_manifest(folder) -> Optional[dict]:
+        """讀取資料夾的 YOLO_TXT_MANIFEST; 不存在或壞掉時回傳 None"""
+        path = Path(folder) / YOLO_TXT_MANIFEST
+        if not path.is_file():
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            manifest.setdefault("unmatched", {})
+            return manifest
+        except Exception as e:
+            log.e(f"讀取 {path} 失敗: {e}")
+            return None
+
+    @staticmethod
+    def _save_txt_manifest(folder, manifest: dict) -> None:
+        """寫回 YOLO_TXT_MANIFEST (先寫暫存檔再取代, 中途當掉也不會留下半個 JSON)"""
+        path = Path(folder) / YOLO_TXT_MANIFEST
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _reusable_txt(xml_path: Path, manifest: Optional[dict], fingerprint: str, mode: str):
+        """存檔時寫的 txt 能否直接沿用: mapping / 模式相同, 且 txt 不比 XML 與起算時間舊
+
+        Returns:
+            Path | None: 可沿用的 txt 路徑
+        """
+        if (
+            manifest is None
+            or manifest.get("fingerprint") != fingerprint
+            or manifest.get("mode") != mode
+        ):
+            return None
+        txt_path = xml_path.with_suffix(".txt")
+        try:
+            txt_mtime = txt_path.stat().st_mtime_ns
+            xml_mtime = xml_path.stat().st_mtime_ns
+        except OSError:
+            return None
+        if txt_mtime < xml_mtime or txt_mtime < manifest.get("since_ns", 0):
+            return None
+        return txt_path
+
+    def check_yolo_txt(
+        self,
+        folder_path,
+        mode: Optional[str] = None,
+        progress_callback: Optional[callable] = None,
+    ) -> tuple[int, list[tuple[str, str]]]:
+        """檢查資料夾內 XML 與旁邊的 YOLO txt 是否一致 (重新由 XML 計算後逐行比對)
+
+        Args:
+            folder_path: 含 XML 與 txt 的資料夾
+            mode: 比對用的輸出模式; None 則取 YOLO_TXT_MANIFEST 記錄的模式
+            progress_callback: (current, total) -> None
+
+        Returns:
+            (checked, problems): 比對的 XML 數; [(XML 檔名, 問題描述)]
+        """
+        folder = Path(folder_path)
+        manifest = self._load_txt_manifest(folder)
+        categories = settings.class_names.categories
+        fingerprint = mapping_fingerprint(categories)
+        if mode is None:
+            mode = (manifest or {}).get("mode", MODE_BBOX)
+        problems: list[tuple[str, str]] = []
+        if manifest is not None and manifest.get("fingerprint") != fingerprint:
+            problems.append((YOLO_TXT_MANIFEST, "class mapping 已變更, txt 全部需要重新輸出"))
+
+        xml_files = sorted(folder.glob("*.xml"))
+        total = len(xml_files)
+        for i, xml_file in enumerate(xml_files, start=1):
+            if progress_callback:
+                progress_callback(i, total)
+            txt_path = xml_file.with_suffix(".txt")
+            if not txt_path.is_file():
+                problems.append((xml_file.name, "缺少 txt"))
+                continue
+            if self._reusable_txt(xml_file, manifest, fingerprint, mode) is None:
+                problems.append((xml_file.name, "txt 比 XML 舊 (XML 之後又被修改過)"))
+            ann = parse_voc_xml(xml_file)
+            if ann is None or ann.width <= 0 or ann.height <= 0:
+                problems.append((xml_file.name, "XML 無法解析或缺少 size"))
+                continue
+            expected, _ = objects_to_lines(
+                ann.objects, ann.width, ann.height, categories, mode, ann.filename,
+                str(xml_file),
+            )
+            with open(txt_path, encoding="utf-8") as f:
+                actual = [line for line in f.read().splitlines() if line.strip()]
+            if not lines_match(expected, actual):
+                problems.append(
+                    (xml_file.name, f"內容不一致 (XML {len(expected)} 行 / txt {len(actual)} 行)")
+                )
+        log.i(f"checked {total} xml/txt pairs in {folder}: {len(problems)} problems")
+        return total, problems
+
 
 file_h = FileHandler()
@@ -0,0 +1,169 @@
+# 影片幀存檔的背景寫檔: GUI thread 只把已解碼的幀 (BGR ndarray) 與 XML 字串放進有上限的佇列,
+# 編碼、寫圖、寫 XML 在單一背景 thread 依送出順序完成, 播放中自動存檔不再卡住畫面。
+# 不碰 Qt、不讀 settings: 完成與否以 on_done callback 回報 (在背景 thread 呼叫), 由呼叫端轉回 GUI。
+# 更新日期: 2026-10-19
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import cv2
+import numpy as np
+
+from src.utils.func import imwrite_unicode
+from src.utils.logger import getUniqueLogger
+
+log = getUniqueLogger(__file__)
+
+# 佇列上限: 寫檔跟不上時 submit 會等到有空位, 記憶體最多多出這麼多張幀
+MAX_PENDING = 8
+
+FRAME_FORMATS = ("jpg", "png")
+
+
+def frame_ext(fmt: str) -> str:
+    """cfg.frame_save_format 轉成副檔名; 不認得的格式改用 jpg
+
+    Args:
+        fmt: "jpg" 或 "png" (大小寫、前面的 "." 皆可)
+
+    Returns:
+        str: ".jpg" 或 ".png"
+    """
+    fmt = (fmt or "").lower().lstrip(".")
+    if fmt == "jpeg":
+        fmt = "jpg"
+    if fmt not in FRAME_FORMATS:
+        log.w(f"不支援的影片幀格式 {fmt!r}, 改用 jpg")
+        fmt = "jpg"
+    return f".{fmt}"
+
+
+def encode_params(ext: str, jpeg_quality: int, png_compression: int) -> list[int]:
+    """依副檔名產生 cv2.imencode 的參數, 數值超出範圍時夾到合法值
+
+    Args:
+        ext: ".jpg" 或 ".png"
+        jpeg_quality: JPEG 品質 0~100
+        png_compression: PNG 壓縮等級 0~9
+
+    Returns:
+        list[int]: 傳給 imwrite_unicode 的 params
+    """
+    if ext == ".png":
+        return [cv2.IMWRITE_PNG_COMPRESSION, min(max(int(png_compression), 0), 9)]
+    return [cv2.IMWRITE_JPEG_QUALITY, min(max(int(jpeg_quality), 0), 100)]
+
+
+@dataclass
+class FrameJob:
+    """一筆影片幀存檔: 先寫圖, 寫成功才寫 XML"""
+
+    image_path: str
+    image: np.ndarray  # BGR; 送出後不可再就地修改
+    xml_path: str
+    xml_content: str
+    params: list
+    context: Any = None  # 呼叫端自用, 原封不動放回 FrameResult
+
+
+@dataclass
+class FrameResult:
+    """一筆存檔的結果 (不含影像, 免得 callback 排隊時還抓著整張幀)"""
+
+    image_path: str
+    xml_path: str
+    ok: bool
+    error: str = ""
+    context: Any = None
+
+
+class FrameWriter:
+    """單一背景 thread 依序寫出影片幀與 XML
+
+    只有一個 thread: 同一幀連存兩次時後送的一定後寫, 檔案內容就是最後一次的標註。
+    thread 在第一次 submit 時才建立; close() 後再 submit 會重新建立。
+    """
+
+    def __init__(
+        self,
+        max_pending: int = MAX_PENDING,
+        on_done: Optional[Callable[[FrameResult], None]] = None,
+    ):
+        """
+        Args:
+            max_pending: 佇列上限
+            on_done: 每筆寫完 (成功或失敗) 後在背景 thread 呼叫
+        """
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._on_done = on_done
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, job: FrameJob) -> None:
+        """放進佇列; 佇列已滿時等到有空位 (寫檔跟不上時以此節流)
+
+        Args:
+            job: 要寫的幀與 XML
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="FrameWriter", daemon=True
+                )
+                self._thread.start()
+        if self._queue.full():
+            log.w("影片幀寫檔跟不上, 等待佇列空出位置")
+        self._queue.put(job)
+
+    def pending(self) -> int:
+        """尚未寫完的筆數 (約略值)"""
+        return self._queue.unfinished_tasks
+
+    def flush(self) -> None:
+        """等佇列裡的幀全部寫完"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """寫完剩下的幀後結束背景 thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                result = self._write(job)
+                if self._on_done is not None:
+                    try:
+                        self._on_done(result)
+                    except Exception as e:
+                        log.e(f"影片幀存檔的完成通知失敗: {e}")
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _write(job: FrameJob) -> FrameResult:
+        """寫圖, 成功才寫 XML: 不會留下找不到圖的 XML"""
+        result = FrameResult(job.image_path, job.xml_path, False, context=job.context)
+        ext = "." + job.image_path.rsplit(".", 1)[-1].lower()
+        if not imwrite_unicode(job.image_path, job.image, ext, job.params):
+            result.error = f"寫入影片幀失敗: {job.image_path}"
+            log.e(result.error)
+            return result
+        try:
+            with open(job.xml_path, "w", encoding="utf-8") as f:
+                f.write(job.xml_content)
+        except Exception as e:
+            result.error = f"寫入標註失敗 ({job.xml_path}): {e}"
+            log.e(result.error)
+            return result
+        result.ok = True
+        return result
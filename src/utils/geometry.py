@@ -0,0 +1,259 @@
+# 標註幾何的向量化運算 (numpy)：旋轉框角點、外接框、夾邊、歸一化、面積、IoU、polygon 簡化
+# 更新日期: 2026-10-19
+#
+# 裁切、畫面與格式轉換共用同一套算式, 一次處理整批標註而不是逐點跑 Python 迴圈。
+# 陣列慣例:
+#   boxes   (N, 5) float64: xmin, ymin, xmax, ymax, angle (度, 順時針, 繞框中心)
+#   xyxy    (N, 4) float64: xmin, ymin, xmax, ymax (軸對齊)
+#   points  (M, 2) float64: 多個 polygon 的頂點首尾相接
+#   offsets (P + 1,) int64: 第 i 個 polygon 是 points[offsets[i]:offsets[i + 1]]
+# 不碰 Qt、不讀 settings, 可直接在 worker process 使用。
+from __future__ import annotations
+
+import math
+from typing import Iterable, Sequence
+
+import numpy as np
+
+# 角點相對於框中心的半寬 / 半高倍率, 順序為 top_left → top_right → bottom_right → bottom_left
+_CORNER_SIGNS = np.array([[-1.0, -1.0], [1.0, -1.0], [1.0, 1.0], [-1.0, 1.0]])
+
+# 少於這個數量時走純 Python 的單筆版本: 每次 numpy 呼叫有數微秒的固定成本,
+# 一張圖只有兩三個框時, 建陣列的時間比運算本身還長
+VECTOR_MIN = 8
+
+
+def boxes_array(rows: Iterable[Sequence[float]]) -> np.ndarray:
+    """(xmin, ymin, xmax, ymax, angle) 的序列 → (N, 5) 陣列; 空序列回傳 (0, 5)"""
+    arr = np.asarray(list(rows), dtype=np.float64)
+    return arr.reshape(-1, 5)
+
+
+def bboxes_to_array(bboxes) -> np.ndarray:
+    """Bbox 物件 (x, y, width, height, angle) 的清單 → (N, 5) 陣列"""
+    return boxes_array(
+        (b.x, b.y, b.x + b.width, b.y + b.height, b.angle) for b in bboxes
+    )
+
+
+def pack_polygons(polygons: Iterable[Sequence[tuple[float, float]]]) -> tuple[np.ndarray, np.ndarray]:
+    """多個 polygon 的頂點清單 → (points, offsets)
+
+    Returns:
+        (points (M, 2), offsets (P + 1,))
+    """
+    # 先在 Python 端攤平成一維再一次轉成陣列; 逐個 polygon 建陣列再 concatenate 慢得多
+    flat: list[float] = []
+    lengths: list[int] = []
+    for poly in polygons:
+        lengths.append(len(poly))
+        for x, y in poly:
+            flat.append(x)
+            flat.append(y)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return np.array(flat, dtype=np.float64).reshape(-1, 2), offsets
+
+
+def rotated_corners(boxes: np.ndarray) -> np.ndarray:
+    """每個框繞中心旋轉 angle 度後的四個角點
+
+    運算順序與逐點版本相同 (center + (dx·cos − dy·sin)), 輸出與先前的純 Python 算式一致。
+
+    Args:
+        boxes: (N, 5)
+
+    Returns:
+        (N, 4, 2) 角點, 順序 top_left → top_right → bottom_right → bottom_left (旋轉前)
+    """
+    xmin, ymin, xmax, ymax, angle = boxes.T
+    half = np.stack([(xmax - xmin) / 2, (ymax - ymin) / 2], axis=1)   # (N, 2)
+    center = np.stack([(xmin + xmax) / 2, (ymin + ymax) / 2], axis=1)  # (N, 2)
+    rad = np.radians(angle)
+    cos_a = np.cos(rad)[:, None]
+    sin_a = np.sin(rad)[:, None]
+    d = _CORNER_SIGNS[None, :, :] * half[:, None, :]                  # (N, 4, 2)
+    dx, dy = d[..., 0], d[..., 1]
+    out = np.empty_like(d)
+    out[..., 0] = center[:, 0:1] + (dx * cos_a - dy * sin_a)
+    out[..., 1] = center[:, 1:2] + (dx * sin_a + dy * cos_a)
+    return out
+
+
+def corners_one(xmin, ymin, xmax, ymax, angle: float) -> list[tuple[float, float]]:
+    """單一框的 rotated_corners (純 Python); 運算順序相同, 結果與向量版逐位元一致"""
+    half_w = (xmax - xmin) / 2
+    half_h = (ymax - ymin) / 2
+    center_x = (xmin + xmax) / 2
+    center_y = (ymin + ymax) / 2
+    rad = math.radians(angle)
+    cos_a = math.cos(rad)
+    sin_a = math.sin(rad)
+    return [
+        (center_x + (dx * cos_a - dy * sin_a), center_y + (dx * sin_a + dy * cos_a))
+        for dx, dy in (
+            (-half_w, -half_h),
+            (half_w, -half_h),
+            (half_w, half_h),
+            (-half_w, half_h),
+        )
+    ]
+
+
+def boxes_aabb(boxes: np.ndarray) -> np.ndarray:
+    """每個框的軸對齊外接框; 角度為 360 的倍數的直接沿用原框 (不經三角函數, 沒有誤差)
+
+    Args:
+        boxes: (N, 5)
+
+    Returns:
+        (N, 4) xyxy
+    """
+    out = boxes[:, :4].copy()
+    rotated = np.mod(boxes[:, 4], 360) != 0
+    if rotated.any():
+        corners = rotated_corners(boxes[rotated])
+        out[rotated, 0:2] = corners.min(axis=1)
+        out[rotated, 2:4] = corners.max(axis=1)
+    return out
+
+
+def polygons_aabb(points: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """每個 polygon 的軸對齊外接框 (空的 polygon 得到 NaN)
+
+    Args:
+        points: (M, 2)
+        offsets: (P + 1,)
+
+    Returns:
+        (P, 4) xyxy
+    """
+    n = len(offsets) - 1
+    out = np.full((n, 4), np.nan)
+    starts = offsets[:-1]
+    nonempty = offsets[1:] > starts
+    if n == 0 or not nonempty.any():
+        return out
+    idx = starts[nonempty]
+    out[nonempty, 0:2] = np.minimum.reduceat(points, idx, axis=0)
+    out[nonempty, 2:4] = np.maximum.reduceat(points, idx, axis=0)
+    return out
+
+
+def clamp_points(points: np.ndarray, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+    """把頂點夾進 [x0, x1] × [y0, y1] (回傳新陣列)"""
+    out = np.empty_like(points, dtype=np.float64)
+    np.clip(points[:, 0], x0, x1, out=out[:, 0])
+    np.clip(points[:, 1], y0, y1, out=out[:, 1])
+    return out
+
+
+def clamp_xyxy(xyxy: np.ndarray, img_w: float, img_h: float) -> np.ndarray:
+    """把軸對齊框夾進影像範圍 (回傳新陣列)"""
+    out = xyxy.astype(np.float64, copy=True)
+    np.clip(out[:, 0::2], 0, img_w, out=out[:, 0::2])
+    np.clip(out[:, 1::2], 0, img_h, out=out[:, 1::2])
+    return out
+
+
+def normalize_points(points: np.ndarray, img_w: float, img_h: float) -> np.ndarray:
+    """pixel 座標 → 0~1 (x / 寬, y / 高); 可吃 (..., 2) 任意形狀"""
+    return points / np.array([img_w, img_h], dtype=np.float64)
+
+
+def polygons_area(points: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """每個 polygon 的面積 (鞋帶公式); 少於三點的為 0
+
+    Args:
+        points: (M, 2)
+        offsets: (P + 1,)
+
+    Returns:
+        (P,) 面積
+    """
+    n = len(offsets) - 1
+    area = np.zeros(n)
+    if n == 0 or len(points) == 0:
+        return area
+    # 每個頂點的「下一個點」: 組內往後一格, 組內最後一點接回第一點
+    nxt = np.arange(1, len(points) + 1)
+    ends = offsets[1:] - 1
+    valid = offsets[1:] > offsets[:-1]
+    nxt[ends[valid]] = offsets[:-1][valid]
+    cross = points[:, 0] * points[nxt, 1] - points[nxt, 0] * points[:, 1]
+    # reduceat 以下一個起點為界, 只能給非空的組 (空組的起點會與下一組重疊)
+    sums = np.add.reduceat(cross, offsets[:-1][valid])
+    area[valid] = np.abs(sums) / 2
+    area[offsets[1:] - offsets[:-1] < 3] = 0.0
+    return area
+
+
+def xyxy_area(xyxy: np.ndarray) -> np.ndarray:
+    """軸對齊框的面積 (寬高為負時視為 0)"""
+    return np.clip(xyxy[:, 2] - xyxy[:, 0], 0, None) * np.clip(xyxy[:, 3] - xyxy[:, 1], 0, None)
+
+
+def iou_xyxy(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """兩組軸對齊框兩兩之間的 IoU
+
+    Args:
+        a: (N, 4)
+        b: (M, 4)
+
+    Returns:
+        (N, M) IoU; 聯集為 0 的組合為 0
+    """
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    wh = np.clip(rb - lt, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    union = xyxy_area(a)[:, None] + xyxy_area(b)[None, :] - inter
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(union > 0, inter / union, 0.0)
+
+
+def simplify_closed(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """閉合 polygon 的 Ramer–Douglas–Peucker 簡化, 只供繪製用
+
+    先以第一個頂點與離它最遠的頂點把環切成兩條折線, 各自簡化; 第一個頂點一定保留
+    (畫面上 label 掛在它旁邊)。簡化後少於三點時回傳原陣列。
+
+    Args:
+        points: (N, 2) 頂點
+        tolerance: 容許的最大偏離距離 (與 points 同單位)
+
+    Returns:
+        (K, 2) 保留下來的頂點, 順序不變
+    """
+    n = len(points)
+    if n <= 3 or tolerance <= 0:
+        return points
+    far = int(np.argmax(np.hypot(points[:, 0] - points[0, 0], points[:, 1] - points[0, 1])))
+    if far == 0:
+        return points
+    # ring[n] 是接回起點的那一點, 讓第二段折線 (far → 起點) 也能用同一套索引
+    ring = np.vstack([points, points[:1]])
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[far] = True
+    stack = [(0, far), (far, n)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        seg = ring[a + 1 : b]
+        x0, y0 = ring[a]
+        dx, dy = ring[b] - ring[a]
+        length = math.hypot(dx, dy)
+        if length == 0:
+            dist = np.hypot(seg[:, 0] - x0, seg[:, 1] - y0)
+        else:
+            dist = np.abs(dx * (seg[:, 1] - y0) - dy * (seg[:, 0] - x0)) / length
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            m = a + 1 + i
+            keep[m] = True
+            stack.append((a, m))
+            stack.append((m, b))
+    if keep.sum() < 3:
+        return points
+    return points[keep]
@@ -1,15 +1,23 @@
 # 標註的 Undo / Redo 歷史。以「變更前的整份標註快照」為一個單位, 換檔即清空。
-# 更新日期: 2026-08-18
+# 更新日期: 2026-10-19
+#
+# 快照在各步之間共用沒變的項目: 每個 bbox / polygon 的純資料 tuple 只在它真的改過時才重建,
+# 堆疊裡每隔 KEYFRAME_INTERVAL 步存一份完整的項目清單 (keyframe), 其餘只存與前一步不同的項目。
+# 先前每一步都 tuple() 一次所有 polygon 的頂點, 1000 個上千點的 polygon 存滿 60 步就是數百 MB,
+# 每次按下 / 放開滑鼠也都要重建、比對整份快照。
 from __future__ import annotations
 
 from src.utils.logger import getUniqueLogger
-from src.utils.model import Bbox, Polygon
+from src.utils.model import Bbox, ColorPen, Polygon
 
 log = getUniqueLogger(__file__)
 
 # 一份快照 = (所有 bbox 的純資料, 所有 polygon 的純資料)
 Snapshot = tuple[tuple, tuple]
 
+# 每隔幾步存一次完整的項目清單; 其餘步驟只存差異, 還原時最多往回套這麼多步
+KEYFRAME_INTERVAL = 16
+
 
 def make_snapshot(bboxes: list[Bbox], polygons: list[Polygon]) -> Snapshot:
     """把目前的標註轉成一份不可變的快照
@@ -43,11 +51,123 @@ def restore_snapshot(snap: Snapshot) -> tuple[list[Bbox], list[Polygon]]:
     )
 
 
+class _Delta:
+    """堆疊中非 keyframe 的一步: 與前一步相比的長度與改過的項目"""
+
+    __slots__ = ("changes", "lengths")
+
+    def __init__(self, lengths: tuple[int, int], changes: list[tuple[int, int, tuple]]) -> None:
+        # (bbox 數, polygon 數)
+        self.lengths = lengths
+        # (種類 0=bbox / 1=polygon, index, 項目快照); 新增的 index 一定在裡面
+        self.changes = changes
+
+
+def _diff(prev: Snapshot, cur: Snapshot) -> _Delta | None:
+    """cur 相對於 prev 的差異; 改了一半以上 (例如重新偵測) 時回傳 None, 直接存完整的比較省
+
+    項目快照在各步之間共用, 這裡只比 identity; 值相同但不是同一個物件時會多記一筆, 不影響正確性。
+    """
+    changes = []
+    for kind in (0, 1):
+        old, new = prev[kind], cur[kind]
+        n_old = len(old)
+        for i, item in enumerate(new):
+            if i >= n_old or old[i] is not item:
+                changes.append((kind, i, item))
+    if len(changes) * 2 > len(cur[0]) + len(cur[1]):
+        return None
+    return _Delta((len(cur[0]), len(cur[1])), changes)
+
+
+def _apply(prev: Snapshot, delta: _Delta) -> Snapshot:
+    """把 _diff 的結果套回 prev, 得到下一步的完整快照"""
+    items = []
+    for kind in (0, 1):
+        n = delta.lengths[kind]
+        seq = list(prev[kind][:n])
+        seq.extend([None] * (n - len(seq)))
+        items.append(seq)
+    for kind, i, item in delta.changes:
+        items[kind][i] = item
+    return (tuple(items[0]), tuple(items[1]))
+
+
+class _SnapshotStack:
+    """一疊快照; keyframe 存完整的項目清單, 其餘存與前一筆的差異, 最後一筆另外快取完整內容"""
+
+    def __init__(self) -> None:
+        self._entries: list[Snapshot | _Delta] = []
+        self._last: Snapshot | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._last = None
+
+    def last(self) -> Snapshot | None:
+        return self._last
+
+    def append(self, snap: Snapshot) -> None:
+        entry = snap
+        if self._last is not None and self._deltas_since_keyframe() < KEYFRAME_INTERVAL - 1:
+            entry = _diff(self._last, snap) or snap
+        self._entries.append(entry)
+        self._last = snap
+
+    def pop(self) -> Snapshot:
+        snap = self._last
+        self._entries.pop()
+        self._last = self._rebuild(len(self._entries) - 1) if self._entries else None
+        return snap
+
+    def pop_oldest(self) -> None:
+        """丟掉最舊的一筆; 下一筆若是差異, 先把它展開成 keyframe"""
+        first = self._entries.pop(0)
+        if self._entries and isinstance(self._entries[0], _Delta):
+            self._entries[0] = _apply(first, self._entries[0])
+        if not self._entries:
+            self._last = None
+
+    def _deltas_since_keyframe(self) -> int:
+        count = 0
+        for entry in reversed(self._entries):
+            if not isinstance(entry, _Delta):
+                break
+            count += 1
+        return count
+
+    def _rebuild(self, index: int) -> Snapshot:
+        """第 index 筆的完整快照: 從前面最近的 keyframe 依序套差異"""
+        start = index
+        while isinstance(self._entries[start], _Delta):
+            start -= 1
+        if start == index:
+            return self._entries[index]
+        # 在同一份 list 上依序套用, 不必每一步都轉一次 tuple
+        items = [list(self._entries[start][0]), list(self._entries[start][1])]
+        for delta in self._entries[start + 1 : index + 1]:
+            for kind in (0, 1):
+                n = delta.lengths[kind]
+                seq = items[kind]
+                del seq[n:]
+                seq.extend([None] * (n - len(seq)))
+            for kind, i, item in delta.changes:
+                items[kind][i] = item
+        return (tuple(items[0]), tuple(items[1]))
+
+
 class AnnotationHistory:
     """單一影像的標註 undo / redo 歷史
 
-    快照式而非命令式: 一張圖的標註只有數十個小物件, 複製成本可忽略; 而 resize、
-    旋轉、頂點拖曳這類連續操作若用命令物件, 很容易漏記反向狀態。
+    快照式而非命令式: resize、旋轉、頂點拖曳這類連續操作若用命令物件, 很容易漏記反向狀態。
+    快照之間共用沒改過的項目, 所以每一步實際多佔的只有改過的那幾個標註。
+
+    判斷項目有沒有改過: bbox 直接比欄位; polygon 比 points 這個 list 的 identity 與
+    label / confidence —— 所以 polygon 的頂點一律整個換成新的 list, 不可就地修改
+    (見 Polygon 的說明), 否則歷史會誤以為沒改過。
 
     歷史屬於「目前這張影像」, 換檔或影片換幀時由 clear() 重置 —— 換檔會重讀 XML,
     保留跨檔歷史會讓 undo 把上一張的框寫進這一張。
@@ -59,8 +179,10 @@ class AnnotationHistory:
             limit: undo 堆疊的最大筆數, 超過時丟棄最舊的一筆
         """
         self._limit = max(1, int(limit))
-        self._undo: list[Snapshot] = []
-        self._redo: list[Snapshot] = []
+        self._undo = _SnapshotStack()
+        self._redo = _SnapshotStack()
+        # id(標註物件) → (物件, 當時的 points list 或 None, 項目快照); 只留目前畫面上的標註
+        self._items: dict[int, tuple] = {}
 
     @property
     def depth(self) -> int:
@@ -81,6 +203,68 @@ class AnnotationHistory:
         """清空整個歷史 (換檔 / 換幀 / 重新載入時呼叫)"""
         self._undo.clear()
         self._redo.clear()
+        self._items = {}
+
+    def _capture(self, bboxes: list[Bbox], polygons: list[Polygon]) -> Snapshot:
+        """目前狀態的快照; 沒改過的項目沿用上一次的項目快照 (同一個 tuple 物件)"""
+        old = self._items
+        items = {}
+        bbox_snaps = []
+        for b in bboxes:
+            snap = b.snapshot()
+            hit = old.get(id(b))
+            if hit is not None and hit[0] is b and hit[2] == snap:
+                snap = hit[2]
+            items[id(b)] = (b, None, snap)
+            bbox_snaps.append(snap)
+        poly_snaps = []
+        for p in polygons:
+            hit = old.get(id(p))
+            if (
+                hit is not None
+                and hit[0] is p
+                and hit[1] is p.points
+                and len(p.points) == len(hit[2][0])
+                and p.label == hit[2][1]
+                and p.confidence == hit[2][2]
+            ):
+                snap = hit[2]
+            else:
+                snap = p.snapshot()
+            items[id(p)] = (p, p.points, snap)
+            poly_snaps.append(snap)
+        self._items = items
+        return (tuple(bbox_snaps), tuple(poly_snaps))
+
+    def _restore(self, snap: Snapshot) -> tuple[list[Bbox], list[Polygon]]:
+        """把快照換回標註物件
+
+        呼叫前剛 _capture 過畫面上的標註: 項目快照相同 (同一個 tuple) 的直接沿用那個物件,
+        只有改過的項目才重建; 並記下各物件對應的項目快照, 下一次 _capture 才能繼續共用。
+        """
+        live = {id(s): obj for obj, _, s in self._items.values()}
+        items = {}
+        bboxes = []
+        for s in snap[0]:
+            b = live.pop(id(s), None)
+            if b is None:
+                b = Bbox.from_snapshot(s)
+            else:
+                # 與重建的物件一致: 顯示狀態 (選取 / 拖曳中的顏色) 不跟著還原
+                b.color_pen = ColorPen.GREEN
+            items[id(b)] = (b, None, s)
+            bboxes.append(b)
+        polygons = []
+        for s in snap[1]:
+            p = live.pop(id(s), None)
+            if p is None:
+                p = Polygon.from_snapshot(s)
+            else:
+                p.color_pen = ColorPen.ORANGE
+            items[id(p)] = (p, p.points, s)
+            polygons.append(p)
+        self._items = items
+        return bboxes, polygons
 
     def push(self, bboxes: list[Bbox], polygons: list[Polygon]) -> None:
         """在變更「之前」記錄目前狀態
@@ -93,12 +277,12 @@ class AnnotationHistory:
             polygons: 變更前的 polygon 清單
         """
         try:
-            self._undo.append(make_snapshot(bboxes, polygons))
+            self._undo.append(self._capture(bboxes, polygons))
         except Exception as e:
             log.e(f"建立 undo 快照失敗: {e}")
             return
         if len(self._undo) > self._limit:
-            self._undo.pop(0)
+            self._undo.pop_oldest()
         self._redo.clear()
 
     def drop_last(self) -> None:
@@ -120,10 +304,12 @@ class AnnotationHistory:
         Returns:
             bool: 相同則為 True; 堆疊為空時回傳 False
         """
-        if not self._undo:
+        last = self._undo.last()
+        if last is None:
             return False
         try:
-            return self._undo[-1] == make_snapshot(bboxes, polygons)
+            # 沒改過的項目是同一個 tuple, == 逐項先比 identity, 只有改過的項目才真的比內容
+            return last == self._capture(bboxes, polygons)
         except Exception as e:
             log.e(f"比對 undo 快照失敗: {e}")
             return False
@@ -143,8 +329,8 @@ class AnnotationHistory:
         if not self._undo:
             return None
         try:
-            self._redo.append(make_snapshot(bboxes, polygons))
-            return restore_snapshot(self._undo.pop())
+            self._redo.append(self._capture(bboxes, polygons))
+            return self._restore(self._undo.pop())
         except Exception as e:
             log.e(f"undo 失敗: {e}")
             return None
@@ -164,8 +350,8 @@ class AnnotationHistory:
         if not self._redo:
             return None
         try:
-            self._undo.append(make_snapshot(bboxes, polygons))
-            return restore_snapshot(self._redo.pop())
+            self._undo.append(self._capture(bboxes, polygons))
+            return self._restore(self._redo.pop())
         except Exception as e:
             log.e(f"redo 失敗: {e}")
             return None
@@ -0,0 +1,188 @@
+# Mask 工具 (Draw / Erase / Fill) 的圖層：原圖大小的單通道 uint8 陣列 (0 = 無, 255 = mask)
+# 更新日期: 2026-10-19
+#
+# 先前 mask 是一張原圖大小的 ARGB QPixmap: 縮小檢視時每次重繪都整張 scaled() 一次,
+# Fill 則把整張轉成 QImage → BGRA 陣列 → floodFill → dstack → 再轉回 QPixmap,
+# 8K 影像上每個動作都要搬上百 MB。現在筆刷 / 填滿直接改陣列並記下改到的範圍,
+# 顯示用的縮圖依尺寸快取, 只重算改到的那一塊。
+# 顯示一律用 QImage.Format_Alpha8 直接包住陣列: Qt 會把它畫成「黑色 + alpha」,
+# 與先前黑色不透明的筆刷外觀相同, 不必另外轉成 ARGB。
+from __future__ import annotations
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PyQt6.QtGui import QImage
+
+from src.utils.func import imwrite_unicode
+from src.utils.logger import getUniqueLogger
+
+log = getUniqueLogger(__file__)
+
+MASK_ON = 255
+MASK_OFF = 0
+# 同時快取幾種縮圖尺寸 (縮放來回切換時不必重算)
+MAX_DISPLAY_CACHE = 3
+
+
+def _union(a: tuple[int, int, int, int] | None, b: tuple[int, int, int, int]) -> tuple[int, int, int, int]:
+    """兩個範圍的聯集; a 為 None 時就是 b"""
+    if a is None:
+        return b
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+class _ScaledDisplay:
+    """某個顯示尺寸的最近鄰縮圖, 與它還沒同步的範圍"""
+
+    def __init__(self, data: np.ndarray, width: int, height: int):
+        h, w = data.shape
+        # 縮圖第 i 列取原圖第 rows[i] 列 (最近鄰), 局部更新與整張計算共用這份對應
+        self.rows = (np.arange(height) * h // height).astype(np.intp)
+        self.cols = (np.arange(width) * w // width).astype(np.intp)
+        self.array = np.ascontiguousarray(data[np.ix_(self.rows, self.cols)])
+        self.image = QImage(self.array.data, width, height, width, QImage.Format.Format_Alpha8)
+        # 原圖座標 (x0, y0, x1, y1), 右下不含; None 表示已同步
+        self.pending: tuple[int, int, int, int] | None = None
+
+    def sync(self, data: np.ndarray) -> None:
+        """把 pending 範圍從原圖重新取樣到縮圖"""
+        if self.pending is None:
+            return
+        x0, y0, x1, y1 = self.pending
+        self.pending = None
+        r0, r1 = np.searchsorted(self.rows, (y0, y1))
+        c0, c1 = np.searchsorted(self.cols, (x0, x1))
+        if r0 < r1 and c0 < c1:
+            self.array[r0:r1, c0:c1] = data[np.ix_(self.rows[r0:r1], self.cols[c0:c1])]
+
+
+class MaskLayer:
+    """原圖大小的二值 mask, 附帶改動範圍追蹤與顯示用的縮圖快取"""
+
+    def __init__(self, width: int, height: int):
+        """
+        Args:
+            width: 原圖寬
+            height: 原圖高
+        """
+        self.data = np.zeros((max(1, height), max(1, width)), dtype=np.uint8)
+        # 原圖解析度的顯示用 QImage, 與 data 共用記憶體 (改 data 就會反映)
+        self._image = QImage(
+            self.data.data, self.width, self.height, self.width, QImage.Format.Format_Alpha8
+        )
+        self._displays: dict[tuple[int, int], _ScaledDisplay] = {}
+        # GL 畫布 (src/gl_canvas.py) 的貼圖還沒同步的範圍; None 表示已同步
+        self._texture_pending: tuple[int, int, int, int] | None = None
+        # 畫過任何東西才需要畫到畫面上; 擦掉之後不重算, 最多多畫一張全透明的圖
+        self.has_content = False
+
+    @property
+    def width(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.data.shape[0]
+
+    def _mark_dirty(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """記下改過的範圍 (原圖座標, 右下不含), 給各個縮圖之後局部更新"""
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.width, x1), min(self.height, y1)
+        if x0 >= x1 or y0 >= y1:
+            return
+        for disp in self._displays.values():
+            disp.pending = _union(disp.pending, (x0, y0, x1, y1))
+        self._texture_pending = _union(self._texture_pending, (x0, y0, x1, y1))
+
+    def take_texture_pending(self) -> tuple[int, int, int, int] | None:
+        """取出 GL 貼圖該重新上傳的範圍 (原圖座標, 右下不含) 並清空; 沒有變動則為 None"""
+        rect, self._texture_pending = self._texture_pending, None
+        return rect
+
+    def draw_line(self, p0: tuple[int, int], p1: tuple[int, int], width: int, erase: bool) -> tuple[int, int, int, int]:
+        """以圓頭筆刷畫 (或擦) 一段線
+
+        Args:
+            p0: 起點 (原圖座標)
+            p1: 終點 (原圖座標)
+            width: 筆刷粗細 (原圖 px)
+            erase: True 為擦除
+
+        Returns:
+            (x0, y0, x1, y1): 改到的範圍 (原圖座標, 右下不含)
+        """
+        value = MASK_OFF if erase else MASK_ON
+        cv2.line(self.data, p0, p1, value, max(1, int(width)), cv2.LINE_8)
+        if not erase:
+            self.has_content = True
+        r = int(width) // 2 + 2
+        rect = (
+            min(p0[0], p1[0]) - r,
+            min(p0[1], p1[1]) - r,
+            max(p0[0], p1[0]) + r + 1,
+            max(p0[1], p1[1]) + r + 1,
+        )
+        self._mark_dirty(*rect)
+        return rect
+
+    def flood_fill(self, x: int, y: int) -> tuple[int, int, int, int] | None:
+        """從 (x, y) 填滿相連的同值區域: 點在空白處就填上, 點在 mask 上就清掉
+
+        Returns:
+            (x0, y0, x1, y1): 改到的範圍; 點在影像外則為 None
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        value = MASK_ON if self.data[y, x] == MASK_OFF else MASK_OFF
+        # mask 參數傳 None: 不需要 floodFill 的輸出遮罩, 省下一張 (h+2)×(w+2) 的陣列
+        _, _, _, (rx, ry, rw, rh) = cv2.floodFill(self.data, None, (x, y), value)
+        if value == MASK_ON:
+            self.has_content = True
+        rect = (rx, ry, rx + rw, ry + rh)
+        self._mark_dirty(*rect)
+        return rect
+
+    def image(self) -> QImage:
+        """原圖解析度的顯示用 QImage (Alpha8, 與 data 共用記憶體)"""
+        return self._image
+
+    def scaled_image(self, width: int, height: int) -> QImage:
+        """縮小檢視用的縮圖 (最近鄰); 同一尺寸只算一次, 之後只補改過的範圍
+
+        Args:
+            width: 縮圖寬
+            height: 縮圖高
+
+        Returns:
+            QImage: Alpha8 縮圖
+        """
+        key = (max(1, width), max(1, height))
+        disp = self._displays.get(key)
+        if disp is None:
+            if len(self._displays) >= MAX_DISPLAY_CACHE:
+                self._displays.pop(next(iter(self._displays)))
+            disp = self._displays[key] = _ScaledDisplay(self.data, *key)
+        else:
+            disp.sync(self.data)
+        return disp.image
+
+    def save(self, path) -> bool:
+        """存成 1-bit 的 PNG (255 = mask); 二值影像以 bilevel 編碼, 檔案比 8-bit 小得多
+
+        Args:
+            path: 輸出路徑
+
+        Returns:
+            bool: 是否寫出成功
+        """
+        ok = imwrite_unicode(
+            path,
+            self.data,
+            ext=".png",
+            params=[cv2.IMWRITE_PNG_BILEVEL, 1, cv2.IMWRITE_PNG_COMPRESSION, 9],
+        )
+        if ok:
+            log.i(f"mask 已存檔: {Path(path).name}")
+        return ok
@@ -0,0 +1,242 @@
+# dataset 的檔案擺放：hardlink / reflink (copy-on-write) / 複製 / symlink / 搬移, 自動挑最省的方式
+# 更新日期: 2026-10-19
+#
+# 圖片內容在建 dataset 時不會被改動, 沒必要真的複製一份: 同一個檔案系統就 hardlink (不佔空間、
+# 瞬間完成), 不能 hardlink 的檔案系統試 reflink (Btrfs / XFS / APFS 的 copy-on-write),
+# 都不行才真的複製, 而複製交給 thread pool (I/O 為主, 不受 GIL 限制)。
+from __future__ import annotations
+
+import ctypes
+import errno
+import os
+import shutil
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.utils.logger import getUniqueLogger
+from src.utils.parallel import chunked
+
+log = getUniqueLogger(__file__)
+
+METHOD_AUTO = "auto"
+METHOD_HARDLINK = "hardlink"
+METHOD_REFLINK = "reflink"
+METHOD_COPY = "copy"
+METHOD_SYMLINK = "symlink"
+METHOD_MOVE = "move"
+METHOD_NAMES = {
+    METHOD_AUTO: "自動 (hardlink → reflink → 複製)",
+    METHOD_HARDLINK: "hardlink",
+    METHOD_REFLINK: "reflink",
+    METHOD_COPY: "複製",
+    METHOD_SYMLINK: "symlink",
+    METHOD_MOVE: "搬移",
+}
+
+# 平行複製的 thread 數; 磁碟 I/O 為主, 太多反而互搶
+COPY_WORKERS = 8
+# 每批檔案數: 每批結束才回報進度、檢查取消
+BATCH_SIZE = 64
+
+# Linux 的 FICLONE ioctl (_IOW(0x94, 9, int))
+_FICLONE = 0x40049409
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    """copy-on-write 複製; 檔案系統不支援時拋 OSError"""
+    if sys.platform.startswith("linux"):
+        import fcntl
+
+        try:
+            with open(src, "rb") as fs, open(dst, "wb") as fd:
+                fcntl.ioctl(fd.fileno(), _FICLONE, fs.fileno())
+        except OSError:
+            dst.unlink(missing_ok=True)
+            raise
+        shutil.copystat(src, dst)
+    elif sys.platform == "darwin":
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(dst))
+    else:
+        raise OSError(errno.EOPNOTSUPP, "reflink not supported on this platform", str(dst))
+
+
+def _place_one(src: Path, dst: Path, method: str) -> None:
+    """用指定方式擺放單一檔案; 失敗時拋 OSError (不做 fallback)"""
+    if method == METHOD_HARDLINK:
+        os.link(src, dst)
+    elif method == METHOD_REFLINK:
+        _reflink(src, dst)
+    elif method == METHOD_SYMLINK:
+        # 相對路徑: 整個資料夾搬走後連結仍有效
+        os.symlink(os.path.relpath(src, dst.parent), dst)
+    elif method == METHOD_MOVE:
+        shutil.move(str(src), str(dst))
+    else:
+        shutil.copy2(str(src), str(dst))
+
+
+def _prepare_dst(src: Path, dst: Path) -> bool:
+    """清出目的地; link 類不能覆蓋既有檔案
+
+    Returns:
+        bool: 目的地原本就有檔案 (上一次建置留下的)
+    """
+    if not os.path.lexists(dst):
+        return False
+    dst.unlink()
+    return True
+
+
+def candidate_methods(method: str, src_dir: Path, dst_dir: Path) -> list[str]:
+    """依使用者的選擇列出要依序嘗試的方式
+
+    auto: 同一個裝置才可能 hardlink / reflink, 否則直接複製。
+    symlink / hardlink / reflink 失敗時都退回複製。
+    """
+    if method == METHOD_AUTO:
+        try:
+            same_dev = os.stat(src_dir).st_dev == os.stat(dst_dir).st_dev
+        except OSError:
+            same_dev = False
+        if same_dev:
+            return [METHOD_HARDLINK, METHOD_REFLINK, METHOD_COPY]
+        return [METHOD_COPY]
+    if method in (METHOD_COPY, METHOD_MOVE):
+        return [method]
+    return [method, METHOD_COPY]
+
+
+def materialize_files(
+    jobs: list[tuple[Path, Path]],
+    method: str,
+    placed: list[tuple[str, Path, Path]],
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    is_canceled: Optional[Callable[[], bool]] = None,
+) -> tuple[Counter, bool]:
+    """把 jobs 的每個 (src, dst) 擺到位
+
+    第一個檔案依 candidate_methods 逐一嘗試, 成功的方式沿用到其餘檔案 (探測一次即可,
+    不必每個檔案都先失敗一輪); 之後個別檔案再失敗就退回複製。
+    複製 / reflink 交給 thread pool 平行處理, hardlink / symlink / 搬移只是 metadata 操作,
+    直接在本 thread 做。
+
+    Args:
+        jobs: (來源, 目的地)
+        method: METHOD_*
+        placed: 成功擺放的 (實際方式, src, dst) 會附加到這裡, 供取消時復原;
+                目的地原本就有檔案的不列入 (復原時不該刪掉上一次建置的結果)
+        progress_callback: 每批完成後呼叫 (已完成數, 總數)
+        is_canceled: 每批完成後檢查; 回傳 True 時停止
+
+    Returns:
+        (used, canceled): 各方式實際擺放的檔案數; 是否被取消
+    """
+    used: Counter = Counter()
+    total = len(jobs)
+    if not jobs:
+        return used, False
+
+    # 探測: 用第一個檔案決定這批要用的方式
+    src, dst = jobs[0]
+    candidates = candidate_methods(method, src.parent, dst.parent)
+    chosen = candidates[-1]
+    existed = _prepare_dst(src, dst)
+    for candidate in candidates:
+        try:
+            _place_one(src, dst, candidate)
+            chosen = candidate
+            break
+        except OSError as e:
+            if candidate == candidates[-1]:
+                raise
+            log.i(f"{candidate} 不可用 ({e}), 改試下一種方式")
+    used[chosen] += 1
+    if not existed:
+        placed.append((chosen, src, dst))
+    if chosen != method:
+        log.i(f"dataset 擺放方式: {chosen} (選擇: {method})")
+
+    def _job(pair: tuple[Path, Path]) -> tuple[str, Path, Path, bool]:
+        s, d = pair
+        had = _prepare_dst(s, d)
+        try:
+            _place_one(s, d, chosen)
+            return chosen, s, d, had
+        except OSError as e:
+            if chosen in (METHOD_COPY, METHOD_MOVE):
+                raise
+            # 個別檔案無法 link (例如 hardlink 數達上限), 退回複製
+            log.w(f"{chosen} 失敗, 改為複製 {s}: {e}")
+            shutil.copy2(str(s), str(d))
+            return METHOD_COPY, s, d, had
+
+    done = 1
+    if progress_callback:
+        progress_callback(done, total)
+    parallel = chosen in (METHOD_COPY, METHOD_REFLINK)
+    pool = ThreadPoolExecutor(max_workers=COPY_WORKERS) if parallel else None
+    try:
+        for batch in chunked(jobs[1:], BATCH_SIZE):
+            if is_canceled and is_canceled():
+                return used, True
+            if pool:
+                _collect_parallel(pool, _job, batch, used, placed)
+            else:
+                for pair in batch:
+                    actual, s, d, had = _job(pair)
+                    used[actual] += 1
+                    if not had:
+                        placed.append((actual, s, d))
+            done += len(batch)
+            if progress_callback:
+                progress_callback(done, total)
+    finally:
+        if pool:
+            pool.shutdown(wait=True)
+    return used, False
+
+
+def _collect_parallel(
+    pool: ThreadPoolExecutor,
+    job: Callable,
+    batch: list[tuple[Path, Path]],
+    used: Counter,
+    placed: list[tuple[str, Path, Path]],
+) -> None:
+    """平行擺放一批, 每個檔案的結果都記進 used / placed 後才把第一個例外往外拋
+
+    pool.map 遇到第一個例外就停止取結果, 同一批排在後面、已經擺好的檔案不會進 placed,
+    取消或失敗時 undo_placed 就刪不到它們。
+    """
+    futures = [pool.submit(job, pair) for pair in batch]
+    error: Optional[BaseException] = None
+    for future in futures:
+        try:
+            actual, s, d, had = future.result()
+        except Exception as e:
+            if error is None:
+                error = e
+            continue
+        used[actual] += 1
+        if not had:
+            placed.append((actual, s, d))
+    if error is not None:
+        raise error
+
+
+def undo_placed(placed: list[tuple[str, Path, Path]]) -> None:
+    """倒序復原擺放過的檔案: 搬移的搬回原位, 其餘 (link / 複製) 刪掉"""
+    for method, src, dst in reversed(placed):
+        try:
+            if method == METHOD_MOVE:
+                shutil.move(str(dst), str(src))
+            else:
+                dst.unlink(missing_ok=True)
+        except Exception as e:
+            log.e(f"復原失敗 {dst} → {src}: {e}")
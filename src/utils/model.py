@@ -1,6 +1,6 @@
 # 標註與播放狀態的資料模型。Bbox / Polygon 另提供 snapshot / from_snapshot,
 # 供 undo 歷史以「不含 Qt 物件的純資料」保存與還原 (見 src/utils/history.py)。
-# 更新日期: 2026-08-18
+# 更新日期: 2026-10-19
 from PyQt6.QtGui import QColor, QPen
 
 
@@ -15,6 +15,9 @@ class ColorPen:
 class Bbox:
     """單一矩形標註 (原始影像座標)"""
 
+    # 一張圖可能有上萬個標註: 不帶 __dict__ 每個物件約省 50 bytes (約 1/4), 取屬性也快一些
+    __slots__ = ("angle", "color_pen", "confidence", "height", "label", "width", "x", "y")
+
     def __init__(self, x, y, width, height, label, confidence=-1.0, angle=0.0):
         self.x = x
         self.y = y
@@ -58,7 +61,13 @@ class Bbox:
 
 
 class Polygon:
-    """單一多邊形標註 (原始影像座標)"""
+    """單一多邊形標註 (原始影像座標)
+
+    points 要改就整個換成新的 list, 不要就地改 points[i]: undo 歷史以這個 list 的
+    identity 判斷 polygon 有沒有改過, 沒改過的 polygon 不必每一步都複製一次頂點。
+    """
+
+    __slots__ = ("color_pen", "confidence", "label", "points")
 
     def __init__(self, points, label, confidence=-1.0):
         self.points = points  # list[(float, float)] in original image coords
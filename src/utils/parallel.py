@@ -0,0 +1,53 @@
+# process pool 的共用小工具：有上限的依序取回、worker 數與分批
+# 更新日期: 2026-10-19
+from __future__ import annotations
+
+import os
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Iterable, Iterator
+
+# 同時在途的任務數 = workers × 這個倍數; 夠讓每個 worker 手上都有下一批, 又不會讓結果堆積
+WINDOW_PER_WORKER = 4
+
+
+def default_workers(workers: int | None = None) -> int:
+    """未指定時用 CPU 數"""
+    return workers or os.cpu_count() or 1
+
+
+def chunked(items: list, size: int) -> list[list]:
+    """切成每批 size 個"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def ordered_results(
+    pool: Executor, fn: Callable, items: Iterable, workers: int | None = None
+) -> Iterator:
+    """依送出順序逐一取回結果, 最多只讓 workers × WINDOW_PER_WORKER 個任務在途
+
+    Executor.map 會一次把所有任務送出, 消費端一慢, 跑完的結果就全堆在記憶體;
+    這裡取走一個才補送一個, 記憶體上限固定。結果順序與 items 相同, 合併後的輸出
+    因此與平行度無關。
+
+    Args:
+        pool: 已建立的 executor
+        fn: 模組層級函式 (process pool 需要能 pickle)
+        items: 每個任務的參數
+        workers: pool 大小, 用來決定視窗大小
+
+    Yields:
+        fn(item) 的結果, 依 items 順序
+    """
+    window = default_workers(workers) * WINDOW_PER_WORKER
+    pending = deque()
+    it = iter(items)
+    for item in it:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            break
+    while pending:
+        yield pending.popleft().result()
+        for item in it:
+            pending.append(pool.submit(fn, item))
+            break
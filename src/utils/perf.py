@@ -0,0 +1,209 @@
+# 換圖 / 存檔 / 偵測 / 重繪的耗時記錄: 每個「事件」拆成數個階段 (存檔、解碼、轉 QPixmap、
+# 讀 XML、偵測、第一次重繪), 保留最近幾筆算 p50 / p95, 也可以逐筆附加到 CSV。
+# 更新日期: 2026-10-19
+#
+# 用法:
+#     with perf.event("navigate", wait_paint=True):   # 最外層才算一個事件, 內層的 event 不另外記
+#         with perf.phase("save"):
+#             ...
+#     paintEvent 結束時呼叫 perf.paint_done(秒數): 等待重繪的事件會補上 first_paint 並結束
+# cfg.enable_perf_monitor 與 cfg.perf_csv_path 都沒開時, event / phase 直接回傳空的 context,
+# 幾乎沒有成本。
+from __future__ import annotations
+
+import contextlib
+import csv
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.config import cfg
+from src.utils.logger import getUniqueLogger
+
+log = getUniqueLogger(__file__)
+
+# CSV 的階段欄位 (固定順序, 沒有經過的階段留空)
+PHASES = ("save", "decode", "qt_convert", "xml_parse", "inference", "first_paint")
+CSV_FIELDS = ("time", "event", "total_ms", *(f"{p}_ms" for p in PHASES), "file")
+# p50 / p95 取最近幾筆
+PERF_WINDOW = 100
+
+_NULL = contextlib.nullcontext()
+
+
+class _Event:
+    """進行中的一個事件: 開始時間與各階段累計的秒數"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.phases: dict[str, float] = {}
+        self.file = ""
+
+
+class _EventScope:
+    def __init__(self, monitor: PerfMonitor, name: str, wait_paint: bool) -> None:
+        self._monitor = monitor
+        self._name = name
+        self._wait_paint = wait_paint
+        self._event: _Event | None = None
+
+    def __enter__(self):
+        m = self._monitor
+        if m._current is not None:
+            # 巢狀: 例如換圖時的存檔與載入, 只當外層事件的一部分
+            return self
+        m._flush_pending()
+        self._event = m._current = _Event(self._name)
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        ev = self._event
+        if ev is None:
+            return False
+        m = self._monitor
+        m._current = None
+        ev.end = time.perf_counter()
+        if self._wait_paint:
+            m._pending = ev
+        else:
+            m._finish(ev)
+        return False
+
+
+class _PhaseScope:
+    def __init__(self, monitor: PerfMonitor, name: str) -> None:
+        self._monitor = monitor
+        self._name = name
+        self._t0 = 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        ev = self._monitor._current
+        if ev is not None:
+            ev.phases[self._name] = ev.phases.get(self._name, 0.0) + time.perf_counter() - self._t0
+        return False
+
+
+class PerfMonitor:
+    """事件耗時的記錄器 (整個程式共用 perf 這一個)
+
+    事件結束時更新該事件名稱的滾動統計, 有設定 CSV 就附加一列, 再呼叫 on_event。
+    「重繪」不算事件 (滑鼠移動就會觸發, 量太大), 只記滾動統計, 不寫 CSV。
+    """
+
+    def __init__(self) -> None:
+        self._current: Optional[_Event] = None
+        # 已經結束、等第一次重繪補上 first_paint 的事件
+        self._pending: Optional[_Event] = None
+        self._samples: dict[str, deque[float]] = {}
+        self._csv_failed = False
+        # 事件結束後的通知 (狀態列更新), 參數為事件名稱、總毫秒數與各階段毫秒數
+        self.on_event: Optional[Callable[[str, float, dict[str, float]], None]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return cfg.enable_perf_monitor or bool(cfg.perf_csv_path)
+
+    def event(self, name: str, wait_paint: bool = False):
+        """記錄一個事件; 已經在另一個事件裡時不另外記 (只累計階段)
+
+        Args:
+            name: 事件名稱 (navigate / load / save / inference)
+            wait_paint: 離開 with 後先不結束, 等下一次重繪補上 first_paint
+        """
+        if not self.enabled:
+            return _NULL
+        return _EventScope(self, name, wait_paint)
+
+    def phase(self, name: str):
+        """把 with 區塊的耗時累計到目前事件的某個階段; 不在事件中則不記"""
+        if not self.enabled:
+            return _NULL
+        return _PhaseScope(self, name)
+
+    def set_file(self, path: str) -> None:
+        """記下目前事件處理的檔案 (寫進 CSV)"""
+        if self._current is not None:
+            self._current.file = str(path)
+
+    def paint_done(self, seconds: float) -> None:
+        """每次重繪結束時呼叫: 記入重繪統計, 並結束等待重繪的事件
+
+        Args:
+            seconds: 這次重繪花的秒數
+        """
+        if not self.enabled:
+            return
+        self._sample("paint", seconds * 1000)
+        ev = self._pending
+        if ev is not None:
+            self._pending = None
+            ev.phases["first_paint"] = seconds
+            ev.end = time.perf_counter()
+            self._finish(ev)
+
+    def stats(self, name: str) -> tuple[float, float, int] | None:
+        """某個事件最近 PERF_WINDOW 筆的 (p50, p95, 筆數), 毫秒; 沒有資料則為 None"""
+        samples = self._samples.get(name)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        n = len(ordered)
+        return ordered[n // 2], ordered[min(n - 1, int(n * 0.95))], n
+
+    def _sample(self, name: str, ms: float) -> None:
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=PERF_WINDOW)
+        samples.append(ms)
+
+    def _flush_pending(self) -> None:
+        """沒等到重繪 (例如視窗被縮小) 就開始下一個事件: 以離開 with 的時間結束它"""
+        ev = self._pending
+        if ev is not None:
+            self._pending = None
+            self._finish(ev)
+
+    def _finish(self, ev: _Event) -> None:
+        total_ms = (ev.end - ev.start) * 1000
+        phases_ms = {k: v * 1000 for k, v in ev.phases.items()}
+        self._sample(ev.name, total_ms)
+        if cfg.perf_csv_path:
+            self._append_csv(ev, total_ms, phases_ms)
+        if self.on_event is not None:
+            self.on_event(ev.name, total_ms, phases_ms)
+
+    def _append_csv(self, ev: _Event, total_ms: float, phases_ms: dict[str, float]) -> None:
+        if self._csv_failed:
+            return
+        path = Path(cfg.perf_csv_path)
+        row = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "event": ev.name,
+            "total_ms": f"{total_ms:.1f}",
+            "file": ev.file,
+        }
+        for p in PHASES:
+            row[f"{p}_ms"] = f"{phases_ms[p]:.1f}" if p in phases_ms else ""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            new_file = not path.exists() or path.stat().st_size == 0
+            with open(path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(row)
+        except OSError as e:
+            # 寫不進去就停掉 CSV, 不要每換一張圖就噴一次錯誤
+            self._csv_failed = True
+            log.w(f"寫入耗時記錄失敗 ({path}), 本次執行不再寫入: {e}")
+
+
+perf = PerfMonitor()
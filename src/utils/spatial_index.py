@@ -0,0 +1,139 @@
+# 標註的空間索引：原圖座標上的均勻格網, 讓滑鼠命中判斷與框選只看游標附近的標註
+# 更新日期: 2026-10-19
+#
+# 先前每次按下 / hover / 框選都逐一檢查全部標註 (每個 polygon 現建一次 numpy 陣列再丟給
+# cv2), 標註一多滑鼠就跟不上。這裡把每個標註的軸對齊外接框 (AABB) 放進格子,
+# 查詢時只取游標所在格子內的候選, 精確判斷仍由呼叫端用原本的算式做, 結果與逐一檢查相同。
+# 不碰 Qt, 陣列慣例同 src/utils/geometry.py。
+from __future__ import annotations
+
+import math
+from typing import Sequence
+
+import numpy as np
+
+from src.utils import geometry
+
+# 格子邊長的下限 (原圖 px): 標註都很小時也不要切出幾十萬個格子
+MIN_CELL_SIZE = 16.0
+# 一個標註最多佔幾格; 超過的 (例如蓋住整張圖的框) 放進 _large, 每次查詢都列為候選
+MAX_CELLS_PER_ITEM = 64
+# AABB 外擴 (原圖 px): 吸收取整與三角函數的誤差, 寧可多給候選也不要漏
+AABB_MARGIN = 1.0
+
+
+class GridIndex:
+    """AABB 的均勻格網索引
+
+    格子大小取 AABB 長邊的中位數 (不小於 MIN_CELL_SIZE), 一般標註只落在 1~4 格;
+    查詢成本只與游標附近的標註數有關, 不隨總數成長。
+    """
+
+    def __init__(self, aabbs: np.ndarray, cell_size: float | None = None):
+        """
+        Args:
+            aabbs: (N, 4) xyxy; 含 NaN 的列 (例如空的 polygon) 不會被查到
+            cell_size: 格子邊長; None 則依 AABB 尺寸自動決定
+        """
+        self.aabbs = np.asarray(aabbs, dtype=np.float64).reshape(-1, 4)
+        valid = ~np.isnan(self.aabbs).any(axis=1)
+        if cell_size is None:
+            sizes = np.maximum(
+                self.aabbs[valid, 2] - self.aabbs[valid, 0],
+                self.aabbs[valid, 3] - self.aabbs[valid, 1],
+            )
+            cell_size = float(np.median(sizes)) if len(sizes) else MIN_CELL_SIZE
+        self.cell_size = max(MIN_CELL_SIZE, cell_size)
+        self._cells: dict[tuple[int, int], list[int]] = {}
+        self._large: list[int] = []
+
+        # 格子範圍整批算, Python 端只剩把 index 塞進 dict
+        idx = np.flatnonzero(valid)
+        cells = np.floor(self.aabbs[idx] / self.cell_size).astype(np.int64)
+        for i, (cx0, cy0, cx1, cy1) in zip(idx.tolist(), cells.tolist()):
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > MAX_CELLS_PER_ITEM:
+                self._large.append(i)
+                continue
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self._cells.setdefault((cx, cy), []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.aabbs)
+
+    def query_rect(self, x0: float, y0: float, x1: float, y1: float) -> list[int]:
+        """AABB 與矩形 [x0, x1] × [y0, y1] 相交的標註
+
+        Returns:
+            list[int]: 由小到大排序的 index (與逐一檢查時的先後順序一致)
+        """
+        if not len(self.aabbs):
+            return []
+        cx0 = math.floor(x0 / self.cell_size)
+        cy0 = math.floor(y0 / self.cell_size)
+        cx1 = math.floor(x1 / self.cell_size)
+        cy1 = math.floor(y1 / self.cell_size)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._cells):
+            # 查詢範圍比有東西的格子還多 (例如框選整張圖): 直接整批比對還快
+            candidates = np.arange(len(self.aabbs))
+        else:
+            found = set(self._large)
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    found.update(self._cells.get((cx, cy), ()))
+            if not found:
+                return []
+            candidates = np.fromiter(found, dtype=np.int64, count=len(found))
+        boxes = self.aabbs[candidates]
+        # NaN 的比較一律為 False, 空的 polygon 自然被排除
+        hit = (boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)
+        return np.sort(candidates[hit]).tolist()
+
+    def query_point(self, x: float, y: float) -> list[int]:
+        """AABB 包含點 (x, y) 的標註, 由小到大排序"""
+        return self.query_rect(x, y, x, y)
+
+
+def bbox_aabbs(bboxes: Sequence) -> np.ndarray:
+    """Bbox 的 AABB: 旋轉後角點與未旋轉矩形的聯集, 再外擴 AABB_MARGIN
+
+    取聯集是因為點選看旋轉後的形狀、框選看未旋轉的矩形, 一份索引要同時涵蓋兩者。
+
+    Returns:
+        (N, 4) xyxy
+    """
+    boxes = geometry.bboxes_to_array(bboxes)
+    out = geometry.boxes_aabb(boxes)
+    np.minimum(out[:, 0:2], boxes[:, 0:2], out=out[:, 0:2])
+    np.maximum(out[:, 2:4], boxes[:, 2:4], out=out[:, 2:4])
+    out[:, 0:2] -= AABB_MARGIN
+    out[:, 2:4] += AABB_MARGIN
+    return out
+
+
+class AnnotationIndex:
+    """一份標註 (bboxes + polygons) 的命中索引
+
+    polygon 的頂點先取整 (與畫面換算 _scale_to_widget 前的 int() 相同) 存成陣列,
+    命中判斷時不必每次從 list 重建。標註內容一改就整份重建 (見 ImageWidget._hitIndex)。
+    """
+
+    def __init__(self, bboxes: Sequence, polygons: Sequence):
+        """
+        Args:
+            bboxes: Bbox 清單
+            polygons: Polygon 清單
+        """
+        self.bboxes = GridIndex(bbox_aabbs(bboxes))
+        points, offsets = geometry.pack_polygons(p.points for p in polygons)
+        # int() 是往 0 取整, 對應 np.trunc
+        points = np.trunc(points)
+        self.polygon_points: list[np.ndarray] = [
+            points[offsets[i] : offsets[i + 1]] for i in range(len(polygons))
+        ]
+        aabbs = geometry.polygons_aabb(points, offsets)
+        aabbs[:, 0:2] -= AABB_MARGIN
+        aabbs[:, 2:4] += AABB_MARGIN
+        self.polygons = GridIndex(aabbs)
+        # 出現過的 label 名稱; 畫面據此估計 label 文字最寬多少 (視窗外的標註要不要畫)
+        self.labels: set[str] = {str(b.label) for b in bboxes} | {str(p.label) for p in polygons}
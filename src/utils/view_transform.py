@@ -1,5 +1,5 @@
 # 原始影像 pixel <-> widget pixel 的唯一換算處 (zoom + pan)。
-# 更新日期: 2026-08-21
+# 更新日期: 2026-10-19
 #
 # 不變量 (改動本檔以外的地方時請維持):
 #
@@ -14,6 +14,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 
 from PyQt6.QtCore import QPointF, QRectF, QSize
+from PyQt6.QtGui import QMatrix4x4
 
 # 允許的縮放範圍; 下限另外還會被 fit_zoom 的比例夾一次 (見 ImageWidget._min_zoom)
 MIN_ZOOM = 0.02
@@ -109,6 +110,32 @@ class ViewTransform:
             return length
         return length / self.zoom
 
+    def ndc_matrix(self, view: QSize, shift: float = 0.0) -> QMatrix4x4:
+        """原圖座標 -> OpenGL 正規化座標 (NDC) 的矩陣, 即 o2v 再換到 [-1, 1] (y 朝上)
+
+        GL 畫布把標註以原圖座標存在 vertex buffer, 檢視變換只靠這個 uniform,
+        zoom / pan 時不必重算任何頂點。
+
+        Args:
+            view: widget 尺寸
+            shift: 額外的 widget 位移 (px); 畫線時給 0.5 讓線落在 pixel 中心
+
+        Returns:
+            QMatrix4x4: 作用在 (x, y, 0, 1) 上的矩陣
+        """
+        w = max(1, view.width())
+        h = max(1, view.height())
+        sx = 2.0 * self.zoom / w
+        sy = -2.0 * self.zoom / h
+        tx = 2.0 * (self.off_x + shift) / w - 1.0
+        ty = 1.0 - 2.0 * (self.off_y + shift) / h
+        return QMatrix4x4(
+            sx, 0.0, 0.0, tx,
+            0.0, sy, 0.0, ty,
+            0.0, 0.0, 1.0, 0.0,
+            0.0, 0.0, 0.0, 1.0,
+        )
+
     def image_rect(self) -> QRectF:
         """整張影像在 widget 上佔的矩形"""
         return QRectF(self.off_x, self.off_y, self.span_x, self.span_y)
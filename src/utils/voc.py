@@ -0,0 +1,193 @@
+# VOC XML 的純資料解析與產生：不碰 Qt 也不讀 settings, 可直接丟進 process pool 的 worker 執行
+# 更新日期: 2026-10-19
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Sequence
+
+from src.utils.logger import getUniqueLogger
+
+log = getUniqueLogger(__file__)
+
+# VocObject.kind
+KIND_BBOX = "bbox"
+KIND_POLYGON = "polygon"
+
+
+@dataclass(slots=True)
+class VocObject:
+    """XML 裡的單一 <object>; bbox 與 polygon 共用, polygon 的外接框另外算好放在 xmin~ymax"""
+
+    label: str
+    kind: str
+    confidence: float = -1.0
+    xmin: float = 0.0
+    ymin: float = 0.0
+    xmax: float = 0.0
+    ymax: float = 0.0
+    angle: float = 0.0
+    points: list[tuple[float, float]] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class VocAnnotation:
+    """一份 VOC XML 的內容 (座標皆為原圖 pixel)"""
+
+    xml_name: str
+    filename: str
+    width: int
+    height: int
+    objects: list[VocObject] = field(default_factory=list)
+
+
+def _text(elem, tag: str, default: str | None = None) -> str | None:
+    """取子節點文字; 節點不存在時回傳 default"""
+    child = elem.find(tag)
+    if child is None or child.text is None:
+        return default
+    return child.text
+
+
+def parse_voc_xml(xml_path) -> VocAnnotation | None:
+    """解析一份本工具產生的 VOC XML
+
+    bbox 座標以 int(float()) 讀入: 本工具寫出的是整數, 但別的工具常寫成 "12.0",
+    直接 int() 會讓整份檔案讀不進來。沒有 <size> 的檔案無法正規化, 回傳 None,
+    與 FileHandler 的轉換流程「略過並警告」一致。
+
+    Args:
+        xml_path: XML 檔案路徑
+
+    Returns:
+        VocAnnotation; 無法解析或缺 <size> 時回傳 None
+    """
+    xml_path = Path(xml_path)
+    try:
+        root = ET.parse(xml_path).getroot()
+    except Exception as e:
+        log.e(f"解析 XML 失敗 ({xml_path}): {e}")
+        return None
+
+    size = root.find("size")
+    if size is None:
+        log.w(f"Warning: No size element found in {xml_path}, skipping")
+        return None
+    try:
+        width = int(float(_text(size, "width", "0")))
+        height = int(float(_text(size, "height", "0")))
+    except ValueError as e:
+        log.w(f"Warning: Invalid size in {xml_path}: {e}")
+        return None
+
+    ann = VocAnnotation(
+        xml_name=xml_path.name,
+        filename=_text(root, "filename", xml_path.stem),
+        width=width,
+        height=height,
+    )
+
+    for obj in root.findall("object"):
+        label = _text(obj, "name", "")
+        try:
+            bndbox = obj.find("bndbox")
+            polygon = obj.find("polygon")
+            if bndbox is not None:
+                ann.objects.append(
+                    VocObject(
+                        label=label,
+                        kind=KIND_BBOX,
+                        confidence=float(_text(bndbox, "confidence", "-1")),
+                        xmin=int(float(_text(bndbox, "xmin"))),
+                        ymin=int(float(_text(bndbox, "ymin"))),
+                        xmax=int(float(_text(bndbox, "xmax"))),
+                        ymax=int(float(_text(bndbox, "ymax"))),
+                        angle=float(_text(bndbox, "angle", "0")),
+                    )
+                )
+            elif polygon is not None:
+                points = [
+                    (float(_text(pt, "x")), float(_text(pt, "y")))
+                    for pt in polygon.findall("point")
+                ]
+                if not points:
+                    continue
+                xs = [p[0] for p in points]
+                ys = [p[1] for p in points]
+                ann.objects.append(
+                    VocObject(
+                        label=label,
+                        kind=KIND_POLYGON,
+                        confidence=float(_text(polygon, "confidence", "-1")),
+                        xmin=min(xs),
+                        ymin=min(ys),
+                        xmax=max(xs),
+                        ymax=max(ys),
+                        points=points,
+                    )
+                )
+        except (TypeError, ValueError) as e:
+            # 單一物件壞掉只跳過那一個, 不讓整份檔案作廢
+            log.w(f"Warning: Invalid object '{label}' in {xml_path}: {e}")
+            continue
+
+    return ann
+
+
+def build_voc_xml(
+    bboxes: Sequence,
+    polygons: Sequence,
+    image_filename: str,
+    folder_name: str,
+    width: int,
+    height: int,
+) -> str:
+    """由 bbox / polygon 產生本工具格式的 VOC XML 字串
+
+    bbox 座標與角度寫成整數、polygon 頂點取到小數一位 (讀回來時的取捨見
+    FileHandler._objects_as_saved)。
+
+    Args:
+        bboxes: Bbox 清單 (原圖座標)
+        polygons: Polygon 清單
+        image_filename: 圖檔名 (<filename>)
+        folder_name: 圖檔所在資料夾名稱 (<folder>)
+        width, height: 圖片寬高 (<size>)
+
+    Returns:
+        str: XML 內容
+    """
+    xml_str = "<annotation>\n"
+    xml_str += f"    <folder>{folder_name}</folder>\n"
+    xml_str += f"    <filename>{image_filename}</filename>\n"
+    xml_str += "    <size>\n"
+    xml_str += f"        <width>{width}</width>\n"
+    xml_str += f"        <height>{height}</height>\n"
+    xml_str += "    </size>\n"
+
+    for bbox in bboxes:
+        xml_str += "    <object>\n"
+        xml_str += f"        <name>{bbox.label}</name>\n"
+        xml_str += "        <bndbox>\n"
+        xml_str += f"            <xmin>{bbox.x}</xmin>\n"
+        xml_str += f"            <ymin>{bbox.y}</ymin>\n"
+        xml_str += f"            <xmax>{bbox.x + bbox.width}</xmax>\n"
+        xml_str += f"            <ymax>{bbox.y + bbox.height}</ymax>\n"
+        xml_str += f"            <confidence>{bbox.confidence}</confidence>\n"
+        xml_str += f"            <angle>{int(bbox.angle)}</angle>\n"
+        xml_str += "        </bndbox>\n"
+        xml_str += "    </object>\n"
+
+    for polygon in polygons:
+        xml_str += "    <object>\n"
+        xml_str += f"        <name>{polygon.label}</name>\n"
+        xml_str += "        <polygon>\n"
+        xml_str += f"            <confidence>{polygon.confidence}</confidence>\n"
+        for px, py in polygon.points:
+            xml_str += f"            <point><x>{px:.1f}</x><y>{py:.1f}</y></point>\n"
+        xml_str += "        </polygon>\n"
+        xml_str += "    </object>\n"
+
+    xml_str += "</annotation>\n"
+    return xml_str
@@ -0,0 +1,207 @@
+# VOC XML → YOLO txt 的批次轉換：chunk 為單位丟進 process pool, 進度與取消由呼叫端驅動
+# 更新日期: 2026-10-19
+#
+# 不碰 Qt、不讀 settings: worker process 只需要 import 這個模組 (與 voc / yolo_format),
+# class mapping 與輸出模式在建立 pool 時由 initializer 送進每個 worker 一次, 不隨每批重送。
+#
+# 增量轉換: 輸出資料夾的 CONVERT_MANIFEST 記錄每個 XML 上次轉換時的 (mtime, size, 內容雜湊)
+# 與未對應的 label, 以及整份的 mapping 指紋與輸出模式; 下次只轉新增與有變動的 XML。
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.utils.logger import getUniqueLogger
+from src.utils.parallel import chunked, default_workers, ordered_results
+from src.utils.voc import parse_voc_xml
+from src.utils.yolo_format import objects_to_lines
+
+log = getUniqueLogger(__file__)
+
+# 每批 XML 數; 一批約數十 ms, 進度條與取消的反應都夠即時
+CHUNK_SIZE = 200
+# 少於這個數量就在本 process 轉, 開 pool 的成本 (每個 worker 重新 import) 划不來
+PARALLEL_THRESHOLD = 500
+
+# 輸出資料夾內的增量轉換紀錄
+CONVERT_MANIFEST = ".convert_manifest.json"
+CONVERT_MANIFEST_VERSION = 1
+
+# worker 端的轉換參數, 由 _init_worker 設定
+_job_args: tuple[str, str, dict] | None = None
+
+
+@dataclass
+class ConvertReport:
+    """一次 VOC→YOLO 轉換的結果"""
+
+    total: int = 0          # 資料夾內的 XML 數
+    added: list[str] = field(default_factory=list)      # 新增 (上次沒轉過) 的 XML
+    changed: list[str] = field(default_factory=list)    # 內容有變動而重新轉換的 XML
+    removed: list[str] = field(default_factory=list)    # XML 已刪除, 連帶刪掉 txt 的檔名
+    unchanged: int = 0      # 沿用上次輸出
+    reused: int = 0         # 沿用存檔時輸出的 txt
+    full: bool = False      # mapping / 模式改變或沒有紀錄, 整批重轉
+    canceled: bool = False
+    not_matched: list[tuple[str, str]] = field(default_factory=list)  # (圖檔名, class_name)
+
+    def summary(self) -> str:
+        """一行的變動摘要"""
+        if self.full:
+            head = f"全部重新轉換 {len(self.added) + len(self.changed)} 個"
+        else:
+            head = (
+                f"新增 {len(self.added)}、變動 {len(self.changed)}、"
+                f"刪除 {len(self.removed)}、未變動 {self.unchanged}"
+            )
+        if self.reused:
+            head += f" (沿用存檔時的 txt {self.reused})"
+        return head
+
+
+def file_digest(path) -> str:
+    """檔案內容的雜湊; 只在 mtime 變了才算, 用來認出「存檔但內容沒變」的 XML"""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def load_convert_manifest(output_folder) -> dict | None:
+    """讀取輸出資料夾的 CONVERT_MANIFEST; 不存在、版本不符或壞掉時回傳 None"""
+    path = Path(output_folder) / CONVERT_MANIFEST
+    if not path.is_file():
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception as e:
+        log.e(f"讀取 {path} 失敗: {e}")
+        return None
+    if manifest.get("version") != CONVERT_MANIFEST_VERSION:
+        return None
+    manifest.setdefault("files", {})
+    return manifest
+
+
+def save_convert_manifest(output_folder, manifest: dict) -> None:
+    """寫回 CONVERT_MANIFEST (先寫暫存檔再取代, 中途當掉也不會留下半個 JSON)"""
+    path = Path(output_folder) / CONVERT_MANIFEST
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def convert_xml_to_txt(xml_path, output_folder, mode: str, categories: dict) -> list[tuple[str, str]]:
+    """轉換單個 VOC XML 為 YOLO txt (bbox / seg / obb 共用)
+
+    Args:
+        xml_path: VOC XML 路徑
+        output_folder: txt 輸出資料夾 (檔名同 XML)
+        mode: MODE_BBOX / MODE_SEG / MODE_OBB
+        categories: label -> class_id
+
+    Returns:
+        not_matched: 未對應到的 (圖檔名, class_name) 列表
+    """
+    ann = parse_voc_xml(xml_path)
+    if ann is None:
+        return []
+    if ann.width <= 0 or ann.height <= 0:
+        log.w(f"Warning: Invalid size in {xml_path}, skipping")
+        return []
+    lines, not_matched = objects_to_lines(
+        ann.objects, ann.width, ann.height, categories, mode, ann.filename, str(xml_path)
+    )
+    output_file = Path(output_folder) / Path(xml_path).with_suffix(".txt").name
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    return not_matched
+
+
+def _init_worker(output_folder: str, mode: str, categories: dict) -> None:
+    """pool initializer: 每個 worker 只收一次轉換參數"""
+    global _job_args
+    _job_args = (output_folder, mode, categories)
+
+
+def _convert_chunk(xml_paths: list[str]) -> list[tuple[list[tuple[str, str]], str]]:
+    """worker: 轉換一批 XML (模組層級函式才能被 pickle)
+
+    內容雜湊順便在 worker 算 (檔案剛讀過, 還在 page cache), 主 process 不必再讀一次。
+
+    Returns:
+        list: 與 xml_paths 同順序, 每個 XML 的 (not_matched, 內容雜湊); 失敗時雜湊為 ""
+    """
+    output_folder, mode, categories = _job_args
+    results = []
+    for xml_path in xml_paths:
+        try:
+            not_matched = convert_xml_to_txt(xml_path, output_folder, mode, categories)
+            results.append((not_matched, file_digest(xml_path)))
+        except Exception as e:
+            # 單檔失敗 (權限、磁碟滿) 不拖垮整批, 與逐檔轉換時的行為一致
+            log.e(f"轉換失敗 {xml_path}: {e}")
+            results.append(([], ""))
+    return results
+
+
+def convert_xml_files(
+    xml_paths: list,
+    output_folder,
+    mode: str,
+    categories: dict,
+    workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    is_canceled: Optional[Callable[[], bool]] = None,
+) -> tuple[list[tuple[list[tuple[str, str]], str]], bool]:
+    """批次轉換 XML; 數量夠多時以 process pool 平行處理
+
+    結果依 xml_paths 的順序依序取回 (不是依完成順序), 合併後的 not_matched
+    與 worker 數、排程快慢都無關。
+
+    Args:
+        xml_paths: 要轉換的 XML
+        output_folder: txt 輸出資料夾
+        mode: MODE_BBOX / MODE_SEG / MODE_OBB
+        categories: label -> class_id (呼叫端的快照)
+        workers: process pool 大小; None 則用 CPU 數, 1 則不開 pool
+        progress_callback: 每批完成後呼叫 (已完成數, 總數)
+        is_canceled: 每批完成後檢查, 回傳 True 時取消尚未開始的批次並返回
+
+    Returns:
+        (results, canceled): 每個 XML 的 (not_matched, 內容雜湊), 取消時只含已完成的前段;
+                             是否被取消
+    """
+    paths = [str(p) for p in xml_paths]
+    total = len(paths)
+    chunks = chunked(paths, CHUNK_SIZE)
+    results: list[tuple[list[tuple[str, str]], str]] = []
+    init_args = (str(output_folder), mode, categories)
+
+    def _consume(chunk_results) -> bool:
+        for chunk_result in chunk_results:
+            results.extend(chunk_result)
+            if progress_callback:
+                progress_callback(len(results), total)
+            if is_canceled and is_canceled():
+                return True
+        return False
+
+    if total < PARALLEL_THRESHOLD or default_workers(workers) <= 1:
+        _init_worker(*init_args)
+        canceled = _consume(_convert_chunk(chunk) for chunk in chunks)
+        return results, canceled
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=init_args
+    ) as pool:
+        canceled = _consume(ordered_results(pool, _convert_chunk, chunks, workers))
+        if canceled:
+            # 在途的批次跑完即止 (最多一個視窗), 還沒開始的直接丟掉
+            pool.shutdown(wait=True, cancel_futures=True)
+    return results, canceled
@@ -0,0 +1,197 @@
+# VOC 物件 → YOLO txt 行的純計算 (bbox / seg / obb)；存檔時直接輸出與整批轉換共用同一套算式
+# 更新日期: 2026-10-19
+#
+# 不碰 Qt、不讀 settings: categories 由呼叫端傳入, 才能直接丟進 process pool 的 worker。
+from __future__ import annotations
+
+import hashlib
+import json
+
+from src.utils import geometry
+from src.utils.logger import getUniqueLogger
+from src.utils.voc import KIND_BBOX, KIND_POLYGON, VocObject
+
+log = getUniqueLogger(__file__)
+
+# yolo_output_mode
+MODE_BBOX = "bbox"
+MODE_SEG = "seg"
+MODE_OBB = "obb"
+YOLO_MODES = (MODE_BBOX, MODE_SEG, MODE_OBB)
+
+
+def mapping_fingerprint(categories: dict) -> str:
+    """class mapping 的指紋; mapping 一改, 先前輸出的 txt 就不能再沿用
+
+    Args:
+        categories: settings.class_names.categories (label -> class_id)
+
+    Returns:
+        str: 16 字元的 hex 摘要 (與 dict 順序無關)
+    """
+    payload = json.dumps(categories, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def bbox_line(cid: int, xmin, ymin, xmax, ymax, img_w: int, img_h: int) -> str:
+    """標準 YOLO 格式: class_id cx cy w h (歸一化)"""
+    x_center = (xmin + xmax) / 2 / img_w
+    y_center = (ymin + ymax) / 2 / img_h
+    w = (xmax - xmin) / img_w
+    h = (ymax - ymin) / img_h
+    return f"{cid} {x_center:.6f} {y_center:.6f} {w:.6f} {h:.6f}"
+
+
+def rotated_corners(xmin, ymin, xmax, ymax, angle: float) -> list[tuple[float, float]]:
+    """單一 bbox 繞中心旋轉 angle 度 (順時針, 與畫面一致) 後的四個角點 (原圖 pixel)
+
+    角點順序為 top_left → top_right → bottom_right → bottom_left (旋轉前)。
+    整批計算請直接用 geometry.rotated_corners。
+    """
+    return geometry.corners_one(xmin, ymin, xmax, ymax, angle)
+
+
+def _format_line(cid: int, values: list[float]) -> str:
+    """class_id 後接歸一化座標 (已攤平的 x1 y1 x2 y2 ...)"""
+    # 一次 %-format 整行 (C 端迴圈), 比逐值 f-string 再 join 快; 輸出字元完全相同
+    return str(cid) + (" %.6f" * len(values)) % tuple(values)
+
+
+def obb_line(cid: int, xmin, ymin, xmax, ymax, angle: float, img_w: int, img_h: int) -> str:
+    """OBB 格式: class_id x1 y1 x2 y2 x3 y3 x4 y4 (旋轉後四角點, 歸一化)"""
+    values = []
+    for abs_x, abs_y in geometry.corners_one(xmin, ymin, xmax, ymax, angle):
+        values += (abs_x / img_w, abs_y / img_h)
+    return _format_line(cid, values)
+
+
+def seg_line(cid: int, points, img_w: int, img_h: int) -> str:
+    """Segmentation 格式: class_id x1 y1 ... xN yN (歸一化)"""
+    values = []
+    for px, py in points:
+        values += (px / img_w, py / img_h)
+    return _format_line(cid, values)
+
+
+def box_seg_line(cid: int, xmin, ymin, xmax, ymax, img_w: int, img_h: int) -> str:
+    """Segmentation 模式下 bbox 的退路: 四角點的 polygon (不套用角度, 與原轉換一致)"""
+    return seg_line(
+        cid, [(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)], img_w, img_h
+    )
+
+
+def objects_to_lines(
+    objects: list[VocObject],
+    img_w: int,
+    img_h: int,
+    categories: dict,
+    mode: str,
+    image_filename: str = "",
+    source: str = "",
+) -> tuple[list[str], list[tuple[str, str]]]:
+    """把一張圖的物件轉成 YOLO txt 的各行
+
+    規則與 VOC→YOLO 轉換一致:
+    * label 不在 categories (或 id 不是整數) → 記進 not_matched 並略過
+    * bbox / obb 模式只輸出 bndbox; obb 模式下角度為 0 的框仍用標準格式
+    * seg 模式輸出 polygon 頂點; bbox 退化成四角點 polygon
+
+    Args:
+        objects: 物件 (座標為原圖 pixel)
+        img_w: 影像寬
+        img_h: 影像高
+        categories: label -> class_id
+        mode: MODE_BBOX / MODE_SEG / MODE_OBB
+        image_filename: 寫進 not_matched 的圖檔名
+        source: log 用的來源描述 (XML 路徑等)
+
+    Returns:
+        (lines, not_matched): txt 各行; 未對應的 (圖檔名, label)
+    """
+    lines: list[str] = []
+    not_matched: list[tuple[str, str]] = []
+
+    # 標註多的圖: OBB 角點 / polygon 頂點整張圖一次 numpy 算完並歸一化;
+    # 少的圖逐個物件算反而快 (見 geometry.VECTOR_MIN), 兩條路的輸出逐位元相同
+    normalized: dict[int, list[float]] = {}
+    if mode == MODE_OBB:
+        rotated = [i for i, o in enumerate(objects) if o.kind == KIND_BBOX and o.angle != 0]
+        if len(rotated) >= geometry.VECTOR_MIN:
+            boxes = geometry.boxes_array(
+                (objects[i].xmin, objects[i].ymin, objects[i].xmax, objects[i].ymax,
+                 objects[i].angle)
+                for i in rotated
+            )
+            corners = geometry.normalize_points(geometry.rotated_corners(boxes), img_w, img_h)
+            normalized = dict(zip(rotated, corners.reshape(len(rotated), 8).tolist()))
+    elif mode == MODE_SEG:
+        polys = [i for i, o in enumerate(objects) if o.kind == KIND_POLYGON]
+        if len(polys) >= geometry.VECTOR_MIN:
+            points, offsets = geometry.pack_polygons(objects[i].points for i in polys)
+            flat = geometry.normalize_points(points, img_w, img_h).ravel().tolist()
+            bounds = (offsets * 2).tolist()
+            normalized = {
+                i: flat[bounds[k]:bounds[k + 1]] for k, i in enumerate(polys)
+            }
+
+    for i, obj in enumerate(objects):
+        label = obj.label
+        if label not in categories:
+            log.w(f"Warning: Label '{label}' not in categories")
+            not_matched.append((image_filename, label))
+            continue
+        cid = categories.get(label)
+        if cid is None or not isinstance(cid, int):
+            log.w(f"Warning: Category ID not found for label '{label}', skipping")
+            not_matched.append((image_filename, label))
+            continue
+
+        if mode == MODE_SEG:
+            if obj.kind == KIND_POLYGON:
+                if i in normalized:
+                    lines.append(_format_line(cid, normalized[i]))
+                else:
+                    lines.append(seg_line(cid, obj.points, img_w, img_h))
+            else:
+                lines.append(
+                    box_seg_line(cid, obj.xmin, obj.ymin, obj.xmax, obj.ymax, img_w, img_h)
+                )
+            continue
+
+        if obj.kind != KIND_BBOX:
+            log.w(f"Warning: No bndbox element for '{label}' in {source}, skipping")
+            continue
+        if mode == MODE_OBB and obj.angle != 0:
+            if i in normalized:
+                lines.append(_format_line(cid, normalized[i]))
+            else:
+                lines.append(
+                    obb_line(cid, obj.xmin, obj.ymin, obj.xmax, obj.ymax, obj.angle, img_w, img_h)
+                )
+        else:
+            lines.append(bbox_line(cid, obj.xmin, obj.ymin, obj.xmax, obj.ymax, img_w, img_h))
+    return lines, not_matched
+
+
+def lines_match(expected: list[str], actual: list[str], tol: float = 2e-6) -> bool:
+    """比較兩份 txt 內容; 數值容許 tol 的誤差 (不同路徑算出的浮點數末位可能差 1)
+
+    Args:
+        expected: 由 XML 算出的各行
+        actual: 檔案裡的各行
+
+    Returns:
+        bool: 是否一致 (行的順序也要一致)
+    """
+    if len(expected) != len(actual):
+        return False
+    for a, b in zip(expected, actual):
+        fa, fb = a.split(), b.split()
+        if len(fa) != len(fb) or fa[0] != fb[0]:
+            return False
+        try:
+            if any(abs(float(x) - float(y)) > tol for x, y in zip(fa[1:], fb[1:])):
+                return False
+        except ValueError:
+            return False
+    return True